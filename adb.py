@@ -0,0 +1,254 @@
+"""Asynchronní fasáda nad db.py.
+
+`adb.<funkce>(...)` zrcadlí funkce z db.py označené `@db_query` / `@db_write` a vrací
+awaitable. Zápisy běží sériově na jednom dedikovaném writer vlákně, čtení na
+malém poolu vláken, takže pomalý fsync už neblokuje event loop (ani gateway
+heartbeat).
+"""
+
+import ast
+import asyncio
+import concurrent.futures
+import functools
+import inspect
+import logging
+import sys
+import textwrap
+import threading
+from dataclasses import dataclass
+from types import ModuleType
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+import db
+
+logger = logging.getLogger("botdc.adb")
+
+_executor_lock = threading.Lock()
+_writer_executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+_reader_executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+_wrappers: Dict[str, Callable[..., Any]] = {}
+
+
+def _get_writer_executor() -> concurrent.futures.ThreadPoolExecutor:
+    global _writer_executor
+    with _executor_lock:
+        if _writer_executor is None:
+            _writer_executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="botdc-db-writer"
+            )
+        return _writer_executor
+
+
+def _get_reader_executor() -> concurrent.futures.ThreadPoolExecutor:
+    global _reader_executor
+    with _executor_lock:
+        if _reader_executor is None:
+            _reader_executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=db.DB_READ_POOL_SIZE, thread_name_prefix="botdc-db-reader"
+            )
+        return _reader_executor
+
+
+def is_write_function(name: str) -> bool:
+    """Podle deklarace v db.py (`@db_write`); neregistrované funkce se berou jako zápis."""
+    return db.QUERY_FUNCTIONS.get(name, "write") == "write"
+
+
+async def run_write(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Spustí `func` na writer vlákně; zápisy se provedou v pořadí odeslání."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _get_writer_executor(), functools.partial(func, *args, **kwargs)
+    )
+
+
+async def run_read(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _get_reader_executor(), functools.partial(func, *args, **kwargs)
+    )
+
+
+def _log_failed_write(future: concurrent.futures.Future, name: str) -> None:
+    if future.cancelled():
+        return
+    exc = future.exception()
+    if exc is not None:
+        logger.error("Asynchronní DB zápis %s selhal.", name, exc_info=exc)
+
+
+def submit_write(
+    func: Callable[..., Any], *args: Any, **kwargs: Any
+) -> concurrent.futures.Future:
+    """Zařadí zápis na writer vlákno bez čekání na výsledek.
+
+    Použitelné i ze synchronního kódu běžícího na event loopu; chyby se jen
+    zalogují.
+    """
+    future = _get_writer_executor().submit(func, *args, **kwargs)
+    name = getattr(func, "__name__", repr(func))
+    future.add_done_callback(lambda done: _log_failed_write(done, name))
+    return future
+
+
+def shutdown(wait: bool = True) -> None:
+    """Dokončí rozpracované zápisy a ukončí vlákna fasády."""
+    global _writer_executor, _reader_executor
+    with _executor_lock:
+        writer, reader = _writer_executor, _reader_executor
+        _writer_executor = None
+        _reader_executor = None
+    if writer is not None:
+        writer.shutdown(wait=wait)
+    if reader is not None:
+        reader.shutdown(wait=wait)
+
+
+def _make_async(name: str, func: Callable[..., Any]) -> Callable[..., Any]:
+    run = run_write if is_write_function(name) else run_read
+
+    @functools.wraps(func)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        return await run(func, *args, **kwargs)
+
+    return wrapper
+
+
+def __getattr__(name: str) -> Callable[..., Any]:
+    wrapper = _wrappers.get(name)
+    if wrapper is not None:
+        return wrapper
+    func = getattr(db, name, None)
+    if name.startswith("_") or name not in query_function_names():
+        raise AttributeError(f"module 'adb' has no attribute {name!r}")
+    wrapper = _make_async(name, func)
+    _wrappers[name] = wrapper
+    return wrapper
+
+
+# ---------- KONTROLA SYNCHRONNÍCH VOLÁNÍ ----------
+
+
+def query_function_names() -> frozenset:
+    """Názvy funkcí z db.py označených `@db_query` / `@db_write`."""
+    return frozenset(db.QUERY_FUNCTIONS)
+
+
+@dataclass(frozen=True)
+class SyncDbCall:
+    module: str
+    filename: str
+    lineno: int
+    coroutine: str
+    function: str
+
+
+class _SyncDbCallVisitor(ast.NodeVisitor):
+    def __init__(self, module: ModuleType, db_names: frozenset) -> None:
+        self.module = module
+        self.filename = getattr(module, "__file__", "") or ""
+        self.db_names = db_names
+        self.imported: Dict[str, str] = {}
+        self.db_aliases: Set[str] = set()
+        self.coroutines: List[Optional[str]] = []
+        self.findings: List[SyncDbCall] = []
+
+    def visit_Import(self, node: ast.Import) -> None:
+        for alias in node.names:
+            if alias.name == "db":
+                self.db_aliases.add(alias.asname or alias.name)
+
+    def visit_ImportFrom(self, node: ast.ImportFrom) -> None:
+        if node.module == "db" and node.level == 0:
+            for alias in node.names:
+                if alias.name in self.db_names:
+                    self.imported[alias.asname or alias.name] = alias.name
+
+    def visit_AsyncFunctionDef(self, node: ast.AsyncFunctionDef) -> None:
+        self.coroutines.append(node.name)
+        self.generic_visit(node)
+        self.coroutines.pop()
+
+    def visit_FunctionDef(self, node: ast.FunctionDef) -> None:
+        # Vnořené synchronní funkce se typicky posílají do vlákna.
+        self.coroutines.append(None)
+        self.generic_visit(node)
+        self.coroutines.pop()
+
+    def visit_Lambda(self, node: ast.Lambda) -> None:
+        self.coroutines.append(None)
+        self.generic_visit(node)
+        self.coroutines.pop()
+
+    def visit_Call(self, node: ast.Call) -> None:
+        coroutine = self.coroutines[-1] if self.coroutines else None
+        if coroutine is not None:
+            target = None
+            if isinstance(node.func, ast.Name):
+                target = self.imported.get(node.func.id)
+            elif (
+                isinstance(node.func, ast.Attribute)
+                and isinstance(node.func.value, ast.Name)
+                and node.func.value.id in self.db_aliases
+                and node.func.attr in self.db_names
+            ):
+                target = node.func.attr
+            if target is not None:
+                self.findings.append(
+                    SyncDbCall(
+                        module=self.module.__name__,
+                        filename=self.filename,
+                        lineno=node.lineno,
+                        coroutine=coroutine,
+                        function=target,
+                    )
+                )
+        self.generic_visit(node)
+
+
+def find_sync_db_calls(modules: Iterable[ModuleType]) -> List[SyncDbCall]:
+    """Najde přímá volání synchronních funkcí z db.py uvnitř `async def`.
+
+    Kontrola je čistě syntaktická: nezachytí volání přes synchronní pomocné
+    metody a nevidí, jestli se funkce předává do vlákna jinak než vnořenou
+    funkcí nebo lambdou.
+    """
+    db_names = query_function_names()
+    findings: List[SyncDbCall] = []
+    seen: Set[str] = set()
+    for module in modules:
+        if module is None or module.__name__ in seen or module is db:
+            continue
+        seen.add(module.__name__)
+        try:
+            source = textwrap.dedent(inspect.getsource(module))
+        except (OSError, TypeError):
+            continue
+        visitor = _SyncDbCallVisitor(module, db_names)
+        visitor.visit(ast.parse(source))
+        findings.extend(visitor.findings)
+    return findings
+
+
+def warn_sync_db_calls(modules: Iterable[ModuleType]) -> List[SyncDbCall]:
+    findings = find_sync_db_calls(modules)
+    for finding in findings:
+        logger.warning(
+            "Synchronní DB volání %s() v korutině %s (%s:%d) blokuje event loop; použij adb.",
+            finding.function,
+            finding.coroutine,
+            finding.filename,
+            finding.lineno,
+        )
+    if findings:
+        logger.info("Kontrola DB volání: %d synchronních volání v korutinách.", len(findings))
+    return findings
+
+
+def modules_of(objects: Iterable[Any]) -> List[ModuleType]:
+    modules: List[ModuleType] = []
+    for obj in objects:
+        module = sys.modules.get(type(obj).__module__)
+        if module is not None:
+            modules.append(module)
+    return modules
@@ -0,0 +1,81 @@
+"""Benchmark detekce ověřeného nicku ve writeru (zprávy za sekundu).
+
+Porovnává původní cestu (settings + json.loads pro každé slovo) s in-memory
+indexem `clan_member_nick_index`. Spouští se nad dočasnou databází:
+
+    python benchmarks/bench_clan_nick_index.py
+"""
+
+import json
+import os
+import random
+import string
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DISCORD_TOKEN", "benchmark")
+
+import db  # noqa: E402
+
+MEMBER_COUNT = 500
+MESSAGE_COUNT = 300
+WORDS_PER_MESSAGE = 40
+
+
+def _legacy_find_nick(text: str) -> bool:
+    for token in text.split():
+        candidate = db.normalize_clan_member_name(token.strip(string.punctuation))
+        if not candidate:
+            continue
+        payload = db.get_setting(db.CLAN_MEMBER_CACHE_SETTING_KEY)
+        if not payload:
+            continue
+        cache = json.loads(payload)
+        if candidate in cache:
+            return True
+    return False
+
+
+def _build_messages(rng: random.Random) -> list[str]:
+    words = ["".join(rng.choices(string.ascii_lowercase, k=6)) for _ in range(2000)]
+    return [
+        " ".join(rng.choices(words, k=WORDS_PER_MESSAGE)) + "!"
+        for _ in range(MESSAGE_COUNT)
+    ]
+
+
+def _measure(label: str, func, messages: list[str]) -> float:
+    started = time.perf_counter()
+    for message in messages:
+        func(message)
+    elapsed = time.perf_counter() - started
+    rate = len(messages) / elapsed if elapsed else float("inf")
+    print(f"{label:<10} {rate:>12.1f} zpráv/s")
+    return rate
+
+
+def main() -> None:
+    from cog_discord_writer import _find_prefix_and_nick_in_text
+
+    rng = random.Random(42)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db.connection_manager.db_path = os.path.join(tmp_dir, "bench.db")
+        db.init_db()
+        cache = {
+            f"member_{index}": {"id": index, "name": f"Member_{index}"}
+            for index in range(MEMBER_COUNT)
+        }
+        db.set_setting(db.CLAN_MEMBER_CACHE_SETTING_KEY, json.dumps(cache))
+        db.clan_member_nick_index.replace(cache.keys())
+        messages = _build_messages(rng)
+
+        before = _measure("před", _legacy_find_nick, messages)
+        after = _measure("po", _find_prefix_and_nick_in_text, messages)
+        print(f"zrychlení  {after / before:>12.1f}x")
+        db.close_connections()
+
+
+if __name__ == "__main__":
+    main()
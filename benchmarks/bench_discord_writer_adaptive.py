@@ -0,0 +1,166 @@
+"""Simulace adaptivního globálního limitu Discord write fronty.
+
+Falešný server drží globální limit (požadavky za sekundu) a per-route
+buckety s hlavičkami X-RateLimit-*; po překročení vrací 429. Porovná pevný
+rozestup zápisů (token bucket bez návalu a bez adaptace, tj. původní
+chování) s AIMD limiterem. Per-operation podlahy jsou vypnuté, aby se
+měřil jen globální limit.
+
+Spuštění: python benchmarks/bench_discord_writer_adaptive.py
+"""
+
+import asyncio
+import collections
+import os
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DISCORD_TOKEN", "benchmark")
+
+import discord  # noqa: E402
+
+import adb  # noqa: E402
+import db  # noqa: E402
+from cog_discord_writer import AdaptiveRateLimiter, DiscordWriteCoordinatorCog  # noqa: E402
+
+CHANNELS = 20
+EDITS_PER_CHANNEL = 5
+REQUEST_SECONDS = 0.04
+CONCURRENCY = 8
+# Falešný server: globální limit a bucket per kanál (5 zápisů za 5 s).
+SERVER_GLOBAL_PER_SECOND = 25
+SERVER_BUCKET_LIMIT = 5
+SERVER_BUCKET_WINDOW = 5.0
+FIXED_INTERVAL_SECONDS = 0.1
+
+
+class FakeDiscordServer:
+    def __init__(self) -> None:
+        self.global_hits: "collections.deque[float]" = collections.deque()
+        self.buckets: dict[int, tuple[float, int]] = {}
+        self.responses: collections.Counter[str] = collections.Counter()
+
+    def handle(self, channel_id: int) -> dict[str, str]:
+        now = time.monotonic()
+        while self.global_hits and self.global_hits[0] <= now - 1.0:
+            self.global_hits.popleft()
+        if len(self.global_hits) >= SERVER_GLOBAL_PER_SECOND:
+            self.responses["429 global"] += 1
+            retry_after = self.global_hits[0] + 1.0 - now
+            raise _rate_limited(
+                {"X-RateLimit-Global": "true", "X-RateLimit-Scope": "global"}, retry_after
+            )
+        reset_at, used = self.buckets.get(channel_id, (now + SERVER_BUCKET_WINDOW, 0))
+        if reset_at <= now:
+            reset_at, used = now + SERVER_BUCKET_WINDOW, 0
+        headers = {
+            "X-Ratelimit-Bucket": f"route-{channel_id}",
+            "X-Ratelimit-Limit": str(SERVER_BUCKET_LIMIT),
+            "X-Ratelimit-Reset-After": f"{reset_at - now:.3f}",
+        }
+        if used >= SERVER_BUCKET_LIMIT:
+            self.responses["429 bucket"] += 1
+            headers["X-Ratelimit-Remaining"] = "0"
+            headers["X-RateLimit-Scope"] = "user"
+            raise _rate_limited(headers, reset_at - now)
+        self.global_hits.append(now)
+        self.buckets[channel_id] = (reset_at, used + 1)
+        headers["X-Ratelimit-Remaining"] = str(SERVER_BUCKET_LIMIT - used - 1)
+        self.responses["200"] += 1
+        return headers
+
+
+def _rate_limited(headers: dict[str, str], retry_after: float) -> discord.HTTPException:
+    response = SimpleNamespace(status=429, reason="Too Many Requests", headers=headers)
+    exc = discord.HTTPException(response, {"message": "You are being rate limited."})
+    exc.retry_after = max(0.0, retry_after)
+    return exc
+
+
+async def _run(limiter: AdaptiveRateLimiter) -> tuple[float, list[float], FakeDiscordServer]:
+    server = FakeDiscordServer()
+    writer = DiscordWriteCoordinatorCog(SimpleNamespace())
+    writer._max_concurrency = CONCURRENCY
+    writer._min_interval_seconds = FIXED_INTERVAL_SECONDS
+    writer._rate_limiter = limiter
+    writer._operation_min_intervals = {}
+    writer._warmup_seconds = 0.0
+    writer._max_backoff_seconds = SERVER_BUCKET_WINDOW
+
+    async def _fake_execute(request):
+        await asyncio.sleep(REQUEST_SECONDS)
+        headers = server.handle(request.payload["channel_id"])
+        # Stejně jako patchnutý discord.py Ratelimit.update po úspěšné odpovědi.
+        writer._capture_rate_limit_headers(
+            headers, writer._get_rate_limit_bucket_key(request), force_block=False
+        )
+        return request.payload["message_id"]
+
+    writer._execute_request = _fake_execute
+    writer._worker_tasks = [
+        asyncio.create_task(writer._worker_loop()) for _ in range(CONCURRENCY)
+    ]
+    writer._worker_tasks.append(asyncio.create_task(writer._timer_loop()))
+    latencies: list[float] = []
+
+    async def _edit(channel_id: int, message_id: int) -> None:
+        started = time.perf_counter()
+        await writer._enqueue(
+            "edit_message",
+            {"channel_id": channel_id, "message_id": message_id, "kwargs": {}},
+            persist=False,
+        )
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(
+        *(
+            _edit(channel_id, channel_id * 1000 + index)
+            for index in range(EDITS_PER_CHANNEL)
+            for channel_id in range(CHANNELS)
+        )
+    )
+    elapsed = time.perf_counter() - started
+    for task in writer._worker_tasks:
+        task.cancel()
+    await asyncio.gather(*writer._worker_tasks, return_exceptions=True)
+    await writer._journal.close()
+    return elapsed, latencies, server
+
+
+def _report(label: str, elapsed: float, latencies: list[float], server, limiter) -> None:
+    ordered = sorted(latencies)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    print(
+        f"{label:<10} {elapsed:>6.2f} s {len(latencies) / elapsed:>6.1f} ops/s "
+        f"p99 {p99:>5.2f} s · 429 global {server.responses['429 global']:>3} · "
+        f"429 bucket {server.responses['429 bucket']:>3} · "
+        f"konečná rychlost {limiter.rate:.1f}/s"
+    )
+
+
+async def main() -> None:
+    fixed_rate = 1.0 / FIXED_INTERVAL_SECONDS
+    fixed = AdaptiveRateLimiter(
+        fixed_rate, min_rate=fixed_rate, max_rate=fixed_rate, burst=1, increase=0, decrease=1
+    )
+    fixed_elapsed, fixed_latencies, fixed_server = await _run(fixed)
+    _report("pevný", fixed_elapsed, fixed_latencies, fixed_server, fixed)
+    adaptive = AdaptiveRateLimiter(
+        fixed_rate, min_rate=1.0, max_rate=50.0, burst=5, increase=1.0, decrease=0.5
+    )
+    adaptive_elapsed, adaptive_latencies, adaptive_server = await _run(adaptive)
+    _report("AIMD", adaptive_elapsed, adaptive_latencies, adaptive_server, adaptive)
+    print(f"zrychlení {fixed_elapsed / adaptive_elapsed:>8.1f}x")
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db.connection_manager.db_path = os.path.join(tmp_dir, "bench.db")
+        db.init_db()
+        asyncio.run(main())
+        adb.shutdown()
+        db.close_connections()
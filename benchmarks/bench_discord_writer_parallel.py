@@ -0,0 +1,123 @@
+"""Benchmark paralelních workerů Discord write fronty.
+
+Simuluje nával editací panelů v několika kanálech (každý zápis trvá jako
+REST volání) a porovná jeden worker s poolem workerů nad podfrontami
+per rate limit bucket. Druhý scénář přidá 429 na jednom kanálu; jeho
+bucket se do vypršení přeskakuje a ostatní kanály se zapisují dál.
+
+Spuštění: python benchmarks/bench_discord_writer_parallel.py
+"""
+
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DISCORD_TOKEN", "benchmark")
+
+import discord  # noqa: E402
+
+import adb  # noqa: E402
+import db  # noqa: E402
+from cog_discord_writer import AdaptiveRateLimiter, DiscordWriteCoordinatorCog  # noqa: E402
+
+CHANNELS = 8
+EDITS_PER_CHANNEL = 10
+REQUEST_SECONDS = 0.06
+# Globální limit Discordu je 50 požadavků/s.
+MIN_INTERVAL_SECONDS = 0.02
+RATE_LIMITED_CHANNEL = 0
+RETRY_AFTER_SECONDS = 1.0
+
+
+def _rate_limited() -> discord.HTTPException:
+    response = SimpleNamespace(status=429, reason="Too Many Requests", headers={})
+    exc = discord.HTTPException(response, {"message": "You are being rate limited."})
+    exc.retry_after = RETRY_AFTER_SECONDS
+    return exc
+
+
+async def _run(concurrency: int, with_429: bool) -> tuple[float, list[float]]:
+    writer = DiscordWriteCoordinatorCog(SimpleNamespace())
+    writer._max_concurrency = concurrency
+    writer._min_interval_seconds = MIN_INTERVAL_SECONDS
+    rate = 1.0 / MIN_INTERVAL_SECONDS
+    writer._rate_limiter = AdaptiveRateLimiter(
+        rate, min_rate=rate, max_rate=rate, burst=1, increase=0, decrease=1
+    )
+    writer._operation_min_intervals = {}
+    writer._warmup_seconds = 0.0
+    writer._max_backoff_seconds = RETRY_AFTER_SECONDS
+    limited: set[int] = set()
+
+    async def _fake_execute(request):
+        await asyncio.sleep(REQUEST_SECONDS)
+        channel_id = request.payload["channel_id"]
+        if with_429 and channel_id == RATE_LIMITED_CHANNEL and channel_id not in limited:
+            limited.add(channel_id)
+            raise _rate_limited()
+        return request.payload["message_id"]
+
+    writer._execute_request = _fake_execute
+    writer._worker_tasks = [
+        asyncio.create_task(writer._worker_loop()) for _ in range(concurrency)
+    ]
+    # Retry po 429 vrací do fronty timer odložených požadavků.
+    writer._worker_tasks.append(asyncio.create_task(writer._timer_loop()))
+    latencies: list[float] = []
+
+    async def _edit(channel_id: int, message_id: int) -> None:
+        started = time.perf_counter()
+        await writer._enqueue(
+            "edit_message",
+            {"channel_id": channel_id, "message_id": message_id, "kwargs": {}},
+            persist=False,
+        )
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(
+        *(
+            _edit(channel_id, channel_id * 1000 + index)
+            for index in range(EDITS_PER_CHANNEL)
+            for channel_id in range(CHANNELS)
+        )
+    )
+    elapsed = time.perf_counter() - started
+    for task in writer._worker_tasks:
+        task.cancel()
+    await asyncio.gather(*writer._worker_tasks, return_exceptions=True)
+    await writer._journal.close()
+    return elapsed, latencies
+
+
+def _report(label: str, elapsed: float, latencies: list[float]) -> None:
+    ordered = sorted(latencies)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    print(
+        f"{label:<22} {elapsed * 1000:>8.0f} ms {len(latencies) / elapsed:>7.1f} ops/s "
+        f"p50 {statistics.median(ordered) * 1000:>6.0f} ms p99 {p99 * 1000:>6.0f} ms"
+    )
+
+
+async def main() -> None:
+    for with_429 in (False, True):
+        print("s 429 na jednom kanálu" if with_429 else "bez rate limitu")
+        serial_elapsed, serial_latencies = await _run(1, with_429)
+        _report("  1 worker", serial_elapsed, serial_latencies)
+        parallel_elapsed, parallel_latencies = await _run(4, with_429)
+        _report("  4 workeři", parallel_elapsed, parallel_latencies)
+        print(f"  zrychlení {serial_elapsed / parallel_elapsed:>11.1f}x")
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db.connection_manager.db_path = os.path.join(tmp_dir, "bench.db")
+        db.init_db()
+        asyncio.run(main())
+        adb.shutdown()
+        db.close_connections()
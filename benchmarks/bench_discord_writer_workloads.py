@@ -0,0 +1,264 @@
+"""Propustnost Discord write fronty proti lokální náhradě Discord REST API.
+
+Spustí benchmarks/fake_discord.py (aiohttp server s bucket a globálními
+limity) a pošle na něj zápisy přes DiscordWriteCoordinatorCog; místo
+discord.py volá REST přímo executor benchmarku a hlavičky předává writeru
+stejně jako patchnutý Ratelimit.update. Scénáře:
+
+- panel_storm – opakované editace panelů v mnoha kanálech
+- dm_fanout – zprávy do mnoha DM kanálů (hlavně globální limit)
+- interaction_burst – nával odpovědí na interakce (rychlý pruh, lhůta 3 s)
+- cleanup – mazání zpráv po jedné (slučování do bulk delete)
+
+Pro každý scénář vypíše ops/s, p50/p99 latenci od zařazení do výsledku,
+429 podle serveru a deadline missy interakcí.
+
+Spuštění: python benchmarks/bench_discord_writer_workloads.py [scénář ...]
+  --floors        ponechat DISCORD_WRITE_OPERATION_MIN_INTERVALS (default vypnuto)
+  --concurrency N počet workerů fronty
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DISCORD_TOKEN", "benchmark")
+
+import aiohttp  # noqa: E402
+import discord  # noqa: E402
+
+import adb  # noqa: E402
+import db  # noqa: E402
+from cog_discord_writer import DISCORD_EPOCH_MS, DiscordWriteCoordinatorCog  # noqa: E402
+from fake_discord import FakeDiscordServer  # noqa: E402
+
+PANEL_CHANNELS = 10
+PANELS_PER_CHANNEL = 3
+PANEL_ROUNDS = 5
+PANEL_ROUND_SECONDS = 0.2
+DM_RECIPIENTS = 200
+INTERACTIONS = 120
+INTERACTION_SPREAD_SECONDS = 1.0
+CLEANUP_CHANNELS = 4
+CLEANUP_MESSAGES = 40
+
+
+class FakeRestExecutor:
+    """Převede WriteRequest na REST volání proti FakeDiscordServer."""
+
+    def __init__(
+        self,
+        writer: DiscordWriteCoordinatorCog,
+        session: aiohttp.ClientSession,
+        base_url: str,
+    ):
+        self.writer = writer
+        self.session = session
+        self.base_url = base_url
+
+    @staticmethod
+    def _route(request) -> tuple[str, str, dict | None]:
+        payload = request.payload
+        operation = request.operation
+        if operation == "send_message":
+            return "POST", f"/channels/{payload['channel_id']}/messages", payload["kwargs"]
+        if operation == "edit_message":
+            path = f"/channels/{payload['channel_id']}/messages/{payload['message_id']}"
+            return "PATCH", path, payload["kwargs"]
+        if operation == "delete_message":
+            path = f"/channels/{payload['channel_id']}/messages/{payload['message_id']}"
+            return "DELETE", path, None
+        if operation == "delete_messages":
+            path = f"/channels/{payload['channel_id']}/messages/bulk-delete"
+            return "POST", path, {"messages": [str(item) for item in payload["message_ids"]]}
+        if operation == "interaction_response":
+            interaction = payload["interaction"]
+            path = f"/interactions/{interaction.id}/{interaction.token}/callback"
+            return "POST", path, {"type": 4, "data": payload["kwargs"]}
+        raise RuntimeError(f"Benchmark nepodporuje operaci {operation}.")
+
+    async def __call__(self, request):
+        method, path, body = self._route(request)
+        bucket_key = self.writer._get_rate_limit_bucket_key(request)
+        async with self.session.request(method, self.base_url + path, json=body) as response:
+            data = None
+            if response.content_type == "application/json":
+                data = await response.json()
+            # Jako patchnutý Ratelimit.update v discord.py po každé odpovědi.
+            self.writer._capture_rate_limit_headers(
+                response.headers, bucket_key, force_block=False
+            )
+            if response.status == 429:
+                exc = discord.HTTPException(response, data)
+                exc.retry_after = data["retry_after"]
+                raise exc
+            if response.status >= 400:
+                raise discord.HTTPException(response, data)
+            if request.operation == "interaction_response":
+                request.payload["interaction"].response.done = True
+            return data
+
+
+def _snowflake(offset: int) -> int:
+    return ((int(time.time() * 1000) - DISCORD_EPOCH_MS) << 22) + offset
+
+
+def _interaction(index: int):
+    response = SimpleNamespace(done=False)
+    response.is_done = lambda: response.done
+    return SimpleNamespace(
+        id=_snowflake(index),
+        token=f"token{index}",
+        application_id=1,
+        channel_id=500,
+        created_at=datetime.now(timezone.utc),
+        response=response,
+    )
+
+
+async def panel_storm(writer, submit) -> None:
+    for _round in range(PANEL_ROUNDS):
+        for channel in range(PANEL_CHANNELS):
+            for panel in range(PANELS_PER_CHANNEL):
+                submit(
+                    "edit_message",
+                    {
+                        "channel_id": 1000 + channel,
+                        "message_id": 1_000_000 + channel * 100 + panel,
+                        "kwargs": {"content": f"kolo {_round}"},
+                    },
+                )
+        await asyncio.sleep(PANEL_ROUND_SECONDS)
+
+
+async def dm_fanout(writer, submit) -> None:
+    for recipient in range(DM_RECIPIENTS):
+        submit(
+            "send_message",
+            {"channel_id": 2_000_000 + recipient, "kwargs": {"content": "Oznámení"}},
+        )
+
+
+async def interaction_burst(writer, submit) -> None:
+    for index in range(INTERACTIONS):
+        submit(
+            "interaction_response",
+            {"interaction": _interaction(index), "args": (), "kwargs": {"content": "ok"}},
+        )
+        await asyncio.sleep(INTERACTION_SPREAD_SECONDS / INTERACTIONS)
+
+
+async def cleanup(writer, submit) -> None:
+    for index in range(CLEANUP_MESSAGES):
+        for channel in range(CLEANUP_CHANNELS):
+            submit(
+                "delete_message",
+                {
+                    "channel_id": 3000 + channel,
+                    "message_id": _snowflake(channel * 1000 + index),
+                    "kwargs": {},
+                },
+            )
+        await asyncio.sleep(0.005)
+
+
+WORKLOADS = {
+    "panel_storm": panel_storm,
+    "dm_fanout": dm_fanout,
+    "interaction_burst": interaction_burst,
+    "cleanup": cleanup,
+}
+
+
+async def _run_workload(name, server, session, args) -> None:
+    server.reset()
+    writer = DiscordWriteCoordinatorCog(SimpleNamespace())
+    writer._max_concurrency = args.concurrency
+    if not args.floors:
+        writer._operation_min_intervals = {}
+    writer._execute_request = FakeRestExecutor(writer, session, server.base_url)
+    writer._worker_tasks = [
+        asyncio.create_task(writer._worker_loop()) for _ in range(writer._max_concurrency)
+    ]
+    writer._worker_tasks += [
+        asyncio.create_task(writer._interaction_worker_loop())
+        for _ in range(writer._interaction_concurrency)
+    ]
+    writer._worker_tasks.append(asyncio.create_task(writer._timer_loop()))
+    latencies: list[float] = []
+    errors: list[BaseException] = []
+    pending: list[asyncio.Task] = []
+
+    async def _write(operation, payload) -> None:
+        started = time.perf_counter()
+        try:
+            await writer._enqueue(operation, payload, persist=False)
+        except Exception as exc:  # noqa: BLE001
+            errors.append(exc)
+        latencies.append(time.perf_counter() - started)
+
+    def submit(operation, payload) -> None:
+        pending.append(asyncio.create_task(_write(operation, payload)))
+
+    started = time.perf_counter()
+    await WORKLOADS[name](writer, submit)
+    await asyncio.gather(*pending)
+    elapsed = time.perf_counter() - started
+    for task in writer._worker_tasks:
+        task.cancel()
+    await asyncio.gather(*writer._worker_tasks, return_exceptions=True)
+    await writer._journal.close()
+
+    ordered = sorted(latencies)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    line = (
+        f"{name:<18} {len(latencies):>4} ops {elapsed:>6.2f} s "
+        f"{len(latencies) / elapsed:>6.1f} ops/s "
+        f"p50 {statistics.median(ordered) * 1000:>6.0f} ms p99 {p99 * 1000:>6.0f} ms · "
+        f"REST {sum(server.requests_by_route.values()):>4} · "
+        f"429 global {server.responses['429 global']:>3} "
+        f"bucket {server.responses['429 bucket']:>3}"
+    )
+    misses = sum(writer.interaction_lane_stats()["deadline_misses"].values())
+    if name == "interaction_burst":
+        line += f" · deadline miss {misses}"
+    if errors:
+        line += f" · chyb {len(errors)}"
+    print(line)
+
+
+async def main(args) -> None:
+    server = FakeDiscordServer(global_per_second=args.global_limit, latency=args.latency)
+    await server.start()
+    try:
+        async with aiohttp.ClientSession() as session:
+            for name in args.workloads or list(WORKLOADS):
+                await _run_workload(name, server, session, args)
+    finally:
+        await server.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("workloads", nargs="*", metavar="scénář")
+    parser.add_argument("--floors", action="store_true")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--global-limit", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.04)
+    arguments = parser.parse_args()
+    unknown = sorted(set(arguments.workloads) - set(WORKLOADS))
+    if unknown:
+        parser.error(f"neznámý scénář {', '.join(unknown)} (dostupné: {', '.join(WORKLOADS)})")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db.connection_manager.db_path = os.path.join(tmp_dir, "bench.db")
+        db.init_db()
+        asyncio.run(main(arguments))
+        adb.shutdown()
+        db.close_connections()
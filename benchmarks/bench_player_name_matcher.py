@@ -0,0 +1,118 @@
+"""Vyhledání hráčů v textu notifikace: smyčka s regexem per jméno vs. PlayerNameMatcher.
+
+Pro 500 a 5000 jmen v cache porovná původní `_find_player_mentions` (nový
+regex pro každé jméno) s jedním zkompilovaným matcherem, ověří shodné
+výsledky a vypíše čas sestavení matcheru a notifikace za sekundu.
+
+    python benchmarks/bench_player_name_matcher.py
+"""
+
+import os
+import random
+import re
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DISCORD_TOKEN", "benchmark")
+
+from cog_secret_notifications_forwarder import PlayerNameMatcher  # noqa: E402
+from db import normalize_clan_member_name  # noqa: E402
+
+CACHE_SIZES = (500, 5000)
+NOTIFICATIONS = 400
+# Původní smyčka je u 5000 jmen pomalá, měří se na menším vzorku.
+LEGACY_NOTIFICATIONS = 40
+
+
+def _legacy_find(cache: dict, text_line: str) -> list[int]:
+    normalized_text = normalize_clan_member_name(text_line)
+    matched_ids = []
+    seen_ids = set()
+    for name, entry in cache.items():
+        if not (entry.get("roblox_username") or entry.get("roblox_nick")):
+            continue
+        escaped = re.escape(name)
+        pattern = rf"(?:(?<=^)|(?<=[\s\W])){escaped}(?:(?=$)|(?=[\s\W]))"
+        if name and re.search(pattern, normalized_text) is not None:
+            member_id = entry.get("id")
+            if member_id not in seen_ids:
+                matched_ids.append(int(member_id))
+                seen_ids.add(member_id)
+    return matched_ids
+
+
+def _build_cache(rng: random.Random, size: int) -> dict[str, dict]:
+    cache: dict[str, dict] = {}
+    member_id = 0
+    while len(cache) < size:
+        member_id += 1
+        username = "".join(
+            rng.choices(string.ascii_letters + string.digits + "_", k=rng.randint(4, 14))
+        )
+        entry = {"id": member_id, "name": username, "roblox_username": username}
+        keys = [username]
+        if rng.random() < 0.3:
+            # Přezdívka, občas s mezerou nebo jako prefix uživatelského jména.
+            nick = rng.choice(
+                [username[: rng.randint(2, 5)], f"{username[:4]} {rng.randint(1, 99)}"]
+            )
+            entry["roblox_nick"] = nick
+            keys.append(nick)
+        for key in keys:
+            normalized = normalize_clan_member_name(key)
+            if normalized and normalized not in cache:
+                cache[normalized] = entry
+    return cache
+
+
+def _build_notifications(rng: random.Random, cache: dict) -> list[str]:
+    names = [entry["name"] for entry in cache.values()]
+    pets = ["Huge Cat", "Titanic Dragon", "Rainbow Unicorn", "Secret Egg"]
+    notifications = []
+    for _ in range(NOTIFICATIONS):
+        players = rng.sample(names, k=rng.randint(0, 2))
+        who = " and ".join(players) or "Someone"
+        notifications.append(
+            f"{who} hatched a {rng.choice(pets)}! (1 in {rng.randint(1, 10**6)}) · Congrats!"
+        )
+    return notifications
+
+
+def _rate(func, notifications: list[str]) -> float:
+    started = time.perf_counter()
+    for notification in notifications:
+        func(notification)
+    elapsed = time.perf_counter() - started
+    return len(notifications) / elapsed if elapsed else float("inf")
+
+
+def main() -> None:
+    rng = random.Random(42)
+    for size in CACHE_SIZES:
+        cache = _build_cache(rng, size)
+        notifications = _build_notifications(rng, cache)
+        started = time.perf_counter()
+        matcher = PlayerNameMatcher(cache)
+        build_ms = (time.perf_counter() - started) * 1000
+
+        for notification in notifications[:LEGACY_NOTIFICATIONS]:
+            expected = _legacy_find(cache, notification)
+            actual = matcher.find(normalize_clan_member_name(notification))
+            if actual != expected:
+                raise SystemExit(f"Neshoda pro {notification!r}: {actual} != {expected}")
+
+        before = _rate(
+            lambda text: _legacy_find(cache, text), notifications[:LEGACY_NOTIFICATIONS]
+        )
+        after = _rate(lambda text: matcher.find(normalize_clan_member_name(text)), notifications)
+        print(
+            f"{size:>5} jmen  sestavení {build_ms:>7.1f} ms · "
+            f"před {before:>9.1f} notif/s · po {after:>9.1f} notif/s · "
+            f"zrychlení {after / before:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
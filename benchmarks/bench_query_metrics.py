@@ -0,0 +1,65 @@
+"""Benchmark režie měření latence db.py funkcí.
+
+Porovná přímé volání neobalené funkce, obalenou funkci s vypnutým měřením
+a se zapnutým měřením. Vypnuté měření má stát jen zlomky mikrosekundy.
+
+Spuštění: python benchmarks/bench_query_metrics.py
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DISCORD_TOKEN", "benchmark")
+
+import db  # noqa: E402
+
+CALLS = 50_000
+# Měřená funkce z registru db.QUERY_FUNCTIONS (čtení s jedním argumentem).
+TARGET = "get_setting"
+
+
+def _measure(func) -> float:
+    started = time.perf_counter()
+    for _ in range(CALLS):
+        func("bench_key")
+    return (time.perf_counter() - started) / CALLS * 1_000_000
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db.connection_manager.db_path = os.path.join(tmp_dir, "bench.db")
+        db.init_db()
+        db.set_setting("bench_key", "value")
+        if db.QUERY_FUNCTIONS.get(TARGET) != "read":
+            raise SystemExit(f"{TARGET} není v db.QUERY_FUNCTIONS jako čtecí funkce.")
+        instrumented = getattr(db, TARGET)
+        raw = instrumented.__wrapped__
+
+        db.query_metrics.disable()
+        # Čistá režie obalu bez práce s DB.
+        noop = lambda key: None  # noqa: E731
+        noop_raw_us = _measure(noop)
+        noop_wrapped_us = _measure(db._instrument("noop", noop))
+        raw_us = _measure(raw)
+        disabled_us = _measure(instrumented)
+        db.query_metrics.enable()
+        enabled_us = _measure(instrumented)
+        db.query_metrics.disable()
+
+        print(f"režie obalu (vypnuto) {noop_wrapped_us - noop_raw_us:+.3f} µs/volání")
+        print(f"bez obalu      {raw_us:>8.2f} µs/volání")
+        print(f"měření vypnuto {disabled_us:>8.2f} µs/volání ({disabled_us - raw_us:+.2f})")
+        print(f"měření zapnuto {enabled_us:>8.2f} µs/volání ({enabled_us - raw_us:+.2f})")
+        stats = db.query_metrics.snapshot()[0]
+        print(
+            f"{stats['name']}: p50 {stats['p50_ms'] * 1000:.1f} µs, "
+            f"p95 {stats['p95_ms'] * 1000:.1f} µs, p99 {stats['p99_ms'] * 1000:.1f} µs"
+        )
+        db.close_connections()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Benchmark write-behind bufferu pro XP a drop statistiky.
+
+Simuluje nával zpráv v chatu a notifikací o dropech a porovná počet
+commitů (a čas) při přímém zápisu každé změny s dávkovým zápisem přes
+db.write_behind.
+
+Spuštění: python benchmarks/bench_write_behind.py
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DISCORD_TOKEN", "benchmark")
+
+import db  # noqa: E402
+
+MESSAGE_COUNT = 3000
+USER_COUNT = 200
+DROP_COUNT = 600
+
+_commits = 0
+
+
+def _count_commits(statement: str) -> None:
+    global _commits
+    if statement.strip().upper().startswith("COMMIT"):
+        _commits += 1
+
+
+def _install_commit_counter() -> None:
+    original_open = db.ConnectionManager._open
+
+    def _open(self, readonly):
+        conn = original_open(self, readonly)
+        conn.set_trace_callback(_count_commits)
+        return conn
+
+    db.ConnectionManager._open = _open
+
+
+def _legacy_update_user_stats(discord_id: int, **fields) -> None:
+    with db.connection() as conn:
+        conn.execute(
+            f"UPDATE user_stats SET {', '.join(f'{key} = ?' for key in fields)} "
+            "WHERE discord_id = ?",
+            tuple(fields.values()) + (discord_id,),
+        )
+
+
+def _legacy_record_drop(user_id: int, now: datetime) -> None:
+    with db.connection() as conn:
+        conn.execute(
+            "INSERT INTO secret_drop_events (occurred_at, user_id, rarity) VALUES (?, ?, ?)",
+            (now.isoformat(), user_id, "secret"),
+        )
+
+
+def _run(label: str, update_stats, record_drop) -> tuple[int, float]:
+    global _commits
+    rng = random.Random(7)
+    for user_id in range(USER_COUNT):
+        db.get_or_create_user_stats(user_id)
+    db.flush_write_behind()
+    _commits = 0
+    started = time.perf_counter()
+    for index in range(MESSAGE_COUNT):
+        user_id = rng.randrange(USER_COUNT)
+        coins, exp, level, _last, messages = db.get_or_create_user_stats(user_id)
+        update_stats(user_id, coins=coins + 1, exp=exp + 10, message_count=messages + 1)
+        if index % (MESSAGE_COUNT // DROP_COUNT) == 0:
+            record_drop(rng.randrange(USER_COUNT), datetime.utcnow())
+    db.flush_write_behind()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<14} {_commits:>6} commitů {elapsed * 1000:>9.1f} ms")
+    return _commits, elapsed
+
+
+def main() -> None:
+    _install_commit_counter()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db.connection_manager.db_path = os.path.join(tmp_dir, "bench.db")
+        db.init_db()
+        # Dlouhý interval, aby flush řídil jen limit položek jako při návalu.
+        db.write_behind.flush_interval = 60.0
+        legacy_commits, legacy_time = _run(
+            "přímý zápis", _legacy_update_user_stats, _legacy_record_drop
+        )
+        buffered_commits, buffered_time = _run(
+            "write-behind",
+            db.update_user_stats,
+            lambda user_id, now: db.add_secret_drop_event(now, user_id, "secret"),
+        )
+        print(f"méně commitů  {legacy_commits / max(1, buffered_commits):>8.1f}x")
+        print(f"zrychlení     {legacy_time / buffered_time:>8.1f}x")
+        db.close_write_behind()
+        db.close_connections()
+
+
+if __name__ == "__main__":
+    main()
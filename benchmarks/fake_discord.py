@@ -0,0 +1,188 @@
+"""Lokální náhrada Discord REST API pro benchmarky write fronty.
+
+aiohttp server na 127.0.0.1 emuluje podmnožinu /api/v10 (zprávy, bulk
+delete, callbacky interakcí) včetně rate limitů: bucket per route a hlavní
+parametr (kanál, interakce), globální limit požadavků za sekundu, hlavičky
+X-RateLimit-* a 429 s tělem jako Discord. Hash v X-RateLimit-Bucket je
+stejně jako u Discordu společný pro route, bez hlavního parametru.
+"""
+
+import asyncio
+import collections
+import hashlib
+import itertools
+import re
+import time
+from dataclasses import dataclass
+
+from aiohttp import web
+
+API_PREFIX = "/api/v10"
+
+
+@dataclass(frozen=True)
+class FakeRoute:
+    method: str
+    pattern: re.Pattern
+    name: str
+    # Limit bucketu (požadavků za okno) a délka okna v sekundách.
+    limit: int
+    window: float
+    # Callbacky interakcí do globálního limitu nepočítají.
+    global_limited: bool = True
+
+
+DEFAULT_ROUTES = (
+    FakeRoute(
+        "POST",
+        re.compile(r"^/channels/(?P<major>\d+)/messages/bulk-delete$"),
+        "bulk_delete",
+        1,
+        1.0,
+    ),
+    FakeRoute("POST", re.compile(r"^/channels/(?P<major>\d+)/messages$"), "send", 5, 5.0),
+    FakeRoute(
+        "PATCH",
+        re.compile(r"^/channels/(?P<major>\d+)/messages/(?P<message_id>\d+)$"),
+        "edit",
+        5,
+        5.0,
+    ),
+    FakeRoute(
+        "DELETE",
+        re.compile(r"^/channels/(?P<major>\d+)/messages/(?P<message_id>\d+)$"),
+        "delete",
+        5,
+        1.0,
+    ),
+    FakeRoute(
+        "POST",
+        re.compile(r"^/interactions/(?P<major>\d+)/(?P<token>[^/]+)/callback$"),
+        "interaction_callback",
+        1,
+        5.0,
+        global_limited=False,
+    ),
+)
+
+
+class FakeDiscordServer:
+    """aiohttp server s rate limity; počítadla odpovědí jsou v ``responses``."""
+
+    def __init__(
+        self,
+        *,
+        global_per_second: int = 50,
+        latency: float = 0.04,
+        routes: tuple[FakeRoute, ...] = DEFAULT_ROUTES,
+    ) -> None:
+        self.global_per_second = global_per_second
+        self.latency = latency
+        self.routes = routes
+        self.responses: collections.Counter[str] = collections.Counter()
+        self.requests_by_route: collections.Counter[str] = collections.Counter()
+        self._global_window_start = 0.0
+        self._global_count = 0
+        # (route, major) -> (reset_at, použito)
+        self._buckets: dict[tuple[str, str], tuple[float, int]] = {}
+        self._ids = itertools.count(1)
+        self._runner: web.AppRunner | None = None
+        self.base_url = ""
+
+    async def start(self) -> str:
+        app = web.Application()
+        app.router.add_route("*", API_PREFIX + "/{tail:.*}", self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://127.0.0.1:{port}{API_PREFIX}"
+        return self.base_url
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def reset(self) -> None:
+        self.responses.clear()
+        self.requests_by_route.clear()
+        self._buckets.clear()
+        self._global_count = 0
+
+    def _match(self, method: str, path: str) -> tuple[FakeRoute, re.Match] | None:
+        for route in self.routes:
+            if route.method != method:
+                continue
+            match = route.pattern.match(path)
+            if match is not None:
+                return route, match
+        return None
+
+    @staticmethod
+    def _bucket_hash(route: FakeRoute) -> str:
+        return hashlib.sha1(f"{route.method} {route.name}".encode()).hexdigest()[:16]
+
+    def _rate_limited(self, retry_after: float, headers: dict[str, str], is_global: bool):
+        self.responses["429 global" if is_global else "429 bucket"] += 1
+        headers["Retry-After"] = f"{retry_after:.3f}"
+        return web.json_response(
+            {
+                "message": "You are being rate limited.",
+                "retry_after": round(retry_after, 3),
+                "global": is_global,
+            },
+            status=429,
+            headers=headers,
+        )
+
+    async def _handle(self, request: web.Request) -> web.StreamResponse:
+        path = "/" + request.match_info["tail"]
+        matched = self._match(request.method, path)
+        if matched is None:
+            self.responses["404"] += 1
+            return web.json_response({"message": "404: Not Found", "code": 0}, status=404)
+        route, match = matched
+        self.requests_by_route[route.name] += 1
+        await asyncio.sleep(self.latency)
+        now = time.monotonic()
+
+        if route.global_limited:
+            if now - self._global_window_start >= 1.0:
+                self._global_window_start = now
+                self._global_count = 0
+            if self._global_count >= self.global_per_second:
+                retry_after = self._global_window_start + 1.0 - now
+                return self._rate_limited(
+                    retry_after,
+                    {"X-RateLimit-Global": "true", "X-RateLimit-Scope": "global"},
+                    is_global=True,
+                )
+            self._global_count += 1
+
+        key = (route.name, match.group("major"))
+        reset_at, used = self._buckets.get(key, (now + route.window, 0))
+        if reset_at <= now:
+            reset_at, used = now + route.window, 0
+        reset_after = reset_at - now
+        headers = {
+            "X-RateLimit-Bucket": self._bucket_hash(route),
+            "X-RateLimit-Limit": str(route.limit),
+            "X-RateLimit-Reset": f"{time.time() + reset_after:.3f}",
+            "X-RateLimit-Reset-After": f"{reset_after:.3f}",
+        }
+        if used >= route.limit:
+            headers["X-RateLimit-Remaining"] = "0"
+            headers["X-RateLimit-Scope"] = "user"
+            return self._rate_limited(reset_after, headers, is_global=False)
+        self._buckets[key] = (reset_at, used + 1)
+        headers["X-RateLimit-Remaining"] = str(route.limit - used - 1)
+        self.responses["2xx"] += 1
+        if route.name in {"delete", "bulk_delete", "interaction_callback"}:
+            return web.Response(status=204, headers=headers)
+        body = {
+            "id": str(match.groupdict().get("message_id") or next(self._ids)),
+            "channel_id": match.group("major"),
+        }
+        return web.json_response(body, headers=headers)
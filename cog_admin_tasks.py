@@ -17,7 +17,6 @@ class AdminTasks(commands.Cog):
         self.bot = bot
         self.logger = logging.getLogger("botdc.admin_tasks")
         self._channel_status: Optional[str] = None
-        self._ensure_schema()
         self.poll_admin_tasks.start()
 
     def _format_channel_reference(
@@ -37,35 +36,6 @@ class AdminTasks(commands.Cog):
     def _get_connection(self) -> sqlite3.Connection:
         return sqlite3.connect(ADMIN_TASK_DB_PATH)
 
-    def _ensure_schema(self) -> None:
-        conn = self._get_connection()
-        cursor = conn.cursor()
-
-        cursor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS tasks (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                action TEXT,
-                params TEXT,
-                created_at TEXT,
-                processed INTEGER NOT NULL DEFAULT 0,
-                processed_at TEXT
-            )
-            """
-        )
-
-        cursor.execute("PRAGMA table_info(tasks)")
-        columns = {row[1] for row in cursor.fetchall()}
-        if "processed" not in columns:
-            cursor.execute(
-                "ALTER TABLE tasks ADD COLUMN processed INTEGER NOT NULL DEFAULT 0"
-            )
-        if "processed_at" not in columns:
-            cursor.execute("ALTER TABLE tasks ADD COLUMN processed_at TEXT")
-
-        conn.commit()
-        conn.close()
-
     def _fetch_unprocessed_tasks(self):
         conn = self._get_connection()
         cursor = conn.cursor()
@@ -5,6 +5,8 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 
+import adb
+from cog_discord_writer import get_writer
 from config import (
     WARN_ROLE_1_ID,
     WARN_ROLE_2_ID,
@@ -15,6 +17,9 @@ from config import (
     CLAN3_MEMBER_ROLE_ID,
 )
 from db import (
+    enable_incremental_auto_vacuum,
+    explain_hot_queries,
+    query_metrics,
     get_latest_clan_application_by_user,
     get_officer_action_stats,
     list_clan_definitions,
@@ -305,6 +310,136 @@ class BasicCommandsCog(commands.Cog, name="BasicCommands"):
             )
             await interaction.followup.send(view=view, ephemeral=True)
 
+    @admin.command(
+        name="db_explain",
+        description="Zobrazí query plán hot DB dotazů a upozorní na full scany.",
+    )
+    @app_commands.checks.has_permissions(administrator=True)
+    async def db_explain(self, interaction: discord.Interaction):
+        await interaction.response.defer(ephemeral=True)
+        results = await adb.run_read(explain_hot_queries)
+
+        problems = [result for result in results if result["full_scans"] or result["error"]]
+        lines = [
+            "## DB query plány",
+            f"Dotazů: `{len(results)}`, s full scanem nebo chybou: `{len(problems)}`",
+        ]
+        for result in sorted(results, key=lambda item: item["name"]):
+            if result["error"]:
+                status = f"❌ chyba: {result['error']}"
+            elif result["full_scans"]:
+                status = "⚠️ full scan: " + ", ".join(result["full_scans"])
+            else:
+                status = "✅"
+            lines.append(f"**{result['name']}** {status}")
+            lines.extend(f"-# {detail}" for detail in result["plan"])
+
+        content = "\n".join(lines)
+        if len(content) > 4000:
+            content = content[:3990].rstrip() + "\n…"
+        view = discord.ui.LayoutView(timeout=None)
+        view.add_item(discord.ui.Container(discord.ui.TextDisplay(content=content)))
+        await interaction.followup.send(view=view, ephemeral=True)
+
+    @admin.command(
+        name="db_vacuum_convert",
+        description="Jednorázově přepne DB na incremental vacuum (plný VACUUM, blokuje zápisy).",
+    )
+    @app_commands.checks.has_permissions(administrator=True)
+    async def db_vacuum_convert(self, interaction: discord.Interaction):
+        await interaction.response.defer(ephemeral=True)
+        before = await adb.get_db_size_info()
+        try:
+            converted = await adb.run_write(enable_incremental_auto_vacuum)
+        except Exception:
+            self.logger.exception("Přepnutí DB na incremental vacuum selhalo.")
+            content = "❌ Přepnutí selhalo. Zkontroluj logy bota."
+        else:
+            after = await adb.get_db_size_info()
+            if converted:
+                content = (
+                    "✅ DB přepnuta na `auto_vacuum=INCREMENTAL`. "
+                    f"Velikost `{before['db_bytes'] // 1024} KiB` → `{after['db_bytes'] // 1024} KiB`."
+                )
+            else:
+                content = "ℹ️ DB už je v režimu `auto_vacuum=INCREMENTAL`."
+        view = discord.ui.LayoutView(timeout=None)
+        view.add_item(discord.ui.Container(discord.ui.TextDisplay(content=content)))
+        await interaction.followup.send(view=view, ephemeral=True)
+
+    @admin.command(
+        name="db_stats",
+        description="Latence DB funkcí (p50/p95/p99, histogramy) a zapnutí/vypnutí měření.",
+    )
+    @app_commands.describe(action="Co provést (výchozí: zobrazit).")
+    @app_commands.choices(
+        action=[
+            app_commands.Choice(name="Zobrazit", value="show"),
+            app_commands.Choice(name="Zapnout měření", value="enable"),
+            app_commands.Choice(name="Vypnout měření", value="disable"),
+            app_commands.Choice(name="Vynulovat", value="reset"),
+        ]
+    )
+    @app_commands.checks.has_permissions(administrator=True)
+    async def db_stats(
+        self,
+        interaction: discord.Interaction,
+        action: app_commands.Choice[str] | None = None,
+    ):
+        action_value = action.value if action else "show"
+        if action_value == "enable":
+            query_metrics.enable()
+        elif action_value == "disable":
+            query_metrics.disable()
+        elif action_value == "reset":
+            query_metrics.reset()
+
+        state = "zapnuto" if query_metrics.enabled else "vypnuto"
+        lines = [
+            "## DB latence",
+            f"Měření: `{state}` · pomalý dotaz od `{query_metrics.slow_query_ms:g} ms` · "
+            f"od <t:{int(query_metrics.started_at)}:R>",
+        ]
+        lines.extend(query_metrics.summary_lines(limit=15, histogram=True) or ["Zatím žádná data."])
+        content = "\n".join(lines)
+        if len(content) > 4000:
+            content = content[:3990].rstrip() + "\n…"
+        view = discord.ui.LayoutView(timeout=None)
+        view.add_item(discord.ui.Container(discord.ui.TextDisplay(content=content)))
+        await interaction.response.send_message(view=view, ephemeral=True)
+
+    @admin.command(
+        name="write_stats",
+        description="Stav Discord write fronty: hloubka, čekání, latence, 429 a retry.",
+    )
+    @app_commands.describe(action="Co provést (výchozí: zobrazit).")
+    @app_commands.choices(
+        action=[
+            app_commands.Choice(name="Zobrazit", value="show"),
+            app_commands.Choice(name="Vynulovat", value="reset"),
+        ]
+    )
+    @app_commands.checks.has_permissions(administrator=True)
+    async def write_stats(
+        self,
+        interaction: discord.Interaction,
+        action: app_commands.Choice[str] | None = None,
+    ):
+        writer = get_writer(self.bot)
+        if action is not None and action.value == "reset":
+            writer.reset_metrics()
+        lines = [
+            "## Discord write fronta",
+            f"Měřeno od <t:{int(writer.metrics.started_at)}:R>",
+        ]
+        lines.extend(writer.metrics_dashboard_lines())
+        content = "\n".join(lines)
+        if len(content) > 4000:
+            content = content[:3990].rstrip() + "\n…"
+        view = discord.ui.LayoutView(timeout=None)
+        view.add_item(discord.ui.Container(discord.ui.TextDisplay(content=content)))
+        await interaction.response.send_message(view=view, ephemeral=True)
+
     @app_commands.command(name="stat", description="Zobrazí statistiky officera.")
     @app_commands.describe(user="Officer, kterého statistiky chceš zobrazit.")
     @app_commands.checks.has_permissions(kick_members=True)
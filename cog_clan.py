@@ -10,6 +10,7 @@ from discord.ext import commands
 from discord.ext import tasks
 from discord import app_commands
 from cog_discord_writer import WritePriority, get_writer
+import adb
 from db import (
     add_clan_application_panel,
     delete_clan_definition,
@@ -18,13 +19,11 @@ from db import (
     get_clan_panel_config,
     get_clan_definition,
     get_clan_application_by_channel,
-    get_open_application_by_channel,
     list_open_clan_applications,
     list_clan_definitions,
     get_next_clan_sort_order,
     get_clan_ticket_vacation,
     get_clan_ticket_category_base_name,
-    remove_clan_application_panel,
     delete_clan_ticket_vacation,
     clear_ticket_last_rename,
     clear_ticket_last_move,
@@ -2631,7 +2630,7 @@ class ClanPanelCog(commands.Cog):
 
     @commands.Cog.listener()
     async def on_raw_message_delete(self, payload: discord.RawMessageDeleteEvent):
-        remove_clan_application_panel(payload.message_id)
+        await adb.remove_clan_application_panel(payload.message_id)
 
     @commands.Cog.listener()
     async def on_message(self, message: discord.Message):
@@ -2642,7 +2641,9 @@ class ClanPanelCog(commands.Cog):
         applicant_id, _ = _parse_ticket_topic(message.channel.topic or "")
         if applicant_id is None:
             return
-        app_record = get_open_application_by_channel(message.channel.id)
+        app_record = await adb.get_open_application_by_channel(message.channel.id)
         if not app_record:
             return
-        update_clan_application_last_message(app_record["id"], by_bot=message.author.bot)
+        await adb.update_clan_application_last_message(
+            app_record["id"], by_bot=message.author.bot
+        )
@@ -0,0 +1,179 @@
+import asyncio
+import collections
+import logging
+import time
+from typing import Any, Dict
+
+import discord
+from discord.ext import commands, tasks
+
+import adb
+from config import (
+    DB_MAINTENANCE_INTERVAL_MINUTES,
+    DB_MAINTENANCE_QUIET_MESSAGES,
+    DB_QUERY_METRICS_SUMMARY_MINUTES,
+    DB_RETENTION_ARCHIVE_DIR,
+    DB_RETENTION_BATCH_SIZE,
+    DB_RETENTION_POLICIES,
+)
+from db import (
+    RETENTION_TABLES,
+    checkpoint_wal,
+    incremental_vacuum,
+    prune_table_batch,
+    query_metrics,
+)
+
+# Okno pro posouzení, jestli je na serveru klid.
+QUIET_WINDOW_SECONDS = 600
+# Pauza mezi dávkami mazání, aby se mezi ně vešly ostatní zápisy z writer fronty.
+BATCH_PAUSE_SECONDS = 0.05
+
+
+def _format_bytes(size: int) -> str:
+    value = float(size)
+    for unit in ("B", "KiB", "MiB"):
+        if abs(value) < 1024:
+            return f"{value:.1f} {unit}" if unit != "B" else f"{int(value)} B"
+        value /= 1024
+    return f"{value:.1f} GiB"
+
+
+class DbMaintenanceCog(commands.Cog, name="DbMaintenance"):
+    """Retence tabulek, incremental vacuum a WAL checkpointy."""
+
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self.logger = logging.getLogger("botdc.db_maintenance")
+        self._recent_messages: "collections.deque[float]" = collections.deque()
+        self._lock = asyncio.Lock()
+        self._vacuum_skip_logged = False
+        self.maintenance_loop.change_interval(
+            minutes=max(1, DB_MAINTENANCE_INTERVAL_MINUTES)
+        )
+        self.maintenance_loop.start()
+        self.query_metrics_summary_loop.change_interval(
+            minutes=max(1, DB_QUERY_METRICS_SUMMARY_MINUTES)
+        )
+        self.query_metrics_summary_loop.start()
+
+    def cog_unload(self):
+        self.maintenance_loop.cancel()
+        self.query_metrics_summary_loop.cancel()
+
+    @commands.Cog.listener()
+    async def on_message(self, message: discord.Message):
+        self._recent_messages.append(time.monotonic())
+
+    def _is_quiet(self) -> bool:
+        threshold = time.monotonic() - QUIET_WINDOW_SECONDS
+        while self._recent_messages and self._recent_messages[0] < threshold:
+            self._recent_messages.popleft()
+        return len(self._recent_messages) <= DB_MAINTENANCE_QUIET_MESSAGES
+
+    async def _prune_table(self, table: str, policy: Dict[str, Any]) -> int:
+        max_age_days = policy.get("max_age_days")
+        max_rows = policy.get("max_rows")
+        if max_age_days is None and max_rows is None:
+            return 0
+        archive_dir = DB_RETENTION_ARCHIVE_DIR if policy.get("archive") else None
+        total = 0
+        while True:
+            deleted = await adb.run_write(
+                prune_table_batch,
+                table,
+                max_age_days=max_age_days,
+                max_rows=max_rows,
+                batch_size=DB_RETENTION_BATCH_SIZE,
+                archive_dir=archive_dir,
+            )
+            total += deleted
+            if deleted < DB_RETENTION_BATCH_SIZE:
+                return total
+            await asyncio.sleep(BATCH_PAUSE_SECONDS)
+
+    async def run_maintenance(self, force_compaction: bool = False) -> Dict[str, Any]:
+        async with self._lock:
+            before = await adb.get_db_size_info()
+            deleted: Dict[str, int] = {}
+            for table, policy in DB_RETENTION_POLICIES.items():
+                if table not in RETENTION_TABLES:
+                    self.logger.warning("Retence: neznámá tabulka %s, přeskočeno.", table)
+                    continue
+                try:
+                    count = await self._prune_table(table, policy)
+                except Exception:
+                    self.logger.exception("Retence tabulky %s selhala.", table)
+                    continue
+                if count:
+                    deleted[table] = count
+
+            vacuumed_pages = 0
+            compacted = force_compaction or self._is_quiet()
+            if compacted:
+                pages = await adb.run_write(incremental_vacuum)
+                if pages is None:
+                    # Plné přepnutí by zablokovalo writer frontu, dělá se jen ručně.
+                    log = self.logger.debug if self._vacuum_skip_logged else self.logger.info
+                    log(
+                        "Údržba DB: incremental vacuum přeskočen, DB není v režimu "
+                        "auto_vacuum=INCREMENTAL (přepnutí: /admin db_vacuum_convert)."
+                    )
+                    self._vacuum_skip_logged = True
+                else:
+                    vacuumed_pages = pages
+                await adb.run_write(checkpoint_wal, "TRUNCATE")
+            after = await adb.get_db_size_info()
+
+        reclaimed = (before["db_bytes"] + before["wal_bytes"]) - (
+            after["db_bytes"] + after["wal_bytes"]
+        )
+        result = {
+            "deleted": deleted,
+            "vacuumed_pages": vacuumed_pages,
+            "compacted": compacted,
+            "reclaimed_bytes": reclaimed,
+            "before": before,
+            "after": after,
+        }
+        if deleted or reclaimed > 0:
+            deleted_text = (
+                ", ".join(f"{table}: {count}" for table, count in deleted.items())
+                or "nic"
+            )
+            self.logger.info(
+                "Údržba DB: smazáno %s; uvolněno %s (DB %s → %s, WAL %s → %s, volné %s).",
+                deleted_text,
+                _format_bytes(max(0, reclaimed)),
+                _format_bytes(before["db_bytes"]),
+                _format_bytes(after["db_bytes"]),
+                _format_bytes(before["wal_bytes"]),
+                _format_bytes(after["wal_bytes"]),
+                _format_bytes(after["free_bytes"]),
+            )
+        elif not compacted:
+            self.logger.debug("Údržba DB: provoz, vacuum a checkpoint odloženy.")
+        return result
+
+    @tasks.loop(minutes=60)
+    async def maintenance_loop(self):
+        try:
+            await self.run_maintenance()
+        except Exception:
+            self.logger.exception("Údržba DB selhala.")
+
+    @maintenance_loop.before_loop
+    async def before_maintenance_loop(self):
+        await self.bot.wait_until_ready()
+
+    @tasks.loop(minutes=60)
+    async def query_metrics_summary_loop(self):
+        if not query_metrics.enabled:
+            return
+        lines = query_metrics.summary_lines(limit=5)
+        if lines:
+            self.logger.info("DB latence (top 5 podle celkového času):\n%s", "\n".join(lines))
+
+    @query_metrics_summary_loop.before_loop
+    async def before_query_metrics_summary_loop(self):
+        await self.bot.wait_until_ready()
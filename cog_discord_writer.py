@@ -1,6 +1,8 @@
 import asyncio
+import collections
 import contextlib
 import contextvars
+import heapq
 import json
 import itertools
 import logging
@@ -9,17 +11,30 @@ import re
 import string
 import random
 import time
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta, timezone
-from typing import Any, Callable, Optional, Mapping
+from typing import Any, Callable, Iterable, Optional, Mapping
 from urllib.parse import urlsplit
 
 import discord
 from discord.ext import commands
 
+import adb
 from config import (
+    DISCORD_WRITE_BULK_DELETE_WINDOW_MS,
+    DISCORD_WRITE_INTERACTION_CONCURRENCY,
+    DISCORD_WRITE_JOURNAL_LOSS_WINDOWS_MS,
+    DISCORD_WRITE_MAX_CONCURRENCY,
+    DISCORD_WRITE_METRICS_LOG_MINUTES,
+    DISCORD_WRITE_RESTORE_PAGE_SIZE,
+    DISCORD_WRITE_RESTORE_WINDOW,
     DISCORD_WRITE_MIN_INTERVAL_SECONDS,
     DISCORD_WRITE_OPERATION_MIN_INTERVALS,
+    DISCORD_WRITE_RATE_BURST,
+    DISCORD_WRITE_RATE_DECREASE,
+    DISCORD_WRITE_RATE_INCREASE,
+    DISCORD_WRITE_RATE_MAX,
+    DISCORD_WRITE_RATE_MIN,
     DISCORD_WRITE_WARMUP_OPERATIONS,
     DISCORD_WRITE_WARMUP_SECONDS,
 )
@@ -31,22 +46,13 @@ from config import (
 # a "DiscordWriteCoordinator cog není načten" se neobjeví, běžné send
 # požadavky musí projít přes queue (grep: "Discord write selhal").
 from db import (
-    clan_member_nick_exists,
-    delete_discord_rate_limit_bucket,
+    apply_discord_write_journal,
+    clan_member_nick_index,
     fetch_discord_rate_limit_bucket_map,
     fetch_discord_rate_limit_buckets,
     fetch_discord_write_state,
-    enqueue_discord_write,
     prune_discord_rate_limit_buckets,
-    fetch_pending_discord_writes,
-    mark_discord_write_done,
-    mark_discord_write_failed,
-    mark_discord_write_retry,
     normalize_clan_member_name,
-    update_discord_write_blocked_until,
-    update_discord_write_last_write_at,
-    upsert_discord_rate_limit_bucket,
-    upsert_discord_rate_limit_bucket_map,
 )
 
 _DISCORD_WRITE_CONTEXT: contextvars.ContextVar[dict[str, Any] | None] = (
@@ -58,6 +64,32 @@ _HTTPCLIENT_REQUEST_ORIGINAL: Callable[..., Any] | None = None
 _HTTPCLIENT_REQUEST_PATCHED = False
 _HTTPCLIENT_BOT_REF_ATTR = "_discord_write_bot"
 
+# Rychlý pruh pro operace s interaction tokenem: nepodléhají globálnímu limitu
+# bota, takže neberou globální rozestup zápisů. Hodnota = lhůta v sekundách
+# od vytvoření interakce (odpověď 3 s, token pro followupy 15 minut).
+INTERACTION_LANE_DEADLINES: dict[str, float] = {
+    "interaction_response": 3.0,
+    "interaction_defer": 3.0,
+    "interaction_modal": 3.0,
+    "interaction_edit": 3.0,
+    "interaction_followup": 900.0,
+    "interaction_edit_original": 900.0,
+}
+# Operace, které jsou odpovědí na interakci; po is_done() už nemají smysl.
+INTERACTION_CALLBACK_OPERATIONS = frozenset(
+    {"interaction_response", "interaction_defer", "interaction_modal", "interaction_edit"}
+)
+# Rezerva na samotné REST volání; později se požadavek už neposílá.
+INTERACTION_DEADLINE_MARGIN_SECONDS = 0.2
+# Bulk delete (POST /messages/bulk-delete): 2–100 zpráv mladších než 14 dní.
+DISCORD_EPOCH_MS = 1420070400000
+BULK_DELETE_MAX_MESSAGES = 100
+# Rezerva minuta na čekání ve frontě a rozjeté hodiny.
+BULK_DELETE_MAX_AGE_MS = (14 * 24 * 60 * 60 - 60) * 1000
+# Jak dlouho si writer pamatuje ID zpráv, které sám mazal (gateway událost
+# dorazí zpravidla do pár sekund).
+OWN_DELETE_TTL_SECONDS = 120.0
+
 
 def _patched_ratelimit_update(self, response, *, use_clock: bool = False) -> None:
     if _RATELIMIT_UPDATE_ORIGINAL is None:
@@ -121,11 +153,21 @@ class WriteRequest:
     attempts: int = 0
     next_retry_at: datetime | None = None
     bucket_key: str | None = None
+    # Pořadí vzniku požadavku; u coalescingu editací rozhoduje, která je novější.
+    sequence: int = 0
+    # Futures editací, které tento požadavek nahradil (dostanou stejný výsledek).
+    waiters: list[asyncio.Future] = field(default_factory=list)
+    # Lhůta interakce v time.monotonic(); jen pro rychlý pruh.
+    deadline: float | None = None
+    # Kdy požadavek (znovu) vstoupil do fronty, pro metriku čekání.
+    queued_at: float = 0.0
 
 
 class WritePriority:
     URGENT = 0
     NORMAL = 10
+    # Logy a jiné zápisy, které nesmí předběhnout provoz uživatelů.
+    LOW = 20
 
     @classmethod
     def normalize(cls, value: str | int | None) -> int:
@@ -138,9 +180,342 @@ class WritePriority:
             return cls.URGENT
         if normalized == "normal":
             return cls.NORMAL
+        if normalized == "low":
+            return cls.LOW
         return cls.NORMAL
 
 
+async def _wait_event(event: asyncio.Event, timeout: float | None) -> None:
+    """Počká na event nebo timeout.
+
+    asyncio.wait_for v Pythonu 3.11 může spolknout zrušení tasku, pokud se
+    event nastaví ve stejné iteraci smyčky; cog_unload by pak čekal navždy.
+    """
+    waiter = asyncio.ensure_future(event.wait())
+    try:
+        await asyncio.wait({waiter}, timeout=timeout)
+    finally:
+        waiter.cancel()
+
+
+class DiscordWriteJournal:
+    """Bufferuje bookkeeping write fronty a zapisuje ho v jedné transakci.
+
+    Každý typ záznamu má okno možné ztráty (DISCORD_WRITE_JOURNAL_LOSS_WINDOWS_MS);
+    flush proběhne nejpozději po uplynutí nejkratšího okna mezi čekajícími
+    záznamy. Novější přechod téhož řádku nebo bucketu přepíše starší.
+    """
+
+    DEFAULT_WINDOW_SECONDS = 1.0
+    RETRY_AFTER_ERROR_SECONDS = 1.0
+
+    def __init__(self, loss_windows_ms: Mapping[str, float]):
+        self.logger = logging.getLogger("botdc.discord_write")
+        self._windows = {
+            str(key): max(0.0, float(value)) / 1000.0
+            for key, value in loss_windows_ms.items()
+        }
+        self._pending = self._empty_batch()
+        self._enqueue_futures: list[asyncio.Future] = []
+        self._flush_at: float | None = None
+        self._wake = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+        self.flush_count = 0
+        self.flushed_items = 0
+
+    @staticmethod
+    def _empty_batch() -> dict[str, Any]:
+        return {
+            "enqueue": [],
+            "payloads": {},
+            "transitions": {},
+            "buckets": {},
+            "bucket_map": {},
+            "state": {},
+        }
+
+    @staticmethod
+    def _count(batch: dict[str, Any]) -> int:
+        return sum(len(items) for items in batch.values())
+
+    def _window(self, kind: str, operation: str | None = None) -> float:
+        if operation is not None and operation in self._windows:
+            return self._windows[operation]
+        return self._windows.get(kind, self.DEFAULT_WINDOW_SECONDS)
+
+    def _touch(self, window: float) -> None:
+        flush_at = time.monotonic() + window
+        if self._flush_at is None or flush_at < self._flush_at:
+            self._flush_at = flush_at
+            self._wake.set()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def enqueue(self, operation: str, payload: dict[str, Any], priority: int) -> int:
+        future = asyncio.get_running_loop().create_future()
+        self._pending["enqueue"].append((operation, payload, priority))
+        self._enqueue_futures.append(future)
+        self._touch(self._window("enqueue"))
+        return await future
+
+    def update_payload(self, write_id: int, operation: str, payload: dict[str, Any]) -> None:
+        self._pending["payloads"][write_id] = payload
+        self._touch(self._window("enqueue", operation))
+
+    def _transition(self, write_id: int, operation: str, transition: tuple) -> None:
+        self._pending["transitions"][write_id] = transition
+        self._touch(self._window(transition[0], operation))
+
+    def mark_done(self, write_id: int, operation: str) -> None:
+        self._transition(write_id, operation, ("done",))
+
+    def mark_failed(self, write_id: int, operation: str, error: str) -> None:
+        self._transition(write_id, operation, ("failed", error))
+
+    def mark_retry(
+        self, write_id: int, operation: str, attempts: int, next_retry_at: str | None
+    ) -> None:
+        self._transition(write_id, operation, ("retry", attempts, next_retry_at))
+
+    def mark_superseded(self, write_id: int, operation: str, superseded_by: int | None) -> None:
+        self._transition(write_id, operation, ("superseded", superseded_by))
+
+    def set_bucket(self, bucket_key: str, blocked_until: float | None) -> None:
+        # None = smazat bucket.
+        self._pending["buckets"][bucket_key] = blocked_until
+        self._touch(self._window("bucket"))
+
+    def set_bucket_map(self, bucket_key: str, bucket_id: str) -> None:
+        self._pending["bucket_map"][bucket_key] = bucket_id
+        self._touch(self._window("bucket_map"))
+
+    def set_state(self, **fields: float | None) -> None:
+        self._pending["state"].update(fields)
+        self._touch(self._window("state"))
+
+    async def _run(self) -> None:
+        while True:
+            if self._flush_at is None:
+                self._wake.clear()
+                await self._wake.wait()
+                continue
+            delay = self._flush_at - time.monotonic()
+            if delay > 0:
+                self._wake.clear()
+                await _wait_event(self._wake, delay)
+                continue
+            try:
+                await self.flush()
+            except Exception:  # noqa: BLE001
+                self.logger.exception("Flush žurnálu Discord write fronty selhal.")
+
+    async def flush(self) -> int:
+        async with self._flush_lock:
+            batch = self._pending
+            futures = self._enqueue_futures
+            items = self._count(batch)
+            self._flush_at = None
+            if not items:
+                return 0
+            self._pending = self._empty_batch()
+            self._enqueue_futures = []
+            try:
+                ids = await adb.run_write(apply_discord_write_journal, batch)
+            except Exception as exc:
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(exc)
+                self._merge_back(batch)
+                raise
+            for future, write_id in zip(futures, ids):
+                if not future.done():
+                    future.set_result(write_id)
+            self.flush_count += 1
+            self.flushed_items += items
+            return items
+
+    def _merge_back(self, batch: dict[str, Any]) -> None:
+        # Zařazení se nevrací (volající dostal výjimku); ostatní záznamy se
+        # vrátí pod novější, aby novější přechody vyhrály.
+        for kind in ("payloads", "transitions", "buckets", "bucket_map", "state"):
+            merged = dict(batch[kind])
+            merged.update(self._pending[kind])
+            self._pending[kind] = merged
+        if self._count(self._pending):
+            self._touch(self.RETRY_AFTER_ERROR_SECONDS)
+
+    async def close(self) -> None:
+        if self._task is not None:
+            # Rozběhnutý flush se nejdřív dokončí; zrušení uprostřed by zahodilo
+            # už odebranou dávku.
+            async with self._flush_lock:
+                self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        await self.flush()
+
+
+WRITE_METRICS_SAMPLE_SIZE = 512
+
+
+class _LatencyStats:
+    __slots__ = ("count", "errors", "total", "max", "samples")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples: "collections.deque[float]" = collections.deque(
+            maxlen=WRITE_METRICS_SAMPLE_SIZE
+        )
+
+    def add(self, seconds: float, failed: bool = False) -> None:
+        self.count += 1
+        self.errors += int(failed)
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.samples.append(seconds)
+
+    def percentile(self, fraction: float) -> float:
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class WriteQueueMetrics:
+    """Čekání ve frontě a latence per operace, 429 per bucket a retry."""
+
+    def __init__(self) -> None:
+        self.reset()
+
+    def reset(self) -> None:
+        self.started_at = time.time()
+        self.wait: dict[str, _LatencyStats] = {}
+        self.execution: dict[str, _LatencyStats] = {}
+        self.rate_limited: collections.Counter[str] = collections.Counter()
+        self.retries: collections.Counter[str] = collections.Counter()
+        self.activity = 0
+
+    def record_wait(self, operation: str, seconds: float) -> None:
+        stats = self.wait.get(operation)
+        if stats is None:
+            stats = self.wait[operation] = _LatencyStats()
+        stats.add(max(0.0, seconds))
+
+    def record_execution(self, operation: str, seconds: float, failed: bool) -> None:
+        stats = self.execution.get(operation)
+        if stats is None:
+            stats = self.execution[operation] = _LatencyStats()
+        stats.add(seconds, failed)
+        self.activity += 1
+
+    def record_rate_limit(self, bucket_key: str, operation: str) -> None:
+        self.rate_limited[bucket_key] += 1
+        self.retries[operation] += 1
+
+    def operations(self) -> list[dict[str, Any]]:
+        """Souhrn per operace seřazený podle počtu zápisů."""
+        results = []
+        for operation, execution in self.execution.items():
+            wait = self.wait.get(operation) or _LatencyStats()
+            results.append(
+                {
+                    "operation": operation,
+                    "count": execution.count,
+                    "errors": execution.errors,
+                    "retries": self.retries.get(operation, 0),
+                    "wait_p50_ms": wait.percentile(0.50) * 1000,
+                    "wait_p95_ms": wait.percentile(0.95) * 1000,
+                    "wait_max_ms": wait.max * 1000,
+                    "exec_p50_ms": execution.percentile(0.50) * 1000,
+                    "exec_p95_ms": execution.percentile(0.95) * 1000,
+                    "exec_max_ms": execution.max * 1000,
+                }
+            )
+        results.sort(key=lambda item: item["count"], reverse=True)
+        return results
+
+
+class AdaptiveRateLimiter:
+    """Globální token bucket s AIMD řízením rychlosti.
+
+    Rychlost (tokeny za sekundu) roste aditivně s každou odpovědí, jejíž
+    bucket hlásí volnou kapacitu, a po 429 klesá násobkem. Nasbírané tokeny
+    (nejvýše ``burst``) dovolují krátký nával bez rozestupu.
+    """
+
+    # Víc 429 ze stejného návalu (souběžní workeři) je jedno zpomalení.
+    DECREASE_COOLDOWN_SECONDS = 1.0
+
+    def __init__(
+        self,
+        rate: float,
+        *,
+        min_rate: float,
+        max_rate: float,
+        burst: float,
+        increase: float,
+        decrease: float,
+    ) -> None:
+        self.min_rate = max(0.01, min_rate)
+        self.max_rate = max(self.min_rate, max_rate)
+        self.rate = min(max(rate, self.min_rate), self.max_rate)
+        self.burst = max(1.0, burst)
+        self.increase = max(0.0, increase)
+        self.decrease = min(1.0, max(0.05, decrease))
+        self.tokens = 1.0
+        self.increases = 0
+        self.decreases = 0
+        self._updated = time.monotonic()
+        self._last_decrease_at: float | None = None
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self) -> float:
+        """Rezervuje token a vrátí, kolik sekund se má před zápisem počkat."""
+        self._refill(time.monotonic())
+        self.tokens -= 1.0
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens / self.rate
+
+    def on_success(self, remaining: int | None) -> None:
+        # Bez hlaviček nebo s vyčerpaným bucketem rychlost jen drží.
+        if remaining is None or remaining <= 0 or self.rate >= self.max_rate:
+            return
+        self.rate = min(self.max_rate, self.rate + self.increase)
+        self.increases += 1
+
+    def on_rate_limited(self) -> None:
+        now = time.monotonic()
+        self._refill(now)
+        # Nasbíraný nával propadne, další zápis počká na nový token.
+        self.tokens = min(self.tokens, 0.0)
+        if (
+            self._last_decrease_at is not None
+            and now - self._last_decrease_at < self.DECREASE_COOLDOWN_SECONDS
+        ):
+            return
+        self._last_decrease_at = now
+        self.rate = max(self.min_rate, self.rate * self.decrease)
+        self.decreases += 1
+
+    def snapshot(self) -> dict[str, Any]:
+        self._refill(time.monotonic())
+        return {
+            "rate": self.rate,
+            "tokens": self.tokens,
+            "increases": self.increases,
+            "decreases": self.decreases,
+        }
+
+
 def get_writer(bot: commands.Bot) -> "DiscordWriteCoordinatorCog":
     writer = bot.get_cog("DiscordWriteCoordinator")
     if not isinstance(writer, DiscordWriteCoordinatorCog):
@@ -246,11 +621,14 @@ def _find_prefix_and_nick_in_text(value: Any) -> tuple[bool, str | None]:
             text = str(value)
         except Exception:  # noqa: BLE001
             return False, None
-    for token in re.split(r"\s+", text):
+    if not len(clan_member_nick_index):
+        return False, None
+    # Jeden průchod: text se normalizuje jednou celý a tokeny se jen ořežou
+    # o interpunkci, index nicků odpovídá v O(1) na token.
+    for token in normalize_clan_member_name(text).split():
         candidate = token.strip(string.punctuation)
-        normalized = normalize_clan_member_name(candidate)
-        if normalized and clan_member_nick_exists(normalized):
-            return True, normalized
+        if candidate and clan_member_nick_index.contains(candidate):
+            return True, candidate
     return False, None
 
 
@@ -853,20 +1231,62 @@ class DiscordWriteCoordinatorCog(commands.Cog, name="DiscordWriteCoordinator"):
         self._patch_enabled = (
             os.getenv("DISCORD_WRITE_PATCH_ENABLED", "true").strip().lower() != "false"
         )
-        self._queue: asyncio.PriorityQueue[tuple[int, int, WriteRequest]] = (
-            asyncio.PriorityQueue()
-        )
+        # Podfronty per rate limit bucket (heap podle priority a pořadí). Jeden
+        # bucket obsluhuje vždy nejvýše jeden worker, takže pořadí zápisů v rámci
+        # bucketu zůstává zachované a 429 na jednom bucketu nedrží ostatní.
+        self._bucket_queues: dict[str, list[tuple[int, int, WriteRequest]]] = {}
+        self._busy_buckets: set[str] = set()
+        # Editace čekající ve frontě podle (channel_id, message_id) pro coalescing.
+        self._queued_edits: dict[tuple[int, int], WriteRequest] = {}
+        self._coalesced_edits = 0
+        self._queue_event = asyncio.Event()
         self._queue_counter = itertools.count()
-        self._worker_task: asyncio.Task | None = None
-        self._scheduled_tasks: set[asyncio.Task] = set()
+        self._journal = DiscordWriteJournal(DISCORD_WRITE_JOURNAL_LOSS_WINDOWS_MS)
+        self._max_concurrency = DISCORD_WRITE_MAX_CONCURRENCY
+        self._worker_tasks: list[asyncio.Task] = []
+        # Rychlý pruh interakcí: heap podle lhůty (earliest deadline first).
+        self._interaction_queue: list[tuple[float, int, WriteRequest]] = []
+        self._interaction_event = asyncio.Event()
+        self._interaction_concurrency = DISCORD_WRITE_INTERACTION_CONCURRENCY
+        self._interaction_sent: collections.Counter[str] = collections.Counter()
+        self._interaction_deadline_misses: collections.Counter[str] = collections.Counter()
+        self._interaction_max_age = 0.0
+        self.metrics = WriteQueueMetrics()
+        self._metrics_log_task: asyncio.Task | None = None
+        # Odložené požadavky (retry po 429, next_retry_at po restartu): jeden
+        # heap podle času splatnosti a jedna timer korutina místo tasku na kus.
+        self._delayed: list[tuple[float, int, WriteRequest]] = []
+        self._delayed_due: dict[int, float] = {}
+        self._delayed_edits: dict[tuple[int, int], WriteRequest] = {}
+        self._timer_event = asyncio.Event()
+        # Streamovaná obnova backlogu: další stránka až po uvolnění fronty.
+        self._restore_page_size = DISCORD_WRITE_RESTORE_PAGE_SIZE
+        self._restore_window = DISCORD_WRITE_RESTORE_WINDOW
+        self._capacity_event = asyncio.Event()
+        # Slučování delete_message téhož kanálu do bulk delete.
+        self._bulk_delete_window = DISCORD_WRITE_BULK_DELETE_WINDOW_MS / 1000
+        self._bulk_delete_calls = 0
+        self._bulk_deleted_messages = 0
+        self._own_deletes: dict[int, float] = {}
         self._last_write_at: float | None = None
         self._blocked_until: float | None = None
         self._rate_limit_buckets: dict[str, float] = {}
         self._rate_limit_bucket_map: dict[str, str] = {}
         self._warmup_buckets: dict[str, float] = {}
         self._max_backoff_seconds = 30.0
-        # DISCORD_WRITE_MIN_INTERVAL_SECONDS (např. 0.1–1.0 s) určuje minimální rozestup zápisů.
+        # DISCORD_WRITE_MIN_INTERVAL_SECONDS (např. 0.1–1.0 s) určuje výchozí rozestup
+        # zápisů (počáteční rychlost adaptivního limitu) a základ backoffu.
         self._min_interval_seconds = DISCORD_WRITE_MIN_INTERVAL_SECONDS
+        self._rate_limiter = AdaptiveRateLimiter(
+            1.0 / max(0.001, DISCORD_WRITE_MIN_INTERVAL_SECONDS),
+            min_rate=DISCORD_WRITE_RATE_MIN,
+            max_rate=DISCORD_WRITE_RATE_MAX,
+            burst=DISCORD_WRITE_RATE_BURST,
+            increase=DISCORD_WRITE_RATE_INCREASE,
+            decrease=DISCORD_WRITE_RATE_DECREASE,
+        )
+        # Poslední X-RateLimit-Remaining per bucket z odpovědi právě běžícího zápisu.
+        self._bucket_remaining: dict[str, int] = {}
         self._operation_min_intervals = DISCORD_WRITE_OPERATION_MIN_INTERVALS
         self._warmup_operations = set(DISCORD_WRITE_WARMUP_OPERATIONS)
         self._warmup_seconds = max(0.0, float(DISCORD_WRITE_WARMUP_SECONDS))
@@ -914,10 +1334,22 @@ class DiscordWriteCoordinatorCog(commands.Cog, name="DiscordWriteCoordinator"):
             self._restore_rate_limit_state()
         except Exception:  # noqa: BLE001
             self.logger.exception("Obnova Discord rate limit stavu selhala.")
+        backlog_max_id = None
         try:
-            await self._restore_pending()
+            backlog = await adb.count_pending_discord_writes()
         except Exception:  # noqa: BLE001
-            self.logger.exception("Obnova pending Discord write fronty selhala.")
+            self.logger.exception("Zjištění pending Discord write backlogu selhalo.")
+        else:
+            if backlog["count"]:
+                backlog_max_id = backlog["max_id"]
+                self.logger.info(
+                    "Pending Discord write backlog: %d záznamů (nejstarší %s), "
+                    "obnova po %d, v paměti nejvýše %d.",
+                    backlog["count"],
+                    backlog["oldest_created_at"],
+                    self._restore_page_size,
+                    self._restore_window,
+                )
         try:
             self._restore_rate_limit_buckets()
         except Exception:  # noqa: BLE001
@@ -941,19 +1373,36 @@ class DiscordWriteCoordinatorCog(commands.Cog, name="DiscordWriteCoordinator"):
                 self.logger.exception(
                     "Uložení reference bota do HTTPClient pro Discord writer selhalo."
                 )
-        self._worker_task = asyncio.create_task(self._worker_loop())
+        self._worker_tasks = [
+            asyncio.create_task(self._worker_loop())
+            for _ in range(self._max_concurrency)
+        ]
+        self._worker_tasks.extend(
+            asyncio.create_task(self._interaction_worker_loop())
+            for _ in range(self._interaction_concurrency)
+        )
+        self._worker_tasks.append(asyncio.create_task(self._timer_loop()))
+        if backlog_max_id is not None:
+            self._worker_tasks.append(
+                asyncio.create_task(self._restore_pending(backlog_max_id))
+            )
+        if DISCORD_WRITE_METRICS_LOG_MINUTES > 0:
+            self._metrics_log_task = asyncio.create_task(self._metrics_log_loop())
 
     async def cog_unload(self):
-        if self._worker_task:
-            self._worker_task.cancel()
-            with contextlib.suppress(asyncio.CancelledError):
-                await self._worker_task
-        for task in list(self._scheduled_tasks):
+        if self._metrics_log_task is not None:
+            self._metrics_log_task.cancel()
+            self._metrics_log_task = None
+        for task in self._worker_tasks:
             task.cancel()
-        if self._scheduled_tasks:
+        if self._worker_tasks:
             with contextlib.suppress(asyncio.CancelledError):
-                await asyncio.gather(*self._scheduled_tasks, return_exceptions=True)
-        self._scheduled_tasks.clear()
+                await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks.clear()
+        try:
+            await self._journal.close()
+        except Exception:  # noqa: BLE001
+            self.logger.exception("Uložení žurnálu Discord write fronty selhalo.")
         self._restore_methods()
         self._restore_ratelimit_update()
         with contextlib.suppress(Exception):
@@ -1547,140 +1996,754 @@ class DiscordWriteCoordinatorCog(commands.Cog, name="DiscordWriteCoordinator"):
 
         self._patched = False
 
-    async def _restore_pending(self):
+    def _in_memory_count(self) -> int:
+        queued = sum(len(items) for items in self._bucket_queues.values())
+        return queued + len(self._busy_buckets) + self.delayed_count()
+
+    async def _restore_pending(self, max_id: int):
+        # Jen řádky existující při startu; novější zápisy už jsou v paměti.
         count = 0
-        for item in fetch_pending_discord_writes():
+        after_id = 0
+        while True:
+            while self._in_memory_count() + self._restore_page_size > self._restore_window:
+                self._capacity_event.clear()
+                await self._capacity_event.wait()
             try:
-                payload = json.loads(item["payload"])
-            except json.JSONDecodeError:
-                self.logger.error(
-                    "Nelze načíst payload pro discord zápis %s", item["id"]
+                page = await adb.fetch_pending_discord_writes(
+                    limit=self._restore_page_size, after_id=after_id, max_id=max_id
                 )
+            except Exception:  # noqa: BLE001
+                self.logger.exception("Obnova pending Discord write fronty selhala.")
+                await asyncio.sleep(5)
                 continue
-            request = WriteRequest(
-                operation=item["operation"],
-                payload=payload,
-                persist=True,
-                future=None,
-                db_id=item["id"],
-                priority=WritePriority.normalize(item.get("priority")),
-                attempts=int(item.get("attempts") or 0),
-                next_retry_at=self._parse_next_retry_at(item.get("next_retry_at")),
+            if not page:
+                break
+            for item in page:
+                after_id = item["id"]
+                if self._restore_item(item):
+                    count += 1
+        self.logger.info("Obnoveno %d pending Discord write záznamů.", count)
+
+    def _restore_item(self, item: dict[str, Any]) -> bool:
+        try:
+            payload = json.loads(item["payload"])
+        except json.JSONDecodeError:
+            self.logger.error(
+                "Nelze načíst payload pro discord zápis %s", item["id"]
             )
-            if await self._maybe_schedule_future_request(request):
-                count += 1
+            return False
+        request = WriteRequest(
+            operation=item["operation"],
+            payload=payload,
+            persist=True,
+            future=None,
+            db_id=item["id"],
+            priority=WritePriority.normalize(item.get("priority")),
+            attempts=int(item.get("attempts") or 0),
+            next_retry_at=self._parse_next_retry_at(item.get("next_retry_at")),
+            sequence=next(self._queue_counter),
+        )
+        if not self._maybe_schedule_future_request(request):
+            self._put_request(request)
+        return True
+
+    def _put_request(self, request: WriteRequest) -> None:
+        request.queued_at = time.monotonic()
+        if request.operation in INTERACTION_LANE_DEADLINES:
+            self._put_interaction_request(request)
+            return
+        bucket_key = self._get_rate_limit_bucket_key(request) or request.operation
+        if self._coalesce_edit(bucket_key, request):
+            return
+        heapq.heappush(
+            self._bucket_queues.setdefault(bucket_key, []),
+            (request.priority, next(self._queue_counter), request),
+        )
+        edit_target = self._get_edit_target(request)
+        if edit_target is not None:
+            self._queued_edits[edit_target] = request
+        self._queue_event.set()
+
+    def _get_edit_target(self, request: WriteRequest) -> tuple[int, int] | None:
+        if request.operation != "edit_message":
+            return None
+        channel_id = request.payload.get("channel_id")
+        message_id = request.payload.get("message_id")
+        if channel_id is None or message_id is None:
+            return None
+        return int(channel_id), int(message_id)
+
+    def _coalesce_edit(self, bucket_key: str, request: WriteRequest) -> bool:
+        edit_target = self._get_edit_target(request)
+        if edit_target is None:
+            return False
+        delayed = self._delayed_edits.get(edit_target)
+        if delayed is not None and delayed is not request:
+            if request.sequence < delayed.sequence:
+                if self._can_supersede_edit(request, delayed):
+                    self._supersede_request(request, delayed)
+                    return True
+            elif self._can_supersede_edit(delayed, request):
+                # Starší editace čeká na retry; nový obsah ji nahradí hned.
+                self.cancel_delayed(delayed)
+                self._supersede_request(delayed, request)
+        queued = self._queued_edits.get(edit_target)
+        items = self._bucket_queues.get(bucket_key)
+        if queued is None or queued is request or not items:
+            return False
+        index = next(
+            (position for position, item in enumerate(items) if item[2] is queued),
+            None,
+        )
+        if index is None:
+            self._queued_edits.pop(edit_target, None)
+            return False
+        if request.sequence < queued.sequence:
+            # Vrácený retry starší editace; ve frontě už čeká novější obsah.
+            if not self._can_supersede_edit(request, queued):
+                return False
+            self._supersede_request(request, queued)
+            return True
+        if not self._can_supersede_edit(queued, request):
+            return False
+        # Nový obsah převezme místo ve frontě po nahrazené editaci.
+        priority, order, _queued = items[index]
+        items[index] = (min(priority, request.priority), order, request)
+        heapq.heapify(items)
+        self._queued_edits[edit_target] = request
+        self._supersede_request(queued, request)
+        return True
+
+    def _can_supersede_edit(self, old: WriteRequest, new: WriteRequest) -> bool:
+        # Novější editace, která nenastavuje všechny klíče starší (např. jen view=),
+        # převezme starší kwargs pod svými. Uložený požadavek jde sloučit, jen
+        # když je sloučený payload serializovatelný.
+        old_kwargs = old.payload.get("kwargs") or {}
+        new_kwargs = new.payload.get("kwargs") or {}
+        if old_kwargs.keys() <= new_kwargs.keys() or not new.persist:
+            return True
+        return self._is_serializable({**new.payload, "kwargs": {**old_kwargs, **new_kwargs}})
+
+    def _supersede_request(self, old: WriteRequest, new: WriteRequest) -> None:
+        old_kwargs = old.payload.get("kwargs") or {}
+        new_kwargs = new.payload.get("kwargs") or {}
+        if not old_kwargs.keys() <= new_kwargs.keys():
+            new.payload["kwargs"] = {**old_kwargs, **new_kwargs}
+            if new.persist and new.db_id is not None:
+                self._journal.update_payload(
+                    new.db_id, new.operation, self._serialize_payload(new.payload)
+                )
+        if old.future is not None:
+            new.waiters.append(old.future)
+        new.waiters.extend(old.waiters)
+        old.waiters.clear()
+        if old.persist and old.db_id is not None:
+            self._journal.mark_superseded(old.db_id, old.operation, new.db_id)
+        self._coalesced_edits += 1
+        self.logger.debug(
+            "Editace nahrazena novější. ids=%s", self._get_payload_log_identifiers(new)
+        )
+
+    def _resolve_request(
+        self,
+        request: WriteRequest,
+        result: Any = None,
+        exc: BaseException | None = None,
+    ) -> None:
+        for future in (request.future, *request.waiters):
+            if future is None or future.done():
                 continue
-            await self._queue.put((request.priority, next(self._queue_counter), request))
-            count += 1
-        self.logger.info("Obnoveno %d pending Discord write záznamů.", count)
+            if exc is not None:
+                future.set_exception(exc)
+            else:
+                future.set_result(result)
+
+    async def _next_request(self) -> tuple[str, WriteRequest]:
+        while True:
+            now = datetime.utcnow().timestamp()
+            best: tuple[tuple[int, int], str] | None = None
+            next_ready_in: float | None = None
+            for bucket_key, items in self._bucket_queues.items():
+                if bucket_key in self._busy_buckets or not items:
+                    continue
+                # Zablokovaný bucket přeskočíme, aby worker mezitím obsloužil jiný.
+                wait_for = self._bucket_wait_seconds(bucket_key, now)
+                if wait_for > 0:
+                    if next_ready_in is None or wait_for < next_ready_in:
+                        next_ready_in = wait_for
+                    continue
+                head = (items[0][0], items[0][1])
+                if best is None or head < best[0]:
+                    best = (head, bucket_key)
+            if best is not None:
+                bucket_key = best[1]
+                items = self._bucket_queues[bucket_key]
+                _priority, _order, request = heapq.heappop(items)
+                if not items:
+                    del self._bucket_queues[bucket_key]
+                edit_target = self._get_edit_target(request)
+                if edit_target is not None and self._queued_edits.get(edit_target) is request:
+                    del self._queued_edits[edit_target]
+                self._busy_buckets.add(bucket_key)
+                return bucket_key, request
+            self._queue_event.clear()
+            await _wait_event(self._queue_event, next_ready_in)
 
     async def _worker_loop(self):
         while True:
-            _priority, _order, request = await self._queue.get()
-            if await self._maybe_schedule_future_request(request):
-                continue
-            bucket_key = self._get_rate_limit_bucket_key(request)
-            await self._respect_rate_limit(request, bucket_key)
+            bucket_key, request = await self._next_request()
             try:
-                result = await self._execute_request(request)
-            except discord.HTTPException as exc:
-                if exc.status == 429:
-                    retry_after = getattr(exc, "retry_after", None)
-                    delay = self._compute_backoff_delay(request, retry_after)
-                    now = datetime.utcnow().timestamp()
-                    blocked_until = now + delay
-                    bucket_set = False
-                    response = getattr(exc, "response", None)
-                    if response is not None:
-                        bucket_set = self._capture_rate_limit_headers(
-                            response.headers,
-                            bucket_key,
-                            force_block=True,
-                            fallback_blocked_until=blocked_until,
-                        )
-                    if self._blocked_until is None or blocked_until > self._blocked_until:
-                        self._blocked_until = blocked_until
-                        update_discord_write_blocked_until(blocked_until)
-                    if bucket_key is not None and not bucket_set:
-                        self._set_rate_limit_bucket(bucket_key, blocked_until)
-                    next_retry_at = datetime.utcnow() + timedelta(seconds=delay)
-                    self.logger.warning(
-                        "Rate limit hit, čekám %.2fs před opakováním. operation=%s bucket_key=%s ids=%s",
-                        delay,
-                        request.operation,
-                        bucket_key,
-                        self._get_payload_log_identifiers(request),
-                    )
-                    request.attempts += 1
-                    request.next_retry_at = next_retry_at
-                    if request.persist and request.db_id is not None:
-                        mark_discord_write_retry(
-                            request.db_id,
-                            request.attempts,
-                            next_retry_at.isoformat(),
-                        )
-                    await self._schedule_request(request, delay)
-                    continue
-                self._mark_failed(request, exc)
-                continue
-            except Exception as exc:  # noqa: BLE001
-                self._mark_failed(request, exc)
-                continue
+                await self._process_request(request)
+            except Exception:  # noqa: BLE001
+                self.logger.exception(
+                    "Zpracování Discord write selhalo: %s", request.operation
+                )
+            finally:
+                self._busy_buckets.discard(bucket_key)
+                self._queue_event.set()
+                self._capacity_event.set()
+
+    def _put_interaction_request(self, request: WriteRequest) -> None:
+        if request.deadline is None:
+            request.deadline = self._compute_interaction_deadline(request)
+        heapq.heappush(
+            self._interaction_queue,
+            (request.deadline, next(self._queue_counter), request),
+        )
+        self._interaction_event.set()
+
+    def _compute_interaction_deadline(self, request: WriteRequest) -> float:
+        budget = INTERACTION_LANE_DEADLINES[request.operation]
+        interaction = request.payload.get("interaction")
+        created_at = getattr(interaction, "created_at", None)
+        if isinstance(created_at, datetime):
+            age = (datetime.now(timezone.utc) - created_at).total_seconds()
+            # Záporné nebo nesmyslně velké stáří = rozjeté hodiny; pak počítáme
+            # lhůtu od zařazení do fronty.
+            if 0 <= age <= budget:
+                budget -= age
+        return time.monotonic() + budget
+
+    def _interaction_expired_reason(self, request: WriteRequest, now: float) -> str | None:
+        if (
+            request.deadline is not None
+            and now > request.deadline - INTERACTION_DEADLINE_MARGIN_SECONDS
+        ):
+            return "lhůta vypršela"
+        if request.operation in INTERACTION_CALLBACK_OPERATIONS:
+            interaction = request.payload.get("interaction")
+            response = getattr(interaction, "response", None)
+            is_done = getattr(response, "is_done", None)
+            if callable(is_done) and is_done():
+                return "interakce už má odpověď"
+        return None
+
+    def _expire_interaction_request(self, request: WriteRequest, reason: str) -> None:
+        self._interaction_deadline_misses[request.operation] += 1
+        self.logger.warning(
+            "Interakce zahozena bez odeslání (%s). operation=%s ids=%s",
+            reason,
+            request.operation,
+            self._get_payload_log_identifiers(request),
+        )
+        # Stejně jako u Unknown interaction (10062) volající dostane None.
+        self._resolve_request(request, None)
+
+    async def _interaction_worker_loop(self):
+        while True:
+            while not self._interaction_queue:
+                self._interaction_event.clear()
+                await self._interaction_event.wait()
+            _deadline, _order, request = heapq.heappop(self._interaction_queue)
+            try:
+                await self._process_interaction_request(request)
+            except Exception:  # noqa: BLE001
+                self.logger.exception(
+                    "Zpracování Discord interakce selhalo: %s", request.operation
+                )
 
-            self._last_write_at = datetime.utcnow().timestamp()
-            self._last_operation_write_at[request.operation] = self._last_write_at
+    async def _process_interaction_request(self, request: WriteRequest) -> None:
+        reason = self._interaction_expired_reason(request, time.monotonic())
+        if reason is not None:
+            self._expire_interaction_request(request, reason)
+            return
+        bucket_key = self._get_rate_limit_bucket_key(request)
+        if bucket_key is not None:
+            wait_for = self._bucket_wait_seconds(bucket_key, datetime.utcnow().timestamp())
+            if wait_for > 0:
+                if (
+                    request.deadline is not None
+                    and time.monotonic() + wait_for
+                    > request.deadline - INTERACTION_DEADLINE_MARGIN_SECONDS
+                ):
+                    self._expire_interaction_request(request, "bucket blokovaný přes lhůtu")
+                    return
+                await asyncio.sleep(wait_for)
+        if request.deadline is not None:
+            remaining = request.deadline - time.monotonic()
+            budget = INTERACTION_LANE_DEADLINES[request.operation]
+            # Stáří interakce v okamžiku odeslání.
+            self._interaction_max_age = max(self._interaction_max_age, budget - remaining)
+        try:
+            result = await self._timed_execute(request)
+        except discord.HTTPException as exc:
+            if exc.status != 429:
+                self._mark_failed(request, exc)
+                return
+            self.metrics.record_rate_limit(bucket_key or request.operation, request.operation)
+            retry_after = getattr(exc, "retry_after", None)
+            delay = self._compute_backoff_delay(request, retry_after)
+            response = getattr(exc, "response", None)
+            if response is not None:
+                self._capture_rate_limit_headers(
+                    response.headers,
+                    bucket_key,
+                    force_block=True,
+                    fallback_blocked_until=datetime.utcnow().timestamp() + delay,
+                )
             if (
-                self._warmup_seconds > 0
-                and request.operation in self._warmup_operations
-                and bucket_key is not None
-                and bucket_key not in self._rate_limit_bucket_map
+                request.deadline is not None
+                and time.monotonic() + delay
+                > request.deadline - INTERACTION_DEADLINE_MARGIN_SECONDS
             ):
-                self._warmup_buckets[bucket_key] = self._last_write_at + self._warmup_seconds
-            update_discord_write_last_write_at(self._last_write_at)
-            if request.persist and request.db_id is not None:
-                mark_discord_write_done(request.db_id)
-            if request.future and not request.future.done():
-                request.future.set_result(result)
+                self._expire_interaction_request(request, "rate limit přes lhůtu")
+                return
+            request.attempts += 1
+            self._schedule_request(request, delay)
+            return
+        except Exception as exc:  # noqa: BLE001
+            self._mark_failed(request, exc)
+            return
+        finally:
+            # Interakce se do globálního limitu nepočítají.
+            if bucket_key is not None:
+                self._bucket_remaining.pop(bucket_key, None)
+        self._interaction_sent[request.operation] += 1
+        self._resolve_request(request, result)
+
+    def _prune_own_deletes(self, now: float) -> None:
+        expired = [key for key, until in self._own_deletes.items() if until <= now]
+        for key in expired:
+            del self._own_deletes[key]
+
+    def _remember_own_deletes(self, request: WriteRequest, now: float) -> None:
+        if request.operation == "delete_message":
+            message_ids = [request.payload.get("message_id")]
+        elif request.operation == "delete_messages":
+            message_ids = request.payload.get("message_ids") or []
+        else:
+            return
+        # Záznamy z neúspěšných mazání, na které gateway nikdy neodpoví, vyprší tady.
+        self._prune_own_deletes(now)
+        for message_id in message_ids:
+            if message_id is not None:
+                self._own_deletes[int(message_id)] = now + OWN_DELETE_TTL_SECONDS
+
+    def pop_own_deletes(self, message_ids: Iterable[int]) -> set[int]:
+        """Vrátí a zapomene ID zpráv, které writer sám smazal (po jedné i hromadně)."""
+        self._prune_own_deletes(time.monotonic())
+        return {
+            int(message_id)
+            for message_id in message_ids
+            if self._own_deletes.pop(int(message_id), None) is not None
+        }
+
+    async def _timed_execute(self, request: WriteRequest):
+        started = time.monotonic()
+        # Zapsat před voláním: gateway událost může předběhnout odpověď REST.
+        self._remember_own_deletes(request, started)
+        if request.queued_at:
+            self.metrics.record_wait(request.operation, started - request.queued_at)
+        failed = True
+        try:
+            result = await self._execute_request(request)
+            failed = False
+            return result
+        finally:
+            self.metrics.record_execution(
+                request.operation, time.monotonic() - started, failed
+            )
+
+    def reset_metrics(self) -> None:
+        self.metrics.reset()
+        self._interaction_sent.clear()
+        self._interaction_deadline_misses.clear()
+        self._interaction_max_age = 0.0
+        self._coalesced_edits = 0
+
+    def queue_snapshot(self) -> dict[str, Any]:
+        by_priority: collections.Counter[str] = collections.Counter()
+        lanes = []
+        for bucket_key, items in self._bucket_queues.items():
+            for priority, _order, _request in items:
+                by_priority[self._priority_label(priority)] += 1
+            if items:
+                lanes.append((len(items), bucket_key))
+        lanes.sort(reverse=True)
+        return {
+            "queued": sum(by_priority.values()),
+            "by_priority": dict(by_priority),
+            "lanes": len(lanes),
+            "top_lanes": [{"bucket": key, "depth": depth} for depth, key in lanes[:5]],
+            "busy_lanes": len(self._busy_buckets),
+            "interaction_queued": len(self._interaction_queue),
+            "scheduled": self.delayed_count(),
+            "blocked_buckets": sum(
+                1 for until in self._rate_limit_buckets.values() if until > time.time()
+            ),
+            "coalesced_edits": self._coalesced_edits,
+            "bulk_delete_calls": self._bulk_delete_calls,
+            "bulk_deleted_messages": self._bulk_deleted_messages,
+            "journal_flushes": self._journal.flush_count,
+            "rate_limiter": self._rate_limiter.snapshot(),
+        }
+
+    @staticmethod
+    def _priority_label(priority: int) -> str:
+        if priority == WritePriority.URGENT:
+            return "urgent"
+        if priority == WritePriority.NORMAL:
+            return "normal"
+        if priority == WritePriority.LOW:
+            return "low"
+        return str(priority)
+
+    def metrics_dashboard_lines(self, limit: int = 12) -> list[str]:
+        queue = self.queue_snapshot()
+        lane_stats = self.interaction_lane_stats()
+        priorities = ", ".join(
+            f"{name} {count}" for name, count in sorted(queue["by_priority"].items())
+        ) or "prázdná"
+        lines = [
+            f"Fronta: **{queue['queued']}** ({priorities}) · bucketů {queue['lanes']} · "
+            f"běží {queue['busy_lanes']} · odložené {queue['scheduled']} · "
+            f"blokované buckety {queue['blocked_buckets']}",
+            f"Interakce: fronta {lane_stats['queued']} · odesláno "
+            f"{sum(lane_stats['sent'].values())} · deadline miss "
+            f"{sum(lane_stats['deadline_misses'].values())} · max stáří "
+            f"{lane_stats['max_age_seconds'] * 1000:.0f} ms",
+            f"Sloučené editace {queue['coalesced_edits']} · hromadně smazáno "
+            f"{queue['bulk_deleted_messages']} zpráv v {queue['bulk_delete_calls']} voláních · "
+            f"flushů žurnálu {queue['journal_flushes']}",
+            f"Globální limit: {queue['rate_limiter']['rate']:.1f} zápisů/s · tokenů "
+            f"{queue['rate_limiter']['tokens']:.1f} · zrychlení "
+            f"{queue['rate_limiter']['increases']} · zpomalení "
+            f"{queue['rate_limiter']['decreases']}",
+        ]
+        if queue["top_lanes"]:
+            lines.append(
+                "Nejdelší buckety: "
+                + ", ".join(f"`{lane['bucket']}` {lane['depth']}" for lane in queue["top_lanes"])
+            )
+        operations = self.metrics.operations()
+        if operations:
+            lines.append("### Operace (čekání / provedení p50·p95 ms)")
+        for item in operations[:limit]:
+            line = (
+                f"`{item['operation']}` {item['count']}× · čekání "
+                f"{item['wait_p50_ms']:.0f}·{item['wait_p95_ms']:.0f} · provedení "
+                f"{item['exec_p50_ms']:.0f}·{item['exec_p95_ms']:.0f}"
+            )
+            if item["retries"]:
+                line += f" · retry {item['retries']}"
+            if item["errors"]:
+                line += f" · chyb {item['errors']}"
+            lines.append(line)
+        if self.metrics.rate_limited:
+            lines.append(
+                "429 podle bucketu: "
+                + ", ".join(
+                    f"`{bucket}` {count}"
+                    for bucket, count in self.metrics.rate_limited.most_common(5)
+                )
+            )
+        return lines
+
+    async def _metrics_log_loop(self):
+        interval = DISCORD_WRITE_METRICS_LOG_MINUTES * 60
+        last_activity = self.metrics.activity
+        while True:
+            await asyncio.sleep(interval)
+            if self.metrics.activity == last_activity and not self._bucket_queues:
+                continue
+            last_activity = self.metrics.activity
+            record = {
+                "queue": self.queue_snapshot(),
+                "interactions": self.interaction_lane_stats(),
+                "operations": [
+                    {
+                        key: round(value, 1) if isinstance(value, float) else value
+                        for key, value in item.items()
+                    }
+                    for item in self.metrics.operations()
+                ],
+                "rate_limited": dict(self.metrics.rate_limited.most_common(10)),
+            }
+            self.logger.info(
+                "discord_write_metrics %s",
+                json.dumps(record, ensure_ascii=False, separators=(",", ":")),
+            )
+
+    def interaction_lane_stats(self) -> dict[str, Any]:
+        return {
+            "queued": len(self._interaction_queue),
+            "sent": dict(self._interaction_sent),
+            "deadline_misses": dict(self._interaction_deadline_misses),
+            "max_age_seconds": self._interaction_max_age,
+        }
+
+    def _is_global_rate_limit(self, exc: discord.HTTPException) -> bool:
+        response = getattr(exc, "response", None)
+        headers = getattr(response, "headers", None) or {}
+        if str(headers.get("X-RateLimit-Global", "")).lower() == "true":
+            return True
+        return str(headers.get("X-RateLimit-Scope", "")).lower() == "global"
+
+    async def _process_request(self, request: WriteRequest, allow_bulk: bool = True) -> None:
+        if self._maybe_schedule_future_request(request):
+            return
+        bucket_key = self._get_rate_limit_bucket_key(request)
+        if allow_bulk and self._bulk_delete_group(request) is not None:
+            batch = await self._gather_bulk_deletes(bucket_key or request.operation, request)
+            if len(batch) > 1:
+                await self._process_bulk_delete(batch)
+                return
+        await self._respect_rate_limit(request, bucket_key)
+        try:
+            result = await self._timed_execute(request)
+        except discord.HTTPException as exc:
+            if exc.status == 429:
+                delay = self._handle_rate_limited(request, bucket_key, exc)
+                self._retry_later(request, delay)
+                return
+            self._mark_failed(request, exc)
+            return
+        except Exception as exc:  # noqa: BLE001
+            self._mark_failed(request, exc)
+            return
+
+        self._rate_limiter.on_success(
+            self._bucket_remaining.pop(bucket_key, None) if bucket_key is not None else None
+        )
+        completed_at = datetime.utcnow().timestamp()
+        if (
+            self._warmup_seconds > 0
+            and request.operation in self._warmup_operations
+            and bucket_key is not None
+            and bucket_key not in self._rate_limit_bucket_map
+        ):
+            self._warmup_buckets[bucket_key] = completed_at + self._warmup_seconds
+        self._journal.set_state(last_write_at=self._last_write_at)
+        if request.persist and request.db_id is not None:
+            self._journal.mark_done(request.db_id, request.operation)
+        self._resolve_request(request, result)
+
+    def _handle_rate_limited(
+        self, request: WriteRequest, bucket_key: str | None, exc: discord.HTTPException
+    ) -> float:
+        """Zapíše 429 do limitů (globální, bucket) a vrátí zpoždění pro retry."""
+        self.metrics.record_rate_limit(bucket_key or request.operation, request.operation)
+        self._rate_limiter.on_rate_limited()
+        if bucket_key is not None:
+            self._bucket_remaining.pop(bucket_key, None)
+        retry_after = getattr(exc, "retry_after", None)
+        delay = self._compute_backoff_delay(request, retry_after)
+        now = datetime.utcnow().timestamp()
+        blocked_until = now + delay
+        bucket_set = False
+        response = getattr(exc, "response", None)
+        if response is not None:
+            bucket_set = self._capture_rate_limit_headers(
+                response.headers,
+                bucket_key,
+                force_block=True,
+                fallback_blocked_until=blocked_until,
+            )
+        # Globální blokace jen pro globální limit; 429 na bucketu drží
+        # pouze daný bucket a ostatní workery nechává běžet.
+        if bucket_key is None or self._is_global_rate_limit(exc):
+            if self._blocked_until is None or blocked_until > self._blocked_until:
+                self._blocked_until = blocked_until
+                self._journal.set_state(blocked_until=blocked_until)
+        if bucket_key is not None and not bucket_set:
+            self._set_rate_limit_bucket(bucket_key, blocked_until)
+        self.logger.warning(
+            "Rate limit hit, čekám %.2fs před opakováním. operation=%s bucket_key=%s ids=%s",
+            delay,
+            request.operation,
+            bucket_key,
+            self._get_payload_log_identifiers(request),
+        )
+        return delay
+
+    def _retry_later(self, request: WriteRequest, delay: float) -> None:
+        next_retry_at = datetime.utcnow() + timedelta(seconds=delay)
+        request.attempts += 1
+        request.next_retry_at = next_retry_at
+        if request.persist and request.db_id is not None:
+            self._journal.mark_retry(
+                request.db_id,
+                request.operation,
+                request.attempts,
+                next_retry_at.isoformat(),
+            )
+        self._schedule_request(request, delay)
+
+    def _bulk_delete_group(self, request: WriteRequest) -> tuple[int, Any] | None:
+        """Kanál a důvod, podle kterých lze delete_message sloučit do bulk delete."""
+        if request.operation != "delete_message" or self._bulk_delete_window <= 0:
+            return None
+        payload = request.payload
+        channel_id = payload.get("channel_id")
+        message_id = payload.get("message_id")
+        kwargs = payload.get("kwargs") or {}
+        if channel_id is None or message_id is None or set(kwargs) - {"reason"}:
+            return None
+        # Bulk delete Discord odmítne pro zprávy starší než 14 dní (čas ze snowflake).
+        created_ms = (int(message_id) >> 22) + DISCORD_EPOCH_MS
+        if time.time() * 1000 - created_ms > BULK_DELETE_MAX_AGE_MS:
+            return None
+        return int(channel_id), kwargs.get("reason")
+
+    async def _gather_bulk_deletes(
+        self, lane_key: str, request: WriteRequest
+    ) -> list[WriteRequest]:
+        group = self._bulk_delete_group(request)
+
+        def mergeable(candidate: WriteRequest, message_ids: set[Any]) -> bool:
+            return (
+                candidate.next_retry_at is None
+                and candidate.payload.get("message_id") not in message_ids
+                and self._bulk_delete_group(candidate) == group
+            )
+
+        # Osamocené mazání odejde hned; okno dostane jen nával, kdy už ve
+        # frontě čeká další mazání téhož kanálu a úklid nejspíš přidá další.
+        message_ids = {request.payload["message_id"]}
+        items = self._bucket_queues.get(lane_key)
+        if not items or not any(mergeable(item[2], message_ids) for item in items):
+            return [request]
+        await asyncio.sleep(self._bulk_delete_window)
+        items = self._bucket_queues.get(lane_key)
+        if not items:
+            return [request]
+        batch = [request]
+        kept = []
+        for item in sorted(items):
+            candidate = item[2]
+            if len(batch) < BULK_DELETE_MAX_MESSAGES and mergeable(candidate, message_ids):
+                batch.append(candidate)
+                message_ids.add(candidate.payload["message_id"])
+            else:
+                kept.append(item)
+        if len(batch) > 1:
+            if kept:
+                items[:] = kept
+                heapq.heapify(items)
+            else:
+                del self._bucket_queues[lane_key]
+        return batch
+
+    async def _process_bulk_delete(self, batch: list[WriteRequest]) -> None:
+        head = batch[0]
+        channel_id, reason = self._bulk_delete_group(head) or (head.payload["channel_id"], None)
+        payload: dict[str, Any] = {
+            "channel_id": channel_id,
+            "message_ids": [item.payload["message_id"] for item in batch],
+        }
+        if reason is not None:
+            payload["reason"] = reason
+        bulk = WriteRequest(
+            operation="delete_messages",
+            payload=payload,
+            persist=False,
+            future=None,
+            db_id=None,
+            priority=head.priority,
+            attempts=max(item.attempts for item in batch),
+            queued_at=head.queued_at,
+        )
+        bulk_key = self._get_rate_limit_bucket_key(bulk)
+        await self._respect_rate_limit(bulk, bulk_key)
+        try:
+            await self._timed_execute(bulk)
+        except discord.HTTPException as exc:
+            if exc.status == 429:
+                delay = self._handle_rate_limited(bulk, bulk_key, exc)
+                for item in batch:
+                    self._retry_later(item, delay)
+                return
+            fallback_reason: BaseException = exc
+        except Exception as exc:  # noqa: BLE001
+            fallback_reason = exc
+        else:
+            self._rate_limiter.on_success(
+                self._bucket_remaining.pop(bulk_key, None) if bulk_key is not None else None
+            )
+            self._journal.set_state(last_write_at=self._last_write_at)
+            self._bulk_delete_calls += 1
+            self._bulk_deleted_messages += len(batch)
+            for item in batch:
+                if item.persist and item.db_id is not None:
+                    self._journal.mark_done(item.db_id, item.operation)
+                self._resolve_request(item)
+            return
+        # Např. některá zpráva už neexistuje: každé mazání dopadne samostatně.
+        self.logger.warning(
+            "Hromadné smazání %d zpráv v kanálu %s selhalo (%r), mažu po jedné.",
+            len(batch),
+            channel_id,
+            fallback_reason,
+        )
+        for item in batch:
+            await self._process_request(item, allow_bulk=False)
+
+    def _bucket_wait_seconds(self, bucket_key: str, now: float) -> float:
+        wait_for = 0.0
+        warmup_until = self._warmup_buckets.get(bucket_key)
+        if warmup_until is not None:
+            if warmup_until <= now:
+                self._warmup_buckets.pop(bucket_key, None)
+            else:
+                wait_for = max(wait_for, warmup_until - now)
+        mapped_bucket = self._rate_limit_bucket_map.get(bucket_key)
+        bucket_keys = [mapped_bucket, bucket_key] if mapped_bucket else [bucket_key]
+        for key in bucket_keys:
+            if key is None:
+                continue
+            bucket_until = self._rate_limit_buckets.get(key)
+            if bucket_until is None:
+                continue
+            if bucket_until <= now:
+                self._rate_limit_buckets.pop(key, None)
+                self._journal.set_bucket(key, None)
+            else:
+                wait_for = max(wait_for, bucket_until - now)
+        return wait_for
 
     async def _respect_rate_limit(self, request: WriteRequest, bucket_key: str | None = None):
         now = datetime.utcnow().timestamp()
         wait_for = 0.0
-        if self._last_write_at is not None:
-            wait_for = max(
-                wait_for, self._min_interval_seconds - (now - self._last_write_at)
-            )
-        # Per-operation throttling podle DISCORD_WRITE_OPERATION_MIN_INTERVALS.
-        operation_min_interval = self._operation_min_intervals.get(request.operation)
-        if operation_min_interval:
-            last_operation_write_at = self._last_operation_write_at.get(request.operation)
-            if last_operation_write_at is not None:
-                wait_for = max(
-                    wait_for, operation_min_interval - (now - last_operation_write_at)
-                )
         if self._blocked_until is not None and self._blocked_until > now:
             wait_for = max(wait_for, self._blocked_until - now)
         if bucket_key is not None:
-            warmup_until = self._warmup_buckets.get(bucket_key)
-            if warmup_until is not None:
-                if warmup_until <= now:
-                    self._warmup_buckets.pop(bucket_key, None)
-                else:
-                    wait_for = max(wait_for, warmup_until - now)
-            mapped_bucket = self._rate_limit_bucket_map.get(bucket_key)
-            bucket_keys = [mapped_bucket, bucket_key] if mapped_bucket else [bucket_key]
-            for key in bucket_keys:
-                if key is None:
-                    continue
-                bucket_until = self._rate_limit_buckets.get(key)
-                if bucket_until is None:
-                    continue
-                if bucket_until <= now:
-                    self._rate_limit_buckets.pop(key, None)
-                    delete_discord_rate_limit_bucket(key)
-                else:
-                    wait_for = max(wait_for, bucket_until - now)
+            wait_for = max(wait_for, self._bucket_wait_seconds(bucket_key, now))
         if wait_for > 0:
             await asyncio.sleep(wait_for)
+            now = datetime.utcnow().timestamp()
+        # Token globálního limitu se rezervuje při startu zápisu, takže ho
+        # dodrží i souběžní workeři.
+        start_at = now + self._rate_limiter.reserve()
+        # Per-operation podlaha podle DISCORD_WRITE_OPERATION_MIN_INTERVALS.
+        operation_min_interval = self._operation_min_intervals.get(request.operation)
+        if operation_min_interval:
+            last_operation_write_at = self._last_operation_write_at.get(request.operation)
+            if last_operation_write_at is not None:
+                start_at = max(start_at, last_operation_write_at + operation_min_interval)
+        self._last_write_at = start_at
+        self._last_operation_write_at[request.operation] = start_at
+        if start_at > now:
+            await asyncio.sleep(start_at - now)
 
     def _restore_rate_limit_state(self) -> None:
         now = datetime.utcnow().timestamp()
@@ -1713,7 +2776,14 @@ class DiscordWriteCoordinatorCog(commands.Cog, name="DiscordWriteCoordinator"):
 
     def _set_rate_limit_bucket(self, bucket_key: str, blocked_until: float) -> None:
         self._rate_limit_buckets[bucket_key] = blocked_until
-        upsert_discord_rate_limit_bucket(bucket_key, blocked_until)
+        self._journal.set_bucket(bucket_key, blocked_until)
+
+    @staticmethod
+    def _scope_bucket_id(bucket_id: str, bucket_key: str) -> str:
+        # X-RateLimit-Bucket je společný pro route napříč kanály; limit platí per
+        # hlavní parametr (kanál, webhook), stejně jako ho klíčuje discord.py.
+        _operation, separator, major = bucket_key.partition("|")
+        return f"{bucket_id}|{major}" if separator else bucket_id
 
     def _capture_rate_limit_headers(
         self,
@@ -1737,6 +2807,8 @@ class DiscordWriteCoordinatorCog(commands.Cog, name="DiscordWriteCoordinator"):
                 remaining = int(remaining_raw)
             except (TypeError, ValueError):
                 remaining = None
+        if bucket_key is not None and remaining is not None:
+            self._bucket_remaining[bucket_key] = remaining
         if reset_after_raw is not None:
             try:
                 reset_after = float(reset_after_raw)
@@ -1749,20 +2821,25 @@ class DiscordWriteCoordinatorCog(commands.Cog, name="DiscordWriteCoordinator"):
                 reset = None
         if reset_after is None and reset is not None:
             reset_after = max(0.0, reset - time.time())
-        if bucket_key is not None and bucket_id:
-            self._rate_limit_bucket_map[bucket_key] = bucket_id
+        # Bucket interakce platí pro jedinou interakci: bez mapování a bez
+        # blokace po vyčerpání, jinak by se klíče hromadily.
+        per_interaction = bucket_key is not None and "|interaction_id:" in bucket_key
+        scoped_bucket_id = None
+        if bucket_key is not None and bucket_id and not per_interaction:
+            scoped_bucket_id = self._scope_bucket_id(bucket_id, bucket_key)
             self._warmup_buckets.pop(bucket_key, None)
-            upsert_discord_rate_limit_bucket_map(bucket_key, bucket_id)
+            if self._rate_limit_bucket_map.get(bucket_key) != scoped_bucket_id:
+                self._rate_limit_bucket_map[bucket_key] = scoped_bucket_id
+                self._journal.set_bucket_map(bucket_key, scoped_bucket_id)
+        target_key = scoped_bucket_id or bucket_key
         if reset_after is None:
             if force_block and fallback_blocked_until is not None:
-                target_key = bucket_id or bucket_key
                 if target_key is not None:
                     self._set_rate_limit_bucket(target_key, fallback_blocked_until)
                     return True
             return False
-        if force_block or (remaining is not None and remaining <= 0):
+        if force_block or (remaining is not None and remaining <= 0 and not per_interaction):
             blocked_until = time.time() + max(0.0, reset_after)
-            target_key = bucket_id or bucket_key
             if target_key is not None:
                 self._set_rate_limit_bucket(target_key, blocked_until)
                 return True
@@ -1780,28 +2857,66 @@ class DiscordWriteCoordinatorCog(commands.Cog, name="DiscordWriteCoordinator"):
             parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
         return parsed
 
-    async def _maybe_schedule_future_request(self, request: WriteRequest) -> bool:
+    def _maybe_schedule_future_request(self, request: WriteRequest) -> bool:
         if request.next_retry_at is None:
             return False
         delay = (request.next_retry_at - datetime.utcnow()).total_seconds()
         if delay <= 0:
             request.next_retry_at = None
             return False
-        await self._schedule_request(request, delay)
+        self._schedule_request(request, delay)
         return True
 
-    async def _schedule_request(self, request: WriteRequest, delay: float) -> None:
-        async def _delayed_put():
-            try:
-                await asyncio.sleep(delay)
-            except asyncio.CancelledError:
-                return
-            request.next_retry_at = None
-            await self._queue.put((request.priority, next(self._queue_counter), request))
+    def _schedule_request(self, request: WriteRequest, delay: float) -> None:
+        edit_target = self._get_edit_target(request)
+        if edit_target is not None:
+            other = self._delayed_edits.get(edit_target)
+            if other is not None and other is not request:
+                if other.sequence > request.sequence:
+                    if self._can_supersede_edit(request, other):
+                        self._supersede_request(request, other)
+                        return
+                elif self._can_supersede_edit(other, request):
+                    self.cancel_delayed(other)
+                    self._supersede_request(other, request)
+            if other is None or other.sequence < request.sequence:
+                self._delayed_edits[edit_target] = request
+        due = time.monotonic() + max(0.0, delay)
+        key = id(request)
+        current = self._delayed_due.get(key)
+        # Opakované naplánování téhož požadavku: platí pozdější termín.
+        if current is not None and current >= due:
+            return
+        self._delayed_due[key] = due
+        heapq.heappush(self._delayed, (due, next(self._queue_counter), request))
+        if self._delayed[0][2] is request:
+            self._timer_event.set()
 
-        task = asyncio.create_task(_delayed_put())
-        self._scheduled_tasks.add(task)
-        task.add_done_callback(lambda done_task: self._scheduled_tasks.discard(done_task))
+    def cancel_delayed(self, request: WriteRequest) -> bool:
+        if self._delayed_due.pop(id(request), None) is None:
+            return False
+        edit_target = self._get_edit_target(request)
+        if edit_target is not None and self._delayed_edits.get(edit_target) is request:
+            del self._delayed_edits[edit_target]
+        return True
+
+    def delayed_count(self) -> int:
+        return len(self._delayed_due)
+
+    async def _timer_loop(self):
+        while True:
+            now = time.monotonic()
+            while self._delayed and self._delayed[0][0] <= now:
+                due, _order, request = heapq.heappop(self._delayed)
+                # Zrušené nebo přeplánované položky zůstávají v heapu jako neplatné.
+                if self._delayed_due.get(id(request)) != due:
+                    continue
+                self.cancel_delayed(request)
+                request.next_retry_at = None
+                self._put_request(request)
+            timeout = self._delayed[0][0] - now if self._delayed else None
+            self._timer_event.clear()
+            await _wait_event(self._timer_event, timeout)
 
     def _compute_backoff_delay(self, request: WriteRequest, retry_after: float | None) -> float:
         base_delay = float(retry_after) if retry_after is not None else self._min_interval_seconds
@@ -1813,9 +2928,8 @@ class DiscordWriteCoordinatorCog(commands.Cog, name="DiscordWriteCoordinator"):
     def _mark_failed(self, request: WriteRequest, exc: Exception):
         self.logger.exception("Discord write selhal: %s", request.operation)
         if request.persist and request.db_id is not None:
-            mark_discord_write_failed(request.db_id, repr(exc))
-        if request.future and not request.future.done():
-            request.future.set_exception(exc)
+            self._journal.mark_failed(request.db_id, request.operation, repr(exc))
+        self._resolve_request(request, exc=exc)
 
     async def _execute_request(self, request: WriteRequest):
         bucket_key = self._get_rate_limit_bucket_key(request)
@@ -1978,6 +3092,10 @@ class DiscordWriteCoordinatorCog(commands.Cog, name="DiscordWriteCoordinator"):
             if webhook_id is not None:
                 interaction_bucket_id = webhook_id
                 interaction_bucket_name = "webhook_id"
+            elif getattr(interaction, "id", None) is not None:
+                # Callback i followupy mají limit per interakce (id a token).
+                interaction_bucket_id = interaction.id
+                interaction_bucket_name = "interaction_id"
             else:
                 interaction_bucket_id = getattr(interaction, "application_id", None)
                 if interaction_bucket_id is not None:
@@ -2172,6 +3290,8 @@ class DiscordWriteCoordinatorCog(commands.Cog, name="DiscordWriteCoordinator"):
             raise RuntimeError("Kanál nemá podporované delete_messages.")
         message_ids = payload.get("message_ids") or []
         messages = [channel.get_partial_message(message_id) for message_id in message_ids]
+        if payload.get("reason") is not None:
+            return await original(channel, messages, reason=payload["reason"])
         return await original(channel, messages)
 
     async def _op_create_thread(self, payload: dict[str, Any]):
@@ -2453,8 +3573,9 @@ class DiscordWriteCoordinatorCog(commands.Cog, name="DiscordWriteCoordinator"):
             if "content" in kwargs and kwargs["content"] is not None:
                 raise TypeError("send_message obdrželo duplicitní content.")
             kwargs["content"] = args[0]
+        priority = kwargs.pop("priority", None)
         payload, persist = self._build_send_payload(target, kwargs)
-        return await self._enqueue("send_message", payload, persist)
+        return await self._enqueue("send_message", payload, persist, priority=priority)
 
     async def edit_message(self, message: discord.Message, **kwargs):
         payload, persist = self._build_message_payload(message, kwargs)
@@ -2742,7 +3863,9 @@ class DiscordWriteCoordinatorCog(commands.Cog, name="DiscordWriteCoordinator"):
         db_id = None
         if persist:
             stored_payload = self._serialize_payload(payload)
-            db_id = enqueue_discord_write(operation, stored_payload, normalized_priority)
+            db_id = await self._journal.enqueue(
+                operation, stored_payload, normalized_priority
+            )
         future = asyncio.get_running_loop().create_future()
         request = WriteRequest(
             operation=operation,
@@ -2751,8 +3874,9 @@ class DiscordWriteCoordinatorCog(commands.Cog, name="DiscordWriteCoordinator"):
             future=future,
             db_id=db_id,
             priority=normalized_priority,
+            sequence=next(self._queue_counter),
         )
-        await self._queue.put((normalized_priority, next(self._queue_counter), request))
+        self._put_request(request)
         return await future
 
     def _extract_http_route_info(self, route: Any, method: str) -> dict[str, Any]:
@@ -2957,17 +4081,17 @@ class DiscordWriteCoordinatorCog(commands.Cog, name="DiscordWriteCoordinator"):
                 self._sanitize_component_item(child)
             return
         if isinstance(item, dict):
-            for field in ("content", "label", "value"):
-                if field in item:
-                    item[field] = self._sanitize_text_component_value(item[field])
+            for key in ("content", "label", "value"):
+                if key in item:
+                    item[key] = self._sanitize_text_component_value(item[key])
             nested = item.get("components") or item.get("children") or item.get("items")
             if nested:
                 self._sanitize_component_item(nested)
             return
-        for field in ("content", "label", "value"):
-            if hasattr(item, field):
-                value = getattr(item, field, None)
-                setattr(item, field, self._sanitize_text_component_value(value))
+        for key in ("content", "label", "value"):
+            if hasattr(item, key):
+                value = getattr(item, key, None)
+                setattr(item, key, self._sanitize_text_component_value(value))
         children = (
             getattr(item, "children", None)
             or getattr(item, "components", None)
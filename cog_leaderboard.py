@@ -15,10 +15,11 @@ from db import (
     get_all_clan_panels,
     get_all_leaderboard_panels,
     get_setting,
+    get_setting_float,
     get_top_users_by_stat,
     remove_clan_panel,
     remove_leaderboard_panel,
-    set_setting,
+    set_settings,
 )
 from i18n import DEFAULT_LOCALE, get_interaction_locale, t
 
@@ -274,20 +275,20 @@ class LeaderboardCog(commands.Cog, name="Leaderboard"):
         if last_hash and last_hash == payload_hash:
             return True
         ts_key = f"{prefix}_{message_id}_last_edit_ts"
-        last_edit_raw = get_setting(ts_key)
-        if not last_edit_raw:
-            return False
-        try:
-            last_edit = float(last_edit_raw)
-        except ValueError:
+        last_edit = get_setting_float(ts_key)
+        if last_edit is None:
             return False
         return (time.time() - last_edit) < self._MIN_EDIT_INTERVAL_SECONDS
 
     def _record_panel_payload_state(
         self, prefix: str, message_id: int, payload_hash: str
     ) -> None:
-        set_setting(f"{prefix}_{message_id}_last_payload_hash", payload_hash)
-        set_setting(f"{prefix}_{message_id}_last_edit_ts", str(time.time()))
+        set_settings(
+            {
+                f"{prefix}_{message_id}_last_payload_hash": payload_hash,
+                f"{prefix}_{message_id}_last_edit_ts": str(time.time()),
+            }
+        )
 
     @tasks.loop(minutes=5)
     async def panel_refresh_loop(self):
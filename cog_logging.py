@@ -1,23 +1,412 @@
 import asyncio
+import collections
 import contextlib
+import copy
+import gzip
+import io
+import json
 import logging
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import IO, Any, Iterable
 
 import discord
 from discord import app_commands
 from discord.ext import commands
 
-from db import (
-    get_audit_log_channel_id,
-    get_error_log_channel_id,
-    get_log_channel_id,
-    set_audit_log_channel_id,
-    set_error_log_channel_id,
+import adb
+from cog_discord_writer import WritePriority, get_writer
+from config import (
+    AUDIT_BURST_MAX_SECONDS,
+    AUDIT_BURST_WINDOW_SECONDS,
+    LOG_RULES_DEFAULT,
+    LOG_RULES_PATH,
+    LOG_SHIP_BUFFER_SIZE,
+    LOG_SHIP_FLUSH_SECONDS,
+    LOG_SHIP_MAX_MESSAGES_PER_FLUSH,
+    LOG_SINK_BACKUP_COUNT,
+    LOG_SINK_MAX_BYTES,
+    LOG_SINK_PATH,
+    LOG_SINK_QUEUE_SIZE,
+    LOG_SINK_ROTATE_HOURS,
 )
 
 LOG_CHANNEL_ID = 1440046748088402064
 MAX_TEXTDISPLAY_PAYLOAD_LENGTH = 4000
 TRUNCATION_SUFFIX = "… (zkráceno)"
 
+# Cíle záznamů podle pravidel: chybový kanál, audit kanál, jen lokální soubor, zahodit.
+ROUTE_ERROR = "error"
+ROUTE_AUDIT = "audit"
+ROUTE_FILE = "file"
+ROUTE_DROP = "drop"
+LOG_ROUTES = (ROUTE_ERROR, ROUTE_AUDIT, ROUTE_FILE, ROUTE_DROP)
+LOG_BATCH_HEADERS = {ROUTE_ERROR: "## Log bota", ROUTE_AUDIT: "## Audit log bota"}
+# Nejvýše tolik různých záznamů se sleduje pro deduplikaci najednou.
+LOG_DEDUP_MAX_KEYS = 1000
+LOG_TAIL_MAX_LINES = 5000
+LOG_TAIL_TIME_FORMAT = "%Y-%m-%d %H:%M"
+NO_TEXT = "*(Žádný text)*"
+
+
+def _parse_level(value: Any, default: int) -> int:
+    if value is None:
+        return default
+    if isinstance(value, int):
+        return value
+    level = logging.getLevelName(str(value).upper())
+    if not isinstance(level, int):
+        raise ValueError(f"neznámá úroveň logu {value!r}")
+    return level
+
+
+class LogRoutingRules:
+    """Deduplikace, vzorkování a směrování záznamů podle pravidel (první shoda)."""
+
+    def __init__(self, config: dict[str, Any], source: str = "výchozí"):
+        if not isinstance(config, dict):
+            raise ValueError("pravidla logů musí být JSON objekt")
+        self.source = source
+        self.dedup_window_seconds = float(config.get("dedup_window_seconds", 60))
+        self.default_route = str(config.get("default_route", ROUTE_ERROR))
+        if self.default_route not in LOG_ROUTES:
+            raise ValueError(f"neznámý cíl {self.default_route!r}")
+        raw_rules = config.get("rules", [])
+        if not isinstance(raw_rules, list):
+            raise ValueError("klíč rules musí být seznam")
+        self.rules: list[dict[str, Any]] = []
+        for index, raw in enumerate(raw_rules, start=1):
+            if not isinstance(raw, dict):
+                raise ValueError(f"pravidlo {index} musí být objekt")
+            route = str(raw.get("route", self.default_route))
+            if route not in LOG_ROUTES:
+                raise ValueError(f"pravidlo {index}: neznámý cíl {route!r}")
+            sample = float(raw.get("sample", 1.0))
+            if not 0 < sample <= 1:
+                raise ValueError(f"pravidlo {index}: sample musí být v intervalu (0, 1]")
+            self.rules.append(
+                {
+                    "logger": str(raw.get("logger", "")),
+                    "level": _parse_level(raw.get("level"), logging.NOTSET),
+                    "max_level": _parse_level(raw.get("max_level"), logging.CRITICAL),
+                    "contains": str(raw.get("contains", "")),
+                    "route": route,
+                    "sample_every": max(1, round(1 / sample)),
+                    "dedup": bool(raw.get("dedup", True)),
+                    "dedup_window_seconds": float(
+                        raw.get("dedup_window_seconds", self.dedup_window_seconds)
+                    ),
+                }
+            )
+        self._lock = threading.Lock()
+        self._sample_counters: collections.Counter[int] = collections.Counter()
+        # (logger, úroveň, text) -> [konec okna, potlačeno, poslední záznam, cíl, okno]
+        self._dedup: dict[tuple[str, int, str], list[Any]] = {}
+        self._pending_summaries: list[tuple[str, logging.LogRecord, int, float]] = []
+        self.routed: collections.Counter[str] = collections.Counter()
+        self.suppressed = 0
+        self.sampled_out = 0
+
+    @classmethod
+    def load(cls, path: str) -> "LogRoutingRules":
+        """Načte pravidla ze souboru; chybějící soubor znamená výchozí pravidla."""
+        try:
+            with open(path, encoding="utf-8") as handle:
+                config = json.load(handle)
+        except FileNotFoundError:
+            return cls(LOG_RULES_DEFAULT)
+        return cls(config, source=path)
+
+    @classmethod
+    def from_file(cls, path: str) -> "LogRoutingRules":
+        try:
+            return cls.load(path)
+        except (OSError, ValueError, TypeError) as exc:
+            logging.getLogger("botdc.logging").warning(
+                "Neplatná pravidla logů v %s, použijí se výchozí: %s", path, exc
+            )
+            return cls(LOG_RULES_DEFAULT)
+
+    def _match(self, record: logging.LogRecord, message: str) -> dict[str, Any] | None:
+        for rule in self.rules:
+            prefix = rule["logger"]
+            if prefix and record.name != prefix and not record.name.startswith(prefix + "."):
+                continue
+            if not rule["level"] <= record.levelno <= rule["max_level"]:
+                continue
+            if rule["contains"] and rule["contains"] not in message:
+                continue
+            return rule
+        return None
+
+    def evaluate(self, record: logging.LogRecord) -> tuple[str, str | None]:
+        """Vrátí (cíl, poznámka k textu); poznámka None = do kanálu se nepošle."""
+        message = record.getMessage()
+        rule = self._match(record, message)
+        route = rule["route"] if rule else self.default_route
+        dedup = rule["dedup"] if rule else True
+        window = rule["dedup_window_seconds"] if rule else self.dedup_window_seconds
+        now = time.monotonic()
+        with self._lock:
+            if route in (ROUTE_FILE, ROUTE_DROP):
+                self.routed[route] += 1
+                return route, None
+            if dedup and window > 0:
+                key = (record.name, record.levelno, message)
+                entry = self._dedup.get(key)
+                if entry is not None and entry[0] > now:
+                    entry[1] += 1
+                    entry[2] = record
+                    self.suppressed += 1
+                    return route, None
+                if entry is not None:
+                    self._close_entry(self._dedup.pop(key))
+                elif len(self._dedup) >= LOG_DEDUP_MAX_KEYS:
+                    self._collect_expired(now)
+                    if len(self._dedup) >= LOG_DEDUP_MAX_KEYS:
+                        self._close_entry(self._dedup.pop(next(iter(self._dedup))))
+                self._dedup[key] = [now + window, 0, record, route, window]
+            note = ""
+            if rule is not None and rule["sample_every"] > 1:
+                counter = self._sample_counters[id(rule)]
+                self._sample_counters[id(rule)] += 1
+                if counter % rule["sample_every"]:
+                    self.sampled_out += 1
+                    return route, None
+                note = f" [vzorek 1/{rule['sample_every']}]"
+            self.routed[route] += 1
+        return route, note
+
+    def _close_entry(self, entry: list[Any]) -> None:
+        if entry[1]:
+            self._pending_summaries.append((entry[3], entry[2], entry[1], entry[4]))
+
+    def _collect_expired(self, now: float) -> None:
+        for key in [key for key, entry in self._dedup.items() if entry[0] <= now]:
+            self._close_entry(self._dedup.pop(key))
+
+    def take_summaries(
+        self, *, expired: bool = False
+    ) -> list[tuple[str, logging.LogRecord, int, float]]:
+        """Vrátí souhrny potlačených opakování (cíl, poslední záznam, počet, okno)."""
+        if not expired and not self._pending_summaries:
+            return []
+        with self._lock:
+            if expired:
+                self._collect_expired(time.monotonic())
+            summaries = self._pending_summaries
+            self._pending_summaries = []
+        return summaries
+
+    def close_all(self) -> list[tuple[str, logging.LogRecord, int, float]]:
+        with self._lock:
+            for entry in self._dedup.values():
+                self._close_entry(entry)
+            self._dedup.clear()
+        return self.take_summaries()
+
+    def describe(self) -> list[str]:
+        lines = [
+            f"Zdroj: {self.source} · výchozí cíl {self.default_route} · "
+            f"deduplikace {self.dedup_window_seconds:g} s"
+        ]
+        for index, rule in enumerate(self.rules, start=1):
+            parts = [f"{index}. `{rule['logger'] or '*'}`"]
+            if rule["level"] > logging.NOTSET:
+                parts.append(f"od {logging.getLevelName(rule['level'])}")
+            if rule["max_level"] < logging.CRITICAL:
+                parts.append(f"do {logging.getLevelName(rule['max_level'])}")
+            if rule["contains"]:
+                parts.append(f"obsahuje „{rule['contains']}“")
+            parts.append(f"→ {rule['route']}")
+            if rule["sample_every"] > 1:
+                parts.append(f"vzorek 1/{rule['sample_every']}")
+            if not rule["dedup"]:
+                parts.append("bez deduplikace")
+            elif rule["dedup_window_seconds"] != self.dedup_window_seconds:
+                parts.append(f"deduplikace {rule['dedup_window_seconds']:g} s")
+            lines.append(" ".join(parts))
+        routed = ", ".join(f"{route} {count}" for route, count in sorted(self.routed.items()))
+        lines.append(
+            f"Směrováno: {routed or '0'} · potlačeno duplicit {self.suppressed} · "
+            f"vynecháno vzorkováním {self.sampled_out}"
+        )
+        return lines
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """Jeden záznam na řádek jako JSON objekt (ts, level, logger, message…)."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created)
+            .astimezone()
+            .isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        route = getattr(record, "log_route", None)
+        if route:
+            entry["route"] = route
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = record.stack_info
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class CompressingRotatingFileHandler(RotatingFileHandler):
+    """Rotace po velikosti i stáří segmentu; rotované segmenty se ukládají jako .gz."""
+
+    def __init__(
+        self,
+        filename: str,
+        *,
+        max_bytes: int,
+        backup_count: int,
+        rotate_seconds: float,
+    ):
+        os.makedirs(os.path.dirname(os.path.abspath(filename)), exist_ok=True)
+        super().__init__(
+            filename,
+            maxBytes=max_bytes,
+            backupCount=backup_count,
+            encoding="utf-8",
+            delay=True,
+        )
+        self.rotate_seconds = rotate_seconds
+        self.namer = lambda name: name + ".gz"
+        self.rotator = self._gzip_rotate
+        self.segment_started = self._read_segment_start()
+
+    def _read_segment_start(self) -> float:
+        # Stáří segmentu podle prvního záznamu, aby restart bota rotaci neodkládal.
+        try:
+            with open(self.baseFilename, encoding="utf-8") as handle:
+                first_line = handle.readline()
+            return datetime.fromisoformat(json.loads(first_line)["ts"]).timestamp()
+        except (OSError, ValueError, KeyError, TypeError):
+            return time.time()
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        if self.rotate_seconds:
+            try:
+                has_data = os.path.getsize(self.baseFilename) > 0
+            except OSError:
+                has_data = False
+            if not has_data:
+                self.segment_started = time.time()
+            elif time.time() - self.segment_started >= self.rotate_seconds:
+                return True
+        return bool(super().shouldRollover(record))
+
+    def doRollover(self) -> None:
+        super().doRollover()
+        self.segment_started = time.time()
+
+    @staticmethod
+    def _gzip_rotate(source: str, dest: str) -> None:
+        with open(source, "rb") as src, gzip.open(dest, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(source)
+
+
+class _SinkQueueHandler(QueueHandler):
+    """Neblokující vstup lokálního logu; při plné frontě záznam zahodí a započítá."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Text a traceback se vyhodnotí ve vlákně volajícího, listener dostane kopii.
+        prepared = copy.copy(record)
+        prepared.msg = record.getMessage()
+        prepared.args = None
+        if record.exc_info:
+            prepared.exc_text = logging.Formatter().formatException(record.exc_info)
+            prepared.exc_info = None
+        return prepared
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def log_sink_segments(path: str, backup_count: int) -> list[str]:
+    """Segmenty lokálního logu od nejstaršího po aktuální soubor."""
+    segments = [f"{path}.{index}.gz" for index in range(backup_count, 0, -1)]
+    segments.append(path)
+    return [segment for segment in segments if os.path.exists(segment)]
+
+
+def tail_log_sink(
+    path: str,
+    output: IO[bytes],
+    *,
+    logger_prefix: str = "",
+    min_level: int = logging.NOTSET,
+    since: float | None = None,
+    until: float | None = None,
+    limit: int = 500,
+) -> int:
+    """Zapíše do output posledních limit odpovídajících řádků; vrací jejich počet.
+
+    Segmenty se čtou po řádcích, v paměti je jen okno posledních limit řádků.
+    """
+    matched: collections.deque[str] = collections.deque(maxlen=limit)
+    for segment in log_sink_segments(path, LOG_SINK_BACKUP_COUNT):
+        if since is not None and segment != path and os.path.getmtime(segment) < since:
+            # Segment byl uzavřen dřív, než začíná hledaný rozsah.
+            continue
+        opener = gzip.open if segment.endswith(".gz") else open
+        with opener(segment, "rt", encoding="utf-8", errors="replace") as handle:
+            for line in handle:
+                try:
+                    entry = json.loads(line)
+                    name = entry["logger"]
+                    level = logging.getLevelName(entry["level"])
+                    created = datetime.fromisoformat(entry["ts"]).timestamp()
+                except (ValueError, KeyError, TypeError):
+                    continue
+                if logger_prefix and name != logger_prefix and not name.startswith(
+                    logger_prefix + "."
+                ):
+                    continue
+                if isinstance(level, int) and level < min_level:
+                    continue
+                if since is not None and created < since:
+                    continue
+                if until is not None and created > until:
+                    continue
+                matched.append(line if line.endswith("\n") else line + "\n")
+    for line in matched:
+        output.write(line.encode("utf-8"))
+    return len(matched)
+
+
+@dataclass
+class _AuditBurst:
+    """Rozpracovaná dávka audit událostí jednoho kanálu."""
+
+    channel_label: str
+    started: float
+    last_event: float
+    events: list[dict[str, Any]] = field(default_factory=list)
+    task: asyncio.Task[None] | None = None
+
 
 class LoggingCog(commands.Cog):
     def __init__(self, bot: commands.Bot):
@@ -25,36 +414,44 @@ class LoggingCog(commands.Cog):
         self.logger = logging.getLogger("botdc")
         self.logger.setLevel(logging.INFO)
 
-        legacy_log_channel_id = get_log_channel_id()
-        stored_error_log_channel_id = get_error_log_channel_id()
-        stored_audit_log_channel_id = get_audit_log_channel_id()
-
-        if stored_error_log_channel_id is None:
-            stored_error_log_channel_id = legacy_log_channel_id
-        if stored_audit_log_channel_id is None:
-            stored_audit_log_channel_id = legacy_log_channel_id
+        # Skutečné kanály se načtou z DB v cog_load, aby __init__ neblokoval loop.
+        self.error_log_channel_id = LOG_CHANNEL_ID
+        self.audit_log_channel_id = LOG_CHANNEL_ID
+
+        # Kruhové buffery záznamů per kanál (chybový, audit); handler do nich
+        # zapisuje i z jiných vláken, při zaplnění se zahazují nejstarší záznamy.
+        self.log_buffers: dict[str, collections.deque[str]] = {
+            ROUTE_ERROR: collections.deque(maxlen=LOG_SHIP_BUFFER_SIZE),
+            ROUTE_AUDIT: collections.deque(maxlen=LOG_SHIP_BUFFER_SIZE),
+        }
+        self._log_buffer_lock = threading.Lock()
+        self.log_records_dropped = 0
+        self.log_records_shipped = 0
+        self.log_messages_sent = 0
+        self._dropped_since_flush: collections.Counter[str] = collections.Counter()
+        self.log_task: asyncio.Task[None] | None = None
+        self.log_rules = LogRoutingRules.from_file(LOG_RULES_PATH)
+        self._audit_bursts: dict[int, _AuditBurst] = {}
 
-        self.error_log_channel_id = (
-            LOG_CHANNEL_ID
-            if stored_error_log_channel_id is None
-            else stored_error_log_channel_id
+        formatter = logging.Formatter(
+            fmt="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+            datefmt="%Y-%m-%d %H:%M:%S",
         )
-        self.audit_log_channel_id = (
-            LOG_CHANNEL_ID
-            if stored_audit_log_channel_id is None
-            else stored_audit_log_channel_id
+        # Lokální JSON-lines log: handler jen vloží záznam do fronty, na disk
+        # zapisuje (a rotuje, komprimuje) vlákno QueueListeneru.
+        self.sink_file_handler = CompressingRotatingFileHandler(
+            LOG_SINK_PATH,
+            max_bytes=LOG_SINK_MAX_BYTES,
+            backup_count=LOG_SINK_BACKUP_COUNT,
+            rotate_seconds=LOG_SINK_ROTATE_HOURS * 3600,
         )
-
-        self.log_queue: asyncio.Queue[str] = asyncio.Queue()
-        self.log_task: asyncio.Task[None] | None = None
+        self.sink_file_handler.setFormatter(JsonLinesFormatter())
+        self.sink_handler = _SinkQueueHandler(queue.Queue(maxsize=LOG_SINK_QUEUE_SIZE))
+        # Vlákno se spouští až v cog_load, aby nezůstalo běžet po neúspěšném načtení.
+        self.sink_listener = QueueListener(self.sink_handler.queue, self.sink_file_handler)
 
         self._handler = _ChannelLogHandler(self)
-        self._handler.setFormatter(
-            logging.Formatter(
-                fmt="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
-                datefmt="%Y-%m-%d %H:%M:%S",
-            )
-        )
+        self._handler.setFormatter(formatter)
         self._handler.setLevel(logging.INFO)
 
         root_logger = logging.getLogger()
@@ -112,19 +509,70 @@ class LoggingCog(commands.Cog):
             description="Vypne posílání audit logů do Discord kanálu.",
         )(self.audit_disable)
 
+        self.rules_group = app_commands.Group(
+            name="rules",
+            description="Pravidla deduplikace, vzorkování a směrování logů.",
+        )
+        self.rules_group.command(
+            name="show",
+            description="Zobrazí aktivní pravidla logů a statistiky.",
+        )(self.rules_show)
+        self.rules_group.command(
+            name="reload",
+            description="Znovu načte pravidla logů ze souboru.",
+        )(self.rules_reload)
+
         self.log_settings_group.add_command(self.error_group)
         self.log_settings_group.add_command(self.audit_group)
+        self.log_settings_group.add_command(self.rules_group)
         self.log_settings_group.command(
             name="show",
             description="Zobrazí souhrn nastavení logování.",
         )(self.show_log_channels)
+        self.log_settings_group.command(
+            name="tail",
+            description="Pošle filtrovaný konec lokálního logu jako přílohu.",
+        )(self.tail_local_log)
         self.log_settings_group.command(
             name="disable",
             description="Vypne chybové i audit logy do Discord kanálu.",
         )(self.disable_all_log_channels)
         self.__cog_app_commands__ = []
 
+    async def _load_log_channels(self) -> None:
+        legacy_log_channel_id, stored_error_log_channel_id, stored_audit_log_channel_id = (
+            await asyncio.gather(
+                adb.get_log_channel_id(),
+                adb.get_error_log_channel_id(),
+                adb.get_audit_log_channel_id(),
+            )
+        )
+
+        if stored_error_log_channel_id is None:
+            stored_error_log_channel_id = legacy_log_channel_id
+        if stored_audit_log_channel_id is None:
+            stored_audit_log_channel_id = legacy_log_channel_id
+
+        self.error_log_channel_id = (
+            LOG_CHANNEL_ID
+            if stored_error_log_channel_id is None
+            else stored_error_log_channel_id
+        )
+        self.audit_log_channel_id = (
+            LOG_CHANNEL_ID
+            if stored_audit_log_channel_id is None
+            else stored_audit_log_channel_id
+        )
+
     async def cog_load(self):
+        self.sink_listener.start()
+        try:
+            await self._load_log_channels()
+        except BaseException:
+            logging.getLogger().removeHandler(self._handler)
+            self.sink_listener.stop()
+            self.sink_file_handler.close()
+            raise
         loop = asyncio.get_running_loop()
         self.log_task = loop.create_task(self._process_log_queue())
         existing_group = self.bot.tree.get_command(
@@ -147,6 +595,13 @@ class LoggingCog(commands.Cog):
             self.log_task.cancel()
             with contextlib.suppress(asyncio.CancelledError):
                 await self.log_task
+        for burst in self._audit_bursts.values():
+            if burst.task is not None:
+                burst.task.cancel()
+        self._audit_bursts.clear()
+        # stop() počká, než vlákno zapíše zbytek fronty.
+        self.sink_listener.stop()
+        self.sink_file_handler.close()
         existing_group = self.bot.tree.get_command(
             "log_settings", type=discord.AppCommandType.chat_input
         )
@@ -182,44 +637,89 @@ class LoggingCog(commands.Cog):
     async def _get_audit_log_channel(self) -> discord.TextChannel | discord.Thread | None:
         return await self._resolve_log_channel(self.audit_log_channel_id)
 
+    def _without_own_deletes(self, message_ids: Iterable[int]) -> set[int]:
+        """Mazání, která poslal sám writer (úklid bota), do auditu nepatří."""
+        message_ids = set(message_ids)
+        try:
+            return message_ids - get_writer(self.bot).pop_own_deletes(message_ids)
+        except RuntimeError:
+            return message_ids
+
     @commands.Cog.listener()
     async def on_message_delete(self, message: discord.Message):
         if message.guild is None or message.author.bot:
             return
+        if not self._without_own_deletes([message.id]):
+            return
 
         self.logger.info(
             "Zpráva odstraněna: autor=%s kanál=%s obsah=%s",
             message.author,
             getattr(message.channel, "name", message.channel),
-            (message.content or "*(Žádný text)*").replace("\n", " "),
+            (message.content or NO_TEXT).replace("\n", " "),
             extra={"skip_channel": True},
         )
+        self._add_audit_event(
+            message.channel.id,
+            f"#{message.channel}",
+            {
+                "kind": "delete",
+                "time": datetime.now(),
+                "message_id": message.id,
+                "author": f"{message.author} ({message.author.id})",
+                "content": message.content or NO_TEXT,
+                "attachments": [attachment.url for attachment in message.attachments],
+            },
+        )
 
-        channel = await self._get_audit_log_channel()
-        if channel is None:
+    @commands.Cog.listener()
+    async def on_raw_bulk_message_delete(self, payload: discord.RawBulkMessageDeleteEvent):
+        if payload.guild_id is None:
+            return
+        message_ids = self._without_own_deletes(payload.message_ids)
+        if not message_ids:
             return
 
-        description_lines = [
-            f"Autor: {message.author} ({message.author.id})",
-            f"Kanál: #{message.channel} ({message.channel.id})",
-        ]
-
-        content = message.content or "*(Žádný text)*"
-        lines = [
-            "## Zpráva odstraněna",
-            "\n".join(description_lines),
-            f"**Obsah:** {content[:1024]}",
-        ]
-
-        attachments = [attachment.url for attachment in message.attachments]
-        if attachments:
-            lines.append("**Přílohy:**\n" + "\n".join(attachments)[:1024])
-
-        view = self._build_view(lines)
-        await channel.send(
-            view=view,
-            allowed_mentions=discord.AllowedMentions.none(),
+        channel = self.bot.get_channel(payload.channel_id)
+        channel_label = f"#{channel}" if channel is not None else f"#{payload.channel_id}"
+        cached = {message.id: message for message in payload.cached_messages}
+        self.logger.info(
+            "Hromadně odstraněno %s zpráv: kanál=%s (v cache %s)",
+            len(message_ids),
+            channel_label,
+            len(cached),
+            extra={"skip_channel": True},
         )
+        now = datetime.now()
+        events = []
+        for message_id in sorted(message_ids):
+            message = cached.get(message_id)
+            if message is None:
+                events.append(
+                    {
+                        "kind": "bulk_delete",
+                        "time": now,
+                        "message_id": message_id,
+                        "author": None,
+                        "content": None,
+                        "attachments": [],
+                    }
+                )
+                continue
+            if message.author.bot:
+                continue
+            events.append(
+                {
+                    "kind": "bulk_delete",
+                    "time": now,
+                    "message_id": message_id,
+                    "author": f"{message.author} ({message.author.id})",
+                    "content": message.content or NO_TEXT,
+                    "attachments": [attachment.url for attachment in message.attachments],
+                }
+            )
+        if events:
+            self._add_audit_event(payload.channel_id, channel_label, *events)
 
     @commands.Cog.listener()
     async def on_message_edit(self, before: discord.Message, after: discord.Message):
@@ -229,69 +729,256 @@ class LoggingCog(commands.Cog):
         if before.content == after.content:
             return
 
-        channel = await self._get_audit_log_channel()
-        if channel is None:
-            return
-
         self.logger.info(
             "Zpráva upravena: autor=%s kanál=%s původní=%s nový=%s",
             before.author,
             getattr(before.channel, "name", before.channel),
-            (before.content or "*(Žádný text)*").replace("\n", " "),
-            (after.content or "*(Žádný text)*").replace("\n", " "),
+            (before.content or NO_TEXT).replace("\n", " "),
+            (after.content or NO_TEXT).replace("\n", " "),
             extra={"skip_channel": True},
         )
+        self._add_audit_event(
+            before.channel.id,
+            f"#{before.channel}",
+            {
+                "kind": "edit",
+                "time": datetime.now(),
+                "message_id": before.id,
+                "author": f"{before.author} ({before.author.id})",
+                "before": before.content or NO_TEXT,
+                "after": after.content or NO_TEXT,
+                "jump_url": after.jump_url,
+            },
+        )
 
-        description_lines = [
-            f"Autor: {before.author} ({before.author.id})",
-            f"Kanál: #{before.channel} ({before.channel.id})",
-            f"Zpráva: [Odkaz]({after.jump_url})",
-        ]
+    def _add_audit_event(
+        self, channel_id: int, channel_label: str, *events: dict[str, Any]
+    ) -> None:
+        if self.audit_log_channel_id <= 0:
+            return
+        now = time.monotonic()
+        burst = self._audit_bursts.get(channel_id)
+        if burst is None:
+            burst = _AuditBurst(channel_label=channel_label, started=now, last_event=now)
+            self._audit_bursts[channel_id] = burst
+            burst.task = asyncio.create_task(self._flush_audit_burst_later(channel_id, burst))
+        burst.last_event = now
+        burst.events.extend(events)
+
+    async def _flush_audit_burst_later(self, channel_id: int, burst: _AuditBurst) -> None:
+        # Dávka končí po okně bez nové události, nejpozději po AUDIT_BURST_MAX_SECONDS.
+        while True:
+            now = time.monotonic()
+            deadline = min(
+                burst.last_event + AUDIT_BURST_WINDOW_SECONDS,
+                burst.started + AUDIT_BURST_MAX_SECONDS,
+            )
+            if now >= deadline:
+                break
+            await asyncio.sleep(deadline - now)
+        if self._audit_bursts.get(channel_id) is burst:
+            del self._audit_bursts[channel_id]
+        try:
+            await self._send_audit_burst(channel_id, burst)
+        except Exception:
+            self.logger.exception(
+                "Nepodařilo se odeslat audit log pro kanál %s",
+                burst.channel_label,
+                extra={"skip_channel": True},
+            )
+
+    async def _send_audit_burst(self, channel_id: int, burst: _AuditBurst) -> None:
+        channel = await self._get_audit_log_channel()
+        if channel is None:
+            return
+
+        events = burst.events
+        if len(events) == 1 and events[0]["kind"] != "bulk_delete":
+            event = events[0]
+            if event["kind"] == "edit":
+                lines = self._audit_edit_lines(event, channel_id, burst.channel_label)
+            else:
+                lines = self._audit_delete_lines(event, channel_id, burst.channel_label)
+            await channel.send(
+                view=self._build_view(lines),
+                allowed_mentions=discord.AllowedMentions.none(),
+            )
+            return
 
+        kinds = collections.Counter(event["kind"] for event in events)
+        authors = collections.Counter(
+            event["author"] or "neznámý (mimo cache)" for event in events
+        )
+        started = min(event["time"] for event in events)
+        finished = max(event["time"] for event in events)
+        deleted = kinds["delete"] + kinds["bulk_delete"]
         lines = [
-            "## Zpráva upravena",
-            "\n".join(description_lines),
-            f"**Původní text:** {(before.content or '*(Žádný text)*')[:1024]}",
-            f"**Nový text:** {(after.content or '*(Žádný text)*')[:1024]}",
+            "## Hromadné změny zpráv",
+            f"Kanál: {burst.channel_label} ({channel_id})\n"
+            f"Období: {started:%Y-%m-%d %H:%M:%S} – {finished:%H:%M:%S}",
+            f"**Smazáno:** {deleted} (z toho hromadně {kinds['bulk_delete']}) · "
+            f"**Upraveno:** {kinds['edit']}",
+            "**Autoři:** "
+            + ", ".join(f"{author} ×{count}" for author, count in authors.most_common(5))
+            + (f" a {len(authors) - 5} dalších" if len(authors) > 5 else ""),
         ]
-        view = self._build_view(lines)
+        filename = f"audit-{channel_id}-{started:%Y%m%d-%H%M%S}.txt"
+        detail = io.BytesIO(
+            self._audit_detail_text(events, channel_id, burst.channel_label).encode("utf-8")
+        )
         await channel.send(
-            view=view,
+            view=self._build_view(lines, attachment=filename),
+            file=discord.File(detail, filename=filename),
             allowed_mentions=discord.AllowedMentions.none(),
         )
 
+    @staticmethod
+    def _audit_delete_lines(
+        event: dict[str, Any], channel_id: int, channel_label: str
+    ) -> list[str]:
+        lines = [
+            "## Zpráva odstraněna",
+            f"Autor: {event['author']}\nKanál: {channel_label} ({channel_id})",
+            f"**Obsah:** {event['content'][:1024]}",
+        ]
+        if event["attachments"]:
+            lines.append("**Přílohy:**\n" + "\n".join(event["attachments"])[:1024])
+        return lines
+
+    @staticmethod
+    def _audit_edit_lines(
+        event: dict[str, Any], channel_id: int, channel_label: str
+    ) -> list[str]:
+        return [
+            "## Zpráva upravena",
+            f"Autor: {event['author']}\nKanál: {channel_label} ({channel_id})\n"
+            f"Zpráva: [Odkaz]({event['jump_url']})",
+            f"**Původní text:** {event['before'][:1024]}",
+            f"**Nový text:** {event['after'][:1024]}",
+        ]
+
+    @staticmethod
+    def _audit_detail_text(
+        events: list[dict[str, Any]], channel_id: int, channel_label: str
+    ) -> str:
+        labels = {"delete": "SMAZÁNO", "bulk_delete": "HROMADNĚ SMAZÁNO", "edit": "UPRAVENO"}
+        lines = [f"Audit log kanálu {channel_label} ({channel_id}), {len(events)} událostí", ""]
+        for event in events:
+            author = event["author"] or "neznámý autor (zpráva nebyla v cache)"
+            lines.append(
+                f"[{event['time']:%Y-%m-%d %H:%M:%S}] {labels[event['kind']]} "
+                f"zpráva {event['message_id']} · {author}"
+            )
+            if event["kind"] == "edit":
+                lines.append(f"  Odkaz: {event['jump_url']}")
+                lines.append("  Původní text: " + event["before"].replace("\n", "\n    "))
+                lines.append("  Nový text: " + event["after"].replace("\n", "\n    "))
+            elif event["content"] is not None:
+                lines.append("  Obsah: " + event["content"].replace("\n", "\n    "))
+            for url in event.get("attachments", ()):
+                lines.append(f"  Příloha: {url}")
+        return "\n".join(lines) + "\n"
+
+    def buffer_log_entry(self, message: str, route: str = ROUTE_ERROR) -> None:
+        buffer = self.log_buffers[route]
+        with self._log_buffer_lock:
+            if len(buffer) == buffer.maxlen:
+                self.log_records_dropped += 1
+                self._dropped_since_flush[route] += 1
+            buffer.append(message)
+
+    def _take_log_batches(self, route: str) -> tuple[list[list[str]], int]:
+        """Odebere z bufferu záznamy pro nejvýše LOG_SHIP_MAX_MESSAGES_PER_FLUSH zpráv."""
+        buffer = self.log_buffers[route]
+        limit = MAX_TEXTDISPLAY_PAYLOAD_LENGTH - len(LOG_BATCH_HEADERS[route]) - 200
+        batches: list[list[str]] = []
+        current: list[str] = []
+        used = 0
+        with self._log_buffer_lock:
+            dropped = self._dropped_since_flush.pop(route, 0)
+            while buffer:
+                entry = self._safe_textdisplay_content(buffer[0], limit=limit)
+                if current and used + len(entry) + 1 > limit:
+                    batches.append(current)
+                    current = []
+                    used = 0
+                    if len(batches) >= LOG_SHIP_MAX_MESSAGES_PER_FLUSH:
+                        break
+                buffer.popleft()
+                current.append(entry)
+                used += len(entry) + 1
+            if current:
+                batches.append(current)
+        return batches, dropped
+
     async def _process_log_queue(self):
         try:
             await self.bot.wait_until_ready()
             while True:
-                log_entry = await self.log_queue.get()
-                try:
-                    await self._send_log_entry(log_entry)
-                except Exception:
-                    self.logger.exception("Nepodařilo se odeslat log do kanálu")
+                await asyncio.sleep(LOG_SHIP_FLUSH_SECONDS)
+                self._handler.emit_dedup_summaries()
+                for route in (ROUTE_ERROR, ROUTE_AUDIT):
+                    try:
+                        await self._flush_log_buffer(route)
+                    except Exception:
+                        self.logger.exception(
+                            "Nepodařilo se odeslat log do kanálu",
+                            extra={"skip_channel": True},
+                        )
         except asyncio.CancelledError:
             pass
 
-    async def _send_log_entry(self, message: str):
-        channel = await self._get_error_log_channel()
+    async def _flush_log_buffer(self, route: str = ROUTE_ERROR) -> None:
+        buffer = self.log_buffers[route]
+        if not buffer and not self._dropped_since_flush.get(route):
+            return
+        if route == ROUTE_AUDIT:
+            channel = await self._get_audit_log_channel()
+        else:
+            channel = await self._get_error_log_channel()
         if channel is None:
+            # Kanál je vypnutý nebo neexistuje, záznamy se nehromadí.
+            with self._log_buffer_lock:
+                self.log_records_dropped += len(buffer)
+                buffer.clear()
+                self._dropped_since_flush.pop(route, None)
             return
 
-        payload_lines = self._fit_textdisplay_payload(["## Log bota", message])
-        view = self._build_view(payload_lines)
-        await channel.send(
-            view=view,
-            allowed_mentions=discord.AllowedMentions.none(),
-        )
-
-    def _build_view(self, lines: list[str]) -> discord.ui.LayoutView:
+        writer = get_writer(self.bot)
+        batches, dropped = self._take_log_batches(route)
+        for index, batch in enumerate(batches):
+            lines = [LOG_BATCH_HEADERS[route]]
+            if index == 0 and dropped:
+                lines.append(f"*Buffer logů byl plný, zahozeno {dropped} starších záznamů.*")
+            lines.append("\n".join(batch))
+            try:
+                await writer.send_message(
+                    channel,
+                    view=self._build_view(lines),
+                    allowed_mentions=discord.AllowedMentions.none(),
+                    priority=WritePriority.LOW,
+                )
+            except Exception:
+                # Neodeslané dávky se započtou jako zahozené a ohlásí se v dalším flushi.
+                unsent = sum(len(rest) for rest in batches[index:])
+                with self._log_buffer_lock:
+                    self.log_records_dropped += unsent
+                    self._dropped_since_flush[route] += unsent + (dropped if index == 0 else 0)
+                raise
+            self.log_messages_sent += 1
+            self.log_records_shipped += len(batch)
+
+    def _build_view(
+        self, lines: list[str], *, attachment: str | None = None
+    ) -> discord.ui.LayoutView:
         safe_lines = self._fit_textdisplay_payload(lines)
+        items: list[discord.ui.Item] = [
+            discord.ui.TextDisplay(content=line) for line in safe_lines
+        ]
+        if attachment is not None:
+            items.append(discord.ui.File(f"attachment://{attachment}"))
         view = discord.ui.LayoutView(timeout=None)
-        view.add_item(
-            discord.ui.Container(
-                *(discord.ui.TextDisplay(content=line) for line in safe_lines)
-            )
-        )
+        view.add_item(discord.ui.Container(*items))
         return view
 
     def _fit_textdisplay_payload(self, values: list[object]) -> list[str]:
@@ -354,7 +1041,7 @@ class LoggingCog(commands.Cog):
         self, interaction: discord.Interaction, channel: discord.TextChannel
     ):
         self.error_log_channel_id = channel.id
-        set_error_log_channel_id(channel.id)
+        await adb.set_error_log_channel_id(channel.id)
         view = self._build_view(
             [
                 "## Chybový log kanál nastaven",
@@ -378,7 +1065,7 @@ class LoggingCog(commands.Cog):
             return
 
         self.error_log_channel_id = channel.id
-        set_error_log_channel_id(channel.id)
+        await adb.set_error_log_channel_id(channel.id)
         view = self._build_view(
             [
                 "## Chybový log kanál nastaven",
@@ -389,7 +1076,7 @@ class LoggingCog(commands.Cog):
 
     async def errors_disable(self, interaction: discord.Interaction):
         self.error_log_channel_id = 0
-        set_error_log_channel_id(0)
+        await adb.set_error_log_channel_id(0)
         view = self._build_view(
             [
                 "## Chybové logování vypnuto",
@@ -422,7 +1109,7 @@ class LoggingCog(commands.Cog):
         self, interaction: discord.Interaction, channel: discord.TextChannel
     ):
         self.audit_log_channel_id = channel.id
-        set_audit_log_channel_id(channel.id)
+        await adb.set_audit_log_channel_id(channel.id)
         view = self._build_view(
             [
                 "## Audit log kanál nastaven",
@@ -446,7 +1133,7 @@ class LoggingCog(commands.Cog):
             return
 
         self.audit_log_channel_id = channel.id
-        set_audit_log_channel_id(channel.id)
+        await adb.set_audit_log_channel_id(channel.id)
         view = self._build_view(
             [
                 "## Audit log kanál nastaven",
@@ -457,7 +1144,7 @@ class LoggingCog(commands.Cog):
 
     async def audit_disable(self, interaction: discord.Interaction):
         self.audit_log_channel_id = 0
-        set_audit_log_channel_id(0)
+        await adb.set_audit_log_channel_id(0)
         view = self._build_view(
             [
                 "## Audit logování vypnuto",
@@ -489,8 +1176,8 @@ class LoggingCog(commands.Cog):
     async def disable_all_log_channels(self, interaction: discord.Interaction):
         self.error_log_channel_id = 0
         self.audit_log_channel_id = 0
-        set_error_log_channel_id(0)
-        set_audit_log_channel_id(0)
+        await adb.set_error_log_channel_id(0)
+        await adb.set_audit_log_channel_id(0)
         view = self._build_view(
             [
                 "## Všechna Discord logování vypnuta",
@@ -525,9 +1212,127 @@ class LoggingCog(commands.Cog):
             "## Nastavení logování",
             error_line,
             audit_line,
+            (
+                f"Buffer logů: {sum(len(buffer) for buffer in self.log_buffers.values())}"
+                f"/{LOG_SHIP_BUFFER_SIZE * len(self.log_buffers)} čeká · "
+                f"odesláno {self.log_records_shipped} záznamů v {self.log_messages_sent} "
+                f"zprávách · zahozeno {self.log_records_dropped}"
+            ),
+            (
+                f"Lokální log: {LOG_SINK_PATH} · fronta {self.sink_handler.queue.qsize()}"
+                f"/{LOG_SINK_QUEUE_SIZE} · zahozeno {self.sink_handler.dropped}"
+            ),
         ])
         await interaction.response.send_message(view=view, ephemeral=True)
 
+    @app_commands.describe(
+        logger="Prefix jména loggeru (např. botdc.writer).",
+        level="Minimální úroveň záznamu.",
+        since="Od (RRRR-MM-DD HH:MM), výchozí je poslední hodina.",
+        until="Do (stejný formát), výchozí je teď.",
+        limit=f"Nejvýše tolik posledních řádků (max {LOG_TAIL_MAX_LINES}).",
+    )
+    @app_commands.choices(
+        level=[
+            app_commands.Choice(name=name, value=name)
+            for name in ("DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL")
+        ]
+    )
+    async def tail_local_log(
+        self,
+        interaction: discord.Interaction,
+        logger: str | None = None,
+        level: app_commands.Choice[str] | None = None,
+        since: str | None = None,
+        until: str | None = None,
+        limit: app_commands.Range[int, 1, LOG_TAIL_MAX_LINES] = 500,
+    ):
+        try:
+            since_ts = (
+                datetime.strptime(since, LOG_TAIL_TIME_FORMAT).timestamp()
+                if since
+                else time.time() - 3600
+            )
+            until_ts = datetime.strptime(until, LOG_TAIL_TIME_FORMAT).timestamp() if until else None
+        except ValueError:
+            view = self._build_view(
+                [
+                    "## Neplatný časový rozsah",
+                    "Použij formát `RRRR-MM-DD HH:MM`, např. 2024-05-01 18:30.",
+                ]
+            )
+            await interaction.response.send_message(view=view, ephemeral=True)
+            return
+
+        await interaction.response.defer(ephemeral=True)
+        output = tempfile.TemporaryFile()
+        try:
+            count = await asyncio.to_thread(
+                tail_log_sink,
+                LOG_SINK_PATH,
+                output,
+                logger_prefix=(logger or "").strip(),
+                min_level=logging.getLevelName(level.value) if level else logging.NOTSET,
+                since=since_ts,
+                until=until_ts,
+                limit=limit,
+            )
+            output.seek(0)
+            filters = [
+                f"logger `{logger}`" if logger else None,
+                f"od {level.value}" if level else None,
+                f"od {datetime.fromtimestamp(since_ts).strftime(LOG_TAIL_TIME_FORMAT)}",
+                f"do {until}" if until else None,
+            ]
+            summary = ", ".join(item for item in filters if item)
+            writer = get_writer(interaction.client)
+            if not count:
+                await writer.send_interaction_followup(
+                    interaction,
+                    view=self._build_view(
+                        ["## Konec lokálního logu", f"Žádné záznamy ({summary})."]
+                    ),
+                    ephemeral=True,
+                )
+                return
+            filename = "log-tail.jsonl"
+            view = self._build_view(
+                ["## Konec lokálního logu", f"{count} záznamů ({summary})."],
+                attachment=filename,
+            )
+            await writer.send_interaction_followup(
+                interaction,
+                view=view,
+                file=discord.File(output, filename=filename),
+                ephemeral=True,
+            )
+        finally:
+            output.close()
+
+    async def rules_show(self, interaction: discord.Interaction):
+        view = self._build_view(["## Pravidla logů", *self.log_rules.describe()])
+        await interaction.response.send_message(view=view, ephemeral=True)
+
+    async def rules_reload(self, interaction: discord.Interaction):
+        try:
+            rules = await asyncio.to_thread(LogRoutingRules.load, LOG_RULES_PATH)
+        except (OSError, ValueError, TypeError) as exc:
+            view = self._build_view(
+                [
+                    "## Pravidla logů nenačtena",
+                    f"Chyba: {exc}",
+                    "Zůstávají platná předchozí pravidla.",
+                ]
+            )
+            await interaction.response.send_message(view=view, ephemeral=True)
+            return
+        # Potlačená opakování ze starých pravidel se ještě vypíšou.
+        self._handler.emit_dedup_summaries(self.log_rules.close_all())
+        self.log_rules = rules
+        self.logger.info("Pravidla logů znovu načtena z %s.", rules.source)
+        view = self._build_view(["## Pravidla logů znovu načtena", *rules.describe()])
+        await interaction.response.send_message(view=view, ephemeral=True)
+
 
 class _ChannelLogHandler(logging.Handler):
     def __init__(self, cog: LoggingCog):
@@ -536,6 +1341,17 @@ class _ChannelLogHandler(logging.Handler):
 
     def emit(self, record: logging.LogRecord):
         if getattr(record, "skip_channel", False):
+            self.cog.sink_handler.handle(record)
+            return
+        rules = self.cog.log_rules
+        route, note = rules.evaluate(record)
+        self.emit_dedup_summaries(rules.take_summaries())
+        record.log_route = route
+        if route == ROUTE_DROP:
+            return
+        # Lokální log dostává vše kromě zahozených, i potlačená opakování.
+        self.cog.sink_handler.handle(record)
+        if note is None:
             return
         try:
             message = self.format(record)
@@ -543,8 +1359,18 @@ class _ChannelLogHandler(logging.Handler):
             self.handleError(record)
             return
 
-        loop = self.cog.bot.loop
-        if loop is None or loop.is_closed():
-            return
+        self.cog.buffer_log_entry(message + note, route)
 
-        loop.call_soon_threadsafe(self.cog.log_queue.put_nowait, message)
+    def emit_dedup_summaries(self, summaries=None) -> None:
+        """Vypíše souhrny potlačených opakování; bez argumentu i s prošlým oknem."""
+        if summaries is None:
+            summaries = self.cog.log_rules.take_summaries(expired=True)
+        for route, record, count, window in summaries:
+            try:
+                message = self.format(record)
+            except Exception:
+                self.handleError(record)
+                continue
+            self.cog.buffer_log_entry(
+                f"{message} *(+{count}× za posledních {window:g} s)*", route
+            )
@@ -22,8 +22,9 @@ from config import (
     REBIRTH_CHAMPIONS_UNIVERSE_ID,
     ROBLOX_ACTIVITY_CHANNEL_ID,
 )
+import adb
 from cog_discord_writer import get_writer
-from db import get_connection, get_setting, set_setting
+from db import connection, get_setting, set_setting
 
 
 ROBLOX_USERNAMES_URL = "https://users.roblox.com/v1/usernames/users"
@@ -69,6 +70,11 @@ def _describe_mention_mode(value: str) -> str:
     return "jen offline/neověření"
 
 
+def _run_in_connection(writer, *args) -> None:
+    with connection() as conn:
+        writer(conn, *args)
+
+
 class ConnectionStatus(TypedDict, total=False):
     is_friend: Optional[bool]
     is_pending: bool
@@ -212,40 +218,6 @@ class RobloxActivityCog(commands.Cog, name="RobloxActivity"):
             self._logger.warning("Failed to parse datetime value: %s", value)
             return None
 
-    def _ensure_tracking_table_columns(self, cursor) -> None:
-        cursor.execute("PRAGMA table_info(roblox_tracking_state)")
-        columns = {row[1] for row in cursor.fetchall()}
-        if "last_channel_report_at" in columns:
-            return
-
-        try:
-            cursor.execute(
-                "ALTER TABLE roblox_tracking_state ADD COLUMN last_channel_report_at TEXT"
-            )
-        except Exception as exc:  # noqa: BLE001
-            self._logger.warning(
-                "Could not add last_channel_report_at column: %s", exc
-            )
-
-    def _ensure_presence_table_columns(self, cursor) -> None:
-        cursor.execute("PRAGMA table_info(roblox_presence_state)")
-        columns = {row[1] for row in cursor.fetchall()}
-        if "count_offline" not in columns:
-            try:
-                cursor.execute(
-                    "ALTER TABLE roblox_presence_state ADD COLUMN count_offline INTEGER"
-                )
-            except Exception as exc:  # noqa: BLE001
-                self._logger.warning("Could not add count_offline column: %s", exc)
-
-        if "offline_notified" not in columns:
-            try:
-                cursor.execute(
-                    "ALTER TABLE roblox_presence_state ADD COLUMN offline_notified INTEGER"
-                )
-            except Exception as exc:  # noqa: BLE001
-                self._logger.warning("Could not add offline_notified column: %s", exc)
-
     def _load_cookie_from_db(self) -> None:
         value = get_setting(self._COOKIE_SETTING_KEY)
         self._roblox_cookie = value.strip() if value else None
@@ -330,92 +302,111 @@ class RobloxActivityCog(commands.Cog, name="RobloxActivity"):
         return bool(int(value))
 
     def _load_state_from_db(self) -> None:
-        conn = get_connection()
-        cursor = conn.cursor()
+        with connection() as conn:
+            cursor = conn.cursor()
 
-        self._ensure_tracking_table_columns(cursor)
-        self._ensure_presence_table_columns(cursor)
-
-        cursor.execute(
-            "SELECT tracking_enabled, session_started_at, session_ended_at, last_channel_report_at FROM roblox_tracking_state WHERE id = 1"
-        )
-        row = cursor.fetchone()
-        if row:
-            tracking_enabled, started_at, ended_at, last_report_at = row
-            try:
-                self._tracking_enabled = bool(int(tracking_enabled))
-            except (TypeError, ValueError):
-                self._tracking_enabled = True
-            self._session_started_at = (
-                self._parse_datetime(started_at) or datetime.now(timezone.utc)
+            cursor.execute(
+                "SELECT tracking_enabled, session_started_at, session_ended_at, last_channel_report_at FROM roblox_tracking_state WHERE id = 1"
             )
-            self._session_ended_at = self._parse_datetime(ended_at)
-            self._last_channel_report = self._parse_datetime(last_report_at)
-        else:
-            now = datetime.now(timezone.utc)
-            self._tracking_enabled = True
-            self._session_started_at = now
-            self._session_ended_at = None
-            self._last_channel_report = None
+            row = cursor.fetchone()
+            if row:
+                tracking_enabled, started_at, ended_at, last_report_at = row
+                try:
+                    self._tracking_enabled = bool(int(tracking_enabled))
+                except (TypeError, ValueError):
+                    self._tracking_enabled = True
+                self._session_started_at = (
+                    self._parse_datetime(started_at) or datetime.now(timezone.utc)
+                )
+                self._session_ended_at = self._parse_datetime(ended_at)
+                self._last_channel_report = self._parse_datetime(last_report_at)
+            else:
+                now = datetime.now(timezone.utc)
+                self._tracking_enabled = True
+                self._session_started_at = now
+                self._session_ended_at = None
+                self._last_channel_report = None
+                cursor.execute(
+                    "INSERT INTO roblox_tracking_state (id, tracking_enabled, session_started_at, session_ended_at, last_channel_report_at) VALUES (1, ?, ?, ?, ?)",
+                    (1, self._serialize_datetime(now), None, None),
+                )
+
             cursor.execute(
-                "INSERT INTO roblox_tracking_state (id, tracking_enabled, session_started_at, session_ended_at, last_channel_report_at) VALUES (1, ?, ?, ?, ?)",
-                (1, self._serialize_datetime(now), None, None),
+                "SELECT user_id, online_seconds, offline_seconds, label FROM roblox_duration_totals"
             )
+            for user_id, online_seconds, offline_seconds, label in cursor.fetchall():
+                self._duration_totals[int(user_id)] = {
+                    "online": float(online_seconds or 0),
+                    "offline": float(offline_seconds or 0),
+                }
+                if label:
+                    self._user_labels[int(user_id)] = label
 
-        cursor.execute(
-            "SELECT user_id, online_seconds, offline_seconds, label FROM roblox_duration_totals"
-        )
-        for user_id, online_seconds, offline_seconds, label in cursor.fetchall():
-            self._duration_totals[int(user_id)] = {
-                "online": float(online_seconds or 0),
-                "offline": float(offline_seconds or 0),
-            }
-            if label:
-                self._user_labels[int(user_id)] = label
+            cursor.execute(
+                "SELECT user_id, status, last_change, last_update, count_offline, offline_notified "
+                "FROM roblox_presence_state"
+            )
+            for user_id, status, last_change, last_update, count_offline, offline_notified in cursor.fetchall():
+                self._presence_state[int(user_id)] = {
+                    "status": self._int_to_status(status),
+                    "last_change": self._parse_datetime(last_change),
+                    "last_update": self._parse_datetime(last_update),
+                    "count_offline": bool(int(count_offline)) if count_offline is not None else True,
+                    "offline_notified": bool(int(offline_notified)) if offline_notified is not None else False,
+                }
 
-        cursor.execute(
-            "SELECT user_id, status, last_change, last_update, count_offline, offline_notified "
-            "FROM roblox_presence_state"
-        )
-        for user_id, status, last_change, last_update, count_offline, offline_notified in cursor.fetchall():
-            self._presence_state[int(user_id)] = {
-                "status": self._int_to_status(status),
-                "last_change": self._parse_datetime(last_change),
-                "last_update": self._parse_datetime(last_update),
-                "count_offline": bool(int(count_offline)) if count_offline is not None else True,
-                "offline_notified": bool(int(offline_notified)) if offline_notified is not None else False,
-            }
+            if self._tracking_enabled and self._presence_state:
+                now = datetime.now(timezone.utc)
+                for user_id, state in list(self._presence_state.items()):
+                    status = state.get("status")
+                    last_update = state.get("last_update")
+                    if status is None or last_update is None:
+                        continue
 
-        if self._tracking_enabled and self._presence_state:
-            now = datetime.now(timezone.utc)
-            for user_id, state in list(self._presence_state.items()):
-                status = state.get("status")
-                last_update = state.get("last_update")
-                if status is None or last_update is None:
-                    continue
+                    elapsed = (now - last_update).total_seconds()
+                    if elapsed <= 0:
+                        continue
 
-                elapsed = (now - last_update).total_seconds()
-                if elapsed <= 0:
-                    continue
+                    if status is True:
+                        self._duration_totals[user_id]["online"] += elapsed
+                    elif status is False:
+                        self._duration_totals[user_id]["offline"] += elapsed
 
-                if status is True:
-                    self._duration_totals[user_id]["online"] += elapsed
-                elif status is False:
-                    self._duration_totals[user_id]["offline"] += elapsed
+                    state["last_update"] = now
 
-                state["last_update"] = now
+                self._write_all_state(conn, *self._all_state_rows())
 
-            self._persist_all_state()
+    def _tracking_state_row(self) -> tuple:
+        return (
+            1 if self._tracking_enabled else 0,
+            self._serialize_datetime(self._session_started_at),
+            self._serialize_datetime(self._session_ended_at),
+            self._serialize_datetime(self._last_channel_report),
+        )
 
-        conn.commit()
-        conn.close()
+    def _user_state_rows(self, user_id: int) -> tuple[tuple, tuple]:
+        state = self._presence_state.get(user_id, {})
+        totals = self._duration_totals.get(user_id, {"online": 0.0, "offline": 0.0})
+        label = self._user_labels.get(user_id)
+        presence_row = (
+            user_id,
+            self._status_to_int(state.get("status")),
+            self._serialize_datetime(state.get("last_change")),
+            self._serialize_datetime(state.get("last_update")),
+            1 if state.get("count_offline", True) else 0,
+            1 if state.get("offline_notified", False) else 0,
+        )
+        totals_row = (user_id, totals["online"], totals["offline"], label)
+        return presence_row, totals_row
 
-    def _persist_tracking_state(self, conn=None) -> None:
-        should_close = False
-        if conn is None:
-            conn = get_connection()
-            should_close = True
+    def _all_state_rows(self) -> tuple[tuple, list[tuple[tuple, tuple]]]:
+        user_ids = set(self._presence_state.keys()) | set(self._duration_totals.keys())
+        return self._tracking_state_row(), [
+            self._user_state_rows(user_id) for user_id in user_ids
+        ]
 
+    @staticmethod
+    def _write_tracking_state(conn, row: tuple) -> None:
         conn.execute(
             """
             INSERT INTO roblox_tracking_state (id, tracking_enabled, session_started_at, session_ended_at, last_channel_report_at)
@@ -426,28 +417,11 @@ class RobloxActivityCog(commands.Cog, name="RobloxActivity"):
                 session_ended_at = excluded.session_ended_at,
                 last_channel_report_at = excluded.last_channel_report_at
             """,
-            (
-                1 if self._tracking_enabled else 0,
-                self._serialize_datetime(self._session_started_at),
-                self._serialize_datetime(self._session_ended_at),
-                self._serialize_datetime(self._last_channel_report),
-            ),
+            row,
         )
 
-        if should_close:
-            conn.commit()
-            conn.close()
-
-    def _persist_user_state(self, user_id: int, conn=None) -> None:
-        should_close = False
-        if conn is None:
-            conn = get_connection()
-            should_close = True
-
-        state = self._presence_state.get(user_id, {})
-        totals = self._duration_totals.get(user_id, {"online": 0.0, "offline": 0.0})
-        label = self._user_labels.get(user_id)
-
+    @staticmethod
+    def _write_user_state(conn, presence_row: tuple, totals_row: tuple) -> None:
         conn.execute(
             """
             INSERT INTO roblox_presence_state (user_id, status, last_change, last_update, count_offline, offline_notified)
@@ -459,14 +433,7 @@ class RobloxActivityCog(commands.Cog, name="RobloxActivity"):
                 count_offline = excluded.count_offline,
                 offline_notified = excluded.offline_notified
             """,
-            (
-                user_id,
-                self._status_to_int(state.get("status")),
-                self._serialize_datetime(state.get("last_change")),
-                self._serialize_datetime(state.get("last_update")),
-                1 if state.get("count_offline", True) else 0,
-                1 if state.get("offline_notified", False) else 0,
-            ),
+            presence_row,
         )
 
         conn.execute(
@@ -478,34 +445,40 @@ class RobloxActivityCog(commands.Cog, name="RobloxActivity"):
                 offline_seconds = excluded.offline_seconds,
                 label = excluded.label
             """,
-            (user_id, totals["online"], totals["offline"], label),
+            totals_row,
+        )
+
+    @classmethod
+    def _write_all_state(
+        cls, conn, tracking_row: tuple, user_rows: list[tuple[tuple, tuple]]
+    ) -> None:
+        cls._write_tracking_state(conn, tracking_row)
+        for presence_row, totals_row in user_rows:
+            cls._write_user_state(conn, presence_row, totals_row)
+
+    @staticmethod
+    def _write_cleared_state(conn) -> None:
+        conn.execute("DELETE FROM roblox_presence_state")
+        conn.execute("DELETE FROM roblox_duration_totals")
+        conn.execute("DELETE FROM roblox_tracking_state WHERE id = 1")
+
+    # Stav se snapshotuje na event loopu a zapisuje na DB writer vlákně;
+    # pořadí zápisů drží fronta writeru.
+    def _persist_tracking_state(self) -> None:
+        adb.submit_write(
+            _run_in_connection, self._write_tracking_state, self._tracking_state_row()
         )
 
-        if should_close:
-            conn.commit()
-            conn.close()
+    def _persist_user_state(self, user_id: int) -> None:
+        adb.submit_write(
+            _run_in_connection, self._write_user_state, *self._user_state_rows(user_id)
+        )
 
     def _persist_all_state(self) -> None:
-        conn = get_connection()
-        try:
-            with conn:
-                self._persist_tracking_state(conn)
-                for user_id in set(
-                    list(self._presence_state.keys()) + list(self._duration_totals.keys())
-                ):
-                    self._persist_user_state(user_id, conn)
-        finally:
-            conn.close()
+        adb.submit_write(_run_in_connection, self._write_all_state, *self._all_state_rows())
 
     def _clear_persistence(self) -> None:
-        conn = get_connection()
-        try:
-            with conn:
-                conn.execute("DELETE FROM roblox_presence_state")
-                conn.execute("DELETE FROM roblox_duration_totals")
-                conn.execute("DELETE FROM roblox_tracking_state WHERE id = 1")
-        finally:
-            conn.close()
+        adb.submit_write(_run_in_connection, self._write_cleared_state)
 
     def _find_roblox_username(self, member: discord.Member) -> Optional[str]:
         nickname = member.nick or member.global_name or member.name
@@ -13,6 +13,7 @@ import discord
 from discord import app_commands
 from discord.ext import commands, tasks
 
+import adb
 from config import (
     CLAN2_MEMBER_ROLE_ID,
     CLAN3_MEMBER_ROLE_ID,
@@ -29,17 +30,15 @@ from cog_clan import CLAN_MEMBER_ROLE_IDS as CLAN_MEMBER_ROLE_IDS_BY_KEY
 from cog_discord_writer import get_writer
 from db import (
     add_secret_drop_event,
+    clan_member_nick_index,
     delete_secret_leaderboard_queue,
     delete_windows_notifications,
     delete_dropstats_panel_states,
     get_all_dropstats_panels,
-    get_connection,
     get_setting,
-    get_secret_drop_breakdown_all_time,
     get_secret_drop_user_display_names,
     get_secret_notifications_role_ids,
     get_windows_notifications,
-    increment_secret_drop_stat,
     enqueue_secret_leaderboard_payload,
     list_clan_definitions,
     list_secret_leaderboard_queue,
@@ -47,6 +46,7 @@ from db import (
     remove_dropstats_panel,
     reset_secret_drop_stats,
     set_setting,
+    set_settings,
     set_dropstats_panel_message_ids,
     set_secret_notifications_role_ids,
     upsert_secret_drop_user,
@@ -54,6 +54,11 @@ from db import (
 
 
 CHANNEL_ID = 1454386651831734324
+DROPSTATS_PERIOD_LABELS = {
+    "all": "",
+    "week": " – tento týden",
+    "month": " – tento měsíc",
+}
 SETTINGS_KEY_CLAN_MEMBER_CACHE = "secret_notifications_clan_member_cache"
 SETTINGS_KEY_CLAN_MEMBER_CACHE_UPDATED = (
     "secret_notifications_clan_member_cache_updated_at"
@@ -101,10 +106,91 @@ if not any(
     winrt_logger.propagate = False
 
 
+_WORD_CHAR = re.compile(r"\w")
+
+
+def _name_trie_pattern(node: dict[str, Any]) -> str:
+    branches = [
+        re.escape(char) + _name_trie_pattern(child)
+        for char, child in sorted(node.items())
+        if char
+    ]
+    if not branches:
+        return ""
+    body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+    if "" in node:
+        # Greedy volitelné pokračování: nejdřív delší jméno, pak kratší.
+        return f"(?:{body})?"
+    return body
+
+
+class PlayerNameMatcher:
+    """Jména hráčů z cache zkompilovaná do jednoho regexu ve tvaru trie.
+
+    Hranice jmen jsou stejné jako u testu jednoho jména regexem
+    `(?:(?<=^)|(?<=[\\s\\W]))jméno(?:(?=$)|(?=[\\s\\W]))`: před a za jménem je
+    začátek/konec textu nebo znak z `[\\s\\W]`, tedy ne `\\w`. Na každé pozici
+    regex najde nejdelší jméno; kratší jména, která jsou jeho prefixem
+    končícím před ne-slovním znakem, se doplní z předpočítané tabulky, takže
+    výsledek odpovídá testu každého jména zvlášť.
+    """
+
+    def __init__(self, cache: dict[str, dict[str, Any]]):
+        self._member_ids: dict[str, int] = {}
+        self._ranks: dict[str, int] = {}
+        for rank, (name, entry) in enumerate(cache.items()):
+            if not name or not (entry.get("roblox_username") or entry.get("roblox_nick")):
+                continue
+            member_id = entry.get("id")
+            if member_id is None:
+                continue
+            self._member_ids[name] = int(member_id)
+            self._ranks[name] = rank
+
+        trie: dict[str, Any] = {}
+        for name in self._member_ids:
+            node = trie
+            for char in name:
+                node = node.setdefault(char, {})
+            node[""] = {}
+        self._pattern = (
+            re.compile(rf"(?<!\w)(?=({_name_trie_pattern(trie)})(?!\w))")
+            if self._member_ids
+            else None
+        )
+        # Jméno -> ono samo a všechna kratší jména, která na stejné pozici
+        # projdou hranicí (prefix, za kterým ve jméně následuje ne-slovní znak).
+        self._implied: dict[str, tuple[str, ...]] = {}
+        for name in self._member_ids:
+            self._implied[name] = (name,) + tuple(
+                name[:index]
+                for index in range(1, len(name))
+                if name[:index] in self._member_ids and not _WORD_CHAR.match(name[index])
+            )
+
+    def __len__(self) -> int:
+        return len(self._member_ids)
+
+    def find(self, normalized_text: str) -> List[int]:
+        """ID hráčů zmíněných v textu v pořadí cache, bez duplicit."""
+        if self._pattern is None or not normalized_text:
+            return []
+        best_rank: dict[int, int] = {}
+        for match in self._pattern.finditer(normalized_text):
+            for name in self._implied[match.group(1)]:
+                member_id = self._member_ids[name]
+                rank = self._ranks[name]
+                if rank < best_rank.get(member_id, rank + 1):
+                    best_rank[member_id] = rank
+        return sorted(best_rank, key=best_rank.__getitem__)
+
+
 class SecretNotificationsForwarder(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
         self._clan_member_cache: dict[str, dict[str, Any]] = {}
+        # Sestaví se líně při první notifikaci po změně cache.
+        self._player_matcher: Optional[PlayerNameMatcher] = None
         self._clan_member_cache_updated_at: Optional[datetime] = None
         self._received_notifications_count = 0
         self._last_processed_notification_id: Optional[int] = None
@@ -643,19 +729,9 @@ class SecretNotificationsForwarder(commands.Cog):
             normalized_text = self._normalize_name(text_line)
             if not normalized_text:
                 return []
-            matched_ids = []
-            seen_ids = set()
-            for name, entry in self._clan_member_cache.items():
-                if not (
-                    entry.get("roblox_username") or entry.get("roblox_nick")
-                ):
-                    continue
-                if name and self._has_exact_name_match(normalized_text, name):
-                    member_id = entry.get("id")
-                    if member_id not in seen_ids:
-                        matched_ids.append(int(member_id))
-                        seen_ids.add(member_id)
-            return matched_ids
+            if self._player_matcher is None:
+                self._player_matcher = PlayerNameMatcher(self._clan_member_cache)
+            return self._player_matcher.find(normalized_text)
         except Exception:
             logger.exception("Chyba při vyhledání hráče v textu notifikace.")
             return []
@@ -723,13 +799,6 @@ class SecretNotificationsForwarder(commands.Cog):
             return str(name)
         return None
 
-    def _has_exact_name_match(self, text: str, name: str) -> bool:
-        if not text or not name:
-            return False
-        escaped = re.escape(name)
-        pattern = rf"(?:(?<=^)|(?<=[\s\W])){escaped}(?:(?=$)|(?=[\s\W]))"
-        return re.search(pattern, text) is not None
-
     def _build_view(self, lines: List[str]) -> discord.ui.LayoutView:
         view = discord.ui.LayoutView()
         container = discord.ui.Container()
@@ -825,15 +894,14 @@ class SecretNotificationsForwarder(commands.Cog):
         return normalized
 
     def _load_cached_players_from_db(self) -> None:
-        conn = None
         try:
-            conn = get_connection()
-            cursor = conn.execute(
-                "SELECT key, value FROM settings WHERE key IN (?, ?)",
-                (SETTINGS_KEY_CLAN_MEMBER_CACHE, SETTINGS_KEY_CLAN_MEMBER_CACHE_UPDATED),
-            )
-            rows = cursor.fetchall()
-            data = {row[0]: row[1] for row in rows}
+            data = {
+                key: get_setting(key)
+                for key in (
+                    SETTINGS_KEY_CLAN_MEMBER_CACHE,
+                    SETTINGS_KEY_CLAN_MEMBER_CACHE_UPDATED,
+                )
+            }
             cache_raw = data.get(SETTINGS_KEY_CLAN_MEMBER_CACHE)
             if cache_raw:
                 cache_data = json.loads(cache_raw)
@@ -894,37 +962,21 @@ class SecretNotificationsForwarder(commands.Cog):
                             )
                             migrated_cache[normalized] = migrated_cache_entry
                     self._clan_member_cache = migrated_cache
+                    self._player_matcher = None
+                    clan_member_nick_index.replace(migrated_cache.keys())
             updated_raw = data.get(SETTINGS_KEY_CLAN_MEMBER_CACHE_UPDATED)
             if updated_raw:
                 self._clan_member_cache_updated_at = datetime.fromisoformat(updated_raw)
         except Exception:
             logger.exception("Načtení cache hráčů z DB selhalo.")
-        finally:
-            if conn is not None:
-                try:
-                    conn.close()
-                except Exception:
-                    logger.exception("Uzavření DB spojení selhalo.")
 
     def _load_last_processed_notification_id(self) -> None:
-        conn = None
         try:
-            conn = get_connection()
-            cursor = conn.execute(
-                "SELECT value FROM settings WHERE key = ?",
-                (SETTINGS_KEY_LAST_NOTIFICATION_ID,),
-            )
-            row = cursor.fetchone()
-            if row and row[0] is not None:
-                self._last_processed_notification_id = int(row[0])
+            value = get_setting(SETTINGS_KEY_LAST_NOTIFICATION_ID)
+            if value is not None:
+                self._last_processed_notification_id = int(value)
         except Exception:
             logger.exception("Načtení posledního ID notifikace z DB selhalo.")
-        finally:
-            if conn is not None:
-                try:
-                    conn.close()
-                except Exception:
-                    logger.exception("Uzavření DB spojení selhalo.")
 
     def _load_secret_leaderboard_settings(self) -> None:
         url_setting = get_setting(SETTINGS_KEY_SECRET_LEADERBOARD_URL)
@@ -1073,27 +1125,20 @@ class SecretNotificationsForwarder(commands.Cog):
     def _save_clan_member_cache(self) -> None:
         if not self._clan_member_cache_updated_at:
             self._clan_member_cache_updated_at = datetime.now(timezone.utc)
-        conn = None
         try:
-            conn = get_connection()
             cache_payload = json.dumps(self._clan_member_cache)
             updated_payload = self._clan_member_cache_updated_at.isoformat()
-            with conn:
-                conn.executemany(
-                    "INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
-                    [
-                        (SETTINGS_KEY_CLAN_MEMBER_CACHE, cache_payload),
-                        (SETTINGS_KEY_CLAN_MEMBER_CACHE_UPDATED, updated_payload),
-                    ],
-                )
+            set_settings(
+                {
+                    SETTINGS_KEY_CLAN_MEMBER_CACHE: cache_payload,
+                    SETTINGS_KEY_CLAN_MEMBER_CACHE_UPDATED: updated_payload,
+                }
+            )
         except Exception:
             logger.exception("Uložení cache hráčů do DB selhalo.")
-        finally:
-            if conn is not None:
-                try:
-                    conn.close()
-                except Exception:
-                    logger.exception("Uzavření DB spojení selhalo.")
+        # Až po zápisu: změna nastavení index invaliduje a tady se rovnou přepíše.
+        clan_member_nick_index.replace(self._clan_member_cache.keys())
+        self._player_matcher = None
 
     def _save_last_processed_notification_id(self, notification_id: int) -> None:
         if notification_id is None:
@@ -1103,23 +1148,11 @@ class SecretNotificationsForwarder(commands.Cog):
             and notification_id <= self._last_processed_notification_id
         ):
             return
-        conn = None
         try:
-            conn = get_connection()
-            with conn:
-                conn.execute(
-                    "INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
-                    (SETTINGS_KEY_LAST_NOTIFICATION_ID, str(notification_id)),
-                )
+            set_setting(SETTINGS_KEY_LAST_NOTIFICATION_ID, str(notification_id))
             self._last_processed_notification_id = notification_id
         except Exception:
             logger.exception("Uložení posledního ID notifikace do DB selhalo.")
-        finally:
-            if conn is not None:
-                try:
-                    conn.close()
-                except Exception:
-                    logger.exception("Uzavření DB spojení selhalo.")
 
     def _add_cache_key(
         self, cache: dict[str, dict[str, Any]], key: Any, entry: dict[str, Any]
@@ -1279,10 +1312,8 @@ class SecretNotificationsForwarder(commands.Cog):
             return
         rarity_value = rarity or "unknown"
         now = datetime.now(timezone.utc)
-        date_value = now.date().isoformat()
         for player_id in player_ids:
             try:
-                increment_secret_drop_stat(date_value, int(player_id), 1)
                 add_secret_drop_event(now, int(player_id), rarity_value)
             except Exception:
                 logger.exception("Uložení denní statistiky dropu selhalo.")
@@ -1306,12 +1337,13 @@ class SecretNotificationsForwarder(commands.Cog):
         if not self._secret_leaderboard_url:
             logger.warning("Secret leaderboard endpoint není nakonfigurován (URL).")
             return
-        payload = self._build_secret_leaderboard_payload()
+        payload = await self._build_secret_leaderboard_payload()
         enqueue_secret_leaderboard_payload(payload)
         await self._flush_secret_leaderboard_queue()
 
-    def _build_secret_leaderboard_payload(self) -> Dict[str, Any]:
-        breakdown = get_secret_drop_breakdown_all_time()
+    async def _build_secret_leaderboard_payload(self) -> Dict[str, Any]:
+        await adb.flush_write_behind()
+        breakdown = await adb.get_secret_drop_breakdown_all_time()
         display_names = get_secret_drop_user_display_names()
         clan_members = self._get_clan_member_entries()
         now = datetime.now(timezone.utc)
@@ -1436,8 +1468,20 @@ class SecretNotificationsForwarder(commands.Cog):
     async def before_secret_leaderboard_snapshot_sender(self) -> None:
         await self.bot.wait_until_ready()
 
-    async def dropstats_leaderboard(self, interaction: discord.Interaction):
-        views = self._build_dropstats_views()
+    @app_commands.describe(period="Období žebříčku (výchozí: celkově).")
+    @app_commands.choices(
+        period=[
+            app_commands.Choice(name="Celkově", value="all"),
+            app_commands.Choice(name="Tento týden", value="week"),
+            app_commands.Choice(name="Tento měsíc", value="month"),
+        ]
+    )
+    async def dropstats_leaderboard(
+        self,
+        interaction: discord.Interaction,
+        period: Optional[app_commands.Choice[str]] = None,
+    ):
+        views = await self._build_dropstats_views(period.value if period else "all")
         if not views:
             view = self._build_notice_view("⚠️ Dropstats nejsou dostupné.")
             await interaction.response.send_message(
@@ -1455,7 +1499,7 @@ class SecretNotificationsForwarder(commands.Cog):
     async def dropstats_setup(
         self, interaction: discord.Interaction, channel: discord.TextChannel
     ):
-        views = self._build_dropstats_views()
+        views = await self._build_dropstats_views()
         if not views:
             view = self._build_notice_view("⚠️ Dropstats není možné vytvořit.")
             await interaction.response.send_message(view=view, ephemeral=True)
@@ -1697,13 +1741,15 @@ class SecretNotificationsForwarder(commands.Cog):
         view.add_item(container)
         return view
 
-    def _build_dropstats_views(self) -> list[discord.ui.LayoutView]:
+    async def _build_dropstats_views(self, period: str = "all") -> list[discord.ui.LayoutView]:
         members = self._get_clan_member_entries()
-        breakdown = self._get_drop_breakdown_safe()
+        breakdown = await self._get_drop_breakdown_safe(period)
         totals = {
             user_id: sum(counts.values()) for user_id, counts in breakdown.items()
         }
-        summary_view = self._build_dropstats_summary_view(members, totals, breakdown)
+        summary_view = self._build_dropstats_summary_view(
+            members, totals, breakdown, period
+        )
         if members:
             summary_view.add_item(
                 self._build_dropstats_top_members_container(
@@ -1717,11 +1763,17 @@ class SecretNotificationsForwarder(commands.Cog):
         members: dict[int, dict[str, Optional[str]]],
         totals: dict[int, int],
         breakdown: dict[int, dict[str, int]],
+        period: str = "all",
     ) -> discord.ui.LayoutView:
         view = discord.ui.LayoutView(timeout=None)
         summary_container = discord.ui.Container()
         summary_container.add_item(
-            discord.ui.TextDisplay(content="## 🏆 Dropstats leaderboard")
+            discord.ui.TextDisplay(
+                content=(
+                    "## 🏆 Dropstats leaderboard"
+                    f"{DROPSTATS_PERIOD_LABELS.get(period, '')}"
+                )
+            )
         )
         summary_container.add_item(
             discord.ui.TextDisplay(
@@ -2034,9 +2086,13 @@ class SecretNotificationsForwarder(commands.Cog):
         view.add_item(container)
         return view
 
-    def _get_drop_breakdown_safe(self) -> dict[int, dict[str, int]]:
+    async def _get_drop_breakdown_safe(self, period: str = "all") -> dict[int, dict[str, int]]:
         try:
-            return get_secret_drop_breakdown_all_time()
+            # Čekající dropy z write-behind bufferu zapíše writer vlákno před čtením.
+            await adb.flush_write_behind()
+            if period != "all":
+                return await adb.get_secret_drop_breakdown_for_period(period)
+            return await adb.get_secret_drop_breakdown_all_time()
         except Exception:
             logger.exception("Načtení statistiky dropu selhalo.")
             return {}
@@ -2128,7 +2184,7 @@ class SecretNotificationsForwarder(commands.Cog):
 
             message_ids = list(stored_message_ids)
             removed_message_ids: list[int] = []
-            views = self._build_dropstats_views()
+            views = await self._build_dropstats_views()
             if not views:
                 continue
             view = views[0]
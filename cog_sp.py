@@ -20,8 +20,9 @@ from db import (
     get_all_sp_panels,
     get_sp_panel_for_guild,
     get_setting,
+    get_setting_float,
     remove_sp_panel,
-    set_setting,
+    set_settings,
 )
 
 
@@ -48,31 +49,6 @@ class RebirthPanel(commands.Cog, name="RebirthPanel"):
     def _get_admin_connection(self) -> sqlite3.Connection:
         return sqlite3.connect(ADMIN_TASK_DB_PATH)
 
-    def _ensure_rebirth_table(self) -> None:
-        conn = self._get_admin_connection()
-        cursor = conn.cursor()
-        cursor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS member_rebirths (
-                user_id TEXT PRIMARY KEY,
-                display_name TEXT,
-                rebirths TEXT NOT NULL DEFAULT '',
-                previous_rebirths TEXT NOT NULL DEFAULT '',
-                updated_at TEXT NOT NULL
-            )
-            """
-        )
-
-        cursor.execute("PRAGMA table_info(member_rebirths)")
-        columns = {row[1] for row in cursor.fetchall()}
-        if "previous_rebirths" not in columns:
-            cursor.execute(
-                "ALTER TABLE member_rebirths ADD COLUMN previous_rebirths TEXT NOT NULL DEFAULT ''"
-            )
-
-        conn.commit()
-        conn.close()
-
     def _parse_rebirth_to_number(self, value: str) -> Optional[float]:
         value = value.strip()
         if not value:
@@ -129,7 +105,6 @@ class RebirthPanel(commands.Cog, name="RebirthPanel"):
         return []
 
     def _save_rebirth_rows_to_db(self, rows: List[RebirthRow]) -> None:
-        self._ensure_rebirth_table()
         conn = self._get_admin_connection()
         cursor = conn.cursor()
 
@@ -223,7 +198,6 @@ class RebirthPanel(commands.Cog, name="RebirthPanel"):
         return rows
 
     def _fetch_rebirth_rows_from_db(self) -> List[RebirthRow]:
-        self._ensure_rebirth_table()
         conn = self._get_admin_connection()
         cursor = conn.cursor()
         cursor.execute(
@@ -374,18 +348,18 @@ class RebirthPanel(commands.Cog, name="RebirthPanel"):
         if last_hash and last_hash == payload_hash:
             return True
         ts_key = f"sp_panel_{message_id}_last_edit_ts"
-        last_edit_raw = get_setting(ts_key)
-        if not last_edit_raw:
-            return False
-        try:
-            last_edit = float(last_edit_raw)
-        except ValueError:
+        last_edit = get_setting_float(ts_key)
+        if last_edit is None:
             return False
         return (time.time() - last_edit) < self._MIN_EDIT_INTERVAL_SECONDS
 
     def _record_panel_payload_state(self, message_id: int, payload_hash: str) -> None:
-        set_setting(f"sp_panel_{message_id}_last_payload_hash", payload_hash)
-        set_setting(f"sp_panel_{message_id}_last_edit_ts", str(time.time()))
+        set_settings(
+            {
+                f"sp_panel_{message_id}_last_payload_hash": payload_hash,
+                f"sp_panel_{message_id}_last_edit_ts": str(time.time()),
+            }
+        )
 
     @tasks.loop(minutes=5)
     async def refresh_loop(self):
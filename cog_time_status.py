@@ -16,7 +16,7 @@ from config import (
     TIME_STATUS_STATE_TIMEZONE,
 )
 from cog_discord_writer import get_writer
-from db import get_setting, set_setting
+from db import get_setting, get_setting_float, set_setting, set_settings
 
 
 class TimeStatusCog(commands.Cog, name="TimeStatusCog"):
@@ -51,8 +51,12 @@ class TimeStatusCog(commands.Cog, name="TimeStatusCog"):
             self.log.warning("Time status channel %s nenalezen nebo není textový.", channel_id)
             return
 
-        set_setting("time_status_state_name", self.state_name)
-        set_setting("time_status_state_timezone", self.state_timezone_name)
+        set_settings(
+            {
+                "time_status_state_name": self.state_name,
+                "time_status_state_timezone": self.state_timezone_name,
+            }
+        )
 
         message = await self._fetch_message(channel)
         if message is None:
@@ -75,15 +79,11 @@ class TimeStatusCog(commands.Cog, name="TimeStatusCog"):
                 return
             writer = get_writer(self.bot)
             await writer.edit_message(message, view=view)
-            set_setting("time_status_message_id", str(message.id))
-            set_setting("time_status_channel_id", str(channel.id))
-            self._record_payload_state(payload_hash)
+            self._record_payload_state(payload_hash, message.id, channel.id)
         else:
             message = await channel.send(view=view)
-            set_setting("time_status_message_id", str(message.id))
-            set_setting("time_status_channel_id", str(channel.id))
             payload_hash = self._hash_payload("", view)
-            self._record_payload_state(payload_hash)
+            self._record_payload_state(payload_hash, message.id, channel.id)
 
         self.message_id = message.id
 
@@ -187,18 +187,22 @@ class TimeStatusCog(commands.Cog, name="TimeStatusCog"):
         last_hash = get_setting("time_status_last_payload_hash")
         if last_hash and last_hash == payload_hash:
             return True
-        last_edit_raw = get_setting("time_status_last_edit_ts")
-        if not last_edit_raw:
-            return False
-        try:
-            last_edit = float(last_edit_raw)
-        except ValueError:
+        last_edit = get_setting_float("time_status_last_edit_ts")
+        if last_edit is None:
             return False
         return (time.time() - last_edit) < self._MIN_EDIT_INTERVAL_SECONDS
 
-    def _record_payload_state(self, payload_hash: str) -> None:
-        set_setting("time_status_last_payload_hash", payload_hash)
-        set_setting("time_status_last_edit_ts", str(time.time()))
+    def _record_payload_state(
+        self, payload_hash: str, message_id: int, channel_id: int
+    ) -> None:
+        set_settings(
+            {
+                "time_status_message_id": str(message_id),
+                "time_status_channel_id": str(channel_id),
+                "time_status_last_payload_hash": payload_hash,
+                "time_status_last_edit_ts": str(time.time()),
+            }
+        )
 
     def _get_cz_zone(self) -> timezone:
         zone = self._load_zone("Europe/Prague")
@@ -12,7 +12,13 @@ import urllib.request
 import zipfile
 from pathlib import Path
 
-from config import DB_PATH, UPDATER_CA_BUNDLE, WINRT_LOG_PATH
+from config import (
+    DB_PATH,
+    LOG_RULES_PATH,
+    LOG_SINK_PATH,
+    UPDATER_CA_BUNDLE,
+    WINRT_LOG_PATH,
+)
 
 import discord
 from discord import app_commands
@@ -36,6 +42,8 @@ class AutoUpdater(commands.Cog):
         self.preserved_paths = {
             Path(DB_PATH).resolve(),
             Path(WINRT_LOG_PATH).resolve(),
+            Path(LOG_RULES_PATH).resolve(),
+            Path(LOG_SINK_PATH).resolve().parent,
         }
 
     def _check_available_memory(self) -> tuple[bool, str]:
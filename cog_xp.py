@@ -10,10 +10,46 @@ from config import (
     XP_COOLDOWN_SECONDS,
     XP_PER_LEVEL,
 )
+import adb
 from db import get_or_create_user_stats, update_user_stats
 from i18n import get_interaction_locale, t
 
 
+def _apply_message_xp(discord_id: int, now: datetime) -> None:
+    # Běží na DB writer vlákně, takže čtení i zápis statistik jsou atomické
+    # vůči dalším zprávám stejného uživatele.
+    coins, exp, level, last_xp_at, message_count = get_or_create_user_stats(discord_id)
+
+    if last_xp_at:
+        try:
+            last_dt = datetime.strptime(last_xp_at, "%Y-%m-%d %H:%M:%S")
+            if (now - last_dt).total_seconds() < XP_COOLDOWN_SECONDS:
+                return
+        except ValueError:
+            pass
+
+    new_exp = exp + XP_PER_MESSAGE
+    new_coins = coins + COINS_PER_MESSAGE
+    lvl_from_exp = (new_exp // XP_PER_LEVEL) + 1
+    new_level = max(level, lvl_from_exp)
+
+    update_user_stats(
+        discord_id,
+        coins=new_coins,
+        exp=new_exp,
+        level=new_level,
+        last_xp_at=now.strftime("%Y-%m-%d %H:%M:%S"),
+        message_count=message_count + 1,
+    )
+
+
+def _add_coins(discord_id: int, amount: int) -> int:
+    coins, _exp, _level, _last_xp_at, _messages = get_or_create_user_stats(discord_id)
+    new_coins = coins + amount
+    update_user_stats(discord_id, coins=new_coins)
+    return new_coins
+
+
 class XpCog(commands.Cog, name="XpCog"):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
@@ -25,31 +61,7 @@ class XpCog(commands.Cog, name="XpCog"):
         if len(message.content.strip()) < XP_MESSAGE_MIN_CHARS:
             return
 
-        discord_id = message.author.id
-        coins, exp, level, last_xp_at, message_count = get_or_create_user_stats(discord_id)
-
-        now = datetime.utcnow()
-        if last_xp_at:
-            try:
-                last_dt = datetime.strptime(last_xp_at, "%Y-%m-%d %H:%M:%S")
-                if (now - last_dt).total_seconds() < XP_COOLDOWN_SECONDS:
-                    return
-            except ValueError:
-                pass
-
-        new_exp = exp + XP_PER_MESSAGE
-        new_coins = coins + COINS_PER_MESSAGE
-        lvl_from_exp = (new_exp // XP_PER_LEVEL) + 1
-        new_level = max(level, lvl_from_exp)
-
-        update_user_stats(
-            discord_id,
-            coins=new_coins,
-            exp=new_exp,
-            level=new_level,
-            last_xp_at=now.strftime("%Y-%m-%d %H:%M:%S"),
-            message_count=message_count + 1,
-        )
+        await adb.run_write(_apply_message_xp, message.author.id, datetime.utcnow())
 
     @app_commands.command(name="profile", description="Ukáže coiny, exp a level hráče.")
     @app_commands.describe(user="Kterého uživatele zobrazit (prázdné = ty).")
@@ -60,7 +72,7 @@ class XpCog(commands.Cog, name="XpCog"):
     ):
         locale = get_interaction_locale(interaction)
         target = user or interaction.user
-        coins, exp, level, _, message_count = get_or_create_user_stats(target.id)
+        coins, exp, level, _, message_count = await adb.get_or_create_user_stats(target.id)
 
         level_exp_base = (level - 1) * XP_PER_LEVEL
         xp_into_level = max(0, exp - level_exp_base)
@@ -112,9 +124,7 @@ class XpCog(commands.Cog, name="XpCog"):
             )
             return
 
-        coins, _exp, _level, _last_xp_at, _messages = get_or_create_user_stats(user.id)
-        new_coins = coins + int(amount)
-        update_user_stats(user.id, coins=new_coins)
+        new_coins = await adb.run_write(_add_coins, user.id, int(amount))
 
         dm_sent = False
         try:
@@ -9,6 +9,22 @@ logger = logging.getLogger(__name__)
 # Logování do konzole (stdout/stderr). Výchozí je vypnuto, logy běží přes LoggingCog.
 LOG_TO_CONSOLE = os.getenv("LOG_TO_CONSOLE", "false").lower() == "true"
 
+# Odesílání logů do Discord kanálu: záznamy se sbírají do kruhového bufferu
+# (při zaplnění se zahazují nejstarší) a po intervalu se posílají sbalené
+# do co nejméně zpráv s nízkou prioritou ve write frontě.
+LOG_SHIP_FLUSH_SECONDS = max(1.0, float(os.getenv("LOG_SHIP_FLUSH_SECONDS", "5")))
+LOG_SHIP_BUFFER_SIZE = max(10, int(os.getenv("LOG_SHIP_BUFFER_SIZE", "1000")))
+LOG_SHIP_MAX_MESSAGES_PER_FLUSH = max(
+    1, int(os.getenv("LOG_SHIP_MAX_MESSAGES_PER_FLUSH", "3"))
+)
+# Audit log: smazání a úpravy zpráv se sbírají per kanál; dávka se odešle po
+# AUDIT_BURST_WINDOW_SECONDS bez nové události (nejpozději po
+# AUDIT_BURST_MAX_SECONDS). Víc událostí jde jako souhrn s přílohou detailů.
+AUDIT_BURST_WINDOW_SECONDS = max(0.5, float(os.getenv("AUDIT_BURST_WINDOW_SECONDS", "5")))
+AUDIT_BURST_MAX_SECONDS = max(
+    AUDIT_BURST_WINDOW_SECONDS, float(os.getenv("AUDIT_BURST_MAX_SECONDS", "30"))
+)
+
 # Absolutní cesta ke kořenovému adresáři projektu
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
@@ -124,8 +140,81 @@ WINRT_LOG_PATH = os.getenv(
     "WINRT_LOG_PATH", os.path.join(BASE_DIR, "winrt_notifications.log")
 )
 
+# Lokální JSON-lines log: zapisuje ho vlákno QueueListeneru, soubor se rotuje
+# po velikosti i stáří a starší segmenty se komprimují do .gz.
+LOG_SINK_PATH = os.getenv("LOG_SINK_PATH", os.path.join(BASE_DIR, "logs", "bot.jsonl"))
+LOG_SINK_MAX_BYTES = max(
+    64 * 1024, int(os.getenv("LOG_SINK_MAX_BYTES", str(10 * 1024 * 1024)))
+)
+LOG_SINK_ROTATE_HOURS = max(0.0, float(os.getenv("LOG_SINK_ROTATE_HOURS", "24")))
+LOG_SINK_BACKUP_COUNT = max(1, int(os.getenv("LOG_SINK_BACKUP_COUNT", "14")))
+LOG_SINK_QUEUE_SIZE = max(100, int(os.getenv("LOG_SINK_QUEUE_SIZE", "10000")))
+# Pravidla deduplikace, vzorkování a směrování logů (JSON soubor). Když soubor
+# chybí, platí LOG_RULES_DEFAULT; za běhu se znovu načte přes
+# /log_settings rules reload. Pravidla se vyhodnocují v pořadí, platí první shoda.
+LOG_RULES_PATH = os.getenv("LOG_RULES_PATH", os.path.join(BASE_DIR, "log_rules.json"))
+LOG_RULES_DEFAULT = {
+    "dedup_window_seconds": 60,
+    "default_route": "error",
+    "rules": [
+        {"logger": "cog_roblox_activity", "contains": "Roblox presence API", "sample": 0.1},
+        {
+            "logger": "botdc.secret_notifications",
+            "contains": "nebyl nalezen",
+            "dedup_window_seconds": 600,
+        },
+        {"logger": "botdc.windows_notifications", "max_level": "INFO", "route": "file"},
+        {"logger": "discord", "max_level": "INFO", "route": "file"},
+    ],
+}
+
 # Cesta k SQLite databázi
 DB_PATH = os.path.join(BASE_DIR, "wood_needs.db")
+# Write-behind buffer pro časté čítače (XP, drop statistiky, dodávky) –
+# flush po uplynutí intervalu nebo po nasbírání daného počtu položek.
+DB_WRITE_BEHIND_FLUSH_MS = int(os.getenv("DB_WRITE_BEHIND_FLUSH_MS", "250"))
+DB_WRITE_BEHIND_MAX_ITEMS = int(os.getenv("DB_WRITE_BEHIND_MAX_ITEMS", "500"))
+
+# Měření latence db.py funkcí (lze přepnout i přes /admin db_stats)
+DB_QUERY_METRICS_ENABLED = os.getenv("DB_QUERY_METRICS_ENABLED", "false").lower() == "true"
+DB_SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", "100"))
+DB_QUERY_METRICS_SUMMARY_MINUTES = int(os.getenv("DB_QUERY_METRICS_SUMMARY_MINUTES", "60"))
+
+# Retence a údržba DB – mazání po dávkách, incremental vacuum a WAL checkpoint
+DB_MAINTENANCE_INTERVAL_MINUTES = int(os.getenv("DB_MAINTENANCE_INTERVAL_MINUTES", "60"))
+DB_RETENTION_BATCH_SIZE = int(os.getenv("DB_RETENTION_BATCH_SIZE", "500"))
+# Vacuum/checkpoint jen v klidu: max. počet zpráv za posledních 10 minut.
+DB_MAINTENANCE_QUIET_MESSAGES = int(os.getenv("DB_MAINTENANCE_QUIET_MESSAGES", "20"))
+DB_RETENTION_ARCHIVE_DIR = os.getenv(
+    "DB_RETENTION_ARCHIVE_DIR", os.path.join(BASE_DIR, "db_archive")
+)
+# Politiky per tabulka: max_age_days, max_rows (None = bez limitu), archive
+# (před smazáním zapsat řádky do DB_RETENTION_ARCHIVE_DIR jako .jsonl.gz).
+DB_RETENTION_POLICIES_DEFAULT = {
+    "discord_write_queue": {"max_age_days": 3, "max_rows": None, "archive": False},
+    "windows_notifications": {"max_age_days": 7, "max_rows": None, "archive": False},
+    # Statistiky dropů čtou z rollupů, surové události stačí na pár měsíců.
+    "secret_drop_events": {"max_age_days": 120, "max_rows": None, "archive": True},
+    "prophecy_logs": {"max_age_days": 180, "max_rows": None, "archive": True},
+    "secret_leaderboard_queue": {"max_age_days": 7, "max_rows": 1000, "archive": False},
+}
+DB_RETENTION_POLICIES = {
+    table: dict(policy) for table, policy in DB_RETENTION_POLICIES_DEFAULT.items()
+}
+DB_RETENTION_POLICIES_RAW = os.getenv("DB_RETENTION_POLICIES", "").strip()
+if DB_RETENTION_POLICIES_RAW:
+    try:
+        parsed_policies = json.loads(DB_RETENTION_POLICIES_RAW)
+        if isinstance(parsed_policies, dict):
+            for table, policy in parsed_policies.items():
+                if table in DB_RETENTION_POLICIES and isinstance(policy, dict):
+                    DB_RETENTION_POLICIES[table].update(policy)
+                else:
+                    logger.warning("Neplatná politika DB_RETENTION_POLICIES pro %s.", table)
+        else:
+            logger.warning("DB_RETENTION_POLICIES musí být JSON objekt.")
+    except json.JSONDecodeError as exc:
+        logger.warning("DB_RETENTION_POLICIES nelze načíst: %s", exc)
 
 # Admin panel – cesta k SQLite databázi a výstupní roomka
 # Admin úkoly nyní sdílí hlavní databázi, aby se používala pouze wood_needs.db
@@ -235,12 +324,6 @@ DISCORD_WRITE_OPERATION_MIN_INTERVALS_DEFAULT = {
     "webhook_send": 1.1,
     "webhook_edit": 1.1,
     "webhook_delete": 1.1,
-    "interaction_followup": 1.1,
-    "interaction_response": 1.1,
-    "interaction_edit": 1.1,
-    "interaction_edit_original": 1.1,
-    "interaction_defer": 1.1,
-    "interaction_modal": 1.1,
     "add_reaction": 0.6,
     "remove_reaction": 0.6,
     "edit_member": 1.0,
@@ -289,6 +372,101 @@ if DISCORD_WRITE_WARMUP_OPERATIONS_RAW:
         if item.strip()
     }
 
+# Okna možné ztráty (ms) pro bookkeeping write fronty. Záznamy se bufferují
+# a zapisují v jedné transakci nejpozději po uplynutí nejkratšího okna mezi
+# čekajícími záznamy. Klíče jsou typy záznamů; klíč s názvem operace
+# přebíjí okno pro done/failed/retry/superseded dané operace.
+DISCORD_WRITE_JOURNAL_LOSS_WINDOWS_MS_DEFAULT = {
+    # Zařazení do fronty čeká na zápis, okno je tedy jen zpoždění pro dávkování.
+    "enqueue": 0,
+    "done": 1000,
+    "failed": 1000,
+    "retry": 1000,
+    "superseded": 1000,
+    "bucket": 5000,
+    "bucket_map": 5000,
+    "state": 5000,
+    # Neidempotentní operace: ztracené "done" znamená po pádu duplicitní zápis.
+    "send_message": 200,
+    "webhook_send": 200,
+    "create_thread": 200,
+    "create_text_channel": 200,
+    "create_voice_channel": 200,
+    "create_category": 200,
+    "create_forum_channel": 200,
+    "create_stage_channel": 200,
+    "create_role": 200,
+}
+DISCORD_WRITE_JOURNAL_LOSS_WINDOWS_MS = dict(DISCORD_WRITE_JOURNAL_LOSS_WINDOWS_MS_DEFAULT)
+DISCORD_WRITE_JOURNAL_LOSS_WINDOWS_MS_RAW = os.getenv(
+    "DISCORD_WRITE_JOURNAL_LOSS_WINDOWS_MS", ""
+).strip()
+if DISCORD_WRITE_JOURNAL_LOSS_WINDOWS_MS_RAW:
+    try:
+        parsed_windows = json.loads(DISCORD_WRITE_JOURNAL_LOSS_WINDOWS_MS_RAW)
+        if isinstance(parsed_windows, dict):
+            for key, value in parsed_windows.items():
+                try:
+                    DISCORD_WRITE_JOURNAL_LOSS_WINDOWS_MS[str(key)] = max(0.0, float(value))
+                except (TypeError, ValueError):
+                    logger.warning(
+                        "Neplatná hodnota DISCORD_WRITE_JOURNAL_LOSS_WINDOWS_MS pro %s: %s",
+                        key,
+                        value,
+                    )
+        else:
+            logger.warning("DISCORD_WRITE_JOURNAL_LOSS_WINDOWS_MS musí být JSON objekt.")
+    except json.JSONDecodeError as exc:
+        logger.warning("DISCORD_WRITE_JOURNAL_LOSS_WINDOWS_MS nelze načíst: %s", exc)
+
+# Počet souběžných workerů Discord write fronty (každý rate limit bucket
+# má vlastní podfrontu, jeden bucket obsluhuje vždy nejvýše jeden worker).
+DISCORD_WRITE_MAX_CONCURRENCY = max(
+    1, int(os.getenv("DISCORD_WRITE_MAX_CONCURRENCY", "4"))
+)
+# Interval strukturovaného logu metrik write fronty (0 = vypnuto).
+DISCORD_WRITE_METRICS_LOG_MINUTES = int(
+    os.getenv("DISCORD_WRITE_METRICS_LOG_MINUTES", "15")
+)
+
+# Obnova pending zápisů po restartu: velikost stránky a kolik požadavků smí
+# být najednou v paměti (další stránka se načte, až se fronta uvolní).
+DISCORD_WRITE_RESTORE_PAGE_SIZE = max(
+    1, int(os.getenv("DISCORD_WRITE_RESTORE_PAGE_SIZE", "100"))
+)
+DISCORD_WRITE_RESTORE_WINDOW = max(
+    DISCORD_WRITE_RESTORE_PAGE_SIZE,
+    int(os.getenv("DISCORD_WRITE_RESTORE_WINDOW", "500")),
+)
+
+# Souběžné workery pro rychlý pruh interakcí (odpovědi musí odejít do 3 s).
+DISCORD_WRITE_INTERACTION_CONCURRENCY = max(
+    1, int(os.getenv("DISCORD_WRITE_INTERACTION_CONCURRENCY", "4"))
+)
+
+# Okno (ms), po které worker sbírá další delete_message téhož kanálu, než je
+# sloučí do jednoho bulk delete. Čeká se jen, když už ve frontě je další
+# mazání téhož kanálu (0 = vypnuto).
+DISCORD_WRITE_BULK_DELETE_WINDOW_MS = max(
+    0, int(os.getenv("DISCORD_WRITE_BULK_DELETE_WINDOW_MS", "250"))
+)
+
+# Adaptivní globální token bucket (AIMD). Začíná na 1 / DISCORD_WRITE_MIN_INTERVAL_SECONDS
+# zápisů za sekundu, s každou odpovědí s volnou kapacitou bucketu
+# (X-RateLimit-Remaining > 0) zrychlí o RATE_INCREASE, po 429 zpomalí
+# násobkem RATE_DECREASE. Globální limit Discordu je 50 požadavků/s.
+DISCORD_WRITE_RATE_MIN = max(0.05, float(os.getenv("DISCORD_WRITE_RATE_MIN", "0.5")))
+DISCORD_WRITE_RATE_MAX = max(
+    DISCORD_WRITE_RATE_MIN, float(os.getenv("DISCORD_WRITE_RATE_MAX", "40"))
+)
+DISCORD_WRITE_RATE_BURST = max(1.0, float(os.getenv("DISCORD_WRITE_RATE_BURST", "5")))
+DISCORD_WRITE_RATE_INCREASE = max(
+    0.0, float(os.getenv("DISCORD_WRITE_RATE_INCREASE", "0.5"))
+)
+DISCORD_WRITE_RATE_DECREASE = min(
+    1.0, max(0.05, float(os.getenv("DISCORD_WRITE_RATE_DECREASE", "0.5")))
+)
+
 # CLAN – role pro přijaté členy
 CLAN_MEMBER_ROLE_ID = 1440268327892025438
 # CLAN – role pro přijaté členy (EN)
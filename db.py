@@ -1,12 +1,61 @@
+import bisect
+import collections
+import contextlib
+import functools
+import gzip
 import json
+import logging
+import os
+import queue
 import re
 import sqlite3
+import threading
+import time
 import unicodedata
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from enum import Enum
-from typing import Optional, List, Tuple, Any, Dict
-
-from config import DB_PATH, INACTIVE_THRESHOLD_HOURS, CLAN_TICKET_CLEANUP_MINUTES
+from typing import (
+    Any,
+    Callable,
+    ContextManager,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
+
+from config import (
+    CLAN_TICKET_CLEANUP_MINUTES,
+    DB_PATH,
+    DB_QUERY_METRICS_ENABLED,
+    DB_SLOW_QUERY_MS,
+    DB_WRITE_BEHIND_FLUSH_MS,
+    DB_WRITE_BEHIND_MAX_ITEMS,
+    INACTIVE_THRESHOLD_HOURS,
+)
+
+logger = logging.getLogger("botdc.db")
+
+# Veřejné funkce, které sahají do databáze: název -> "read" / "write".
+# Podle registru adb volá funkci na čtecím poolu nebo na writer vlákně
+# a query metriky ji obalí měřením.
+QUERY_FUNCTIONS: Dict[str, str] = {}
+
+
+def db_query(func: Callable[..., Any]) -> Callable[..., Any]:
+    """Označí čtecí dotazovou funkci."""
+    QUERY_FUNCTIONS[func.__name__] = "read"
+    return func
+
+
+def db_write(func: Callable[..., Any]) -> Callable[..., Any]:
+    """Označí funkci, která do databáze zapisuje."""
+    QUERY_FUNCTIONS[func.__name__] = "write"
+    return func
+
+CLAN_MEMBER_CACHE_SETTING_KEY = "secret_notifications_clan_member_cache"
 
 
 def normalize_clan_member_name(text: str) -> str:
@@ -22,99 +71,525 @@ def normalize_clan_member_name(text: str) -> str:
     return normalized
 
 
-def get_connection():
-    conn = sqlite3.connect(DB_PATH, timeout=30)
-    conn.execute("PRAGMA busy_timeout = 30000")
-    conn.execute("PRAGMA journal_mode=WAL")
-    return conn
+DB_READ_POOL_SIZE = 4
+# Počet připravených (prepared) SQL příkazů, které si drží každé spojení.
+DB_CACHED_STATEMENTS = 256
 
 
-def increment_secret_drop_stat(date_value: str, user_id: int, amount: int = 1) -> None:
-    conn = None
-    try:
-        conn = get_connection()
-        with conn:
-            conn.execute(
-                """
-                INSERT INTO secret_drop_stats (date, user_id, count)
-                VALUES (?, ?, ?)
-                ON CONFLICT(date, user_id)
-                DO UPDATE SET count = count + excluded.count
-                """,
-                (date_value, user_id, amount),
+class ConnectionManager:
+    """Dlouhožijící SQLite spojení sdílená všemi funkcemi v db.py.
+
+    Každé vlákno má vlastní znovupoužitelné zápisové spojení, čtení běží přes
+    malý pool spojení s `query_only`. PRAGMA se nastavují jednou při otevření
+    a připravené příkazy se cachují po dobu života spojení.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        read_pool_size: int = DB_READ_POOL_SIZE,
+        cached_statements: int = DB_CACHED_STATEMENTS,
+    ) -> None:
+        self.db_path = db_path
+        self._read_pool_size = max(1, int(read_pool_size))
+        self._cached_statements = cached_statements
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._all_connections: List[sqlite3.Connection] = []
+        self._read_pool: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._read_connections_open = 0
+        self._trace_callback: Optional[Callable[[str], None]] = None
+
+    def _open(self, readonly: bool) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=30,
+            check_same_thread=False,
+            cached_statements=self._cached_statements,
+        )
+        conn.execute("PRAGMA busy_timeout = 30000")
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        if readonly:
+            conn.execute("PRAGMA query_only = ON")
+        with self._lock:
+            self._all_connections.append(conn)
+            if self._trace_callback is not None:
+                conn.set_trace_callback(self._trace_callback)
+        return conn
+
+    def set_trace_callback(self, callback: Optional[Callable[[str], None]]) -> None:
+        """Nastaví trace callback na všechna otevřená i budoucí spojení."""
+        with self._lock:
+            self._trace_callback = callback
+            connections = list(self._all_connections)
+        for conn in connections:
+            conn.set_trace_callback(callback)
+
+    def _writer_state(self) -> threading.local:
+        state = self._local
+        if getattr(state, "generation", None) != self._generation:
+            state.conn = None
+            state.depth = 0
+            state.generation = self._generation
+        return state
+
+    @contextlib.contextmanager
+    def writer(self) -> Iterator[sqlite3.Connection]:
+        state = self._writer_state()
+        if state.conn is None:
+            state.conn = self._open(readonly=False)
+        conn = state.conn
+        state.depth += 1
+        try:
+            yield conn
+        except BaseException:
+            state.depth -= 1
+            if state.depth == 0 and conn.in_transaction:
+                conn.rollback()
+            raise
+        state.depth -= 1
+        if state.depth == 0 and conn.in_transaction:
+            conn.commit()
+
+    @contextlib.contextmanager
+    def reader(self) -> Iterator[sqlite3.Connection]:
+        state = self._writer_state()
+        if state.depth > 0:
+            # Uvnitř rozpracované zápisové transakce čteme přes stejné spojení,
+            # aby byly vidět i necommitnuté změny.
+            yield state.conn
+            return
+        conn = self._acquire_reader()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._read_pool.put(conn)
+
+    def _acquire_reader(self) -> sqlite3.Connection:
+        try:
+            return self._read_pool.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            can_open = self._read_connections_open < self._read_pool_size
+            if can_open:
+                self._read_connections_open += 1
+        if can_open:
+            return self._open(readonly=True)
+        return self._read_pool.get(timeout=30)
+
+    def close(self) -> None:
+        with self._lock:
+            connections = self._all_connections
+            self._all_connections = []
+            self._read_pool = queue.LifoQueue()
+            self._read_connections_open = 0
+            self._generation += 1
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+
+
+connection_manager = ConnectionManager(DB_PATH)
+
+
+def connection() -> ContextManager[sqlite3.Connection]:
+    """Zápisové spojení aktuálního vlákna; commit proběhne při opuštění bloku."""
+    return connection_manager.writer()
+
+
+def read_connection() -> ContextManager[sqlite3.Connection]:
+    return connection_manager.reader()
+
+
+def close_connections() -> None:
+    connection_manager.close()
+
+
+# Registr "hot" dotazů pro /admin db_explain: název -> (SQL, ukázkové parametry,
+# tabulky/aliasy z plánu, u kterých je full scan očekávaný).
+HOT_QUERIES: Dict[str, Tuple[str, Tuple[Any, ...], Tuple[str, ...]]] = {}
+_FULL_SCAN_RE = re.compile(r"^SCAN (?:TABLE )?(\w+)(?: AS \w+)?$")
+
+
+def register_hot_query(
+    name: str,
+    sql: str,
+    sample_params: Iterable[Any] = (),
+    expected_scans: Iterable[str] = (),
+) -> str:
+    HOT_QUERIES[name] = (sql, tuple(sample_params), tuple(expected_scans))
+    return sql
+
+
+@db_query
+def explain_hot_queries() -> List[Dict[str, Any]]:
+    """Spustí EXPLAIN QUERY PLAN pro všechny registrované hot dotazy."""
+    results: List[Dict[str, Any]] = []
+    with read_connection() as conn:
+        for name, (sql, params, expected_scans) in HOT_QUERIES.items():
+            try:
+                rows = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+            except sqlite3.Error as exc:
+                results.append(
+                    {"name": name, "plan": [], "full_scans": [], "error": str(exc)}
+                )
+                continue
+            plan = [str(row[3]) for row in rows]
+            full_scans = []
+            for detail in plan:
+                match = _FULL_SCAN_RE.match(detail)
+                if match and match.group(1) not in expected_scans:
+                    full_scans.append(match.group(1))
+            results.append(
+                {"name": name, "plan": plan, "full_scans": full_scans, "error": None}
             )
-    finally:
-        if conn is not None:
-            conn.close()
+    return results
 
 
-def add_secret_drop_event(occurred_at: datetime, user_id: int, rarity: str) -> None:
-    conn = None
-    try:
-        conn = get_connection()
-        with conn:
+class WriteBehindBuffer:
+    """Paměťový buffer pro časté čítače a append-only události.
+
+    Položky se zapisují hromadně v jedné transakci nejpozději po
+    `flush_interval` sekundách nebo po nasbírání `max_items` položek.
+    Dosud nezapsané hodnoty uživatelských statistik se překrývají přes
+    výsledky čtení, agregační dotazy si před čtením vynutí flush.
+    """
+
+    def __init__(self, flush_interval: float, max_items: int) -> None:
+        self.flush_interval = max(0.01, float(flush_interval))
+        self.max_items = max(1, int(max_items))
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self._pending = self._empty_batch()
+        self._inflight = self._empty_batch()
+        self._pending_items = 0
+        self.flush_count = 0
+        self.flushed_items = 0
+
+    @staticmethod
+    def _empty_batch() -> Dict[str, Any]:
+        return {
+            "user_stats": {},
+            "drop_events": [],
+            "deliveries": [],
+        }
+
+    def _add(self) -> None:
+        # Voláno se zamčeným self._lock.
+        self._pending_items += 1
+        if self._thread is None or not self._thread.is_alive():
+            self._stopping = False
+            self._thread = threading.Thread(
+                target=self._run, name="botdc-db-write-behind", daemon=True
+            )
+            self._thread.start()
+        if self._pending_items >= self.max_items:
+            self._wake.set()
+
+    def add_user_stats(self, discord_id: int, fields: Dict[str, Any]) -> None:
+        with self._lock:
+            self._pending["user_stats"].setdefault(int(discord_id), {}).update(fields)
+            self._add()
+
+    def add_drop_event(self, occurred_at: str, user_id: int, rarity: str) -> None:
+        with self._lock:
+            self._pending["drop_events"].append((occurred_at, int(user_id), rarity))
+            self._add()
+
+    def add_delivery(
+        self, discord_id: int, resource_name: str, amount: int, created_at: str
+    ) -> None:
+        with self._lock:
+            self._pending["deliveries"].append(
+                (int(discord_id), resource_name, int(amount), created_at)
+            )
+            self._add()
+
+    def user_stats_overlay(self, discord_id: int) -> Dict[str, Any]:
+        with self._lock:
+            overlay = dict(self._inflight["user_stats"].get(int(discord_id), {}))
+            overlay.update(self._pending["user_stats"].get(int(discord_id), {}))
+        return overlay
+
+    def has_pending(self, *kinds: str) -> bool:
+        with self._lock:
+            return any(self._pending[kind] or self._inflight[kind] for kind in kinds)
+
+    def _run(self) -> None:
+        while not self._stopping:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Flush write-behind bufferu selhal.")
+
+    def flush(self) -> int:
+        """Zapíše všechny čekající položky v jedné transakci; vrací jejich počet."""
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending_items:
+                    return 0
+                batch = self._pending
+                items = self._pending_items
+                self._inflight = batch
+                self._pending = self._empty_batch()
+                self._pending_items = 0
+            try:
+                with connection() as conn:
+                    self._write_batch(conn, batch)
+            except Exception:
+                with self._lock:
+                    self._merge_back(batch, items)
+                    self._inflight = self._empty_batch()
+                raise
+            with self._lock:
+                self._inflight = self._empty_batch()
+            self.flush_count += 1
+            self.flushed_items += items
+            return items
+
+    def _merge_back(self, batch: Dict[str, Any], items: int) -> None:
+        # Vrátí neúspěšnou dávku před novější položky, aby se zachovalo pořadí.
+        for discord_id, fields in batch["user_stats"].items():
+            merged = dict(fields)
+            merged.update(self._pending["user_stats"].get(discord_id, {}))
+            self._pending["user_stats"][discord_id] = merged
+        self._pending["drop_events"][:0] = batch["drop_events"]
+        self._pending["deliveries"][:0] = batch["deliveries"]
+        self._pending_items += items
+
+    @staticmethod
+    def _write_batch(conn: sqlite3.Connection, batch: Dict[str, Any]) -> None:
+        for discord_id, fields in batch["user_stats"].items():
+            columns = [column for column in USER_STATS_COLUMNS if column in fields]
+            if not columns:
+                continue
             conn.execute(
+                f"UPDATE user_stats SET {', '.join(f'{column} = ?' for column in columns)} "
+                "WHERE discord_id = ?",
+                tuple(fields[column] for column in columns) + (discord_id,),
+            )
+        if batch["drop_events"]:
+            conn.executemany(
                 """
                 INSERT INTO secret_drop_events (occurred_at, user_id, rarity)
                 VALUES (?, ?, ?)
                 """,
-                (occurred_at.isoformat(), user_id, rarity),
+                batch["drop_events"],
+            )
+            _apply_drop_rollups(conn, batch["drop_events"])
+        if batch["deliveries"]:
+            resource_ids: Dict[str, int] = {}
+            rows = []
+            for discord_id, resource_name, amount, created_at in batch["deliveries"]:
+                if resource_name not in resource_ids:
+                    resource_ids[resource_name] = get_or_create_resource(resource_name)
+                rows.append((discord_id, resource_ids[resource_name], amount, created_at))
+            conn.executemany(
+                """
+                INSERT INTO resource_deliveries (discord_id, resource_id, amount, created_at)
+                VALUES (?, ?, ?, ?)
+                """,
+                rows,
             )
-    finally:
-        if conn is not None:
-            conn.close()
+
+    def close(self) -> None:
+        """Zastaví flush vlákno a zapíše zbytek bufferu."""
+        self._stopping = True
+        self._wake.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=30)
+        self._thread = None
+        self.flush()
+
+
+USER_STATS_COLUMNS = ("coins", "exp", "level", "last_xp_at", "message_count")
+
+write_behind = WriteBehindBuffer(
+    DB_WRITE_BEHIND_FLUSH_MS / 1000.0, DB_WRITE_BEHIND_MAX_ITEMS
+)
+
+
+@db_write
+def flush_write_behind() -> int:
+    return write_behind.flush()
+
+
+@db_write
+def close_write_behind() -> None:
+    write_behind.close()
+
+
+def _as_utc_naive(value: datetime) -> datetime:
+    # Časy dropů se ukládají a porovnávají jako naivní UTC, den rollupu je UTC den.
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+@db_write
+def add_secret_drop_event(occurred_at: datetime, user_id: int, rarity: str) -> None:
+    write_behind.add_drop_event(
+        _as_utc_naive(occurred_at).isoformat(), user_id, rarity
+    )
+
+
+def _flush_pending_drop_stats() -> None:
+    # Jen pro zápisové funkce; čtení statistik dropů běží na reader poolu,
+    # a tak volající nejdřív sám počká na flush_write_behind přes adb.run_write.
+    if write_behind.has_pending("drop_events"):
+        write_behind.flush()
 
 
+def _apply_drop_rollups(
+    conn: sqlite3.Connection, events: Iterable[Tuple[str, int, str]]
+) -> None:
+    # Rollupy se zvyšují ve stejné transakci jako vložení událostí.
+    totals: Dict[Tuple[int, str], int] = {}
+    daily: Dict[Tuple[str, int, str], int] = {}
+    for occurred_at, user_id, rarity in events:
+        totals[(user_id, rarity)] = totals.get((user_id, rarity), 0) + 1
+        day_key = (occurred_at[:10], user_id, rarity)
+        daily[day_key] = daily.get(day_key, 0) + 1
+    conn.executemany(
+        """
+        INSERT INTO secret_drop_rollup_totals (user_id, rarity, count)
+        VALUES (?, ?, ?)
+        ON CONFLICT(user_id, rarity) DO UPDATE SET count = count + excluded.count
+        """,
+        [(user_id, rarity, count) for (user_id, rarity), count in totals.items()],
+    )
+    conn.executemany(
+        """
+        INSERT INTO secret_drop_rollup_daily (day, user_id, rarity, count)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT(day, user_id, rarity) DO UPDATE SET count = count + excluded.count
+        """,
+        [
+            (day, user_id, rarity, count)
+            for (day, user_id, rarity), count in daily.items()
+        ],
+    )
+
+
+def _rows_to_breakdown(rows: Iterable[Tuple[Any, Any, Any]]) -> Dict[int, Dict[str, int]]:
+    results: Dict[int, Dict[str, int]] = {}
+    for user_id, rarity, total_count in rows:
+        counts = results.setdefault(int(user_id), {})
+        counts[str(rarity)] = counts.get(str(rarity), 0) + int(total_count)
+    return results
+
+
+_GET_SECRET_DROP_BREAKDOWN_FROM_DAY_SQL = register_hot_query(
+    "get_secret_drop_breakdown_from_day",
+    """
+    SELECT user_id, rarity, SUM(count) AS total_count
+    FROM secret_drop_rollup_daily
+    WHERE day >= ?
+    GROUP BY user_id, rarity
+    """,
+    ("1970-01-01",),
+)
+
+_GET_SECRET_DROP_BREAKDOWN_PARTIAL_DAY_SQL = register_hot_query(
+    "get_secret_drop_breakdown_partial_day",
+    """
+    SELECT user_id, rarity, COUNT(*) AS total_count
+    FROM secret_drop_events
+    WHERE occurred_at >= ? AND occurred_at < ?
+    GROUP BY user_id, rarity
+    """,
+    ("1970-01-01T12:00:00", "1970-01-02"),
+)
+
+
+@db_query
 def get_secret_drop_breakdown_since(since: datetime) -> Dict[int, Dict[str, int]]:
-    conn = None
-    try:
-        conn = get_connection()
-        cursor = conn.execute(
-            """
-            SELECT user_id, rarity, COUNT(*) AS total_count
-            FROM secret_drop_events
-            WHERE occurred_at >= ?
-            GROUP BY user_id, rarity
-            """,
-            (since.isoformat(),),
-        )
-        results: Dict[int, Dict[str, int]] = {}
-        for user_id, rarity, total_count in cursor.fetchall():
-            results.setdefault(int(user_id), {})[str(rarity)] = int(total_count)
-        return results
-    finally:
-        if conn is not None:
-            conn.close()
+    """Breakdown od `since`: celé dny z denního rollupu, první načatý den z událostí.
+
+    Naivní `since` se bere jako UTC, časové pásmo se převede na UTC.
+    """
+    since = _as_utc_naive(since)
+    since_day = since.date()
+    with read_connection() as conn:
+        if since.time() == datetime.min.time():
+            return _rows_to_breakdown(
+                conn.execute(
+                    _GET_SECRET_DROP_BREAKDOWN_FROM_DAY_SQL, (since_day.isoformat(),)
+                ).fetchall()
+            )
+        next_day = (since_day + timedelta(days=1)).isoformat()
+        rows = conn.execute(
+            _GET_SECRET_DROP_BREAKDOWN_FROM_DAY_SQL, (next_day,)
+        ).fetchall()
+        rows += conn.execute(
+            _GET_SECRET_DROP_BREAKDOWN_PARTIAL_DAY_SQL,
+            (since.isoformat(), next_day),
+        ).fetchall()
+    return _rows_to_breakdown(rows)
+
+
+SECRET_DROP_PERIODS = ("week", "month")
+
+
+def secret_drop_period_start(period: str, now: Optional[datetime] = None) -> datetime:
+    """Začátek aktuálního týdne (pondělí) nebo měsíce v UTC."""
+    current = _as_utc_naive(now or datetime.utcnow()).replace(
+        hour=0, minute=0, second=0, microsecond=0
+    )
+    if period == "week":
+        return current - timedelta(days=current.weekday())
+    if period == "month":
+        return current.replace(day=1)
+    raise ValueError(f"Neznámé období: {period}")
+
 
+@db_query
+def get_secret_drop_breakdown_for_period(
+    period: str, now: Optional[datetime] = None
+) -> Dict[int, Dict[str, int]]:
+    return get_secret_drop_breakdown_since(secret_drop_period_start(period, now))
 
+
+_GET_SECRET_DROP_BREAKDOWN_ALL_TIME_SQL = register_hot_query(
+    "get_secret_drop_breakdown_all_time",
+    """
+    SELECT user_id, rarity, count
+    FROM secret_drop_rollup_totals
+    """,
+    (),
+    # Rollup má jeden řádek na uživatele a raritu, full scan je záměr.
+    ("secret_drop_rollup_totals",),
+)
+
+
+@db_query
 def get_secret_drop_breakdown_all_time() -> Dict[int, Dict[str, int]]:
-    conn = None
-    try:
-        conn = get_connection()
-        cursor = conn.execute(
-            """
-            SELECT user_id, rarity, COUNT(*) AS total_count
-            FROM secret_drop_events
-            GROUP BY user_id, rarity
-            """
+    with read_connection() as conn:
+        return _rows_to_breakdown(
+            conn.execute(_GET_SECRET_DROP_BREAKDOWN_ALL_TIME_SQL).fetchall()
         )
-        results: Dict[int, Dict[str, int]] = {}
-        for user_id, rarity, total_count in cursor.fetchall():
-            results.setdefault(int(user_id), {})[str(rarity)] = int(total_count)
-        return results
-    finally:
-        if conn is not None:
-            conn.close()
 
 
+@db_query
 def get_secret_drop_leaderboard(limit: int = 10) -> List[Tuple[int, int]]:
-    conn = None
-    try:
-        conn = get_connection()
+    with read_connection() as conn:
         cursor = conn.execute(
             """
             SELECT user_id, SUM(count) AS total_count
-            FROM secret_drop_stats
+            FROM secret_drop_rollup_totals
             GROUP BY user_id
             ORDER BY total_count DESC, user_id ASC
             LIMIT ?
@@ -122,40 +597,33 @@ def get_secret_drop_leaderboard(limit: int = 10) -> List[Tuple[int, int]]:
             (limit,),
         )
         return [(int(row[0]), int(row[1])) for row in cursor.fetchall()]
-    finally:
-        if conn is not None:
-            conn.close()
 
 
+@db_query
 def get_secret_drop_totals() -> Dict[int, int]:
-    conn = None
-    try:
-        conn = get_connection()
+    with read_connection() as conn:
         cursor = conn.execute(
             """
             SELECT user_id, SUM(count) AS total_count
-            FROM secret_drop_stats
+            FROM secret_drop_rollup_totals
             GROUP BY user_id
             """
         )
         return {int(row[0]): int(row[1]) for row in cursor.fetchall()}
-    finally:
-        if conn is not None:
-            conn.close()
 
 
+@db_write
 def reset_secret_drop_stats() -> None:
-    conn = None
-    try:
-        conn = get_connection()
-        with conn:
-            conn.execute("DELETE FROM secret_drop_stats")
-            conn.execute("DELETE FROM secret_drop_events")
-    finally:
-        if conn is not None:
-            conn.close()
+    _flush_pending_drop_stats()
+    with connection() as conn:
+        # Tabulka se už neplní, jen se čistí data ze starších verzí.
+        conn.execute("DELETE FROM secret_drop_stats")
+        conn.execute("DELETE FROM secret_drop_events")
+        conn.execute("DELETE FROM secret_drop_rollup_totals")
+        conn.execute("DELETE FROM secret_drop_rollup_daily")
 
 
+@db_write
 def upsert_secret_drop_user(
     user_id: int, display_name: str, updated_at: datetime | str
 ) -> None:
@@ -167,29 +635,22 @@ def upsert_secret_drop_user(
     timestamp = (
         updated_at.isoformat() if isinstance(updated_at, datetime) else str(updated_at)
     )
-    conn = None
-    try:
-        conn = get_connection()
-        with conn:
-            conn.execute(
-                """
-                INSERT INTO secret_drop_users (user_id, display_name, updated_at)
-                VALUES (?, ?, ?)
-                ON CONFLICT(user_id)
-                DO UPDATE SET display_name = excluded.display_name,
-                              updated_at = excluded.updated_at
-                """,
-                (int(user_id), name, timestamp),
-            )
-    finally:
-        if conn is not None:
-            conn.close()
+    with connection() as conn:
+        conn.execute(
+            """
+            INSERT INTO secret_drop_users (user_id, display_name, updated_at)
+            VALUES (?, ?, ?)
+            ON CONFLICT(user_id)
+            DO UPDATE SET display_name = excluded.display_name,
+                          updated_at = excluded.updated_at
+            """,
+            (int(user_id), name, timestamp),
+        )
 
 
+@db_query
 def get_secret_drop_user_display_names() -> Dict[int, str]:
-    conn = None
-    try:
-        conn = get_connection()
+    with read_connection() as conn:
         cursor = conn.execute(
             """
             SELECT user_id, display_name
@@ -197,33 +658,24 @@ def get_secret_drop_user_display_names() -> Dict[int, str]:
             """
         )
         return {int(row[0]): str(row[1]) for row in cursor.fetchall() if row[1]}
-    finally:
-        if conn is not None:
-            conn.close()
 
 
+@db_write
 def enqueue_secret_leaderboard_payload(payload: Dict[str, Any]) -> int:
-    conn = None
-    try:
-        conn = get_connection()
-        with conn:
-            cursor = conn.execute(
-                """
-                INSERT INTO secret_leaderboard_queue (payload, created_at)
-                VALUES (?, ?)
-                """,
-                (json.dumps(payload, ensure_ascii=False), datetime.utcnow().isoformat()),
-            )
-            return int(cursor.lastrowid)
-    finally:
-        if conn is not None:
-            conn.close()
+    with connection() as conn:
+        cursor = conn.execute(
+            """
+            INSERT INTO secret_leaderboard_queue (payload, created_at)
+            VALUES (?, ?)
+            """,
+            (json.dumps(payload, ensure_ascii=False), datetime.utcnow().isoformat()),
+        )
+        return int(cursor.lastrowid)
 
 
+@db_query
 def list_secret_leaderboard_queue(limit: int = 20) -> List[Tuple[int, Dict[str, Any]]]:
-    conn = None
-    try:
-        conn = get_connection()
+    with read_connection() as conn:
         cursor = conn.execute(
             """
             SELECT id, payload
@@ -241,29 +693,29 @@ def list_secret_leaderboard_queue(limit: int = 20) -> List[Tuple[int, Dict[str,
                 payload = {}
             items.append((int(row_id), payload))
         return items
-    finally:
-        if conn is not None:
-            conn.close()
 
 
+@db_write
 def delete_secret_leaderboard_queue(ids: List[int]) -> None:
     if not ids:
         return
-    conn = None
-    try:
-        conn = get_connection()
-        with conn:
-            conn.execute(
-                f"DELETE FROM secret_leaderboard_queue WHERE id IN ({','.join(['?'] * len(ids))})",
-                ids,
-            )
-    finally:
-        if conn is not None:
-            conn.close()
+    with connection() as conn:
+        conn.execute(
+            f"DELETE FROM secret_leaderboard_queue WHERE id IN ({','.join(['?'] * len(ids))})",
+            ids,
+        )
 
 
-def init_db():
-    conn = get_connection()
+# ---------- MIGRACE ----------
+#
+# Schéma se verzuje přes PRAGMA user_version. Každá migrace běží v jedné
+# transakci spolu se zvýšením verze; teplý start tak jen přečte číslo verze.
+# Nové změny schématu patří do nové migrace na konec SCHEMA_MIGRATIONS,
+# existující migrace se už nemění.
+
+
+def _migration_001_base_schema(conn: sqlite3.Connection) -> None:
+    # Původní init_db: idempotentně dorovná i starší databáze bez user_version.
     c = conn.cursor()
 
     # Dřevo
@@ -1057,253 +1509,557 @@ def init_db():
             "ALTER TABLE clan_applications ADD COLUMN last_ping_at TEXT"
         )
 
-    conn.commit()
-    conn.close()
 
+def _add_missing_columns(
+    conn: sqlite3.Connection, table: str, columns: Dict[str, str]
+) -> None:
+    existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+    for name, definition in columns.items():
+        if name not in existing:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {definition}")
 
-# ---------- SETTINGS ----------
 
-def set_setting(key: str, value: str):
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        """
-        INSERT INTO settings (key, value)
-        VALUES (?, ?)
-        ON CONFLICT(key) DO UPDATE SET value = excluded.value
-        """,
-        (key, value),
+def _migration_002_cog_schemas(conn: sqlite3.Connection) -> None:
+    # Schémata, která si dřív při každém startu/fetchi kontrolovaly cogy
+    # RobloxActivity, RebirthPanel a AdminTasks.
+    _add_missing_columns(
+        conn,
+        "roblox_tracking_state",
+        {"last_channel_report_at": "TEXT"},
+    )
+    _add_missing_columns(
+        conn,
+        "roblox_presence_state",
+        {"count_offline": "INTEGER", "offline_notified": "INTEGER"},
     )
-    conn.commit()
-    conn.close()
-
-
-def get_setting(key: str) -> Optional[str]:
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute("SELECT value FROM settings WHERE key = ?", (key,))
-    row = c.fetchone()
-    conn.close()
-    return row[0] if row else None
-
 
-def set_guild_personality(guild_id: int, personality_text: str) -> None:
-    now_iso = datetime.utcnow().isoformat()
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS member_rebirths (
+            user_id TEXT PRIMARY KEY,
+            display_name TEXT,
+            rebirths TEXT NOT NULL DEFAULT '',
+            previous_rebirths TEXT NOT NULL DEFAULT '',
+            updated_at TEXT NOT NULL
+        )
         """
-        INSERT INTO guild_personality_settings (guild_id, personality_text, updated_at)
-        VALUES (?, ?, ?)
-        ON CONFLICT(guild_id) DO UPDATE SET
-            personality_text = excluded.personality_text,
-            updated_at = excluded.updated_at
-        """,
-        (int(guild_id), personality_text, now_iso),
     )
-    conn.commit()
-    conn.close()
-
+    _add_missing_columns(
+        conn,
+        "member_rebirths",
+        {"previous_rebirths": "TEXT NOT NULL DEFAULT ''"},
+    )
 
-def get_guild_personality(guild_id: int) -> Optional[str]:
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS tasks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            action TEXT,
+            params TEXT,
+            created_at TEXT,
+            processed INTEGER NOT NULL DEFAULT 0,
+            processed_at TEXT
+        )
         """
-        SELECT personality_text
-        FROM guild_personality_settings
-        WHERE guild_id = ?
-        """,
-        (int(guild_id),),
     )
-    row = c.fetchone()
-    conn.close()
-    return row[0] if row else None
+    _add_missing_columns(
+        conn,
+        "tasks",
+        {
+            "processed": "INTEGER NOT NULL DEFAULT 0",
+            "processed_at": "TEXT",
+        },
+    )
 
 
-def set_guild_prophecy_random_chance(guild_id: int, random_chance: float) -> None:
-    now_iso = datetime.utcnow().isoformat()
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
+def _migration_003_hot_query_indexes(conn: sqlite3.Connection) -> None:
+    # Indexy pro dotazy z HOT_QUERIES (ověř přes /admin db_explain).
+    conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_discord_write_queue_pending
+        ON discord_write_queue (id)
+        WHERE status = 'pending'
         """
-        INSERT INTO guild_prophecy_settings (guild_id, random_chance, updated_at)
-        VALUES (?, ?, ?)
-        ON CONFLICT(guild_id) DO UPDATE SET
-            random_chance = excluded.random_chance,
-            updated_at = excluded.updated_at
-        """,
-        (int(guild_id), float(random_chance), now_iso),
     )
-    conn.commit()
-    conn.close()
-
-
-def get_guild_prophecy_random_chance(guild_id: int) -> Optional[float]:
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
+    conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_clan_applications_open_channel
+        ON clan_applications (channel_id, created_at)
+        WHERE status = 'open' AND deleted = 0
         """
-        SELECT random_chance
-        FROM guild_prophecy_settings
-        WHERE guild_id = ?
-        """,
-        (int(guild_id),),
     )
-    row = c.fetchone()
-    conn.close()
-    return float(row[0]) if row else None
-
-
-def upsert_guild_restart_setting(
-    guild_id: int, enabled: bool, interval_minutes: int
-) -> None:
-    now_iso = datetime.utcnow().isoformat()
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
+    conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_clan_applications_open_guild
+        ON clan_applications (guild_id, created_at)
+        WHERE status = 'open' AND deleted = 0
         """
-        INSERT INTO guild_restart_settings (guild_id, enabled, interval_minutes, updated_at)
-        VALUES (?, ?, ?, ?)
-        ON CONFLICT(guild_id) DO UPDATE SET
-            enabled = excluded.enabled,
-            interval_minutes = excluded.interval_minutes,
-            updated_at = excluded.updated_at
-        """,
-        (int(guild_id), 1 if enabled else 0, int(interval_minutes), now_iso),
     )
-    conn.commit()
-    conn.close()
-
-
-def get_guild_restart_setting(guild_id: int) -> Optional[Dict[str, Any]]:
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
+    conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_clan_applications_guild_channel
+        ON clan_applications (guild_id, channel_id, created_at)
+        WHERE deleted = 0
         """
-        SELECT guild_id, enabled, interval_minutes, updated_at
-        FROM guild_restart_settings
-        WHERE guild_id = ?
-        """,
-        (int(guild_id),),
     )
-    row = c.fetchone()
-    conn.close()
-    if not row:
-        return None
-    return {
-        "guild_id": int(row[0]),
-        "enabled": bool(row[1]),
-        "interval_minutes": int(row[2]),
-        "updated_at": str(row[3]),
-    }
-
-
-def get_all_enabled_restart_settings() -> List[Dict[str, Any]]:
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
+    conn.execute(
         """
-        SELECT guild_id, enabled, interval_minutes, updated_at
-        FROM guild_restart_settings
-        WHERE enabled = 1
+        CREATE INDEX IF NOT EXISTS idx_resource_deliveries_resource
+        ON resource_deliveries (resource_id, amount)
         """
     )
-    rows = c.fetchall()
-    conn.close()
-    return [
-        {
-            "guild_id": int(row[0]),
-            "enabled": bool(row[1]),
-            "interval_minutes": int(row[2]),
-            "updated_at": str(row[3]),
-        }
-        for row in rows
-    ]
-
-
-def upsert_guild_restart_runtime(
-    guild_id: int,
-    next_restart_at: Optional[datetime],
-    last_restart_at: Optional[datetime],
-) -> None:
-    now_iso = datetime.utcnow().isoformat()
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
+    conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_resource_deliveries_user_created
+        ON resource_deliveries (discord_id, created_at)
         """
-        INSERT INTO guild_restart_runtime (guild_id, next_restart_at, last_restart_at, updated_at)
-        VALUES (?, ?, ?, ?)
-        ON CONFLICT(guild_id) DO UPDATE SET
-            next_restart_at = excluded.next_restart_at,
-            last_restart_at = excluded.last_restart_at,
-            updated_at = excluded.updated_at
-        """,
-        (
-            int(guild_id),
-            next_restart_at.isoformat() if next_restart_at else None,
-            last_restart_at.isoformat() if last_restart_at else None,
-            now_iso,
-        ),
     )
-    conn.commit()
-    conn.close()
+    conn.execute("ANALYZE")
 
 
-def get_guild_restart_runtime(guild_id: int) -> Optional[Dict[str, Any]]:
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
+def _migration_004_secret_drop_rollups(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS secret_drop_rollup_totals (
+            user_id INTEGER NOT NULL,
+            rarity TEXT NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, rarity)
+        ) WITHOUT ROWID
         """
-        SELECT guild_id, next_restart_at, last_restart_at, updated_at
-        FROM guild_restart_runtime
-        WHERE guild_id = ?
-        """,
-        (int(guild_id),),
     )
-    row = c.fetchone()
-    conn.close()
-    if not row:
-        return None
-    return {
-        "guild_id": int(row[0]),
-        "next_restart_at": str(row[1]) if row[1] else None,
-        "last_restart_at": str(row[2]) if row[2] else None,
-        "updated_at": str(row[3]),
-    }
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS secret_drop_rollup_daily (
+            day TEXT NOT NULL,
+            user_id INTEGER NOT NULL,
+            rarity TEXT NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, user_id, rarity)
+        ) WITHOUT ROWID
+        """
+    )
+    # Dopočet z existujících událostí.
+    conn.execute("DELETE FROM secret_drop_rollup_totals")
+    conn.execute("DELETE FROM secret_drop_rollup_daily")
+    conn.execute(
+        """
+        INSERT INTO secret_drop_rollup_totals (user_id, rarity, count)
+        SELECT user_id, rarity, COUNT(*)
+        FROM secret_drop_events
+        GROUP BY user_id, rarity
+        """
+    )
+    conn.execute(
+        """
+        INSERT INTO secret_drop_rollup_daily (day, user_id, rarity, count)
+        SELECT substr(occurred_at, 1, 10), user_id, rarity, COUNT(*)
+        FROM secret_drop_events
+        GROUP BY substr(occurred_at, 1, 10), user_id, rarity
+        """
+    )
+
+
+SCHEMA_MIGRATIONS: List[Tuple[int, str, Callable[[sqlite3.Connection], None]]] = [
+    (1, "base_schema", _migration_001_base_schema),
+    (2, "cog_schemas", _migration_002_cog_schemas),
+    (3, "hot_query_indexes", _migration_003_hot_query_indexes),
+    (4, "secret_drop_rollups", _migration_004_secret_drop_rollups),
+]
+SCHEMA_VERSION = SCHEMA_MIGRATIONS[-1][0]
+
+
+@db_query
+def get_schema_version() -> int:
+    with read_connection() as conn:
+        return int(conn.execute("PRAGMA user_version").fetchone()[0])
+
+
+@db_write
+def run_migrations() -> int:
+    """Aplikuje chybějící migrace a vrátí výslednou verzi schématu."""
+    version = get_schema_version()
+    if version >= SCHEMA_VERSION:
+        return version
+    for number, name, migrate in SCHEMA_MIGRATIONS:
+        if number <= version:
+            continue
+        with connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            migrate(conn)
+            conn.execute(f"PRAGMA user_version = {int(number)}")
+        logger.info("DB migrace %03d (%s) aplikována.", number, name)
+        version = number
+    return version
+
+
+@db_write
+def init_db():
+    run_migrations()
+
+
+# ---------- SETTINGS ----------
+
+
+class SettingsCache:
+    """In-process cache tabulky settings (read-through, zápis cache zneplatní).
+
+    Chybějící klíče se cachují také (negativní cache), takže opakovaná čtení
+    v refresh smyčkách do DB vůbec nejdou. Při změně klíče se volají
+    registrované hooky `hook(key)`; `key=None` znamená zahození celé cache.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._values: Dict[str, Optional[str]] = {}
+        self._version = 0
+        self._hooks: List[Callable[[Optional[str]], None]] = []
+        self.hits = 0
+        self.misses = 0
+
+    def add_invalidation_hook(self, hook: Callable[[Optional[str]], None]) -> None:
+        self._hooks.append(hook)
+
+    def _notify(self, keys: Iterable[Optional[str]]) -> None:
+        for key in keys:
+            for hook in self._hooks:
+                try:
+                    hook(key)
+                except Exception:
+                    logger.exception("Hook invalidace nastavení %s selhal.", key)
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            if key in self._values:
+                self.hits += 1
+                return self._values[key]
+            self.misses += 1
+            version = self._version
+        with read_connection() as conn:
+            row = conn.execute(_GET_SETTING_SQL, (key,)).fetchone()
+        value = row[0] if row else None
+        with self._lock:
+            # Souběžný zápis mezitím mohl hodnotu změnit – pak necachujeme.
+            if self._version == version:
+                self._values[key] = value
+        return value
+
+    def set_many(self, items: Dict[str, str]) -> None:
+        changed = []
+        with connection() as conn:
+            for key, value in items.items():
+                # Upsert beze změny hodnoty nic nezapíše (rowcount 0).
+                if conn.execute(_SET_SETTING_SQL, (key, value)).rowcount:
+                    changed.append(key)
+        if not changed:
+            return
+        # Hodnoty se do cache neukládají: při souběžných zápisech by cache mohla
+        # skončit s jinou hodnotou než DB. Další get je načte znovu.
+        with self._lock:
+            for key in changed:
+                self._values.pop(key, None)
+            self._version += 1
+        self._notify(changed)
+
+    def invalidate(self, key: Optional[str] = None) -> None:
+        with self._lock:
+            if key is None:
+                self._values.clear()
+            else:
+                self._values.pop(key, None)
+            self._version += 1
+        self._notify([key])
+
+
+_SET_SETTING_SQL = """
+    INSERT INTO settings (key, value)
+    VALUES (?, ?)
+    ON CONFLICT(key) DO UPDATE SET value = excluded.value
+    WHERE value IS NOT excluded.value
+"""
+
+_GET_SETTING_SQL = register_hot_query(
+    "get_setting", "SELECT value FROM settings WHERE key = ?", ("",)
+)
+
+settings_cache = SettingsCache()
+
+
+@db_write
+def set_setting(key: str, value: str):
+    settings_cache.set_many({key: value})
+
+
+@db_write
+def set_settings(items: Dict[str, str]) -> None:
+    """Zapíše více nastavení v jedné transakci."""
+    settings_cache.set_many(items)
+
+
+@db_query
+def get_setting(key: str) -> Optional[str]:
+    return settings_cache.get(key)
+
+
+@db_query
+def get_setting_int(key: str, default: Optional[int] = None) -> Optional[int]:
+    value = get_setting(key)
+    if value is None:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        return default
+
+
+@db_query
+def get_setting_float(key: str, default: Optional[float] = None) -> Optional[float]:
+    value = get_setting(key)
+    if value is None:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        return default
+
+
+@db_query
+def get_setting_bool(key: str, default: bool = False) -> bool:
+    value = get_setting(key)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+@db_query
+def get_setting_json(key: str, default: Any = None) -> Any:
+    value = get_setting(key)
+    if not value:
+        return default
+    try:
+        return json.loads(value)
+    except json.JSONDecodeError:
+        return default
+
+
+@db_write
+def invalidate_setting(key: Optional[str] = None) -> None:
+    """Zahodí klíč (nebo celou cache) po změně settings mimo tyto funkce."""
+    settings_cache.invalidate(key)
+
+
+@db_write
+def set_guild_personality(guild_id: int, personality_text: str) -> None:
+    now_iso = datetime.utcnow().isoformat()
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            """
+            INSERT INTO guild_personality_settings (guild_id, personality_text, updated_at)
+            VALUES (?, ?, ?)
+            ON CONFLICT(guild_id) DO UPDATE SET
+                personality_text = excluded.personality_text,
+                updated_at = excluded.updated_at
+            """,
+            (int(guild_id), personality_text, now_iso),
+        )
+
+
+@db_query
+def get_guild_personality(guild_id: int) -> Optional[str]:
+    with read_connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            """
+            SELECT personality_text
+            FROM guild_personality_settings
+            WHERE guild_id = ?
+            """,
+            (int(guild_id),),
+        )
+        row = c.fetchone()
+    return row[0] if row else None
+
+
+@db_write
+def set_guild_prophecy_random_chance(guild_id: int, random_chance: float) -> None:
+    now_iso = datetime.utcnow().isoformat()
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            """
+            INSERT INTO guild_prophecy_settings (guild_id, random_chance, updated_at)
+            VALUES (?, ?, ?)
+            ON CONFLICT(guild_id) DO UPDATE SET
+                random_chance = excluded.random_chance,
+                updated_at = excluded.updated_at
+            """,
+            (int(guild_id), float(random_chance), now_iso),
+        )
+
+
+@db_query
+def get_guild_prophecy_random_chance(guild_id: int) -> Optional[float]:
+    with read_connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            """
+            SELECT random_chance
+            FROM guild_prophecy_settings
+            WHERE guild_id = ?
+            """,
+            (int(guild_id),),
+        )
+        row = c.fetchone()
+    return float(row[0]) if row else None
+
+
+@db_write
+def upsert_guild_restart_setting(
+    guild_id: int, enabled: bool, interval_minutes: int
+) -> None:
+    now_iso = datetime.utcnow().isoformat()
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            """
+            INSERT INTO guild_restart_settings (guild_id, enabled, interval_minutes, updated_at)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(guild_id) DO UPDATE SET
+                enabled = excluded.enabled,
+                interval_minutes = excluded.interval_minutes,
+                updated_at = excluded.updated_at
+            """,
+            (int(guild_id), 1 if enabled else 0, int(interval_minutes), now_iso),
+        )
+
+
+@db_query
+def get_guild_restart_setting(guild_id: int) -> Optional[Dict[str, Any]]:
+    with read_connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            """
+            SELECT guild_id, enabled, interval_minutes, updated_at
+            FROM guild_restart_settings
+            WHERE guild_id = ?
+            """,
+            (int(guild_id),),
+        )
+        row = c.fetchone()
+    if not row:
+        return None
+    return {
+        "guild_id": int(row[0]),
+        "enabled": bool(row[1]),
+        "interval_minutes": int(row[2]),
+        "updated_at": str(row[3]),
+    }
+
+
+@db_query
+def get_all_enabled_restart_settings() -> List[Dict[str, Any]]:
+    with read_connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            """
+            SELECT guild_id, enabled, interval_minutes, updated_at
+            FROM guild_restart_settings
+            WHERE enabled = 1
+            """
+        )
+        rows = c.fetchall()
+    return [
+        {
+            "guild_id": int(row[0]),
+            "enabled": bool(row[1]),
+            "interval_minutes": int(row[2]),
+            "updated_at": str(row[3]),
+        }
+        for row in rows
+    ]
 
 
+@db_write
+def upsert_guild_restart_runtime(
+    guild_id: int,
+    next_restart_at: Optional[datetime],
+    last_restart_at: Optional[datetime],
+) -> None:
+    now_iso = datetime.utcnow().isoformat()
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            """
+            INSERT INTO guild_restart_runtime (guild_id, next_restart_at, last_restart_at, updated_at)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(guild_id) DO UPDATE SET
+                next_restart_at = excluded.next_restart_at,
+                last_restart_at = excluded.last_restart_at,
+                updated_at = excluded.updated_at
+            """,
+            (
+                int(guild_id),
+                next_restart_at.isoformat() if next_restart_at else None,
+                last_restart_at.isoformat() if last_restart_at else None,
+                now_iso,
+            ),
+        )
+
+
+@db_query
+def get_guild_restart_runtime(guild_id: int) -> Optional[Dict[str, Any]]:
+    with read_connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            """
+            SELECT guild_id, next_restart_at, last_restart_at, updated_at
+            FROM guild_restart_runtime
+            WHERE guild_id = ?
+            """,
+            (int(guild_id),),
+        )
+        row = c.fetchone()
+    if not row:
+        return None
+    return {
+        "guild_id": int(row[0]),
+        "next_restart_at": str(row[1]) if row[1] else None,
+        "last_restart_at": str(row[2]) if row[2] else None,
+        "updated_at": str(row[3]),
+    }
+
+
+@db_write
 def set_restart_plan(planned_restart_at: datetime, source_guild_id: Optional[int]) -> None:
     now_iso = datetime.utcnow().isoformat()
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        """
-        INSERT INTO restart_plans (id, planned_restart_at, source_guild_id, updated_at)
-        VALUES (1, ?, ?, ?)
-        ON CONFLICT(id) DO UPDATE SET
-            planned_restart_at = excluded.planned_restart_at,
-            source_guild_id = excluded.source_guild_id,
-            updated_at = excluded.updated_at
-        """,
-        (planned_restart_at.isoformat(), source_guild_id, now_iso),
-    )
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            """
+            INSERT INTO restart_plans (id, planned_restart_at, source_guild_id, updated_at)
+            VALUES (1, ?, ?, ?)
+            ON CONFLICT(id) DO UPDATE SET
+                planned_restart_at = excluded.planned_restart_at,
+                source_guild_id = excluded.source_guild_id,
+                updated_at = excluded.updated_at
+            """,
+            (planned_restart_at.isoformat(), source_guild_id, now_iso),
+        )
 
 
+@db_query
 def get_restart_plan() -> Optional[Dict[str, Any]]:
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        """
-        SELECT planned_restart_at, source_guild_id, updated_at
-        FROM restart_plans
-        WHERE id = 1
-        """
-    )
-    row = c.fetchone()
-    conn.close()
+    with read_connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            """
+            SELECT planned_restart_at, source_guild_id, updated_at
+            FROM restart_plans
+            WHERE id = 1
+            """
+        )
+        row = c.fetchone()
     if not row:
         return None
     return {
@@ -1313,19 +2069,20 @@ def get_restart_plan() -> Optional[Dict[str, Any]]:
     }
 
 
+@db_write
 def clear_restart_plan() -> None:
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute("DELETE FROM restart_plans WHERE id = 1")
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute("DELETE FROM restart_plans WHERE id = 1")
 
 
+@db_write
 def set_secret_notifications_role_ids(role_ids: List[int]) -> None:
     normalized = [int(role_id) for role_id in role_ids if role_id]
     set_setting("secret_notifications_role_ids", json.dumps(normalized))
 
 
+@db_query
 def get_secret_notifications_role_ids() -> List[int]:
     value = get_setting("secret_notifications_role_ids")
     if not value:
@@ -1346,162 +2103,217 @@ def get_secret_notifications_role_ids() -> List[int]:
     return result
 
 
-def clan_member_nick_exists(nick: str) -> bool:
-    if not nick:
-        return False
-    normalized = normalize_clan_member_name(nick)
-    if not normalized:
-        return False
-    payload = get_setting("secret_notifications_clan_member_cache")
+class ClanMemberNickIndex:
+    """Sdílená in-memory množina normalizovaných nicků členů clanu.
+
+    Forwarder secret notifikací index přepisuje při každé obnově cache hráčů,
+    writer se ptá přes `contains` v O(1) bez čtení settings a `json.loads`.
+    Verze se zvyšuje s každou výměnou množiny.
+    """
+
+    def __init__(self) -> None:
+        self._names: frozenset[str] = frozenset()
+        self._version = 0
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def __len__(self) -> int:
+        self._ensure_loaded()
+        return len(self._names)
+
+    def replace(self, names: Iterable[Any]) -> int:
+        normalized_names = frozenset(
+            normalized
+            for normalized in (
+                normalize_clan_member_name(str(name)) for name in names if name
+            )
+            if normalized
+        )
+        with self._lock:
+            self._names = normalized_names
+            self._loaded = True
+            self._version += 1
+            return self._version
+
+    def invalidate(self) -> None:
+        """Další dotaz index znovu načte z nastavení."""
+        with self._lock:
+            self._loaded = False
+
+    def contains(self, normalized_nick: str) -> bool:
+        self._ensure_loaded()
+        return normalized_nick in self._names
+
+    def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            self._names = frozenset(_load_clan_member_cache_keys())
+            self._loaded = True
+            self._version += 1
+
+
+def _load_clan_member_cache_keys() -> List[str]:
+    payload = get_setting(CLAN_MEMBER_CACHE_SETTING_KEY)
     if not payload:
-        return False
+        return []
     try:
         cache = json.loads(payload)
     except json.JSONDecodeError:
-        return False
+        return []
     if not isinstance(cache, dict):
+        return []
+    return [
+        normalized
+        for normalized in (normalize_clan_member_name(str(key)) for key in cache)
+        if normalized
+    ]
+
+
+clan_member_nick_index = ClanMemberNickIndex()
+settings_cache.add_invalidation_hook(
+    lambda key: clan_member_nick_index.invalidate()
+    if key in (None, CLAN_MEMBER_CACHE_SETTING_KEY)
+    else None
+)
+
+
+def clan_member_nick_exists(nick: str) -> bool:
+    if not nick:
         return False
-    return normalized in cache
+    normalized = normalize_clan_member_name(nick)
+    if not normalized:
+        return False
+    return clan_member_nick_index.contains(normalized)
 
 
+@db_write
 def set_clan_stats_channel(channel_id: int):
     set_setting("clan_stats_channel_id", str(channel_id))
 
 
+@db_query
 def get_clan_stats_channel() -> Optional[int]:
-    value = get_setting("clan_stats_channel_id")
-    if value is None:
-        return None
-    try:
-        return int(value)
-    except ValueError:
-        return None
+    return get_setting_int("clan_stats_channel_id")
 
 
+@db_write
 def set_log_channel_id(channel_id: int) -> None:
     set_setting("log_channel_id", str(channel_id))
 
 
+@db_query
 def get_log_channel_id() -> Optional[int]:
-    value = get_setting("log_channel_id")
-    if value is None:
-        return None
-    try:
-        return int(value)
-    except ValueError:
-        return None
+    return get_setting_int("log_channel_id")
 
 
+@db_write
 def set_error_log_channel_id(channel_id: int) -> None:
     set_setting("error_log_channel_id", str(channel_id))
 
 
+@db_query
 def get_error_log_channel_id() -> Optional[int]:
-    value = get_setting("error_log_channel_id")
-    if value is None:
-        return None
-    try:
-        return int(value)
-    except ValueError:
-        return None
+    return get_setting_int("error_log_channel_id")
 
 
+@db_write
 def set_audit_log_channel_id(channel_id: int) -> None:
     set_setting("audit_log_channel_id", str(channel_id))
 
 
+@db_query
 def get_audit_log_channel_id() -> Optional[int]:
-    value = get_setting("audit_log_channel_id")
-    if value is None:
-        return None
-    try:
-        return int(value)
-    except ValueError:
-        return None
+    return get_setting_int("audit_log_channel_id")
 
 
 # ---------- GIVEAWAYS ----------
 
 
+@db_write
 def save_giveaway_state(message_id: int, state: Dict[str, Any]):
-    conn = get_connection()
-    c = conn.cursor()
+    with connection() as conn:
+        c = conn.cursor()
 
-    participants = state.get("participants", set())
-    if participants is None:
-        participants = set()
-    participants_json = json.dumps(list(participants))
+        participants = state.get("participants", set())
+        if participants is None:
+            participants = set()
+        participants_json = json.dumps(list(participants))
 
-    bids = state.get("bids", {})
-    if bids is None:
-        bids = {}
-    bids_json = json.dumps({str(k): v for k, v in bids.items()})
+        bids = state.get("bids", {})
+        if bids is None:
+            bids = {}
+        bids_json = json.dumps({str(k): v for k, v in bids.items()})
 
-    end_at = state.get("end_at")
-    end_at_str = end_at.isoformat() if isinstance(end_at, datetime) else ""
+        end_at = state.get("end_at")
+        end_at_str = end_at.isoformat() if isinstance(end_at, datetime) else ""
 
-    gtype = state.get("type")
-    gtype_value = gtype.value if isinstance(gtype, Enum) else str(gtype)
+        gtype = state.get("type")
+        gtype_value = gtype.value if isinstance(gtype, Enum) else str(gtype)
 
-    c.execute(
-        """
-        INSERT INTO active_giveaways (
-            message_id, channel_id, type, host_id, amount, pet_name, click_value,
-            auction_item, starting_bid, image_url, winners_count, duration_minutes,
-            end_at, participants_json, bids_json
-        )
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ON CONFLICT(message_id) DO UPDATE SET
-            channel_id = excluded.channel_id,
-            type = excluded.type,
-            host_id = excluded.host_id,
-            amount = excluded.amount,
-            pet_name = excluded.pet_name,
-            click_value = excluded.click_value,
-            auction_item = excluded.auction_item,
-            starting_bid = excluded.starting_bid,
-            image_url = excluded.image_url,
-            winners_count = excluded.winners_count,
-            duration_minutes = excluded.duration_minutes,
-            end_at = excluded.end_at,
-            participants_json = excluded.participants_json,
-            bids_json = excluded.bids_json
-        """,
-        (
-            message_id,
-            int(state.get("channel_id", 0)),
-            gtype_value,
-            state.get("host_id"),
-            state.get("amount"),
-            state.get("pet_name"),
-            state.get("click_value"),
-            state.get("auction_item"),
-            state.get("starting_bid"),
-            state.get("image_url"),
-            state.get("winners_count"),
-            state.get("duration", 0),
-            end_at_str,
-            participants_json,
-            bids_json,
-        ),
-    )
-    conn.commit()
-    conn.close()
+        c.execute(
+            """
+            INSERT INTO active_giveaways (
+                message_id, channel_id, type, host_id, amount, pet_name, click_value,
+                auction_item, starting_bid, image_url, winners_count, duration_minutes,
+                end_at, participants_json, bids_json
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(message_id) DO UPDATE SET
+                channel_id = excluded.channel_id,
+                type = excluded.type,
+                host_id = excluded.host_id,
+                amount = excluded.amount,
+                pet_name = excluded.pet_name,
+                click_value = excluded.click_value,
+                auction_item = excluded.auction_item,
+                starting_bid = excluded.starting_bid,
+                image_url = excluded.image_url,
+                winners_count = excluded.winners_count,
+                duration_minutes = excluded.duration_minutes,
+                end_at = excluded.end_at,
+                participants_json = excluded.participants_json,
+                bids_json = excluded.bids_json
+            """,
+            (
+                message_id,
+                int(state.get("channel_id", 0)),
+                gtype_value,
+                state.get("host_id"),
+                state.get("amount"),
+                state.get("pet_name"),
+                state.get("click_value"),
+                state.get("auction_item"),
+                state.get("starting_bid"),
+                state.get("image_url"),
+                state.get("winners_count"),
+                state.get("duration", 0),
+                end_at_str,
+                participants_json,
+                bids_json,
+            ),
+        )
 
 
+@db_query
 def load_active_giveaways() -> List[Tuple[int, Dict[str, Any]]]:
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        """
-        SELECT message_id, channel_id, type, host_id, amount, pet_name, click_value,
-               auction_item, starting_bid, image_url, winners_count, duration_minutes,
-               end_at, participants_json, bids_json
-        FROM active_giveaways
-        """
-    )
-    rows = c.fetchall()
-    conn.close()
+    with read_connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            """
+            SELECT message_id, channel_id, type, host_id, amount, pet_name, click_value,
+                   auction_item, starting_bid, image_url, winners_count, duration_minutes,
+                   end_at, participants_json, bids_json
+            FROM active_giveaways
+            """
+        )
+        rows = c.fetchall()
 
     giveaways: List[Tuple[int, Dict[str, Any]]] = []
     for row in rows:
@@ -1554,21 +2366,21 @@ def load_active_giveaways() -> List[Tuple[int, Dict[str, Any]]]:
     return giveaways
 
 
+@db_query
 def get_active_giveaway(message_id: int) -> Optional[Dict[str, Any]]:
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        """
-        SELECT message_id, channel_id, type, host_id, amount, pet_name, click_value,
-               auction_item, starting_bid, image_url, winners_count, duration_minutes,
-               end_at, participants_json, bids_json
-        FROM active_giveaways
-        WHERE message_id = ?
-        """,
-        (message_id,),
-    )
-    row = c.fetchone()
-    conn.close()
+    with read_connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            """
+            SELECT message_id, channel_id, type, host_id, amount, pet_name, click_value,
+                   auction_item, starting_bid, image_url, winners_count, duration_minutes,
+                   end_at, participants_json, bids_json
+            FROM active_giveaways
+            WHERE message_id = ?
+            """,
+            (message_id,),
+        )
+        row = c.fetchone()
 
     if row is None:
         return None
@@ -1615,17 +2427,17 @@ def get_active_giveaway(message_id: int) -> Optional[Dict[str, Any]]:
     }
 
 
+@db_write
 def delete_giveaway_state(message_id: int):
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute("DELETE FROM active_giveaways WHERE message_id = ?", (message_id,))
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute("DELETE FROM active_giveaways WHERE message_id = ?", (message_id,))
 
 
 # ---------- ATTENDANCE PANELY ----------
 
 
+@db_write
 def save_attendance_panel(
     message_id: int,
     guild_id: int,
@@ -1633,74 +2445,71 @@ def save_attendance_panel(
     role_ids: List[int],
     statuses: Dict[int, str],
 ):
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        """
-        INSERT INTO attendance_panels (
-            message_id,
-            guild_id,
-            channel_id,
-            role_ids_json,
-            statuses_json
-        )
-        VALUES (?, ?, ?, ?, ?)
-        ON CONFLICT(message_id) DO UPDATE SET
-            guild_id = excluded.guild_id,
-            channel_id = excluded.channel_id,
-            role_ids_json = excluded.role_ids_json,
-            statuses_json = excluded.statuses_json
-        """,
-        (message_id, guild_id, channel_id, json.dumps(role_ids), json.dumps(statuses)),
-    )
-    conn.commit()
-    conn.close()
-
-
-def delete_attendance_panel(message_id: int):
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute("DELETE FROM attendance_panels WHERE message_id = ?", (message_id,))
-    conn.commit()
-    conn.close()
-
-
-def load_attendance_panels() -> list[tuple[int, int, int, List[int], Dict[int, str]]]:
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute("PRAGMA table_info(attendance_panels)")
-    columns = {row[1] for row in c.fetchall()}
-    if "role_ids_json" in columns and "role_id" in columns:
+    with connection() as conn:
+        c = conn.cursor()
         c.execute(
             """
-            SELECT
+            INSERT INTO attendance_panels (
                 message_id,
                 guild_id,
                 channel_id,
                 role_ids_json,
-                role_id,
                 statuses_json
-            FROM attendance_panels
-            """
-        )
-        rows = c.fetchall()
-        with_role_id = True
-    elif "role_ids_json" in columns:
-        c.execute(
-            """
-            SELECT message_id, guild_id, channel_id, role_ids_json, statuses_json
-            FROM attendance_panels
-            """
-        )
-        rows = c.fetchall()
-        with_role_id = False
-    else:
-        c.execute(
-            "SELECT message_id, guild_id, channel_id, role_id, statuses_json FROM attendance_panels"
+            )
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(message_id) DO UPDATE SET
+                guild_id = excluded.guild_id,
+                channel_id = excluded.channel_id,
+                role_ids_json = excluded.role_ids_json,
+                statuses_json = excluded.statuses_json
+            """,
+            (message_id, guild_id, channel_id, json.dumps(role_ids), json.dumps(statuses)),
         )
-        rows = c.fetchall()
-        with_role_id = True
-    conn.close()
+
+
+@db_write
+def delete_attendance_panel(message_id: int):
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute("DELETE FROM attendance_panels WHERE message_id = ?", (message_id,))
+
+
+@db_query
+def load_attendance_panels() -> list[tuple[int, int, int, List[int], Dict[int, str]]]:
+    with read_connection() as conn:
+        c = conn.cursor()
+        c.execute("PRAGMA table_info(attendance_panels)")
+        columns = {row[1] for row in c.fetchall()}
+        if "role_ids_json" in columns and "role_id" in columns:
+            c.execute(
+                """
+                SELECT
+                    message_id,
+                    guild_id,
+                    channel_id,
+                    role_ids_json,
+                    role_id,
+                    statuses_json
+                FROM attendance_panels
+                """
+            )
+            rows = c.fetchall()
+            with_role_id = True
+        elif "role_ids_json" in columns:
+            c.execute(
+                """
+                SELECT message_id, guild_id, channel_id, role_ids_json, statuses_json
+                FROM attendance_panels
+                """
+            )
+            rows = c.fetchall()
+            with_role_id = False
+        else:
+            c.execute(
+                "SELECT message_id, guild_id, channel_id, role_id, statuses_json FROM attendance_panels"
+            )
+            rows = c.fetchall()
+            with_role_id = True
     panels: list[tuple[int, int, int, List[int], Dict[int, str]]] = []
     for row in rows:
         if with_role_id and len(row) == 6:
@@ -1737,6 +2546,7 @@ def load_attendance_panels() -> list[tuple[int, int, int, List[int], Dict[int, s
     return panels
 
 
+@db_write
 def save_attendance_setup_panel(
     message_id: int,
     guild_id: int,
@@ -1745,49 +2555,46 @@ def save_attendance_setup_panel(
     page_index: int = 0,
 ) -> None:
     selected_role_ids_json = json.dumps(selected_role_ids or [])
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        """
-        INSERT INTO attendance_setup_panels (
-            message_id,
-            guild_id,
-            channel_id,
-            selected_role_ids_json,
-            page_index
-        )
-        VALUES (?, ?, ?, ?, ?)
-        ON CONFLICT(message_id) DO UPDATE SET
-            guild_id = excluded.guild_id,
-            channel_id = excluded.channel_id,
-            selected_role_ids_json = excluded.selected_role_ids_json,
-            page_index = excluded.page_index
-        """,
-        (message_id, guild_id, channel_id, selected_role_ids_json, page_index),
-    )
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            """
+            INSERT INTO attendance_setup_panels (
+                message_id,
+                guild_id,
+                channel_id,
+                selected_role_ids_json,
+                page_index
+            )
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(message_id) DO UPDATE SET
+                guild_id = excluded.guild_id,
+                channel_id = excluded.channel_id,
+                selected_role_ids_json = excluded.selected_role_ids_json,
+                page_index = excluded.page_index
+            """,
+            (message_id, guild_id, channel_id, selected_role_ids_json, page_index),
+        )
 
 
+@db_write
 def delete_attendance_setup_panel(message_id: int) -> None:
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute("DELETE FROM attendance_setup_panels WHERE message_id = ?", (message_id,))
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute("DELETE FROM attendance_setup_panels WHERE message_id = ?", (message_id,))
 
 
+@db_query
 def load_attendance_setup_panels() -> list[tuple[int, int, int, list[int], int]]:
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        """
-        SELECT message_id, guild_id, channel_id, selected_role_ids_json, page_index
-        FROM attendance_setup_panels
-        """
-    )
-    rows = c.fetchall()
-    conn.close()
+    with read_connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            """
+            SELECT message_id, guild_id, channel_id, selected_role_ids_json, page_index
+            FROM attendance_setup_panels
+            """
+        )
+        rows = c.fetchall()
     panels = []
     for row in rows:
         message_id, guild_id, channel_id, selected_role_ids_json, page_index = row
@@ -1814,6 +2621,7 @@ def load_attendance_setup_panels() -> list[tuple[int, int, int, list[int], int]]
 # ---------- PROPHECY LOGS ----------
 
 
+@db_write
 def log_prophecy(
     message_id: int,
     channel_id: int,
@@ -1823,48 +2631,46 @@ def log_prophecy(
     model: str,
     created_at: datetime,
 ):
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        """
-        INSERT INTO prophecy_logs (message_id, channel_id, author_id, question, answer, model, created_at)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-        ON CONFLICT(message_id) DO UPDATE SET
-            channel_id = excluded.channel_id,
-            author_id = excluded.author_id,
-            question = excluded.question,
-            answer = excluded.answer,
-            model = excluded.model,
-            created_at = excluded.created_at
-        """,
-        (
-            message_id,
-            channel_id,
-            author_id,
-            question,
-            answer,
-            model,
-            created_at.isoformat(),
-        ),
-    )
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            """
+            INSERT INTO prophecy_logs (message_id, channel_id, author_id, question, answer, model, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(message_id) DO UPDATE SET
+                channel_id = excluded.channel_id,
+                author_id = excluded.author_id,
+                question = excluded.question,
+                answer = excluded.answer,
+                model = excluded.model,
+                created_at = excluded.created_at
+            """,
+            (
+                message_id,
+                channel_id,
+                author_id,
+                question,
+                answer,
+                model,
+                created_at.isoformat(),
+            ),
+        )
 
 
+@db_query
 def get_recent_prophecies(limit: int = 50) -> list[dict[str, object]]:
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        """
-        SELECT message_id, channel_id, author_id, question, answer, model, created_at
-        FROM prophecy_logs
-        ORDER BY datetime(created_at) DESC
-        LIMIT ?
-        """,
-        (limit,),
-    )
-    rows = c.fetchall()
-    conn.close()
+    with read_connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            """
+            SELECT message_id, channel_id, author_id, question, answer, model, created_at
+            FROM prophecy_logs
+            ORDER BY datetime(created_at) DESC
+            LIMIT ?
+            """,
+            (limit,),
+        )
+        rows = c.fetchall()
 
     results: list[dict[str, object]] = []
     for row in rows:
@@ -1894,66 +2700,63 @@ def get_recent_prophecies(limit: int = 50) -> list[dict[str, object]]:
 
 # ---------- CLAN PANELY ----------
 
+@db_write
 def add_clan_panel(guild_id: int, channel_id: int, message_id: int):
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        """
-        INSERT INTO clan_panels (message_id, guild_id, channel_id)
-        VALUES (?, ?, ?)
-        ON CONFLICT(message_id) DO UPDATE SET
-            guild_id = excluded.guild_id,
-            channel_id = excluded.channel_id
-        """,
-        (message_id, guild_id, channel_id),
-    )
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            """
+            INSERT INTO clan_panels (message_id, guild_id, channel_id)
+            VALUES (?, ?, ?)
+            ON CONFLICT(message_id) DO UPDATE SET
+                guild_id = excluded.guild_id,
+                channel_id = excluded.channel_id
+            """,
+            (message_id, guild_id, channel_id),
+        )
 
 
+@db_write
 def remove_clan_panel(message_id: int):
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute("DELETE FROM clan_panels WHERE message_id = ?", (message_id,))
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute("DELETE FROM clan_panels WHERE message_id = ?", (message_id,))
 
 
+@db_query
 def get_all_clan_panels() -> list[tuple[int, int, int]]:
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute("SELECT guild_id, channel_id, message_id FROM clan_panels")
-    rows = c.fetchall()
-    conn.close()
+    with read_connection() as conn:
+        c = conn.cursor()
+        c.execute("SELECT guild_id, channel_id, message_id FROM clan_panels")
+        rows = c.fetchall()
     return [(int(g), int(ch), int(msg)) for g, ch, msg in rows]
 
 
+@db_write
 def set_clan_panel_config(guild_id: int, title: str, requirements: str):
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        """
-        INSERT INTO clan_panel_configs (guild_id, title, requirements)
-        VALUES (?, ?, ?)
-        ON CONFLICT(guild_id) DO UPDATE SET
-            title = excluded.title,
-            requirements = excluded.requirements
-        """,
-        (guild_id, title, requirements),
-    )
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            """
+            INSERT INTO clan_panel_configs (guild_id, title, requirements)
+            VALUES (?, ?, ?)
+            ON CONFLICT(guild_id) DO UPDATE SET
+                title = excluded.title,
+                requirements = excluded.requirements
+            """,
+            (guild_id, title, requirements),
+        )
 
 
+@db_query
 def get_clan_panel_config(guild_id: int) -> tuple[str, str] | None:
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        "SELECT title, requirements FROM clan_panel_configs WHERE guild_id = ?",
-        (guild_id,),
-    )
-    row = c.fetchone()
-    conn.close()
+    with read_connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            "SELECT title, requirements FROM clan_panel_configs WHERE guild_id = ?",
+            (guild_id,),
+        )
+        row = c.fetchone()
     if not row:
         return None
     title, requirements = row
@@ -1962,45 +2765,44 @@ def get_clan_panel_config(guild_id: int) -> tuple[str, str] | None:
 
 # ---------- CLAN APPLICATION PANELY ----------
 
+@db_write
 def add_clan_application_panel(guild_id: int, channel_id: int, message_id: int):
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        """
-        INSERT INTO clan_application_panels (message_id, guild_id, channel_id)
-        VALUES (?, ?, ?)
-        ON CONFLICT(message_id) DO UPDATE SET
-            guild_id = excluded.guild_id,
-            channel_id = excluded.channel_id
-        """,
-        (message_id, guild_id, channel_id),
-    )
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            """
+            INSERT INTO clan_application_panels (message_id, guild_id, channel_id)
+            VALUES (?, ?, ?)
+            ON CONFLICT(message_id) DO UPDATE SET
+                guild_id = excluded.guild_id,
+                channel_id = excluded.channel_id
+            """,
+            (message_id, guild_id, channel_id),
+        )
 
 
+@db_write
 def remove_clan_application_panel(message_id: int):
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute("DELETE FROM clan_application_panels WHERE message_id = ?", (message_id,))
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute("DELETE FROM clan_application_panels WHERE message_id = ?", (message_id,))
 
 
+@db_query
 def get_all_clan_application_panels() -> list[tuple[int, int, int]]:
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        "SELECT guild_id, channel_id, message_id FROM clan_application_panels"
-    )
-    rows = c.fetchall()
-    conn.close()
+    with read_connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            "SELECT guild_id, channel_id, message_id FROM clan_application_panels"
+        )
+        rows = c.fetchall()
     return [(int(g), int(ch), int(msg)) for g, ch, msg in rows]
 
 
 # ---------- CLAN DEFINITIONS ----------
 
 
+@db_write
 def upsert_clan_definition(
     guild_id: int,
     clan_key: str,
@@ -2015,80 +2817,77 @@ def upsert_clan_definition(
     review_role_id: int | None,
     sort_order: int,
 ):
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        """
-        INSERT INTO clan_clans (
-            guild_id,
-            clan_key,
-            display_name,
-            description,
-            us_requirements,
-            cz_requirements,
-            accept_role_id,
-            accept_role_id_cz,
-            accept_role_id_en,
-            accept_category_id,
-            review_role_id,
-            sort_order
-        )
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ON CONFLICT(guild_id, clan_key) DO UPDATE SET
-            display_name = excluded.display_name,
-            description = excluded.description,
-            us_requirements = excluded.us_requirements,
-            cz_requirements = excluded.cz_requirements,
-            accept_role_id = excluded.accept_role_id,
-            accept_role_id_cz = excluded.accept_role_id_cz,
-            accept_role_id_en = excluded.accept_role_id_en,
-            accept_category_id = excluded.accept_category_id,
-            review_role_id = excluded.review_role_id,
-            sort_order = excluded.sort_order
-        """,
-        (
-            guild_id,
-            clan_key,
-            display_name,
-            description,
-            us_requirements,
-            cz_requirements,
-            accept_role_id,
-            accept_role_id_cz,
-            accept_role_id_en,
-            accept_category_id,
-            review_role_id,
-            sort_order,
-        ),
-    )
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            """
+            INSERT INTO clan_clans (
+                guild_id,
+                clan_key,
+                display_name,
+                description,
+                us_requirements,
+                cz_requirements,
+                accept_role_id,
+                accept_role_id_cz,
+                accept_role_id_en,
+                accept_category_id,
+                review_role_id,
+                sort_order
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(guild_id, clan_key) DO UPDATE SET
+                display_name = excluded.display_name,
+                description = excluded.description,
+                us_requirements = excluded.us_requirements,
+                cz_requirements = excluded.cz_requirements,
+                accept_role_id = excluded.accept_role_id,
+                accept_role_id_cz = excluded.accept_role_id_cz,
+                accept_role_id_en = excluded.accept_role_id_en,
+                accept_category_id = excluded.accept_category_id,
+                review_role_id = excluded.review_role_id,
+                sort_order = excluded.sort_order
+            """,
+            (
+                guild_id,
+                clan_key,
+                display_name,
+                description,
+                us_requirements,
+                cz_requirements,
+                accept_role_id,
+                accept_role_id_cz,
+                accept_role_id_en,
+                accept_category_id,
+                review_role_id,
+                sort_order,
+            ),
+        )
 
 
+@db_write
 def delete_clan_definition(guild_id: int, clan_key: str):
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        "DELETE FROM clan_clans WHERE guild_id = ? AND clan_key = ?",
-        (guild_id, clan_key),
-    )
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            "DELETE FROM clan_clans WHERE guild_id = ? AND clan_key = ?",
+            (guild_id, clan_key),
+        )
 
 
+@db_query
 def get_clan_definition(guild_id: int, clan_key: str):
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        """
-        SELECT clan_key, display_name, description, us_requirements, cz_requirements, accept_role_id, accept_role_id_cz, accept_role_id_en, accept_category_id, review_role_id, sort_order
-        FROM clan_clans
-        WHERE guild_id = ? AND clan_key = ?
-        """,
-        (guild_id, clan_key),
-    )
-    row = c.fetchone()
-    conn.close()
+    with read_connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            """
+            SELECT clan_key, display_name, description, us_requirements, cz_requirements, accept_role_id, accept_role_id_cz, accept_role_id_en, accept_category_id, review_role_id, sort_order
+            FROM clan_clans
+            WHERE guild_id = ? AND clan_key = ?
+            """,
+            (guild_id, clan_key),
+        )
+        row = c.fetchone()
     if not row:
         return None
     (
@@ -2119,20 +2918,20 @@ def get_clan_definition(guild_id: int, clan_key: str):
     }
 
 
+@db_query
 def list_clan_definitions(guild_id: int):
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        """
-        SELECT clan_key, display_name, description, us_requirements, cz_requirements, accept_role_id, accept_role_id_cz, accept_role_id_en, accept_category_id, review_role_id, sort_order
-        FROM clan_clans
-        WHERE guild_id = ?
-        ORDER BY sort_order ASC, clan_key COLLATE NOCASE
-        """,
-        (guild_id,),
-    )
-    rows = c.fetchall()
-    conn.close()
+    with read_connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            """
+            SELECT clan_key, display_name, description, us_requirements, cz_requirements, accept_role_id, accept_role_id_cz, accept_role_id_en, accept_category_id, review_role_id, sort_order
+            FROM clan_clans
+            WHERE guild_id = ?
+            ORDER BY sort_order ASC, clan_key COLLATE NOCASE
+            """,
+            (guild_id,),
+        )
+        rows = c.fetchall()
     results = []
     for (
         key,
@@ -2165,52 +2964,50 @@ def list_clan_definitions(guild_id: int):
     return results
 
 
+@db_query
 def get_next_clan_sort_order(guild_id: int) -> int:
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        "SELECT COALESCE(MAX(sort_order), -1) FROM clan_clans WHERE guild_id = ?",
-        (guild_id,),
-    )
-    row = c.fetchone()
-    conn.close()
+    with read_connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            "SELECT COALESCE(MAX(sort_order), -1) FROM clan_clans WHERE guild_id = ?",
+            (guild_id,),
+        )
+        row = c.fetchone()
     current_max = int(row[0]) if row and row[0] is not None else -1
     return current_max + 1
 
 
 # ---------- LEADERBOARD PANELY ----------
 
+@db_write
 def add_leaderboard_panel(guild_id: int, channel_id: int, message_id: int):
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        """
-        INSERT INTO leaderboard_panels (message_id, guild_id, channel_id)
-        VALUES (?, ?, ?)
-        ON CONFLICT(message_id) DO UPDATE SET
-            guild_id = excluded.guild_id,
-            channel_id = excluded.channel_id
-        """,
-        (message_id, guild_id, channel_id),
-    )
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            """
+            INSERT INTO leaderboard_panels (message_id, guild_id, channel_id)
+            VALUES (?, ?, ?)
+            ON CONFLICT(message_id) DO UPDATE SET
+                guild_id = excluded.guild_id,
+                channel_id = excluded.channel_id
+            """,
+            (message_id, guild_id, channel_id),
+        )
 
 
+@db_write
 def remove_leaderboard_panel(message_id: int):
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute("DELETE FROM leaderboard_panels WHERE message_id = ?", (message_id,))
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute("DELETE FROM leaderboard_panels WHERE message_id = ?", (message_id,))
 
 
+@db_query
 def get_all_leaderboard_panels() -> list[tuple[int, int, int]]:
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute("SELECT guild_id, channel_id, message_id FROM leaderboard_panels")
-    rows = c.fetchall()
-    conn.close()
+    with read_connection() as conn:
+        c = conn.cursor()
+        c.execute("SELECT guild_id, channel_id, message_id FROM leaderboard_panels")
+        rows = c.fetchall()
     return [(int(g), int(ch), int(msg)) for g, ch, msg in rows]
 
 
@@ -2220,65 +3017,62 @@ def _normalize_message_ids(message_ids: List[int]) -> List[int]:
     return [int(message_id) for message_id in message_ids if message_id]
 
 
+@db_write
 def set_dropstats_panel_message_ids(
     guild_id: int, channel_id: int, message_ids: List[int]
 ) -> None:
     normalized_ids = _normalize_message_ids(message_ids)
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        """
-        INSERT INTO dropstats_panels (guild_id, channel_id, message_ids)
-        VALUES (?, ?, ?)
-        ON CONFLICT(guild_id, channel_id) DO UPDATE SET
-            message_ids = excluded.message_ids
-        """,
-        (guild_id, channel_id, json.dumps(normalized_ids)),
-    )
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            """
+            INSERT INTO dropstats_panels (guild_id, channel_id, message_ids)
+            VALUES (?, ?, ?)
+            ON CONFLICT(guild_id, channel_id) DO UPDATE SET
+                message_ids = excluded.message_ids
+            """,
+            (guild_id, channel_id, json.dumps(normalized_ids)),
+        )
 
 
+@db_write
 def remove_dropstats_panel(guild_id: int, channel_id: int) -> None:
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        "SELECT message_ids FROM dropstats_panels WHERE guild_id = ? AND channel_id = ?",
-        (guild_id, channel_id),
-    )
-    row = c.fetchone()
-    if row:
-        message_ids = _decode_message_ids(row[0])
-        _delete_dropstats_panel_states(c, message_ids)
-    c.execute(
-        "DELETE FROM dropstats_panels WHERE guild_id = ? AND channel_id = ?",
-        (guild_id, channel_id),
-    )
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            "SELECT message_ids FROM dropstats_panels WHERE guild_id = ? AND channel_id = ?",
+            (guild_id, channel_id),
+        )
+        row = c.fetchone()
+        if row:
+            message_ids = _decode_message_ids(row[0])
+            _delete_dropstats_panel_states(c, message_ids)
+        c.execute(
+            "DELETE FROM dropstats_panels WHERE guild_id = ? AND channel_id = ?",
+            (guild_id, channel_id),
+        )
 
 
+@db_query
 def get_all_dropstats_panels() -> list[tuple[int, int, list[int]]]:
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute("SELECT guild_id, channel_id, message_ids FROM dropstats_panels")
-    rows = c.fetchall()
-    conn.close()
+    with read_connection() as conn:
+        c = conn.cursor()
+        c.execute("SELECT guild_id, channel_id, message_ids FROM dropstats_panels")
+        rows = c.fetchall()
     return [
         (int(g), int(ch), _decode_message_ids(message_ids))
         for g, ch, message_ids in rows
     ]
 
 
+@db_write
 def delete_dropstats_panel_states(message_ids: List[int]) -> None:
     normalized = _normalize_message_ids(message_ids)
     if not normalized:
         return
-    conn = get_connection()
-    c = conn.cursor()
-    _delete_dropstats_panel_states(c, normalized)
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        c = conn.cursor()
+        _delete_dropstats_panel_states(c, normalized)
 
 
 def _delete_dropstats_panel_states(
@@ -2303,82 +3097,79 @@ def _decode_message_ids(raw_value: Optional[str]) -> List[int]:
     return _normalize_message_ids(parsed)
 
 
+@db_write
 def set_dropstats_panel_state(
     message_id: int, selected_clan_key: Optional[str]
 ) -> None:
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        """
-        INSERT INTO dropstats_panel_state (message_id, selected_clan_key)
-        VALUES (?, ?)
-        ON CONFLICT(message_id) DO UPDATE
-        SET selected_clan_key = excluded.selected_clan_key
-        """,
-        (message_id, selected_clan_key),
-    )
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            """
+            INSERT INTO dropstats_panel_state (message_id, selected_clan_key)
+            VALUES (?, ?)
+            ON CONFLICT(message_id) DO UPDATE
+            SET selected_clan_key = excluded.selected_clan_key
+            """,
+            (message_id, selected_clan_key),
+        )
 
 
+@db_query
 def get_dropstats_panel_state(message_id: int) -> Optional[str]:
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        "SELECT selected_clan_key FROM dropstats_panel_state WHERE message_id = ?",
-        (message_id,),
-    )
-    row = c.fetchone()
-    conn.close()
+    with read_connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            "SELECT selected_clan_key FROM dropstats_panel_state WHERE message_id = ?",
+            (message_id,),
+        )
+        row = c.fetchone()
     return row[0] if row else None
 
 
 # ---------- SP PANELY ----------
 
 
+@db_write
 def add_sp_panel(guild_id: int, channel_id: int, message_id: int):
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        """
-        INSERT INTO sp_panels (message_id, guild_id, channel_id)
-        VALUES (?, ?, ?)
-        ON CONFLICT(message_id) DO UPDATE SET
-            guild_id = excluded.guild_id,
-            channel_id = excluded.channel_id
-        """,
-        (message_id, guild_id, channel_id),
-    )
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            """
+            INSERT INTO sp_panels (message_id, guild_id, channel_id)
+            VALUES (?, ?, ?)
+            ON CONFLICT(message_id) DO UPDATE SET
+                guild_id = excluded.guild_id,
+                channel_id = excluded.channel_id
+            """,
+            (message_id, guild_id, channel_id),
+        )
 
 
+@db_write
 def remove_sp_panel(message_id: int):
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute("DELETE FROM sp_panels WHERE message_id = ?", (message_id,))
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute("DELETE FROM sp_panels WHERE message_id = ?", (message_id,))
 
 
+@db_query
 def get_all_sp_panels() -> list[tuple[int, int, int]]:
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute("SELECT guild_id, channel_id, message_id FROM sp_panels")
-    rows = c.fetchall()
-    conn.close()
+    with read_connection() as conn:
+        c = conn.cursor()
+        c.execute("SELECT guild_id, channel_id, message_id FROM sp_panels")
+        rows = c.fetchall()
     return [(int(g), int(ch), int(msg)) for g, ch, msg in rows]
 
 
+@db_query
 def get_sp_panel_for_guild(guild_id: int) -> Optional[tuple[int, int, int]]:
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        "SELECT guild_id, channel_id, message_id FROM sp_panels WHERE guild_id = ?",
-        (guild_id,),
-    )
-    row = c.fetchone()
-    conn.close()
+    with read_connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            "SELECT guild_id, channel_id, message_id FROM sp_panels WHERE guild_id = ?",
+            (guild_id,),
+        )
+        row = c.fetchone()
     if row is None:
         return None
     guild_id_val, channel_id, message_id = row
@@ -2387,102 +3178,109 @@ def get_sp_panel_for_guild(guild_id: int) -> Optional[tuple[int, int, int]]:
 
 # ---------- DŘEVO ----------
 
+@db_write
 def get_or_create_resource(name: str) -> int:
     norm_name = name.strip()
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        "INSERT INTO resources (name) VALUES (?) ON CONFLICT(name) DO NOTHING",
-        (norm_name,),
-    )
-    conn.commit()
-    c.execute("SELECT id FROM resources WHERE name = ?", (norm_name,))
-    row = c.fetchone()
-    conn.close()
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            "INSERT INTO resources (name) VALUES (?) ON CONFLICT(name) DO NOTHING",
+            (norm_name,),
+        )
+        c.execute("SELECT id FROM resources WHERE name = ?", (norm_name,))
+        row = c.fetchone()
     if not row:
         raise RuntimeError("Nepodařilo se vytvořit resource.")
     return int(row[0])
 
 
+@db_write
 def set_resource_need(resource_name: str, required_amount: int):
     rid = get_or_create_resource(resource_name)
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        """
-        INSERT INTO resource_targets (resource_id, required_amount)
-        VALUES (?, ?)
-        ON CONFLICT(resource_id) DO UPDATE SET required_amount = excluded.required_amount
-        """,
-        (rid, required_amount),
-    )
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            """
+            INSERT INTO resource_targets (resource_id, required_amount)
+            VALUES (?, ?)
+            ON CONFLICT(resource_id) DO UPDATE SET required_amount = excluded.required_amount
+            """,
+            (rid, required_amount),
+        )
 
 
+@db_write
 def reset_resource_need(resource_name: Optional[str] = None):
-    conn = get_connection()
-    c = conn.cursor()
-    if resource_name is None:
-        c.execute("DELETE FROM resource_targets")
-        c.execute("DELETE FROM resource_deliveries")
-    else:
-        rid = get_or_create_resource(resource_name)
-        c.execute("DELETE FROM resource_targets WHERE resource_id = ?", (rid,))
-        c.execute("DELETE FROM resource_deliveries WHERE resource_id = ?", (rid,))
-    conn.commit()
-    conn.close()
+    _flush_pending_deliveries()
+    with connection() as conn:
+        c = conn.cursor()
+        if resource_name is None:
+            c.execute("DELETE FROM resource_targets")
+            c.execute("DELETE FROM resource_deliveries")
+        else:
+            rid = get_or_create_resource(resource_name)
+            c.execute("DELETE FROM resource_targets WHERE resource_id = ?", (rid,))
+            c.execute("DELETE FROM resource_deliveries WHERE resource_id = ?", (rid,))
+
 
+def _flush_pending_deliveries() -> None:
+    if write_behind.has_pending("deliveries"):
+        write_behind.flush()
 
+
+@db_write
 def add_delivery(discord_id: int, resource_name: str, amount: int):
-    rid = get_or_create_resource(resource_name)
     now_str = datetime.now().strftime("%Y-%m-%d %H:%M")
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        """
-        INSERT INTO resource_deliveries (discord_id, resource_id, amount, created_at)
-        VALUES (?, ?, ?, ?)
-        """,
-        (discord_id, rid, amount, now_str),
-    )
-    conn.commit()
-    conn.close()
+    write_behind.add_delivery(discord_id, resource_name, amount, now_str)
 
 
+_GET_RESOURCES_STATUS_SQL = register_hot_query(
+    "get_resources_status",
+    """
+    SELECT
+        r.name,
+        t.required_amount,
+        COALESCE(SUM(d.amount), 0) AS delivered
+    FROM resource_targets t
+    JOIN resources r ON r.id = t.resource_id
+    LEFT JOIN resource_deliveries d ON d.resource_id = t.resource_id
+    GROUP BY t.resource_id, r.name, t.required_amount
+    ORDER BY r.name
+    """,
+    (),
+    # resource_targets (alias t) je malá konfigurační tabulka, scan je v pořádku.
+    expected_scans=("t",),
+)
+
+
+@db_query
 def get_resources_status() -> List[Tuple[str, int, int]]:
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        """
-        SELECT
-            r.name,
-            t.required_amount,
-            COALESCE(SUM(d.amount), 0) AS delivered
-        FROM resource_targets t
-        JOIN resources r ON r.id = t.resource_id
-        LEFT JOIN resource_deliveries d ON d.resource_id = t.resource_id
-        GROUP BY t.resource_id, r.name, t.required_amount
-        ORDER BY r.name
-        """
-    )
-    rows = c.fetchall()
-    conn.close()
+    _flush_pending_deliveries()
+    with read_connection() as conn:
+        c = conn.cursor()
+        c.execute(_GET_RESOURCES_STATUS_SQL)
+        rows = c.fetchall()
     return [(str(r[0]), int(r[1]), int(r[2])) for r in rows]
 
 
+_GET_INACTIVE_USERS_SQL = register_hot_query(
+    "get_inactive_users",
+    """
+    SELECT discord_id, MAX(created_at) AS last_ts
+    FROM resource_deliveries
+    GROUP BY discord_id
+    """,
+    (),
+)
+
+
+@db_query
 def get_inactive_users(threshold_hours: int = INACTIVE_THRESHOLD_HOURS) -> List[int]:
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        """
-        SELECT discord_id, MAX(created_at) AS last_ts
-        FROM resource_deliveries
-        GROUP BY discord_id
-        """
-    )
-    rows = c.fetchall()
-    conn.close()
+    _flush_pending_deliveries()
+    with read_connection() as conn:
+        c = conn.cursor()
+        c.execute(_GET_INACTIVE_USERS_SQL)
+        rows = c.fetchall()
 
     now = datetime.now()
     result: List[int] = []
@@ -2498,129 +3296,131 @@ def get_inactive_users(threshold_hours: int = INACTIVE_THRESHOLD_HOURS) -> List[
 
 # ---------- TIMERY ----------
 
+@db_write
 def create_or_update_timer(name: str, minutes: int) -> int:
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        """
-        INSERT INTO timers (name, duration_minutes)
-        VALUES (?, ?)
-        ON CONFLICT(name) DO UPDATE SET duration_minutes = excluded.duration_minutes
-        """,
-        (name, minutes),
-    )
-    conn.commit()
-    c.execute("SELECT id FROM timers WHERE name = ?", (name,))
-    row = c.fetchone()
-    conn.close()
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            """
+            INSERT INTO timers (name, duration_minutes)
+            VALUES (?, ?)
+            ON CONFLICT(name) DO UPDATE SET duration_minutes = excluded.duration_minutes
+            """,
+            (name, minutes),
+        )
+        c.execute("SELECT id FROM timers WHERE name = ?", (name,))
+        row = c.fetchone()
     if not row:
         raise RuntimeError("Nepodařilo se vytvořit / načíst timer.")
     return int(row[0])
 
 
+@db_query
 def get_all_timers() -> List[Tuple[int, str, int]]:
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute("SELECT id, name, duration_minutes FROM timers ORDER BY name")
-    rows = c.fetchall()
-    conn.close()
+    with read_connection() as conn:
+        c = conn.cursor()
+        c.execute("SELECT id, name, duration_minutes FROM timers ORDER BY name")
+        rows = c.fetchall()
     return [(int(r[0]), str(r[1]), int(r[2])) for r in rows]
 
 
+@db_write
 def delete_timer(name: str) -> bool:
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute("DELETE FROM timers WHERE name = ?", (name,))
-    deleted = c.rowcount
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute("DELETE FROM timers WHERE name = ?", (name,))
+        deleted = c.rowcount
     return deleted > 0
 
 
+@db_write
 def upsert_active_timer(user_id: int, timer_name: str, minutes: int, end_at: datetime):
-    conn = get_connection()
-    c = conn.cursor()
-    end_str = end_at.strftime("%Y-%m-%d %H:%M:%S")
-    c.execute(
-        """
-        INSERT INTO active_timers (user_id, timer_name, duration_minutes, end_at)
-        VALUES (?, ?, ?, ?)
-        ON CONFLICT(user_id, timer_name)
-        DO UPDATE SET duration_minutes = excluded.duration_minutes,
-                      end_at = excluded.end_at
-        """,
-        (user_id, timer_name, minutes, end_str),
-    )
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        c = conn.cursor()
+        end_str = end_at.strftime("%Y-%m-%d %H:%M:%S")
+        c.execute(
+            """
+            INSERT INTO active_timers (user_id, timer_name, duration_minutes, end_at)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(user_id, timer_name)
+            DO UPDATE SET duration_minutes = excluded.duration_minutes,
+                          end_at = excluded.end_at
+            """,
+            (user_id, timer_name, minutes, end_str),
+        )
 
 
+@db_write
 def delete_active_timer(user_id: int, timer_name: str):
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        "DELETE FROM active_timers WHERE user_id = ? AND timer_name = ?",
-        (user_id, timer_name),
-    )
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            "DELETE FROM active_timers WHERE user_id = ? AND timer_name = ?",
+            (user_id, timer_name),
+        )
 
 
+@db_write
 def delete_active_timers_for_name(timer_name: str):
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute("DELETE FROM active_timers WHERE timer_name = ?", (timer_name,))
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute("DELETE FROM active_timers WHERE timer_name = ?", (timer_name,))
 
 
+@db_query
 def get_all_active_timers() -> List[Tuple[int, str, int, str]]:
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute("SELECT user_id, timer_name, duration_minutes, end_at FROM active_timers")
-    rows = c.fetchall()
-    conn.close()
+    with read_connection() as conn:
+        c = conn.cursor()
+        c.execute("SELECT user_id, timer_name, duration_minutes, end_at FROM active_timers")
+        rows = c.fetchall()
     return [(int(r[0]), str(r[1]), int(r[2]), str(r[3])) for r in rows]
 
 
 # ---------- USER STATS (XP/COINS/LEVEL/MESSAGES) ----------
 
 
+@db_write
 def ensure_user_stats_columns():
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute("PRAGMA table_info(user_stats)")
-    columns = {row[1] for row in c.fetchall()}
-    if "message_count" not in columns:
-        c.execute(
-            "ALTER TABLE user_stats ADD COLUMN message_count INTEGER NOT NULL DEFAULT 0"
-        )
-        conn.commit()
-    conn.close()
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute("PRAGMA table_info(user_stats)")
+        columns = {row[1] for row in c.fetchall()}
+        if "message_count" not in columns:
+            c.execute(
+                "ALTER TABLE user_stats ADD COLUMN message_count INTEGER NOT NULL DEFAULT 0"
+            )
 
+@db_write
 def get_or_create_user_stats(discord_id: int) -> Tuple[int, int, int, Optional[str], int]:
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        "SELECT coins, exp, level, last_xp_at, message_count FROM user_stats WHERE discord_id = ?",
-        (discord_id,),
-    )
-    row = c.fetchone()
-    if row is None:
+    with connection() as conn:
+        c = conn.cursor()
         c.execute(
-            """
-            INSERT INTO user_stats (discord_id, coins, exp, level, last_xp_at, message_count)
-            VALUES (?, 0, 0, 1, NULL, 0)
-            """,
+            "SELECT coins, exp, level, last_xp_at, message_count FROM user_stats WHERE discord_id = ?",
             (discord_id,),
         )
-        conn.commit()
-        conn.close()
-        return 0, 0, 1, None, 0
-    conn.close()
-    return int(row[0]), int(row[1]), int(row[2]), row[3], int(row[4])
+        row = c.fetchone()
+        if row is None:
+            c.execute(
+                """
+                INSERT INTO user_stats (discord_id, coins, exp, level, last_xp_at, message_count)
+                VALUES (?, 0, 0, 1, NULL, 0)
+                """,
+                (discord_id,),
+            )
+            row = (0, 0, 1, None, 0)
+    stats = dict(zip(USER_STATS_COLUMNS, row))
+    # Read-your-writes: hodnoty čekající ve write-behind bufferu mají přednost.
+    stats.update(write_behind.user_stats_overlay(discord_id))
+    return (
+        int(stats["coins"]),
+        int(stats["exp"]),
+        int(stats["level"]),
+        stats["last_xp_at"],
+        int(stats["message_count"]),
+    )
 
 
+@db_write
 def update_user_stats(
     discord_id: int,
     coins: Optional[int] = None,
@@ -2629,56 +3429,39 @@ def update_user_stats(
     last_xp_at: Optional[Optional[str]] = None,
     message_count: Optional[int] = None,
 ):
-    conn = get_connection()
-    c = conn.cursor()
-    parts: List[str] = []
-    params: List[Any] = []
-
-    if coins is not None:
-        parts.append("coins = ?")
-        params.append(coins)
-    if exp is not None:
-        parts.append("exp = ?")
-        params.append(exp)
-    if level is not None:
-        parts.append("level = ?")
-        params.append(level)
-    if last_xp_at is not None:
-        parts.append("last_xp_at = ?")
-        params.append(last_xp_at)
-    if message_count is not None:
-        parts.append("message_count = ?")
-        params.append(message_count)
-
-    if not parts:
-        conn.close()
+    fields = {
+        column: value
+        for column, value in zip(
+            USER_STATS_COLUMNS, (coins, exp, level, last_xp_at, message_count)
+        )
+        if value is not None
+    }
+    if not fields:
         return
-
-    sql = f"UPDATE user_stats SET {', '.join(parts)} WHERE discord_id = ?"
-    params.append(discord_id)
-    c.execute(sql, tuple(params))
-    conn.commit()
-    conn.close()
+    write_behind.add_user_stats(discord_id, fields)
 
 
+@db_query
 def get_top_users_by_stat(stat: str, limit: int = 10) -> List[Tuple[int, int]]:
     allowed = {"coins", "message_count"}
     if stat not in allowed:
         raise ValueError(f"Nepodporovaný sloupec: {stat}")
 
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        f"SELECT discord_id, {stat} FROM user_stats ORDER BY {stat} DESC LIMIT ?",
-        (limit,),
-    )
-    rows = c.fetchall()
-    conn.close()
+    if write_behind.has_pending("user_stats"):
+        write_behind.flush()
+    with read_connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            f"SELECT discord_id, {stat} FROM user_stats ORDER BY {stat} DESC LIMIT ?",
+            (limit,),
+        )
+        rows = c.fetchall()
     return [(int(r[0]), int(r[1])) for r in rows]
 
 
 # ---------- SHOP ----------
 
+@db_write
 def create_shop_item(
     title: str,
     image_url: Optional[str],
@@ -2686,49 +3469,46 @@ def create_shop_item(
     stock: int,
     seller_id: int,
 ) -> int:
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        """
-        INSERT INTO shop_items (title, image_url, price_coins, stock, seller_id, is_active)
-        VALUES (?, ?, ?, ?, ?, 1)
-        """,
-        (title, image_url, price_coins, stock, seller_id),
-    )
-    conn.commit()
-    item_id = c.lastrowid
-    conn.close()
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            """
+            INSERT INTO shop_items (title, image_url, price_coins, stock, seller_id, is_active)
+            VALUES (?, ?, ?, ?, ?, 1)
+            """,
+            (title, image_url, price_coins, stock, seller_id),
+        )
+        item_id = c.lastrowid
     return int(item_id)
 
 
+@db_write
 def set_shop_item_message(item_id: int, channel_id: int, message_id: int):
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        """
-        UPDATE shop_items
-        SET channel_id = ?, message_id = ?
-        WHERE id = ?
-        """,
-        (channel_id, message_id, item_id),
-    )
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            """
+            UPDATE shop_items
+            SET channel_id = ?, message_id = ?
+            WHERE id = ?
+            """,
+            (channel_id, message_id, item_id),
+        )
 
 
+@db_query
 def get_shop_item(item_id: int) -> Optional[Dict[str, Any]]:
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        """
-        SELECT id, title, image_url, price_coins, stock, seller_id, channel_id, message_id, is_active
-        FROM shop_items
-        WHERE id = ?
-        """,
-        (item_id,),
-    )
-    row = c.fetchone()
-    conn.close()
+    with read_connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            """
+            SELECT id, title, image_url, price_coins, stock, seller_id, channel_id, message_id, is_active
+            FROM shop_items
+            WHERE id = ?
+            """,
+            (item_id,),
+        )
+        row = c.fetchone()
     if row is None:
         return None
     return {
@@ -2744,128 +3524,121 @@ def get_shop_item(item_id: int) -> Optional[Dict[str, Any]]:
     }
 
 
+@db_write
 def decrement_shop_item_stock(item_id: int, amount: int = 1) -> Tuple[bool, int]:
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute("SELECT stock, is_active FROM shop_items WHERE id = ?", (item_id,))
-    row = c.fetchone()
-    if row is None:
-        conn.close()
-        return False, 0
-
-    stock = int(row[0])
-    is_active = int(row[1])
-    if amount <= 0:
-        conn.close()
-        return False, stock
-
-    if is_active == 0 or stock <= 0 or stock < amount:
-        conn.close()
-        return False, max(stock, 0)
-
-    new_stock = stock - amount
-    new_active = 1 if new_stock > 0 else 0
-    c.execute(
-        "UPDATE shop_items SET stock = ?, is_active = ? WHERE id = ?",
-        (new_stock, new_active, item_id),
-    )
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute("SELECT stock, is_active FROM shop_items WHERE id = ?", (item_id,))
+        row = c.fetchone()
+        if row is None:
+            return False, 0
+
+        stock = int(row[0])
+        is_active = int(row[1])
+        if amount <= 0:
+            return False, stock
+
+        if is_active == 0 or stock <= 0 or stock < amount:
+            return False, max(stock, 0)
+
+        new_stock = stock - amount
+        new_active = 1 if new_stock > 0 else 0
+        c.execute(
+            "UPDATE shop_items SET stock = ?, is_active = ? WHERE id = ?",
+            (new_stock, new_active, item_id),
+        )
     return True, new_stock
 
 
+@db_query
 def get_active_shop_item_ids() -> List[int]:
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        """
-        SELECT id
-        FROM shop_items
-        WHERE is_active = 1 AND channel_id IS NOT NULL AND message_id IS NOT NULL
-        """
-    )
-    rows = c.fetchall()
-    conn.close()
+    with read_connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            """
+            SELECT id
+            FROM shop_items
+            WHERE is_active = 1 AND channel_id IS NOT NULL AND message_id IS NOT NULL
+            """
+        )
+        rows = c.fetchall()
     return [int(r[0]) for r in rows]
 
 
+@db_write
 def create_shop_purchase(
     item_id: int, buyer_id: int, seller_id: int, price_coins: int, quantity: int = 1
 ) -> int:
     now_str = datetime.utcnow().isoformat()
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        """
-        INSERT INTO shop_purchases (item_id, buyer_id, seller_id, price_coins, created_at, quantity)
-        VALUES (?, ?, ?, ?, ?, ?)
-        """,
-        (item_id, buyer_id, seller_id, price_coins, now_str, quantity),
-    )
-    conn.commit()
-    purchase_id = c.lastrowid
-    conn.close()
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            """
+            INSERT INTO shop_purchases (item_id, buyer_id, seller_id, price_coins, created_at, quantity)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            (item_id, buyer_id, seller_id, price_coins, now_str, quantity),
+        )
+        purchase_id = c.lastrowid
     return int(purchase_id)
 
 
+@db_query
 def get_pending_shop_purchases_grouped() -> List[Dict[str, Any]]:
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        """
-        SELECT buyer_id, SUM(quantity) AS cnt
-        FROM shop_purchases
-        WHERE completed = 0
-        GROUP BY buyer_id
-        ORDER BY cnt DESC
-        """
-    )
-    rows = c.fetchall()
-    conn.close()
+    with read_connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            """
+            SELECT buyer_id, SUM(quantity) AS cnt
+            FROM shop_purchases
+            WHERE completed = 0
+            GROUP BY buyer_id
+            ORDER BY cnt DESC
+            """
+        )
+        rows = c.fetchall()
     return [{"buyer_id": int(r[0]), "count": int(r[1])} for r in rows]
 
 
+@db_write
 def complete_shop_purchase(purchase_id: int) -> bool:
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        "UPDATE shop_purchases SET completed = 1 WHERE id = ? AND completed = 0",
-        (purchase_id,),
-    )
-    conn.commit()
-    rowcount = c.rowcount
-    conn.close()
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            "UPDATE shop_purchases SET completed = 1 WHERE id = ? AND completed = 0",
+            (purchase_id,),
+        )
+        rowcount = c.rowcount
     return rowcount > 0
 
 
+@db_write
 def complete_shop_purchases_for_user(buyer_id: int) -> int:
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        "UPDATE shop_purchases SET completed = 1 WHERE buyer_id = ? AND completed = 0",
-        (buyer_id,),
-    )
-    conn.commit()
-    rowcount = c.rowcount
-    conn.close()
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            "UPDATE shop_purchases SET completed = 1 WHERE buyer_id = ? AND completed = 0",
+            (buyer_id,),
+        )
+        rowcount = c.rowcount
     return int(rowcount)
 
 
+@db_query
 def get_pending_shop_sales_for_seller(seller_id: int) -> List[Dict[str, Any]]:
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        """
-        SELECT sp.id, sp.item_id, sp.buyer_id, sp.price_coins, sp.created_at, si.title, sp.quantity
-        FROM shop_purchases sp
-        JOIN shop_items si ON sp.item_id = si.id
-        WHERE sp.seller_id = ? AND sp.completed = 0
-        ORDER BY sp.created_at ASC
-        """,
-        (seller_id,),
-    )
-    rows = c.fetchall()
-    conn.close()
+    with read_connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            """
+            SELECT sp.id, sp.item_id, sp.buyer_id, sp.price_coins, sp.created_at, si.title, sp.quantity
+            FROM shop_purchases sp
+            JOIN shop_items si ON sp.item_id = si.id
+            WHERE sp.seller_id = ? AND sp.completed = 0
+            ORDER BY sp.created_at ASC
+            """,
+            (seller_id,),
+        )
+        rows = c.fetchall()
     return [
         {
             "id": int(r[0]),
@@ -2903,53 +3676,53 @@ def _row_to_clan_application(row) -> Dict[str, Any]:
     }
 
 
+@db_write
 def create_clan_application(
     guild_id: int, channel_id: int, user_id: int, locale: str
 ) -> int:
     now_str = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        """
-        INSERT INTO clan_applications (
-            guild_id, channel_id, user_id,
-            roblox_nick, hours_per_day, rebirths,
-            locale, status, created_at, decided_at,
-            last_message_at, last_message_by_bot, last_ping_at, deleted
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            """
+            INSERT INTO clan_applications (
+                guild_id, channel_id, user_id,
+                roblox_nick, hours_per_day, rebirths,
+                locale, status, created_at, decided_at,
+                last_message_at, last_message_by_bot, last_ping_at, deleted
+            )
+            VALUES (?, ?, ?, NULL, NULL, NULL, ?, 'open', ?, NULL, ?, 0, NULL, 0)
+            """,
+            (guild_id, channel_id, user_id, locale, now_str, now_str),
         )
-        VALUES (?, ?, ?, NULL, NULL, NULL, ?, 'open', ?, NULL, ?, 0, NULL, 0)
-        """,
-        (guild_id, channel_id, user_id, locale, now_str, now_str),
-    )
-    conn.commit()
-    app_id = c.lastrowid
-    conn.close()
+        app_id = c.lastrowid
     return int(app_id)
 
 
+@db_query
 def get_open_application_by_user(guild_id: int, user_id: int) -> Optional[Dict[str, Any]]:
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        """
-        SELECT id, guild_id, channel_id, user_id,
-               roblox_nick, hours_per_day, rebirths, locale,
-               status, created_at, decided_at, last_message_at,
-               last_message_by_bot, last_ping_at, deleted
-        FROM clan_applications
-        WHERE guild_id = ? AND user_id = ? AND status = 'open' AND deleted = 0
-        ORDER BY created_at DESC
-        LIMIT 1
-        """,
-        (guild_id, user_id),
-    )
-    row = c.fetchone()
-    conn.close()
+    with read_connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            """
+            SELECT id, guild_id, channel_id, user_id,
+                   roblox_nick, hours_per_day, rebirths, locale,
+                   status, created_at, decided_at, last_message_at,
+                   last_message_by_bot, last_ping_at, deleted
+            FROM clan_applications
+            WHERE guild_id = ? AND user_id = ? AND status = 'open' AND deleted = 0
+            ORDER BY created_at DESC
+            LIMIT 1
+            """,
+            (guild_id, user_id),
+        )
+        row = c.fetchone()
     if row is None:
         return None
     return _row_to_clan_application(row)
 
 
+@db_query
 def get_latest_clan_application_by_user(
     guild_id: int, user_id: int
 ) -> Optional[Dict[str, Any]]:
@@ -2958,161 +3731,180 @@ def get_latest_clan_application_by_user(
     Používá se při přemapování ticketů pro stávající členy.
     """
 
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        """
-        SELECT id, guild_id, channel_id, user_id,
-               roblox_nick, hours_per_day, rebirths, locale,
-               status, created_at, decided_at, last_message_at,
-               last_message_by_bot, last_ping_at, deleted
-        FROM clan_applications
-        WHERE guild_id = ? AND user_id = ? AND deleted = 0
-        ORDER BY created_at DESC
-        LIMIT 1
-        """,
-        (guild_id, user_id),
-    )
-    row = c.fetchone()
-    conn.close()
+    with read_connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            """
+            SELECT id, guild_id, channel_id, user_id,
+                   roblox_nick, hours_per_day, rebirths, locale,
+                   status, created_at, decided_at, last_message_at,
+                   last_message_by_bot, last_ping_at, deleted
+            FROM clan_applications
+            WHERE guild_id = ? AND user_id = ? AND deleted = 0
+            ORDER BY created_at DESC
+            LIMIT 1
+            """,
+            (guild_id, user_id),
+        )
+        row = c.fetchone()
     if row is None:
         return None
     return _row_to_clan_application(row)
 
 
+@db_query
 def get_clan_applications_by_user(
     guild_id: int, user_id: int, include_deleted: bool = False
 ) -> list[Dict[str, Any]]:
     """Vrátí všechny přihlášky uživatele seřazené od nejnovější."""
 
-    conn = get_connection()
-    c = conn.cursor()
-    query = """
-        SELECT id, guild_id, channel_id, user_id,
-               roblox_nick, hours_per_day, rebirths, locale,
-               status, created_at, decided_at, last_message_at,
-               last_message_by_bot, last_ping_at, deleted
-        FROM clan_applications
-        WHERE guild_id = ? AND user_id = ?
-    """
-    params: list[Any] = [guild_id, user_id]
-    if not include_deleted:
-        query += " AND deleted = 0"
+    with read_connection() as conn:
+        c = conn.cursor()
+        query = """
+            SELECT id, guild_id, channel_id, user_id,
+                   roblox_nick, hours_per_day, rebirths, locale,
+                   status, created_at, decided_at, last_message_at,
+                   last_message_by_bot, last_ping_at, deleted
+            FROM clan_applications
+            WHERE guild_id = ? AND user_id = ?
+        """
+        params: list[Any] = [guild_id, user_id]
+        if not include_deleted:
+            query += " AND deleted = 0"
 
-    query += " ORDER BY created_at DESC"
+        query += " ORDER BY created_at DESC"
 
-    c.execute(query, params)
-    rows = c.fetchall()
-    conn.close()
+        c.execute(query, params)
+        rows = c.fetchall()
     return [_row_to_clan_application(row) for row in rows]
 
 
+_GET_CLAN_APPLICATION_BY_CHANNEL_SQL = register_hot_query(
+    "get_clan_application_by_channel",
+    """
+    SELECT id, guild_id, channel_id, user_id,
+           roblox_nick, hours_per_day, rebirths, locale,
+           status, created_at, decided_at, last_message_at,
+           last_message_by_bot, last_ping_at, deleted
+    FROM clan_applications
+    WHERE guild_id = ? AND channel_id = ? AND deleted = 0
+    ORDER BY created_at DESC
+    LIMIT 1
+    """,
+    (0, 0),
+)
+
+
+@db_query
 def get_clan_application_by_channel(
     guild_id: int, channel_id: int
 ) -> Optional[Dict[str, Any]]:
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        """
-        SELECT id, guild_id, channel_id, user_id,
-               roblox_nick, hours_per_day, rebirths, locale,
-               status, created_at, decided_at, last_message_at,
-               last_message_by_bot, last_ping_at, deleted
-        FROM clan_applications
-        WHERE guild_id = ? AND channel_id = ? AND deleted = 0
-        ORDER BY created_at DESC
-        LIMIT 1
-        """,
-        (guild_id, channel_id),
-    )
-    row = c.fetchone()
-    conn.close()
+    with read_connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            _GET_CLAN_APPLICATION_BY_CHANNEL_SQL,
+            (guild_id, channel_id),
+        )
+        row = c.fetchone()
     if row is None:
         return None
     return _row_to_clan_application(row)
 
 
+_LIST_OPEN_CLAN_APPLICATIONS_SQL = register_hot_query(
+    "list_open_clan_applications",
+    """
+    SELECT id, guild_id, channel_id, user_id,
+           roblox_nick, hours_per_day, rebirths, locale,
+           status, created_at, decided_at, last_message_at,
+           last_message_by_bot, last_ping_at, deleted
+    FROM clan_applications
+    WHERE guild_id = ? AND status = 'open' AND deleted = 0
+    ORDER BY created_at DESC
+    """,
+    (0,),
+)
+
+
+@db_query
 def list_open_clan_applications(guild_id: int) -> list[Dict[str, Any]]:
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        """
-        SELECT id, guild_id, channel_id, user_id,
-               roblox_nick, hours_per_day, rebirths, locale,
-               status, created_at, decided_at, last_message_at,
-               last_message_by_bot, last_ping_at, deleted
-        FROM clan_applications
-        WHERE guild_id = ? AND status = 'open' AND deleted = 0
-        ORDER BY created_at DESC
-        """,
-        (guild_id,),
-    )
-    rows = c.fetchall()
-    conn.close()
+    with read_connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            _LIST_OPEN_CLAN_APPLICATIONS_SQL,
+            (guild_id,),
+        )
+        rows = c.fetchall()
     return [_row_to_clan_application(row) for row in rows]
 
 
+_GET_OPEN_APPLICATION_BY_CHANNEL_SQL = register_hot_query(
+    "get_open_application_by_channel",
+    """
+    SELECT id, guild_id, channel_id, user_id,
+           roblox_nick, hours_per_day, rebirths, locale,
+           status, created_at, decided_at, last_message_at,
+           last_message_by_bot, last_ping_at, deleted
+    FROM clan_applications
+    WHERE channel_id = ? AND status = 'open' AND deleted = 0
+    ORDER BY created_at DESC
+    LIMIT 1
+    """,
+    (0,),
+)
+
+
+@db_query
 def get_open_application_by_channel(channel_id: int) -> Optional[Dict[str, Any]]:
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        """
-        SELECT id, guild_id, channel_id, user_id,
-               roblox_nick, hours_per_day, rebirths, locale,
-               status, created_at, decided_at, last_message_at,
-               last_message_by_bot, last_ping_at, deleted
-        FROM clan_applications
-        WHERE channel_id = ? AND status = 'open' AND deleted = 0
-        ORDER BY created_at DESC
-        LIMIT 1
-        """,
-        (channel_id,),
-    )
-    row = c.fetchone()
-    conn.close()
+    with read_connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            _GET_OPEN_APPLICATION_BY_CHANNEL_SQL,
+            (channel_id,),
+        )
+        row = c.fetchone()
     if row is None:
         return None
     return _row_to_clan_application(row)
 
 
+@db_write
 def update_clan_application_form(
     app_id: int,
     roblox_nick: str,
     hours_per_day: str,
     rebirths: str,
 ):
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        """
-        UPDATE clan_applications
-        SET roblox_nick = ?, hours_per_day = ?, rebirths = ?
-        WHERE id = ?
-        """,
-        (roblox_nick, hours_per_day, rebirths, app_id),
-    )
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            """
+            UPDATE clan_applications
+            SET roblox_nick = ?, hours_per_day = ?, rebirths = ?
+            WHERE id = ?
+            """,
+            (roblox_nick, hours_per_day, rebirths, app_id),
+        )
 
 
+@db_write
 def set_clan_application_status(app_id: int, status: str, decided_at: Optional[datetime] = None):
     if decided_at is None:
         decided_at = datetime.utcnow()
     decided_str = decided_at.strftime("%Y-%m-%d %H:%M:%S")
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        """
-        UPDATE clan_applications
-        SET status = ?, decided_at = ?
-        WHERE id = ?
-        """,
-        (status, decided_str, app_id),
-    )
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            """
+            UPDATE clan_applications
+            SET status = ?, decided_at = ?
+            WHERE id = ?
+            """,
+            (status, decided_str, app_id),
+        )
 
 
+@db_write
 def update_clan_application_last_message(
     app_id: int,
     message_at: Optional[datetime] = None,
@@ -3121,48 +3913,46 @@ def update_clan_application_last_message(
     if message_at is None:
         message_at = datetime.utcnow()
     message_str = message_at.strftime("%Y-%m-%d %H:%M:%S")
-    conn = get_connection()
-    c = conn.cursor()
-    if by_bot is None:
-        c.execute(
-            """
-            UPDATE clan_applications
-            SET last_message_at = ?
-            WHERE id = ?
-            """,
-            (message_str, app_id),
-        )
-    else:
-        c.execute(
-            """
-            UPDATE clan_applications
-            SET last_message_at = ?, last_message_by_bot = ?
-            WHERE id = ?
-            """,
-            (message_str, int(by_bot), app_id),
-        )
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        c = conn.cursor()
+        if by_bot is None:
+            c.execute(
+                """
+                UPDATE clan_applications
+                SET last_message_at = ?
+                WHERE id = ?
+                """,
+                (message_str, app_id),
+            )
+        else:
+            c.execute(
+                """
+                UPDATE clan_applications
+                SET last_message_at = ?, last_message_by_bot = ?
+                WHERE id = ?
+                """,
+                (message_str, int(by_bot), app_id),
+            )
 
 
+@db_write
 def update_clan_application_last_ping(app_id: int, pinged_at: Optional[datetime] = None):
     if pinged_at is None:
         pinged_at = datetime.utcnow()
     pinged_str = pinged_at.strftime("%Y-%m-%d %H:%M:%S")
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        """
-        UPDATE clan_applications
-        SET last_ping_at = ?
-        WHERE id = ?
-        """,
-        (pinged_str, app_id),
-    )
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            """
+            UPDATE clan_applications
+            SET last_ping_at = ?
+            WHERE id = ?
+            """,
+            (pinged_str, app_id),
+        )
 
 
+@db_query
 def get_clan_applications_for_cleanup(
     age_minutes: int = CLAN_TICKET_CLEANUP_MINUTES,
 ) -> List[Dict[str, Any]]:
@@ -3172,38 +3962,37 @@ def get_clan_applications_for_cleanup(
     """
     cutoff = datetime.utcnow() - timedelta(minutes=age_minutes)
     cutoff_str = cutoff.strftime("%Y-%m-%d %H:%M:%S")
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        """
-        SELECT id, guild_id, channel_id, user_id,
-               roblox_nick, hours_per_day, rebirths, locale,
-               status, created_at, decided_at, last_message_at,
-               last_message_by_bot, last_ping_at, deleted
-        FROM clan_applications
-        WHERE deleted = 0
-          AND status IN ('accepted', 'rejected')
-          AND decided_at IS NOT NULL
-          AND decided_at <= ?
-        """,
-        (cutoff_str,),
-    )
-    rows = c.fetchall()
-    conn.close()
+    with read_connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            """
+            SELECT id, guild_id, channel_id, user_id,
+                   roblox_nick, hours_per_day, rebirths, locale,
+                   status, created_at, decided_at, last_message_at,
+                   last_message_by_bot, last_ping_at, deleted
+            FROM clan_applications
+            WHERE deleted = 0
+              AND status IN ('accepted', 'rejected')
+              AND decided_at IS NOT NULL
+              AND decided_at <= ?
+            """,
+            (cutoff_str,),
+        )
+        rows = c.fetchall()
     return [_row_to_clan_application(r) for r in rows]
 
 
+@db_write
 def mark_clan_application_deleted(app_id: int):
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        "UPDATE clan_applications SET deleted = 1 WHERE id = ?",
-        (app_id,),
-    )
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            "UPDATE clan_applications SET deleted = 1 WHERE id = ?",
+            (app_id,),
+        )
 
 
+@db_write
 def record_officer_action(
     guild_id: int,
     officer_id: int,
@@ -3216,42 +4005,41 @@ def record_officer_action(
         return
 
     timestamp = (happened_at or datetime.utcnow()).strftime("%Y-%m-%d %H:%M:%S")
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        """
-        INSERT INTO officer_action_stats (
-            guild_id,
-            officer_id,
-            action_type,
-            target_user_id,
-            created_at
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            """
+            INSERT INTO officer_action_stats (
+                guild_id,
+                officer_id,
+                action_type,
+                target_user_id,
+                created_at
+            )
+            VALUES (?, ?, ?, ?, ?)
+            """,
+            (int(guild_id), int(officer_id), action, target_user_id, timestamp),
         )
-        VALUES (?, ?, ?, ?, ?)
-        """,
-        (int(guild_id), int(officer_id), action, target_user_id, timestamp),
-    )
-    conn.commit()
-    conn.close()
 
 
+@db_query
 def get_officer_action_stats(guild_id: int, officer_id: int) -> Dict[str, int]:
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        """
-        SELECT action_type, COUNT(*)
-        FROM officer_action_stats
-        WHERE guild_id = ? AND officer_id = ?
-        GROUP BY action_type
-        """,
-        (int(guild_id), int(officer_id)),
-    )
-    rows = c.fetchall()
-    conn.close()
+    with read_connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            """
+            SELECT action_type, COUNT(*)
+            FROM officer_action_stats
+            WHERE guild_id = ? AND officer_id = ?
+            GROUP BY action_type
+            """,
+            (int(guild_id), int(officer_id)),
+        )
+        rows = c.fetchall()
     return {str(action): int(count) for action, count in rows}
 
 
+@db_write
 def save_clan_ticket_vacation(
     guild_id: int,
     channel_id: int,
@@ -3265,53 +4053,51 @@ def save_clan_ticket_vacation(
     moved_at = moved_at or datetime.utcnow()
     moved_at_str = moved_at.strftime("%Y-%m-%d %H:%M:%S")
     removed_role_ids_json = json.dumps(removed_role_ids)
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        """
-        INSERT INTO clan_ticket_vacations (
-            channel_id, guild_id, user_id, clan_key, prev_category_id,
-            removed_role_ids_json, vacation_role_id, moved_at
-        )
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        ON CONFLICT(channel_id) DO UPDATE SET
-            guild_id = excluded.guild_id,
-            user_id = excluded.user_id,
-            clan_key = excluded.clan_key,
-            prev_category_id = excluded.prev_category_id,
-            removed_role_ids_json = excluded.removed_role_ids_json,
-            vacation_role_id = excluded.vacation_role_id,
-            moved_at = excluded.moved_at
-        """,
-        (
-            channel_id,
-            guild_id,
-            user_id,
-            clan_key,
-            prev_category_id,
-            removed_role_ids_json,
-            vacation_role_id,
-            moved_at_str,
-        ),
-    )
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            """
+            INSERT INTO clan_ticket_vacations (
+                channel_id, guild_id, user_id, clan_key, prev_category_id,
+                removed_role_ids_json, vacation_role_id, moved_at
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(channel_id) DO UPDATE SET
+                guild_id = excluded.guild_id,
+                user_id = excluded.user_id,
+                clan_key = excluded.clan_key,
+                prev_category_id = excluded.prev_category_id,
+                removed_role_ids_json = excluded.removed_role_ids_json,
+                vacation_role_id = excluded.vacation_role_id,
+                moved_at = excluded.moved_at
+            """,
+            (
+                channel_id,
+                guild_id,
+                user_id,
+                clan_key,
+                prev_category_id,
+                removed_role_ids_json,
+                vacation_role_id,
+                moved_at_str,
+            ),
+        )
 
 
+@db_query
 def get_clan_ticket_vacation(channel_id: int) -> Optional[Dict[str, Any]]:
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        """
-        SELECT channel_id, guild_id, user_id, clan_key, prev_category_id,
-               removed_role_ids_json, vacation_role_id, moved_at
-        FROM clan_ticket_vacations
-        WHERE channel_id = ?
-        """,
-        (channel_id,),
-    )
-    row = c.fetchone()
-    conn.close()
+    with read_connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            """
+            SELECT channel_id, guild_id, user_id, clan_key, prev_category_id,
+                   removed_role_ids_json, vacation_role_id, moved_at
+            FROM clan_ticket_vacations
+            WHERE channel_id = ?
+            """,
+            (channel_id,),
+        )
+        row = c.fetchone()
     if not row:
         return None
     removed_role_ids_json = row[5] or "[]"
@@ -3331,180 +4117,183 @@ def get_clan_ticket_vacation(channel_id: int) -> Optional[Dict[str, Any]]:
     }
 
 
+@db_write
 def delete_clan_ticket_vacation(channel_id: int):
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute("DELETE FROM clan_ticket_vacations WHERE channel_id = ?", (channel_id,))
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute("DELETE FROM clan_ticket_vacations WHERE channel_id = ?", (channel_id,))
 
 
+@db_query
 def get_ticket_last_rename(channel_id: int) -> Optional[int]:
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        """
-        SELECT last_rename_ts
-        FROM clan_ticket_rename_cooldowns
-        WHERE channel_id = ?
-        """,
-        (channel_id,),
-    )
-    row = c.fetchone()
-    conn.close()
+    with read_connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            """
+            SELECT last_rename_ts
+            FROM clan_ticket_rename_cooldowns
+            WHERE channel_id = ?
+            """,
+            (channel_id,),
+        )
+        row = c.fetchone()
     if row:
         return int(row[0])
     return None
 
 
+@db_write
 def set_ticket_last_rename(channel_id: int, ts: int) -> None:
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        """
-        INSERT INTO clan_ticket_rename_cooldowns (channel_id, last_rename_ts)
-        VALUES (?, ?)
-        ON CONFLICT(channel_id)
-        DO UPDATE SET last_rename_ts = excluded.last_rename_ts
-        """,
-        (channel_id, int(ts)),
-    )
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            """
+            INSERT INTO clan_ticket_rename_cooldowns (channel_id, last_rename_ts)
+            VALUES (?, ?)
+            ON CONFLICT(channel_id)
+            DO UPDATE SET last_rename_ts = excluded.last_rename_ts
+            """,
+            (channel_id, int(ts)),
+        )
 
 
+@db_write
 def clear_ticket_last_rename(channel_id: int) -> None:
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        "DELETE FROM clan_ticket_rename_cooldowns WHERE channel_id = ?",
-        (channel_id,),
-    )
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            "DELETE FROM clan_ticket_rename_cooldowns WHERE channel_id = ?",
+            (channel_id,),
+        )
 
 
+@db_query
 def get_ticket_last_move(channel_id: int) -> Optional[int]:
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        """
-        SELECT last_move_ts
-        FROM clan_ticket_move_cooldowns
-        WHERE channel_id = ?
-        """,
-        (channel_id,),
-    )
-    row = c.fetchone()
-    conn.close()
+    with read_connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            """
+            SELECT last_move_ts
+            FROM clan_ticket_move_cooldowns
+            WHERE channel_id = ?
+            """,
+            (channel_id,),
+        )
+        row = c.fetchone()
     if row:
         return int(row[0])
     return None
 
 
+@db_write
 def set_ticket_last_move(channel_id: int, ts: int) -> None:
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        """
-        INSERT INTO clan_ticket_move_cooldowns (channel_id, last_move_ts)
-        VALUES (?, ?)
-        ON CONFLICT(channel_id)
-        DO UPDATE SET last_move_ts = excluded.last_move_ts
-        """,
-        (channel_id, int(ts)),
-    )
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            """
+            INSERT INTO clan_ticket_move_cooldowns (channel_id, last_move_ts)
+            VALUES (?, ?)
+            ON CONFLICT(channel_id)
+            DO UPDATE SET last_move_ts = excluded.last_move_ts
+            """,
+            (channel_id, int(ts)),
+        )
 
 
+@db_write
 def clear_ticket_last_move(channel_id: int) -> None:
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        "DELETE FROM clan_ticket_move_cooldowns WHERE channel_id = ?",
-        (channel_id,),
-    )
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            "DELETE FROM clan_ticket_move_cooldowns WHERE channel_id = ?",
+            (channel_id,),
+        )
 
 
+@db_query
 def get_clan_ticket_category_base_name(guild_id: int, category_id: int) -> Optional[str]:
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        """
-        SELECT base_name
-        FROM clan_ticket_category_labels
-        WHERE guild_id = ? AND category_id = ?
-        """,
-        (guild_id, category_id),
-    )
-    row = c.fetchone()
-    conn.close()
+    with read_connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            """
+            SELECT base_name
+            FROM clan_ticket_category_labels
+            WHERE guild_id = ? AND category_id = ?
+            """,
+            (guild_id, category_id),
+        )
+        row = c.fetchone()
     if row:
         return row[0]
     return None
 
 
+@db_write
 def set_clan_ticket_category_base_name(guild_id: int, category_id: int, base_name: str) -> None:
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        """
-        INSERT INTO clan_ticket_category_labels (guild_id, category_id, base_name)
-        VALUES (?, ?, ?)
-        ON CONFLICT(guild_id, category_id)
-        DO UPDATE SET base_name = excluded.base_name
-        """,
-        (guild_id, category_id, base_name),
-    )
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            """
+            INSERT INTO clan_ticket_category_labels (guild_id, category_id, base_name)
+            VALUES (?, ?, ?)
+            ON CONFLICT(guild_id, category_id)
+            DO UPDATE SET base_name = excluded.base_name
+            """,
+            (guild_id, category_id, base_name),
+        )
 
 
+@db_write
 def enqueue_discord_write(operation: str, payload: Dict[str, Any], priority: int = 10) -> int:
-    conn = get_connection()
-    c = conn.cursor()
-    now = datetime.utcnow().isoformat()
-    payload_json = json.dumps(payload, ensure_ascii=False)
-    c.execute(
-        """
-        INSERT INTO discord_write_queue (
-            operation,
-            payload,
-            priority,
-            attempts,
-            next_retry_at,
-            status,
-            created_at,
-            updated_at
+    with connection() as conn:
+        c = conn.cursor()
+        now = datetime.utcnow().isoformat()
+        payload_json = json.dumps(payload, ensure_ascii=False)
+        c.execute(
+            """
+            INSERT INTO discord_write_queue (
+                operation,
+                payload,
+                priority,
+                attempts,
+                next_retry_at,
+                status,
+                created_at,
+                updated_at
+            )
+            VALUES (?, ?, ?, 0, NULL, 'pending', ?, ?)
+            """,
+            (operation, payload_json, priority, now, now),
         )
-        VALUES (?, ?, ?, 0, NULL, 'pending', ?, ?)
-        """,
-        (operation, payload_json, priority, now, now),
-    )
-    conn.commit()
-    row_id = c.lastrowid
-    conn.close()
+        row_id = c.lastrowid
     return int(row_id)
 
 
-def fetch_pending_discord_writes(limit: int = 100) -> List[Dict[str, Any]]:
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        """
-        SELECT id, operation, payload, priority, attempts, next_retry_at
-        FROM discord_write_queue
-        WHERE status = 'pending'
-        ORDER BY id ASC
-        LIMIT ?
-        """,
-        (limit,),
-    )
-    rows = c.fetchall()
-    conn.close()
+_FETCH_PENDING_DISCORD_WRITES_SQL = register_hot_query(
+    "fetch_pending_discord_writes",
+    """
+    SELECT id, operation, payload, priority, attempts, next_retry_at
+    FROM discord_write_queue
+    WHERE status = 'pending' AND id > ? AND id <= ?
+    ORDER BY id ASC
+    LIMIT ?
+    """,
+    (0, 1_000_000, 100),
+)
+
+
+@db_query
+def fetch_pending_discord_writes(
+    limit: int = 100, after_id: int = 0, max_id: int | None = None
+) -> List[Dict[str, Any]]:
+    """Stránka pending zápisů s id v (after_id, max_id] (keyset stránkování)."""
+    with read_connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            _FETCH_PENDING_DISCORD_WRITES_SQL,
+            (after_id, max_id if max_id is not None else 2**63 - 1, limit),
+        )
+        rows = c.fetchall()
     return [
         {
             "id": row[0],
@@ -3518,163 +4307,300 @@ def fetch_pending_discord_writes(limit: int = 100) -> List[Dict[str, Any]]:
     ]
 
 
+@db_query
+def count_pending_discord_writes() -> Dict[str, Any]:
+    with read_connection() as conn:
+        row = conn.execute(
+            """
+            SELECT COUNT(*), MAX(id), MIN(created_at)
+            FROM discord_write_queue
+            WHERE status = 'pending'
+            """
+        ).fetchone()
+    return {"count": int(row[0]), "max_id": row[1], "oldest_created_at": row[2]}
+
+
+@db_write
 def mark_discord_write_done(write_id: int):
-    conn = get_connection()
-    c = conn.cursor()
-    now = datetime.utcnow().isoformat()
-    c.execute(
-        """
-        UPDATE discord_write_queue
-        SET status = 'done', updated_at = ?, last_error = NULL
-        WHERE id = ?
-        """,
-        (now, write_id),
-    )
-    conn.commit()
-    conn.close()
+    # Dokončené zápisy se mažou, ve frontě zůstávají jen pending/failed/superseded.
+    with connection() as conn:
+        conn.execute("DELETE FROM discord_write_queue WHERE id = ?", (write_id,))
 
 
+@db_write
 def mark_discord_write_failed(write_id: int, error: str):
-    conn = get_connection()
-    c = conn.cursor()
-    now = datetime.utcnow().isoformat()
-    c.execute(
-        """
-        UPDATE discord_write_queue
-        SET status = 'failed', updated_at = ?, last_error = ?
-        WHERE id = ?
-        """,
-        (now, error, write_id),
-    )
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        c = conn.cursor()
+        now = datetime.utcnow().isoformat()
+        c.execute(
+            """
+            UPDATE discord_write_queue
+            SET status = 'failed', updated_at = ?, last_error = ?
+            WHERE id = ?
+            """,
+            (now, error, write_id),
+        )
+
+
+@db_write
+def mark_discord_write_superseded(write_id: int, superseded_by: int | None):
+    # Editace nahrazená novější editací téže zprávy (coalescing ve write frontě).
+    with connection() as conn:
+        c = conn.cursor()
+        now = datetime.utcnow().isoformat()
+        c.execute(
+            """
+            UPDATE discord_write_queue
+            SET status = 'superseded', updated_at = ?, last_error = ?
+            WHERE id = ? AND status = 'pending'
+            """,
+            (
+                now,
+                f"superseded_by={superseded_by}" if superseded_by is not None else None,
+                write_id,
+            ),
+        )
 
 
+@db_write
 def mark_discord_write_retry(write_id: int, attempts: int, next_retry_at: str | None):
-    conn = get_connection()
-    c = conn.cursor()
-    now = datetime.utcnow().isoformat()
-    c.execute(
-        """
-        UPDATE discord_write_queue
-        SET attempts = ?, next_retry_at = ?, updated_at = ?
-        WHERE id = ?
-        """,
-        (attempts, next_retry_at, now, write_id),
-    )
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        c = conn.cursor()
+        now = datetime.utcnow().isoformat()
+        c.execute(
+            """
+            UPDATE discord_write_queue
+            SET attempts = ?, next_retry_at = ?, updated_at = ?
+            WHERE id = ?
+            """,
+            (attempts, next_retry_at, now, write_id),
+        )
+
+
+@db_write
+def apply_discord_write_journal(batch: Dict[str, Any]) -> List[int]:
+    """Zapíše dávku bookkeepingu write fronty v jedné transakci.
+
+    Vrací id nově zařazených zápisů ve stejném pořadí jako `batch["enqueue"]`.
+    """
+    ids: List[int] = []
+    with connection() as conn:
+        c = conn.cursor()
+        now = datetime.utcnow().isoformat()
+        for operation, payload, priority in batch.get("enqueue", ()):
+            c.execute(
+                """
+                INSERT INTO discord_write_queue (
+                    operation, payload, priority, attempts, next_retry_at,
+                    status, created_at, updated_at
+                )
+                VALUES (?, ?, ?, 0, NULL, 'pending', ?, ?)
+                """,
+                (operation, json.dumps(payload, ensure_ascii=False), priority, now, now),
+            )
+            ids.append(int(c.lastrowid))
+        payloads = [
+            (json.dumps(payload, ensure_ascii=False), now, write_id)
+            for write_id, payload in batch.get("payloads", {}).items()
+        ]
+        if payloads:
+            # Sloučené kwargs editace, která převzala starší (coalescing).
+            c.executemany(
+                """
+                UPDATE discord_write_queue
+                SET payload = ?, updated_at = ?
+                WHERE id = ? AND status = 'pending'
+                """,
+                payloads,
+            )
+        done, failed, retries, superseded = [], [], [], []
+        for write_id, transition in batch.get("transitions", {}).items():
+            kind = transition[0]
+            if kind == "done":
+                done.append((write_id,))
+            elif kind == "failed":
+                failed.append((now, transition[1], write_id))
+            elif kind == "retry":
+                retries.append((transition[1], transition[2], now, write_id))
+            elif kind == "superseded":
+                note = f"superseded_by={transition[1]}" if transition[1] is not None else None
+                superseded.append((now, note, write_id))
+        if done:
+            c.executemany("DELETE FROM discord_write_queue WHERE id = ?", done)
+        if failed:
+            c.executemany(
+                """
+                UPDATE discord_write_queue
+                SET status = 'failed', updated_at = ?, last_error = ?
+                WHERE id = ?
+                """,
+                failed,
+            )
+        if retries:
+            c.executemany(
+                """
+                UPDATE discord_write_queue
+                SET attempts = ?, next_retry_at = ?, updated_at = ?
+                WHERE id = ?
+                """,
+                retries,
+            )
+        if superseded:
+            c.executemany(
+                """
+                UPDATE discord_write_queue
+                SET status = 'superseded', updated_at = ?, last_error = ?
+                WHERE id = ? AND status = 'pending'
+                """,
+                superseded,
+            )
+        buckets = batch.get("buckets", {})
+        upserts = [(key, until) for key, until in buckets.items() if until is not None]
+        deletes = [(key,) for key, until in buckets.items() if until is None]
+        if upserts:
+            c.executemany(
+                """
+                INSERT INTO discord_rate_limit_buckets (bucket_key, blocked_until)
+                VALUES (?, ?)
+                ON CONFLICT(bucket_key)
+                DO UPDATE SET blocked_until = excluded.blocked_until
+                """,
+                upserts,
+            )
+        if deletes:
+            c.executemany(
+                "DELETE FROM discord_rate_limit_buckets WHERE bucket_key = ?", deletes
+            )
+        bucket_map = batch.get("bucket_map", {})
+        if bucket_map:
+            c.executemany(
+                """
+                INSERT INTO discord_rate_limit_bucket_map (bucket_key, bucket_id)
+                VALUES (?, ?)
+                ON CONFLICT(bucket_key)
+                DO UPDATE SET bucket_id = excluded.bucket_id
+                """,
+                list(bucket_map.items()),
+            )
+        state = batch.get("state", {})
+        if state:
+            c.execute(
+                "INSERT OR IGNORE INTO discord_write_state (id, blocked_until, last_write_at) "
+                "VALUES (1, NULL, NULL)"
+            )
+            columns = [column for column in ("blocked_until", "last_write_at") if column in state]
+            c.execute(
+                f"UPDATE discord_write_state SET {', '.join(f'{column} = ?' for column in columns)} "
+                "WHERE id = 1",
+                tuple(state[column] for column in columns),
+            )
+    return ids
 
 
+@db_write
 def clear_pending_discord_writes() -> int:
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute("SELECT COUNT(*) FROM discord_write_queue WHERE status = 'pending'")
-    count = c.fetchone()[0]
-    c.execute("DELETE FROM discord_write_queue WHERE status = 'pending'")
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute("SELECT COUNT(*) FROM discord_write_queue WHERE status = 'pending'")
+        count = c.fetchone()[0]
+        c.execute("DELETE FROM discord_write_queue WHERE status = 'pending'")
     return int(count)
 
 
+@db_query
 def fetch_discord_rate_limit_buckets(min_blocked_until: float) -> Dict[str, float]:
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        """
-        SELECT bucket_key, blocked_until
-        FROM discord_rate_limit_buckets
-        WHERE blocked_until > ?
-        """,
-        (min_blocked_until,),
-    )
-    rows = c.fetchall()
-    conn.close()
+    with read_connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            """
+            SELECT bucket_key, blocked_until
+            FROM discord_rate_limit_buckets
+            WHERE blocked_until > ?
+            """,
+            (min_blocked_until,),
+        )
+        rows = c.fetchall()
     return {str(row[0]): float(row[1]) for row in rows}
 
 
+@db_write
 def upsert_discord_rate_limit_bucket(bucket_key: str, blocked_until: float) -> None:
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        """
-        INSERT INTO discord_rate_limit_buckets (bucket_key, blocked_until)
-        VALUES (?, ?)
-        ON CONFLICT(bucket_key)
-        DO UPDATE SET blocked_until = excluded.blocked_until
-        """,
-        (bucket_key, blocked_until),
-    )
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            """
+            INSERT INTO discord_rate_limit_buckets (bucket_key, blocked_until)
+            VALUES (?, ?)
+            ON CONFLICT(bucket_key)
+            DO UPDATE SET blocked_until = excluded.blocked_until
+            """,
+            (bucket_key, blocked_until),
+        )
 
 
+@db_write
 def delete_discord_rate_limit_bucket(bucket_key: str) -> None:
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        "DELETE FROM discord_rate_limit_buckets WHERE bucket_key = ?",
-        (bucket_key,),
-    )
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            "DELETE FROM discord_rate_limit_buckets WHERE bucket_key = ?",
+            (bucket_key,),
+        )
 
 
+@db_write
 def prune_discord_rate_limit_buckets(cutoff: float) -> int:
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        "DELETE FROM discord_rate_limit_buckets WHERE blocked_until <= ?",
-        (cutoff,),
-    )
-    deleted = c.rowcount
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            "DELETE FROM discord_rate_limit_buckets WHERE blocked_until <= ?",
+            (cutoff,),
+        )
+        deleted = c.rowcount
     return int(deleted)
 
 
+@db_query
 def fetch_discord_rate_limit_bucket_map() -> Dict[str, str]:
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        """
-        SELECT bucket_key, bucket_id
-        FROM discord_rate_limit_bucket_map
-        """
-    )
-    rows = c.fetchall()
-    conn.close()
+    with read_connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            """
+            SELECT bucket_key, bucket_id
+            FROM discord_rate_limit_bucket_map
+            """
+        )
+        rows = c.fetchall()
     return {str(row[0]): str(row[1]) for row in rows}
 
 
+@db_write
 def upsert_discord_rate_limit_bucket_map(bucket_key: str, bucket_id: str) -> None:
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        """
-        INSERT INTO discord_rate_limit_bucket_map (bucket_key, bucket_id)
-        VALUES (?, ?)
-        ON CONFLICT(bucket_key)
-        DO UPDATE SET bucket_id = excluded.bucket_id
-        """,
-        (bucket_key, bucket_id),
-    )
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            """
+            INSERT INTO discord_rate_limit_bucket_map (bucket_key, bucket_id)
+            VALUES (?, ?)
+            ON CONFLICT(bucket_key)
+            DO UPDATE SET bucket_id = excluded.bucket_id
+            """,
+            (bucket_key, bucket_id),
+        )
 
 
+@db_query
 def fetch_discord_write_state() -> Dict[str, float | None]:
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        """
-        SELECT blocked_until, last_write_at
-        FROM discord_write_state
-        WHERE id = 1
-        """
-    )
-    row = c.fetchone()
-    conn.close()
+    with read_connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            """
+            SELECT blocked_until, last_write_at
+            FROM discord_write_state
+            WHERE id = 1
+            """
+        )
+        row = c.fetchone()
     if not row:
         return {"blocked_until": None, "last_write_at": None}
     blocked_until = float(row[0]) if row[0] is not None else None
@@ -3682,68 +4608,65 @@ def fetch_discord_write_state() -> Dict[str, float | None]:
     return {"blocked_until": blocked_until, "last_write_at": last_write_at}
 
 
+@db_write
 def update_discord_write_blocked_until(blocked_until: float | None) -> None:
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        """
-        INSERT INTO discord_write_state (id, blocked_until, last_write_at)
-        VALUES (1, ?, NULL)
-        ON CONFLICT(id)
-        DO UPDATE SET blocked_until = excluded.blocked_until
-        """,
-        (blocked_until,),
-    )
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            """
+            INSERT INTO discord_write_state (id, blocked_until, last_write_at)
+            VALUES (1, ?, NULL)
+            ON CONFLICT(id)
+            DO UPDATE SET blocked_until = excluded.blocked_until
+            """,
+            (blocked_until,),
+        )
 
 
+@db_write
 def update_discord_write_last_write_at(last_write_at: float | None) -> None:
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        """
-        INSERT INTO discord_write_state (id, blocked_until, last_write_at)
-        VALUES (1, NULL, ?)
-        ON CONFLICT(id)
-        DO UPDATE SET last_write_at = excluded.last_write_at
-        """,
-        (last_write_at,),
-    )
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            """
+            INSERT INTO discord_write_state (id, blocked_until, last_write_at)
+            VALUES (1, NULL, ?)
+            ON CONFLICT(id)
+            DO UPDATE SET last_write_at = excluded.last_write_at
+            """,
+            (last_write_at,),
+        )
 
 
+@db_write
 def add_windows_notification(payload: Dict[str, Any]) -> None:
-    conn = get_connection()
-    c = conn.cursor()
-    created_at = datetime.utcnow().isoformat()
-    payload_json = json.dumps(payload, ensure_ascii=False)
-    c.execute(
-        """
-        INSERT INTO windows_notifications (payload, created_at)
-        VALUES (?, ?)
-        """,
-        (payload_json, created_at),
-    )
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        c = conn.cursor()
+        created_at = datetime.utcnow().isoformat()
+        payload_json = json.dumps(payload, ensure_ascii=False)
+        c.execute(
+            """
+            INSERT INTO windows_notifications (payload, created_at)
+            VALUES (?, ?)
+            """,
+            (payload_json, created_at),
+        )
 
 
+@db_query
 def get_windows_notifications(limit: int = 50) -> List[Dict[str, Any]]:
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        """
-        SELECT id, payload, created_at
-        FROM windows_notifications
-        ORDER BY id ASC
-        LIMIT ?
-        """,
-        (limit,),
-    )
-    rows = c.fetchall()
-    conn.close()
+    with read_connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            """
+            SELECT id, payload, created_at
+            FROM windows_notifications
+            ORDER BY id ASC
+            LIMIT ?
+            """,
+            (limit,),
+        )
+        rows = c.fetchall()
     notifications: List[Dict[str, Any]] = []
     for row in rows:
         payload_raw = row[1]
@@ -3757,20 +4680,20 @@ def get_windows_notifications(limit: int = 50) -> List[Dict[str, Any]]:
     return notifications
 
 
+@db_write
 def delete_windows_notifications(notification_ids: List[int]) -> None:
     if not notification_ids:
         return
-    conn = get_connection()
-    c = conn.cursor()
-    placeholders = ",".join("?" for _ in notification_ids)
-    c.execute(
-        f"DELETE FROM windows_notifications WHERE id IN ({placeholders})",
-        tuple(notification_ids),
-    )
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        c = conn.cursor()
+        placeholders = ",".join("?" for _ in notification_ids)
+        c.execute(
+            f"DELETE FROM windows_notifications WHERE id IN ({placeholders})",
+            tuple(notification_ids),
+        )
 
 
+@db_write
 def create_sz_message(
     guild_id: int,
     sender_id: int,
@@ -3778,34 +4701,32 @@ def create_sz_message(
     content: str,
     created_at: str,
 ) -> int:
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        """
-        INSERT INTO private_messages (guild_id, sender_id, recipient_id, content, created_at)
-        VALUES (?, ?, ?, ?, ?)
-        """,
-        (int(guild_id), int(sender_id), int(recipient_id), str(content), str(created_at)),
-    )
-    message_id = int(c.lastrowid)
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            """
+            INSERT INTO private_messages (guild_id, sender_id, recipient_id, content, created_at)
+            VALUES (?, ?, ?, ?, ?)
+            """,
+            (int(guild_id), int(sender_id), int(recipient_id), str(content), str(created_at)),
+        )
+        message_id = int(c.lastrowid)
     return message_id
 
 
+@db_query
 def get_sz_message(message_id: int) -> Dict[str, Any] | None:
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        """
-        SELECT id, guild_id, sender_id, recipient_id, content, created_at
-        FROM private_messages
-        WHERE id = ?
-        """,
-        (int(message_id),),
-    )
-    row = c.fetchone()
-    conn.close()
+    with read_connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            """
+            SELECT id, guild_id, sender_id, recipient_id, content, created_at
+            FROM private_messages
+            WHERE id = ?
+            """,
+            (int(message_id),),
+        )
+        row = c.fetchone()
     if not row:
         return None
     return {
@@ -3818,63 +4739,434 @@ def get_sz_message(message_id: int) -> Dict[str, Any] | None:
     }
 
 
+@db_query
 def list_unread_sz_message_ids(limit: int = 2000) -> List[int]:
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        """
-        SELECT id
-        FROM private_messages
-        ORDER BY id DESC
-        LIMIT ?
-        """,
-        (int(limit),),
-    )
-    rows = c.fetchall()
-    conn.close()
+    with read_connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            """
+            SELECT id
+            FROM private_messages
+            ORDER BY id DESC
+            LIMIT ?
+            """,
+            (int(limit),),
+        )
+        rows = c.fetchall()
     return [int(row[0]) for row in rows]
 
 
+@db_write
 def add_sz_reader_role(guild_id: int, role_id: int) -> None:
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        """
-        INSERT OR IGNORE INTO guild_sz_reader_roles (guild_id, role_id)
-        VALUES (?, ?)
-        """,
-        (int(guild_id), int(role_id)),
-    )
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            """
+            INSERT OR IGNORE INTO guild_sz_reader_roles (guild_id, role_id)
+            VALUES (?, ?)
+            """,
+            (int(guild_id), int(role_id)),
+        )
 
 
+@db_write
 def remove_sz_reader_role(guild_id: int, role_id: int) -> None:
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        """
-        DELETE FROM guild_sz_reader_roles
-        WHERE guild_id = ? AND role_id = ?
-        """,
-        (int(guild_id), int(role_id)),
-    )
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            """
+            DELETE FROM guild_sz_reader_roles
+            WHERE guild_id = ? AND role_id = ?
+            """,
+            (int(guild_id), int(role_id)),
+        )
 
 
+@db_query
 def list_sz_reader_roles(guild_id: int) -> List[int]:
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        """
-        SELECT role_id
-        FROM guild_sz_reader_roles
-        WHERE guild_id = ?
-        ORDER BY role_id ASC
-        """,
-        (int(guild_id),),
-    )
-    rows = c.fetchall()
-    conn.close()
+    with read_connection() as conn:
+        c = conn.cursor()
+        c.execute(
+            """
+            SELECT role_id
+            FROM guild_sz_reader_roles
+            WHERE guild_id = ?
+            ORDER BY role_id ASC
+            """,
+            (int(guild_id),),
+        )
+        rows = c.fetchall()
     return [int(row[0]) for row in rows]
+
+
+# ---------- RETENCE A ÚDRŽBA ----------
+
+# Tabulka -> (sloupec s časem vytvoření/poslední změny, podmínka pro mazání).
+RETENTION_TABLES: Dict[str, Tuple[str, str]] = {
+    "discord_write_queue": ("updated_at", "status IN ('done', 'failed', 'superseded')"),
+    "windows_notifications": ("created_at", "1 = 1"),
+    "secret_drop_events": ("occurred_at", "1 = 1"),
+    "prophecy_logs": ("created_at", "1 = 1"),
+    "secret_leaderboard_queue": ("created_at", "1 = 1"),
+}
+
+
+def _archive_rows(
+    conn: sqlite3.Connection, table: str, row_ids: List[int], archive_dir: str
+) -> None:
+    cursor = conn.execute(
+        f"SELECT * FROM {table} WHERE rowid IN ({','.join(['?'] * len(row_ids))})",
+        row_ids,
+    )
+    columns = [description[0] for description in cursor.description]
+    os.makedirs(archive_dir, exist_ok=True)
+    path = os.path.join(
+        archive_dir, f"{table}-{datetime.utcnow().strftime('%Y-%m')}.jsonl.gz"
+    )
+    # Append do gzipu vytvoří další member; gzip/zcat ho přečte jako jeden soubor.
+    with gzip.open(path, "at", encoding="utf-8") as handle:
+        for row in cursor:
+            handle.write(
+                json.dumps(dict(zip(columns, row)), ensure_ascii=False, default=str)
+                + "\n"
+            )
+
+
+@db_write
+def prune_table_batch(
+    table: str,
+    max_age_days: Optional[float] = None,
+    max_rows: Optional[int] = None,
+    batch_size: int = 500,
+    archive_dir: Optional[str] = None,
+) -> int:
+    """Smaže jednu dávku řádků po retenci, vrací počet smazaných řádků.
+
+    Nejdřív se maže podle stáří, potom nejstarší řádky nad limit `max_rows`.
+    Krátké transakce nechávají mezi dávkami prostor ostatním zápisům.
+    """
+    timestamp_column, condition = RETENTION_TABLES[table]
+    with connection() as conn:
+        row_ids: List[int] = []
+        if max_age_days is not None:
+            cutoff = (datetime.utcnow() - timedelta(days=float(max_age_days))).isoformat()
+            row_ids = [
+                int(row[0])
+                for row in conn.execute(
+                    f"""
+                    SELECT rowid FROM {table}
+                    WHERE {condition} AND {timestamp_column} < ?
+                    ORDER BY rowid ASC
+                    LIMIT ?
+                    """,
+                    (cutoff, int(batch_size)),
+                )
+            ]
+        if not row_ids and max_rows is not None:
+            row_ids = [
+                int(row[0])
+                for row in conn.execute(
+                    f"""
+                    SELECT rowid FROM {table}
+                    WHERE {condition}
+                    ORDER BY rowid DESC
+                    LIMIT ? OFFSET ?
+                    """,
+                    (int(batch_size), int(max_rows)),
+                )
+            ]
+        if not row_ids:
+            return 0
+        if archive_dir:
+            _archive_rows(conn, table, row_ids, archive_dir)
+        conn.execute(
+            f"DELETE FROM {table} WHERE rowid IN ({','.join(['?'] * len(row_ids))})",
+            row_ids,
+        )
+    return len(row_ids)
+
+
+@db_query
+def get_db_size_info() -> Dict[str, int]:
+    with read_connection() as conn:
+        page_size = int(conn.execute("PRAGMA page_size").fetchone()[0])
+        page_count = int(conn.execute("PRAGMA page_count").fetchone()[0])
+        freelist_count = int(conn.execute("PRAGMA freelist_count").fetchone()[0])
+        auto_vacuum = int(conn.execute("PRAGMA auto_vacuum").fetchone()[0])
+    wal_path = f"{connection_manager.db_path}-wal"
+    wal_bytes = os.path.getsize(wal_path) if os.path.exists(wal_path) else 0
+    return {
+        "page_size": page_size,
+        "page_count": page_count,
+        "freelist_count": freelist_count,
+        "auto_vacuum": auto_vacuum,
+        "db_bytes": page_size * page_count,
+        "free_bytes": page_size * freelist_count,
+        "wal_bytes": wal_bytes,
+    }
+
+
+@db_write
+def incremental_vacuum(max_pages: Optional[int] = None) -> Optional[int]:
+    """Vrátí volné stránky souboru systému, vrací počet uvolněných stránek.
+
+    Bez auto_vacuum=INCREMENTAL nedělá nic a vrací None; přepnutí je
+    samostatná akce (enable_incremental_auto_vacuum).
+    """
+    with connection() as conn:
+        if int(conn.execute("PRAGMA auto_vacuum").fetchone()[0]) != 2:
+            return None
+        freelist_before = int(conn.execute("PRAGMA freelist_count").fetchone()[0])
+        if max_pages is None:
+            conn.execute("PRAGMA incremental_vacuum").fetchall()
+        else:
+            conn.execute(f"PRAGMA incremental_vacuum({int(max_pages)})").fetchall()
+        freelist_after = int(conn.execute("PRAGMA freelist_count").fetchone()[0])
+    return max(0, freelist_before - freelist_after)
+
+
+@db_write
+def enable_incremental_auto_vacuum() -> bool:
+    """Přepne DB na auto_vacuum=INCREMENTAL plným VACUUM, False pokud už přepnutá je.
+
+    VACUUM přepíše celý soubor: po tu dobu stojí všechny zápisy a na disku je
+    potřeba zhruba dvojnásobek velikosti DB.
+    """
+    with connection() as conn:
+        if int(conn.execute("PRAGMA auto_vacuum").fetchone()[0]) == 2:
+            return False
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+    logger.info("DB přepnuta na auto_vacuum=INCREMENTAL (jednorázový VACUUM).")
+    return True
+
+
+@db_write
+def checkpoint_wal(mode: str = "TRUNCATE") -> Tuple[int, int, int]:
+    """Spustí WAL checkpoint; vrací (busy, stránky ve WAL, zapsané stránky)."""
+    if mode not in ("PASSIVE", "FULL", "RESTART", "TRUNCATE"):
+        raise ValueError(f"Neznámý režim checkpointu: {mode}")
+    with connection() as conn:
+        busy, log_pages, checkpointed = conn.execute(
+            f"PRAGMA wal_checkpoint({mode})"
+        ).fetchone()
+    return int(busy), int(log_pages), int(checkpointed)
+
+
+# ---------- METRIKY DOTAZŮ ----------
+#
+# Každá veřejná funkce, která sahá do DB, se na konci importu obalí měřením.
+# Vypnuté měření stojí jen jedno volání navíc a kontrolu příznaku.
+
+QUERY_HISTOGRAM_BOUNDS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000)
+_QUERY_SAMPLE_SIZE = 1024
+_SLOW_QUERY_MAX_STATEMENTS = 20
+_SQL_LITERAL_RE = re.compile(
+    r"'(?:[^']|'')*'|\bX'[0-9A-Fa-f]*'|\b\d+\.\d+\b|\b\d+\b"
+)
+
+
+def _sql_shape(sql: str) -> str:
+    """Nahradí literály z rozvinutého SQL jejich typem (?str, ?int, ...)."""
+
+    def _replace(match: "re.Match[str]") -> str:
+        literal = match.group(0)
+        if literal.startswith("'"):
+            return "?str"
+        if literal[:2] in ("X'", "x'"):
+            return "?blob"
+        return "?real" if "." in literal else "?int"
+
+    return " ".join(_SQL_LITERAL_RE.sub(_replace, sql).split())
+
+
+def _count_rows(result: Any) -> int:
+    if result is None:
+        return 0
+    if isinstance(result, (list, dict, set, frozenset)):
+        return len(result)
+    return 1
+
+
+class _FunctionStats:
+    __slots__ = ("calls", "errors", "rows", "total_ms", "max_ms", "histogram", "samples")
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.errors = 0
+        self.rows = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.histogram = [0] * (len(QUERY_HISTOGRAM_BOUNDS_MS) + 1)
+        self.samples: "collections.deque[float]" = collections.deque(
+            maxlen=_QUERY_SAMPLE_SIZE
+        )
+
+
+class QueryMetrics:
+    """Počty volání, latence (p50/p95/p99 z posledních vzorků) a histogramy."""
+
+    def __init__(self, slow_query_ms: float) -> None:
+        self.enabled = False
+        self.slow_query_ms = float(slow_query_ms)
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        self._stats: Dict[str, _FunctionStats] = {}
+        self._local = threading.local()
+
+    def enable(self) -> None:
+        self.enabled = True
+        connection_manager.set_trace_callback(self._trace_statement)
+
+    def disable(self) -> None:
+        self.enabled = False
+        connection_manager.set_trace_callback(None)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats = {}
+            self.started_at = time.time()
+
+    def _trace_statement(self, sql: str) -> None:
+        statements = getattr(self._local, "statements", None)
+        if statements is not None and len(statements) < _SLOW_QUERY_MAX_STATEMENTS:
+            statements.append(sql)
+
+    def call(self, name: str, func: Callable[..., Any], args: Any, kwargs: Any) -> Any:
+        outermost = getattr(self._local, "statements", None) is None
+        if outermost:
+            self._local.statements = []
+        failed = False
+        result = None
+        started = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+            return result
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000.0
+            self._record(name, elapsed_ms, _count_rows(result), failed)
+            if outermost:
+                statements = self._local.statements
+                self._local.statements = None
+                if elapsed_ms >= self.slow_query_ms:
+                    self._log_slow(name, elapsed_ms, args, kwargs, statements)
+
+    def _record(self, name: str, elapsed_ms: float, rows: int, failed: bool) -> None:
+        with self._lock:
+            stats = self._stats.get(name)
+            if stats is None:
+                stats = self._stats[name] = _FunctionStats()
+            stats.calls += 1
+            stats.errors += int(failed)
+            stats.rows += rows
+            stats.total_ms += elapsed_ms
+            stats.max_ms = max(stats.max_ms, elapsed_ms)
+            stats.histogram[bisect.bisect_left(QUERY_HISTOGRAM_BOUNDS_MS, elapsed_ms)] += 1
+            stats.samples.append(elapsed_ms)
+
+    def _log_slow(
+        self,
+        name: str,
+        elapsed_ms: float,
+        args: Any,
+        kwargs: Any,
+        statements: List[str],
+    ) -> None:
+        arg_shapes = [type(value).__name__ for value in args]
+        arg_shapes.extend(f"{key}={type(value).__name__}" for key, value in kwargs.items())
+        sql = "; ".join(
+            _sql_shape(statement)
+            for statement in statements
+            if statement not in ("BEGIN ", "COMMIT", "ROLLBACK")
+        )
+        logger.warning(
+            "Pomalý DB dotaz %s(%s): %.1f ms. SQL: %s",
+            name,
+            ", ".join(arg_shapes),
+            elapsed_ms,
+            sql or "-",
+        )
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """Souhrn per funkce seřazený podle celkového času."""
+        with self._lock:
+            items = [
+                (name, stats, sorted(stats.samples), list(stats.histogram))
+                for name, stats in self._stats.items()
+            ]
+        results: List[Dict[str, Any]] = []
+        for name, stats, samples, histogram in items:
+
+            def _percentile(fraction: float) -> float:
+                if not samples:
+                    return 0.0
+                return samples[min(len(samples) - 1, int(fraction * len(samples)))]
+
+            results.append(
+                {
+                    "name": name,
+                    "calls": stats.calls,
+                    "errors": stats.errors,
+                    "rows": stats.rows,
+                    "total_ms": stats.total_ms,
+                    "max_ms": stats.max_ms,
+                    "p50_ms": _percentile(0.50),
+                    "p95_ms": _percentile(0.95),
+                    "p99_ms": _percentile(0.99),
+                    "histogram": histogram,
+                }
+            )
+        results.sort(key=lambda item: item["total_ms"], reverse=True)
+        return results
+
+    def summary_lines(self, limit: int = 10, histogram: bool = False) -> List[str]:
+        lines = []
+        for item in self.snapshot()[:limit]:
+            line = (
+                f"`{item['name']}` {item['calls']}× · "
+                f"p50 {item['p50_ms']:.2f} / p95 {item['p95_ms']:.2f} / "
+                f"p99 {item['p99_ms']:.2f} ms · max {item['max_ms']:.1f} ms · "
+                f"celkem {item['total_ms']:.0f} ms · řádků {item['rows']}"
+            )
+            if item["errors"]:
+                line += f" · chyb {item['errors']}"
+            lines.append(line)
+            if histogram:
+                buckets = [
+                    f"≤{bound:g}: {count}"
+                    for bound, count in zip(QUERY_HISTOGRAM_BOUNDS_MS, item["histogram"])
+                    if count
+                ]
+                if item["histogram"][-1]:
+                    buckets.append(
+                        f">{QUERY_HISTOGRAM_BOUNDS_MS[-1]:g}: {item['histogram'][-1]}"
+                    )
+                lines.append("-# ms " + "  ".join(buckets))
+        return lines
+
+
+query_metrics = QueryMetrics(DB_SLOW_QUERY_MS)
+
+
+def _instrument(name: str, func: Callable[..., Any]) -> Callable[..., Any]:
+    @functools.wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        if not query_metrics.enabled:
+            return func(*args, **kwargs)
+        return query_metrics.call(name, func, args, kwargs)
+
+    return wrapper
+
+
+def _instrument_query_functions() -> None:
+    namespace = globals()
+    for name in QUERY_FUNCTIONS:
+        namespace[name] = _instrument(name, namespace[name])
+
+
+_instrument_query_functions()
+if DB_QUERY_METRICS_ENABLED:
+    query_metrics.enable()
@@ -10,11 +10,13 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 
+import adb
 from cog_admin_tasks import AdminTasks
 from cog_attendance import AttendanceCog
 from cog_basic import BasicCommandsCog
 from cog_clan import ClanPanelCog
 from cog_clan_stats import ClanStatsOcrCog
+from cog_db_maintenance import DbMaintenanceCog
 from cog_discord_writer import DiscordWriteCoordinatorCog
 from cog_giveaway import GiveawayCog
 from cog_leaderboard import LeaderboardCog
@@ -40,7 +42,7 @@ from config import (
     WINDOWS_NOTIFICATION_WINRT_ENABLED,
     WINDOWS_NOTIFICATION_WINRT_POLL_INTERVAL,
 )
-from db import init_db
+from db import close_connections, close_write_behind, init_db
 from windows_notification_listener import WindowsNotificationListener
 
 
@@ -122,6 +124,7 @@ class MyBot(commands.Bot):
             lambda: TimeStatusCog(self),
             lambda: WelcomeCog(self),
             lambda: RestartSchedulerCog(self),
+            lambda: DbMaintenanceCog(self),
         ]:
             await add_cog_safe(cog_factory)
 
@@ -154,6 +157,7 @@ class MyBot(commands.Bot):
         else:
             logger.info("WinRT ingest notifikací je vypnutý v konfiguraci.")
 
+        adb.warn_sync_db_calls(adb.modules_of(self.cogs.values()))
         await self._sync_app_commands()
         self._log_admin_tree_presence()
 
@@ -277,6 +281,9 @@ class MyBot(commands.Bot):
             except Exception:
                 logger.exception("Zastavení WinRT listeneru selhalo.")
         await super().close()
+        adb.shutdown()
+        close_write_behind()
+        close_connections()
 
 
 if __name__ == "__main__":